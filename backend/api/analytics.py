@@ -4,6 +4,7 @@ from auth import get_current_user, get_db
 import models_package.analytics as analytics_models
 import models
 from typing import List, Optional
+from datetime import datetime
 
 from schemas.analytics import (
     DashboardCreate,
@@ -22,6 +23,7 @@ from schemas.analytics import (
     MetricUpdate,
     MetricResponse,
     MetricListResponse,
+    MetricSamplesCreate,
     EventCreate,
     EventResponse,
 )
@@ -215,15 +217,38 @@ def delete_metric(
 @router.get("/api/analytics/metrics/{metric_id}/data")
 def get_metric_data(
     metric_id: int,
+    start: Optional[datetime] = Query(
+        None, description="Начало периода (по умолчанию сутки назад)"
+    ),
+    end: Optional[datetime] = Query(
+        None, description="Конец периода (по умолчанию текущее время)"
+    ),
+    step: Optional[int] = Query(
+        None, ge=1, description="Шаг точек в секундах (по умолчанию по длине периода)"
+    ),
     current_user: models.User = Depends(get_current_user),
     db: Session = Depends(get_db),
 ):
-    """Получить данные метрики"""
+    """Получить временной ряд метрики: count, avg, min, max и p95 по интервалам"""
     service = AnalyticsService(db)
-    data = service.get_metric_data(metric_id, current_user)
+    data = service.get_metric_data(
+        metric_id, current_user, start=start, end=end, step=step
+    )
     return data
 
 
+@router.post("/api/analytics/metrics/{metric_id}/data")
+def add_metric_data(
+    metric_id: int,
+    samples: MetricSamplesCreate,
+    current_user: models.User = Depends(get_current_user),
+    db: Session = Depends(get_db),
+):
+    """Записать пачку значений метрики"""
+    service = AnalyticsService(db)
+    return service.add_metric_data(metric_id, samples, current_user)
+
+
 # Reports endpoints
 @router.get("/api/analytics/reports", response_model=ReportListResponse)
 def get_reports(
@@ -1,6 +1,17 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query, UploadFile, File
+from fastapi import (
+    APIRouter,
+    Depends,
+    HTTPException,
+    status,
+    Query,
+    UploadFile,
+    File,
+    Request,
+)
 from sqlalchemy.orm import Session
-from auth import get_current_user, get_db
+from sqlalchemy.ext.asyncio import AsyncSession
+from auth import get_current_user, get_db, get_async_db
+from config import settings
 import models_package.content as content_models
 import models
 from typing import List, Optional
@@ -22,7 +33,10 @@ from schemas.content import (
     CategoryFilters,
     MediaFileFilters,
 )
+from schemas.base import CursorParams
 from services.content_service import ContentService
+from services.response_cache import ResponseCache
+from utils.validation import PaginationValidator
 from utils.exceptions import (
     ArticleNotFoundError,
     CategoryNotFoundError,
@@ -31,6 +45,12 @@ from utils.exceptions import (
 
 router = APIRouter()
 
+# Список категорий содержит счетчики статей, поэтому сбрасывается
+# и при изменении статей
+categories_cache = ResponseCache(
+    "content:categories", ttl=settings.HTTP_CACHE_CATEGORIES_TTL
+)
+
 
 # Articles endpoints
 @router.get("/api/content/articles", response_model=ArticleListResponse)
@@ -44,6 +64,7 @@ def get_articles(
     published_from: Optional[str] = Query(None, description="Статьи с даты публикации"),
     published_to: Optional[str] = Query(None, description="Статьи до даты публикации"),
     search: Optional[str] = Query(None, min_length=1, description="Поисковый запрос"),
+    cursor_params: Optional[CursorParams] = Depends(PaginationValidator.cursor_params),
     current_user: Optional[models.User] = Depends(get_current_user),
     db: Session = Depends(get_db),
 ):
@@ -65,7 +86,11 @@ def get_articles(
 
     service = ContentService(db)
     result = service.get_articles(
-        skip=skip, limit=limit, filters=filters, user=current_user
+        skip=skip,
+        limit=limit,
+        filters=filters,
+        user=current_user,
+        cursor_params=cursor_params,
     )
 
     articles = []
@@ -97,6 +122,7 @@ def get_articles(
         total=result["total"],
         skip=result["skip"],
         limit=result["limit"],
+        next_cursor=result["next_cursor"],
     )
 
 
@@ -140,6 +166,7 @@ def create_article(
     """Создать новую статью"""
     service = ContentService(db)
     article = service.create_article(article_data, current_user)
+    categories_cache.invalidate_sync()
 
     return ArticleResponse(
         id=article.id,
@@ -172,6 +199,7 @@ def update_article(
     """Обновить статью"""
     service = ContentService(db)
     article = service.update_article(article_id, article_data, current_user)
+    categories_cache.invalidate_sync()
 
     # Получаем обновленную информацию
     result = service.get_article(article_id, current_user)
@@ -206,6 +234,7 @@ def delete_article(
     """Удалить статью"""
     service = ContentService(db)
     service.delete_article(article_id, current_user)
+    categories_cache.invalidate_sync()
     return {"message": "Article deleted successfully"}
 
 
@@ -283,7 +312,8 @@ def unpublish_article(
 
 # Categories endpoints
 @router.get("/api/content/categories", response_model=CategoryListResponse)
-def get_categories(
+async def get_categories(
+    request: Request,
     skip: int = Query(0, ge=0, description="Количество пропущенных категорий"),
     limit: int = Query(
         20, ge=1, le=100, description="Количество категорий на странице"
@@ -292,7 +322,7 @@ def get_categories(
         None, description="Фильтр по родительской категории"
     ),
     search: Optional[str] = Query(None, min_length=1, description="Поисковый запрос"),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
     """Получить список категорий с фильтрацией"""
     filters = CategoryFilters(
@@ -300,32 +330,36 @@ def get_categories(
         search=search,
     )
 
-    service = ContentService(db)
-    result = service.get_categories(skip=skip, limit=limit, filters=filters)
-
-    categories = []
-    for item in result["items"]:
-        categories.append(
-            CategoryResponse(
-                id=item["category"].id,
-                name=item["category"].name,
-                description=item["category"].description,
-                slug=item["category"].slug,
-                parent_id=item["category"].parent_id,
-                is_active=item["category"].is_active,
-                created_at=item["category"].created_at,
-                updated_at=item["category"].updated_at,
-                articles_count=item["articles_count"],
-                subcategories_count=item["subcategories_count"],
+    def build_response(session: Session) -> CategoryListResponse:
+        service = ContentService(session)
+        result = service.get_categories(skip=skip, limit=limit, filters=filters)
+
+        categories = []
+        for item in result["items"]:
+            categories.append(
+                CategoryResponse(
+                    id=item["category"].id,
+                    name=item["category"].name,
+                    description=item["category"].description,
+                    slug=item["category"].slug,
+                    parent_id=None,  # parent_id не поддерживается в модели
+                    is_active=item["category"].is_active,
+                    created_at=item["category"].created_at,
+                    # updated_at не поддерживается в модели
+                    updated_at=item["category"].created_at,
+                    articles_count=item["articles_count"],
+                    subcategories_count=item["subcategories_count"],
+                )
             )
+
+        return CategoryListResponse(
+            items=categories,
+            total=result["total"],
+            skip=result["skip"],
+            limit=result["limit"],
         )
 
-    return CategoryListResponse(
-        items=categories,
-        total=result["total"],
-        skip=result["skip"],
-        limit=result["limit"],
-    )
+    return await categories_cache.respond(request, lambda: db.run_sync(build_response))
 
 
 @router.get("/api/content/categories/{category_id}", response_model=CategoryResponse)
@@ -360,6 +394,7 @@ def create_category(
     """Создать новую категорию"""
     service = ContentService(db)
     category = service.create_category(category_data, current_user)
+    categories_cache.invalidate_sync()
 
     return CategoryResponse(
         id=category.id,
@@ -385,6 +420,7 @@ def update_category(
     """Обновить категорию"""
     service = ContentService(db)
     category = service.update_category(category_id, category_data, current_user)
+    categories_cache.invalidate_sync()
 
     # Получаем обновленную статистику
     result = service.get_category(category_id)
@@ -412,6 +448,7 @@ def delete_category(
     """Удалить категорию"""
     service = ContentService(db)
     service.delete_category(category_id, current_user)
+    categories_cache.invalidate_sync()
     return {"message": "Category deleted successfully"}
 
 
@@ -1,6 +1,8 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Request
 from sqlalchemy.orm import Session
-from auth import get_current_user, get_db
+from sqlalchemy.ext.asyncio import AsyncSession
+from auth import get_current_user, get_db, get_async_db
+from config import settings
 import models_package.ecommerce as ecommerce_models
 import models
 from typing import List, Optional
@@ -20,7 +22,10 @@ from schemas.ecommerce import (
     OrderListResponse,
     ProductFilters,
 )
+from schemas.base import CursorParams
 from services.ecommerce_service import EcommerceService
+from services.response_cache import ResponseCache
+from utils.validation import PaginationValidator
 from utils.exceptions import (
     ProductNotFoundError,
     InsufficientStockError,
@@ -29,10 +34,25 @@ from utils.exceptions import (
 
 router = APIRouter()
 
+# Каталог одинаков для всех пользователей, поэтому ответы кэшируются общими
+products_cache = ResponseCache(
+    "ecommerce:products", ttl=settings.HTTP_CACHE_PRODUCTS_TTL
+)
+categories_cache = ResponseCache(
+    "ecommerce:categories", ttl=settings.HTTP_CACHE_CATEGORIES_TTL
+)
+
+
+def invalidate_catalog_cache():
+    """Сбросить кэш каталога после изменения товаров или их остатков"""
+    products_cache.invalidate_sync()
+    categories_cache.invalidate_sync()
+
 
 # Products endpoints
 @router.get("/api/ecommerce/products", response_model=ProductListResponse)
-def get_products(
+async def get_products(
+    request: Request,
     skip: int = Query(0, ge=0, description="Количество пропущенных товаров"),
     limit: int = Query(20, ge=1, le=100, description="Количество товаров на странице"),
     category: Optional[str] = Query(None, description="Фильтр по категории"),
@@ -40,7 +60,8 @@ def get_products(
     max_price: Optional[float] = Query(None, ge=0, description="Максимальная цена"),
     in_stock: Optional[bool] = Query(None, description="Только в наличии"),
     search: Optional[str] = Query(None, min_length=1, description="Поисковый запрос"),
-    db: Session = Depends(get_db),
+    cursor_params: Optional[CursorParams] = Depends(PaginationValidator.cursor_params),
+    db: AsyncSession = Depends(get_async_db),
 ):
     """Получить список товаров с фильтрацией и поиском"""
     filters = ProductFilters(
@@ -51,15 +72,20 @@ def get_products(
         search=search,
     )
 
-    service = EcommerceService(db)
-    result = service.get_products(skip=skip, limit=limit, filters=filters)
+    def build_response(session: Session) -> ProductListResponse:
+        service = EcommerceService(session)
+        result = service.get_products(
+            skip=skip, limit=limit, filters=filters, cursor_params=cursor_params
+        )
+        return ProductListResponse(
+            items=[ProductResponse.model_validate(item) for item in result["items"]],
+            total=result["total"],
+            skip=result["skip"],
+            limit=result["limit"],
+            next_cursor=result["next_cursor"],
+        )
 
-    return ProductListResponse(
-        items=[ProductResponse.model_validate(item) for item in result["items"]],
-        total=result["total"],
-        skip=result["skip"],
-        limit=result["limit"],
-    )
+    return await products_cache.respond(request, lambda: db.run_sync(build_response))
 
 
 @router.get("/api/ecommerce/products/{product_id}", response_model=ProductResponse)
@@ -79,6 +105,7 @@ def create_product(
     """Создать новый товар"""
     service = EcommerceService(db)
     product = service.create_product(product_data, current_user)
+    invalidate_catalog_cache()
     return ProductResponse.model_validate(product)
 
 
@@ -92,6 +119,7 @@ def update_product(
     """Обновить товар"""
     service = EcommerceService(db)
     product = service.update_product(product_id, product_data, current_user)
+    invalidate_catalog_cache()
     return ProductResponse.model_validate(product)
 
 
@@ -104,15 +132,19 @@ def delete_product(
     """Удалить товар (мягкое удаление)"""
     service = EcommerceService(db)
     service.delete_product(product_id, current_user)
+    invalidate_catalog_cache()
     return {"message": "Product deleted successfully"}
 
 
 @router.get("/api/ecommerce/categories")
-def get_categories(db: Session = Depends(get_db)):
+async def get_categories(request: Request, db: AsyncSession = Depends(get_async_db)):
     """Получить список категорий товаров"""
-    service = EcommerceService(db)
-    categories = service.get_categories()
-    return {"categories": categories}
+
+    def build_response(session: Session) -> dict:
+        categories = EcommerceService(session).get_categories()
+        return {"categories": categories}
+
+    return await categories_cache.respond(request, lambda: db.run_sync(build_response))
 
 
 # Cart endpoints
@@ -221,12 +253,15 @@ def clear_cart(
 def get_orders(
     skip: int = Query(0, ge=0, description="Количество пропущенных заказов"),
     limit: int = Query(20, ge=1, le=100, description="Количество заказов на странице"),
+    cursor_params: Optional[CursorParams] = Depends(PaginationValidator.cursor_params),
     current_user: models.User = Depends(get_current_user),
     db: Session = Depends(get_db),
 ):
     """Получить заказы пользователя"""
     service = EcommerceService(db)
-    result = service.get_orders(current_user, skip=skip, limit=limit)
+    result = service.get_orders(
+        current_user, skip=skip, limit=limit, cursor_params=cursor_params
+    )
 
     orders = []
     for order in result["items"]:
@@ -262,6 +297,7 @@ def get_orders(
         total=result["total"],
         skip=result["skip"],
         limit=result["limit"],
+        next_cursor=result["next_cursor"],
     )
 
 
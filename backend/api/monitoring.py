@@ -3,6 +3,7 @@ API endpoints для мониторинга
 """
 
 from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.responses import JSONResponse
 from typing import Dict, Any
 from monitoring import MetricsCollector, HealthChecker, MetricsEndpoint, HealthEndpoint
 from monitoring.logging import app_logger
@@ -59,7 +60,13 @@ async def get_health_detailed():
 async def get_ready():
     """Проверка готовности к работе (для Kubernetes)"""
     try:
-        return await health_endpoint.get_ready()
+        result = await health_endpoint.get_ready()
+        if result["status"] != "ready":
+            # Проба readinessProbe считает неуспешным только код ответа
+            return JSONResponse(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE, content=result
+            )
+        return result
     except Exception as e:
         app_logger.error("Readiness check failed", error=str(e))
         raise HTTPException(
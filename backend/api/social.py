@@ -1,6 +1,7 @@
 from fastapi import APIRouter, Depends, HTTPException, status, Query
 from sqlalchemy.orm import Session
-from auth import get_current_user, get_db
+from sqlalchemy.ext.asyncio import AsyncSession
+from auth import get_current_user, get_current_user_async, get_db, get_async_db
 import models_package.social as social_models
 import models
 from typing import List, Optional
@@ -21,39 +22,16 @@ from schemas.social import (
     UserProfileResponse,
     PostFilters,
 )
+from schemas.base import CursorParams
 from services.social_service import SocialService
+from utils.validation import PaginationValidator
 from utils.exceptions import PostNotFoundError, NotFoundError
 
 router = APIRouter()
 
 
-# Posts endpoints
-@router.get("/api/social/posts", response_model=PostListResponse)
-def get_posts(
-    skip: int = Query(0, ge=0, description="Количество пропущенных постов"),
-    limit: int = Query(20, ge=1, le=100, description="Количество постов на странице"),
-    author_id: Optional[int] = Query(None, description="Фильтр по автору"),
-    is_public: Optional[bool] = Query(None, description="Фильтр по публичности"),
-    search: Optional[str] = Query(None, min_length=1, description="Поисковый запрос"),
-    date_from: Optional[str] = Query(None, description="Посты с даты"),
-    date_to: Optional[str] = Query(None, description="Посты до даты"),
-    current_user: Optional[models.User] = Depends(get_current_user),
-    db: Session = Depends(get_db),
-):
-    """Получить список постов с фильтрацией"""
-    filters = PostFilters(
-        author_id=author_id,
-        is_public=is_public,
-        search=search,
-        date_from=date_from,
-        date_to=date_to,
-    )
-
-    service = SocialService(db)
-    result = service.get_posts(
-        skip=skip, limit=limit, filters=filters, user=current_user
-    )
-
+def _build_post_list_response(result: dict) -> PostListResponse:
+    """Сборка ответа со списком постов из результата сервиса"""
     posts = []
     for item in result["items"]:
         posts.append(
@@ -76,9 +54,47 @@ def get_posts(
         total=result["total"],
         skip=result["skip"],
         limit=result["limit"],
+        next_cursor=result["next_cursor"],
     )
 
 
+# Posts endpoints
+@router.get("/api/social/posts", response_model=PostListResponse)
+async def get_posts(
+    skip: int = Query(0, ge=0, description="Количество пропущенных постов"),
+    limit: int = Query(20, ge=1, le=100, description="Количество постов на странице"),
+    author_id: Optional[int] = Query(None, description="Фильтр по автору"),
+    is_public: Optional[bool] = Query(None, description="Фильтр по публичности"),
+    search: Optional[str] = Query(None, min_length=1, description="Поисковый запрос"),
+    date_from: Optional[str] = Query(None, description="Посты с даты"),
+    date_to: Optional[str] = Query(None, description="Посты до даты"),
+    cursor_params: Optional[CursorParams] = Depends(PaginationValidator.cursor_params),
+    current_user: Optional[models.User] = Depends(get_current_user_async),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """Получить список постов с фильтрацией"""
+    filters = PostFilters(
+        author_id=author_id,
+        is_public=is_public,
+        search=search,
+        date_from=date_from,
+        date_to=date_to,
+    )
+
+    def build_response(session: Session) -> PostListResponse:
+        service = SocialService(session)
+        result = service.get_posts(
+            skip=skip,
+            limit=limit,
+            filters=filters,
+            user=current_user,
+            cursor_params=cursor_params,
+        )
+        return _build_post_list_response(result)
+
+    return await db.run_sync(build_response)
+
+
 @router.get("/api/social/posts/{post_id}", response_model=PostResponse)
 def get_post(
     post_id: int,
@@ -435,36 +451,20 @@ def get_user_profile(
 
 # Feed endpoints
 @router.get("/api/social/feed", response_model=PostListResponse)
-def get_feed(
+async def get_feed(
     skip: int = Query(0, ge=0, description="Количество пропущенных постов"),
     limit: int = Query(20, ge=1, le=100, description="Количество постов на странице"),
-    current_user: models.User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    cursor_params: Optional[CursorParams] = Depends(PaginationValidator.cursor_params),
+    current_user: models.User = Depends(get_current_user_async),
+    db: AsyncSession = Depends(get_async_db),
 ):
     """Получить ленту пользователя"""
-    service = SocialService(db)
-    result = service.get_feed(current_user, skip=skip, limit=limit)
 
-    posts = []
-    for item in result["items"]:
-        posts.append(
-            PostResponse(
-                id=item["post"].id,
-                content=item["post"].content,
-                image_url=item["post"].image_url,
-                is_public=item["post"].is_public,
-                created_at=item["post"].created_at,
-                updated_at=item["post"].updated_at,
-                author=item["post"].user,
-                likes_count=item["likes_count"],
-                comments_count=item["comments_count"],
-                is_liked=item["is_liked"],
-            )
+    def build_response(session: Session) -> PostListResponse:
+        service = SocialService(session)
+        result = service.get_feed(
+            current_user, skip=skip, limit=limit, cursor_params=cursor_params
         )
+        return _build_post_list_response(result)
 
-    return PostListResponse(
-        items=posts,
-        total=result["total"],
-        skip=result["skip"],
-        limit=result["limit"],
-    )
+    return await db.run_sync(build_response)
@@ -1,6 +1,7 @@
 from fastapi import APIRouter, Depends, HTTPException, status, Query
 from sqlalchemy.orm import Session
-from auth import get_current_user, get_db
+from sqlalchemy.ext.asyncio import AsyncSession
+from auth import get_current_user, get_current_user_async, get_db, get_async_db
 import models_package.tasks as tasks_models
 import models
 from typing import List, Optional
@@ -21,7 +22,9 @@ from schemas.tasks import (
     BoardFilters,
     CardFilters,
 )
+from schemas.base import CursorParams
 from services.tasks_service import TasksService
+from utils.validation import PaginationValidator
 from utils.exceptions import (
     BoardNotFoundError,
     CardNotFoundError,
@@ -39,6 +42,7 @@ def get_boards(
     user_id: Optional[int] = Query(None, description="Фильтр по владельцу"),
     is_public: Optional[bool] = Query(None, description="Фильтр по публичности"),
     search: Optional[str] = Query(None, min_length=1, description="Поисковый запрос"),
+    cursor_params: Optional[CursorParams] = Depends(PaginationValidator.cursor_params),
     current_user: Optional[models.User] = Depends(get_current_user),
     db: Session = Depends(get_db),
 ):
@@ -51,7 +55,11 @@ def get_boards(
 
     service = TasksService(db)
     result = service.get_boards(
-        skip=skip, limit=limit, filters=filters, user=current_user
+        skip=skip,
+        limit=limit,
+        filters=filters,
+        user=current_user,
+        cursor_params=cursor_params,
     )
 
     boards = []
@@ -77,6 +85,7 @@ def get_boards(
         total=result["total"],
         skip=result["skip"],
         limit=result["limit"],
+        next_cursor=result["next_cursor"],
     )
 
 
@@ -173,7 +182,7 @@ def delete_board(
 
 # Cards endpoints
 @router.get("/api/tasks/boards/{board_id}/cards", response_model=CardListResponse)
-def get_board_cards(
+async def get_board_cards(
     board_id: int,
     skip: int = Query(0, ge=0, description="Количество пропущенных карточек"),
     limit: int = Query(20, ge=1, le=100, description="Количество карточек на странице"),
@@ -185,8 +194,8 @@ def get_board_cards(
     ),
     due_date_to: Optional[str] = Query(None, description="Карточки до даты выполнения"),
     search: Optional[str] = Query(None, min_length=1, description="Поисковый запрос"),
-    current_user: Optional[models.User] = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    current_user: Optional[models.User] = Depends(get_current_user_async),
+    db: AsyncSession = Depends(get_async_db),
 ):
     """Получить карточки доски с фильтрацией"""
     filters = CardFilters(
@@ -198,36 +207,40 @@ def get_board_cards(
         search=search,
     )
 
-    service = TasksService(db)
-    result = service.get_cards(
-        board_id, skip=skip, limit=limit, filters=filters, user=current_user
-    )
+    def build_response(session: Session) -> CardListResponse:
+        service = TasksService(session)
+        result = service.get_cards(
+            board_id, skip=skip, limit=limit, filters=filters, user=current_user
+        )
 
-    cards = []
-    for item in result["items"]:
-        cards.append(
-            CardResponse(
-                id=item["card"].id,
-                title=item["card"].title,
-                description=item["card"].description,
-                status=item["card"].status.value,
-                priority=item["card"].priority.value,
-                assigned_to=item["card"].assigned_to,
-                due_date=item["card"].due_date,
-                created_at=item["card"].created_at,
-                updated_at=item["card"].updated_at,
-                board_id=item["card"].board_id,
-                comments_count=item["comments_count"],
-                is_overdue=item["is_overdue"],
+        cards = []
+        for item in result["items"]:
+            cards.append(
+                CardResponse(
+                    id=item["card"].id,
+                    title=item["card"].title,
+                    description=item["card"].description,
+                    status=item["card"].status.value,
+                    priority=item["card"].priority.value,
+                    assigned_to=item["card"].assigned_to,
+                    due_date=item["card"].due_date,
+                    created_at=item["card"].created_at,
+                    updated_at=item["card"].updated_at,
+                    board_id=item["card"].board_id,
+                    comments_count=item["comments_count"],
+                    is_overdue=item["is_overdue"],
+                )
             )
+
+        return CardListResponse(
+            items=cards,
+            total=result["total"],
+            skip=result["skip"],
+            limit=result["limit"],
         )
 
-    return CardListResponse(
-        items=cards,
-        total=result["total"],
-        skip=result["skip"],
-        limit=result["limit"],
-    )
+    # Ленивые связи карточек загружаются внутри run_sync
+    return await db.run_sync(build_response)
 
 
 @router.get("/api/tasks/cards/{card_id}", response_model=CardResponse)
@@ -2,9 +2,10 @@ from contextlib import asynccontextmanager
 from fastapi import FastAPI, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
 from main_routers import router as main_router
-from models import create_db_and_tables
-from middleware import SecurityMiddleware, RequestLoggingMiddleware
-from monitoring import MetricsCollector, PrometheusMetrics
+from models import create_db_and_tables, engine, async_engine
+from middleware import RequestPipeline, SecurityStage, RequestLoggingStage
+from monitoring import MetricsCollector, MetricsStage, system_sampler
+from services.event_pipeline import event_pipeline
 from websocket_manager import websocket_manager
 
 
@@ -13,8 +14,13 @@ async def lifespan(app: FastAPI):
     """Управление жизненным циклом приложения"""
     # Startup
     create_db_and_tables()
+    system_sampler.start()
+    event_pipeline.start()
     yield
-    # Shutdown (если нужно)
+    # Shutdown: события из очереди дописываются до закрытия пула соединений
+    await event_pipeline.stop()
+    await system_sampler.stop()
+    await async_engine.dispose()
 
 
 app = FastAPI(
@@ -24,13 +30,20 @@ app = FastAPI(
     lifespan=lifespan,
 )
 
-# Middleware для мониторинга
+# Middleware мониторинга, логирования и безопасности: один ASGI-конвейер
+# с общим контекстом запроса. Метрики и лог видят и ответы, которыми
+# этап безопасности отклонил запрос.
 metrics_collector = MetricsCollector()
-app.add_middleware(PrometheusMetrics, metrics_collector=metrics_collector)
-
-# Middleware для безопасности
-app.add_middleware(SecurityMiddleware)
-app.add_middleware(RequestLoggingMiddleware)
+metrics_collector.instrument_engine(engine)
+metrics_collector.instrument_engine(async_engine.sync_engine)
+app.add_middleware(
+    RequestPipeline,
+    stages=[
+        MetricsStage(metrics_collector),
+        RequestLoggingStage(),
+        SecurityStage(),
+    ],
+)
 
 # CORS настройки
 app.add_middleware(
@@ -1,12 +1,17 @@
 from datetime import datetime, timedelta, timezone
-from typing import Optional
+from typing import Optional, Dict, Any
+import time
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 from fastapi import HTTPException, status, Depends
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from sqlalchemy.orm import Session
+from sqlalchemy import select, event, inspect
+from sqlalchemy.orm import Session, make_transient_to_detached
+from sqlalchemy.ext.asyncio import AsyncSession
 import models, schemas, config
 from security import SecurityUtils
+from utils.cache import TTLCache
+from monitoring.metrics import MetricsCollector
 
 
 def get_db():
@@ -18,6 +23,12 @@ def get_db():
         db.close()
 
 
+async def get_async_db():
+    """Dependency для получения асинхронной сессии БД"""
+    async with models.AsyncSessionLocal() as db:
+        yield db
+
+
 # Настройка хеширования паролей
 pwd_context = CryptContext(schemes=["pbkdf2_sha256"], deprecated="auto")
 
@@ -29,6 +40,15 @@ ACCESS_TOKEN_EXPIRE_MINUTES = config.settings.ACCESS_TOKEN_EXPIRE_MINUTES
 security = HTTPBearer()
 
 
+def _credentials_exception() -> HTTPException:
+    """Ошибка аутентификации по токену"""
+    return HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Could not validate credentials",
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+
+
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """Проверка пароля"""
     return SecurityUtils.verify_password(plain_password, hashed_password)
@@ -69,28 +89,140 @@ def authenticate_user(db: Session, email: str, password: str):
     return user
 
 
-def get_current_user(
-    credentials: HTTPAuthorizationCredentials = Depends(security),
-    db: Session = Depends(get_db),
-):
-    """Получение текущего пользователя по токену"""
-    credentials_exception = HTTPException(
-        status_code=status.HTTP_401_UNAUTHORIZED,
-        detail="Could not validate credentials",
-        headers={"WWW-Authenticate": "Bearer"},
-    )
+# Кэши аутентификации в памяти процесса: расшифрованные токены и пользователи.
+# Пользователь хранится как снимок колонок и присоединяется к сессии запроса
+# через merge(load=False), поэтому попадание в кэш не выполняет SELECT
+token_cache = TTLCache(
+    config.settings.AUTH_TOKEN_CACHE_SIZE, config.settings.AUTH_TOKEN_CACHE_TTL
+)
+user_cache = TTLCache(
+    config.settings.AUTH_USER_CACHE_SIZE, config.settings.AUTH_USER_CACHE_TTL
+)
+metrics_collector = MetricsCollector()
+
+
+def _get_token_email(credentials: HTTPAuthorizationCredentials) -> str:
+    """Извлечение email пользователя из access токена"""
+    token = credentials.credentials
+    cached = token_cache.get(token)
+    if cached is not None:
+        email, expires_at = cached
+        if expires_at is None or expires_at > time.time():
+            metrics_collector.record_auth_cache("token", hit=True)
+            return email
+        token_cache.delete(token)
+    metrics_collector.record_auth_cache("token", hit=False)
+
     try:
-        payload = jwt.decode(
-            credentials.credentials, SECRET_KEY, algorithms=[ALGORITHM]
-        )
+        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         email: str = payload.get("sub")
         if email is None:
-            raise credentials_exception
+            raise _credentials_exception()
         token_data = schemas.TokenData(email=email)
     except JWTError:
-        raise credentials_exception
+        raise _credentials_exception()
+
+    # Запись не переживает срок действия токена
+    expires_at = payload.get("exp")
+    ttl = expires_at - time.time() if expires_at else None
+    token_cache.set(token, (token_data.email, expires_at), ttl=ttl)
+    return token_data.email
+
+
+# Денормализованные счетчики меняются массовым UPDATE (CounterHelper) без
+# событий маппера и потому не кэшируются: у пользователя из кэша они не
+# загружены и читаются из БД при первом обращении
+USER_COUNTER_COLUMNS = frozenset(
+    {"posts_count", "followers_count", "following_count", "articles_count"}
+)
+
+
+def _user_snapshot(user: models.User) -> Dict[str, Any]:
+    """Значения колонок пользователя для кэша (без счетчиков)"""
+    return {
+        attr.key: getattr(user, attr.key)
+        for attr in inspect(models.User).column_attrs
+        if attr.key not in USER_COUNTER_COLUMNS
+    }
+
+
+def _user_from_snapshot(snapshot: Dict[str, Any]) -> models.User:
+    """Отсоединенный экземпляр пользователя из снимка, готовый к merge"""
+    user = models.User(**snapshot)
+    make_transient_to_detached(user)
+    return user
+
+
+def _get_cached_user(email: str) -> Optional[models.User]:
+    """Пользователь из кэша или None"""
+    snapshot = user_cache.get(email)
+    metrics_collector.record_auth_cache("user", hit=snapshot is not None)
+    if snapshot is None:
+        return None
+    return _user_from_snapshot(snapshot)
+
+
+def invalidate_user_cache(email: str) -> None:
+    """Сбросить кэшированного пользователя"""
+    user_cache.delete(email)
+
+
+@event.listens_for(models.User, "after_update")
+@event.listens_for(models.User, "after_delete")
+def _on_user_changed(mapper, connection, target):
+    """Сброс кэша при изменении профиля, пароля, деактивации или удалении"""
+    emails = {target.email, *inspect(target).attrs.email.history.deleted}
+    session = Session.object_session(target)
+    if session is not None:
+        session.info.setdefault("invalidated_user_emails", set()).update(emails)
+    for email in emails:
+        invalidate_user_cache(email)
+
+
+@event.listens_for(Session, "after_commit")
+def _on_session_commit(session):
+    """Повторный сброс после коммита: параллельный запрос мог закэшировать
+    пользователя между flush и commit"""
+    for email in session.info.pop("invalidated_user_emails", ()):
+        invalidate_user_cache(email)
+
+
+@event.listens_for(Session, "after_rollback")
+def _on_session_rollback(session):
+    """Изменения отменены, повторный сброс не нужен"""
+    session.info.pop("invalidated_user_emails", None)
+
 
-    user = db.query(models.User).filter(models.User.email == token_data.email).first()
+def get_current_user(
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    db: Session = Depends(get_db),
+):
+    """Получение текущего пользователя по токену"""
+    email = _get_token_email(credentials)
+    cached_user = _get_cached_user(email)
+    if cached_user is not None:
+        return db.merge(cached_user, load=False)
+
+    user = db.query(models.User).filter(models.User.email == email).first()
+    if user is None:
+        raise _credentials_exception()
+    user_cache.set(email, _user_snapshot(user))
+    return user
+
+
+async def get_current_user_async(
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """Получение текущего пользователя по токену через асинхронную сессию"""
+    email = _get_token_email(credentials)
+    cached_user = _get_cached_user(email)
+    if cached_user is not None:
+        return await db.merge(cached_user, load=False)
+
+    result = await db.execute(select(models.User).where(models.User.email == email))
+    user = result.scalars().first()
     if user is None:
-        raise credentials_exception
+        raise _credentials_exception()
+    user_cache.set(email, _user_snapshot(user))
     return user
@@ -17,6 +17,8 @@ sys.path.insert(0, os.path.dirname(__file__))
 
 from models import Base, User
 from security import get_password_hash
+from services.counter_service import CounterService, install_counter_columns
+from utils.full_text import install_search_indexes
 import models_package.ecommerce
 import models_package.social
 import models_package.tasks
@@ -141,6 +143,12 @@ def create_tables(database_url):
     try:
         engine = create_engine(database_url)
         Base.metadata.create_all(bind=engine)
+        # create_all не добавляет новые колонки в уже существующие таблицы
+        added = install_counter_columns(engine)
+        if added:
+            print(f"✅ Добавлены колонки счетчиков: {', '.join(added)}")
+        if install_search_indexes(engine):
+            print("✅ Полнотекстовые индексы установлены")
         print("✅ Таблицы созданы")
         return True
     except Exception as e:
@@ -191,6 +199,10 @@ def create_test_data(database_url):
         # Создаем тестовые данные для Analytics
         create_analytics_test_data(db, test_user)
 
+        # Посты и статьи создаются напрямую, минуя сервисы со счетчиками
+        CounterService(db).reconcile_all()
+        print("✅ Счетчики пересчитаны")
+
         db.close()
         return True
 
@@ -7,6 +7,7 @@ from auth import get_db
 
 # Import all API routers
 from api import ecommerce, social, tasks, content, analytics, monitoring
+
 # from routers.notifications import router as notifications_router
 
 router = APIRouter()
@@ -170,7 +171,9 @@ def logout(current_user: models.User = Depends(auth.get_current_user)):
 
 
 @router.get("/api/auth/me", response_model=schemas.UserResponse)
-def get_current_user_info(current_user: models.User = Depends(auth.get_current_user)):
+async def get_current_user_info(
+    current_user: models.User = Depends(auth.get_current_user_async),
+):
     """Получение информации о текущем пользователе"""
     return current_user
 
@@ -245,5 +248,6 @@ def health_check():
     """Проверка здоровья API"""
     return {"status": "ok", "message": "API is running"}
 
+
 # Экспорт роутера
 __all__ = ["router"]
@@ -2,9 +2,21 @@
 Middleware package
 """
 
-from .security import SecurityMiddleware, RequestLoggingMiddleware
+from .pipeline import (
+    PipelineStage,
+    RequestContext,
+    RequestPipeline,
+    get_request_context,
+)
+from .security_middleware import SecurityStage, CSRFStage
+from .logging_middleware import RequestLoggingStage
 
 __all__ = [
-    "SecurityMiddleware",
-    "RequestLoggingMiddleware",
+    "PipelineStage",
+    "RequestContext",
+    "RequestPipeline",
+    "get_request_context",
+    "SecurityStage",
+    "CSRFStage",
+    "RequestLoggingStage",
 ]
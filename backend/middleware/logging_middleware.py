@@ -0,0 +1,50 @@
+"""
+Middleware для логирования запросов
+"""
+
+import logging
+
+from middleware.pipeline import PipelineStage, RequestContext
+
+logger = logging.getLogger(__name__)
+
+
+class RequestLoggingStage(PipelineStage):
+    """Этап конвейера для логирования запросов"""
+
+    async def on_request(self, context: RequestContext):
+        """Логирование входящего запроса"""
+        # Поля extra собираются, только если сообщение будет записано
+        if logger.isEnabledFor(logging.INFO):
+            logger.info(
+                f"Request: {context.method} {context.path}",
+                extra={
+                    "method": context.method,
+                    "path": context.path,
+                    "client_ip": context.client_ip,
+                    "user_agent": context.headers.get("user-agent", ""),
+                },
+            )
+        return None
+
+    def on_response_end(self, context: RequestContext):
+        """Логирование результата обработки"""
+        process_time = context.duration
+
+        if context.error is not None and context.status_code is None:
+            logger.error(
+                f"Request failed: {context.method} {context.path} "
+                f"-> ERROR in {process_time:.3f}s: {context.error}"
+            )
+            return
+
+        if logger.isEnabledFor(logging.INFO):
+            logger.info(
+                f"Response: {context.status_code} in {process_time:.3f}s",
+                extra={
+                    "status_code": context.status_code,
+                    "process_time": process_time,
+                    "response_size": context.response_size,
+                    "client_ip": context.client_ip,
+                },
+            )
@@ -0,0 +1,177 @@
+"""
+Конвейер ASGI middleware с общим контекстом запроса
+"""
+
+from typing import Dict, List, Optional, Sequence, Tuple
+import time
+
+from starlette.responses import Response
+
+# Заголовки ответа в формате ASGI: (имя, значение) в байтах
+RawHeaders = List[Tuple[bytes, bytes]]
+
+
+class RequestContext:
+    """Данные запроса, общие для всех этапов конвейера
+
+    Заголовки разбираются один раз при создании контекста. Контекст
+    доступен обработчикам через request.state.request_context.
+    """
+
+    __slots__ = (
+        "scope",
+        "method",
+        "path",
+        "query_string",
+        "headers",
+        "header_items",
+        "client_ip",
+        "start_time",
+        "status_code",
+        "response_size",
+        "error",
+    )
+
+    def __init__(self, scope, start_time: Optional[float] = None):
+        self.scope = scope
+        self.method: str = scope["method"]
+        self.path: str = scope["path"]
+        self.query_string: str = scope.get("query_string", b"").decode("latin-1")
+
+        # Имена заголовков в ASGI уже в нижнем регистре; при повторе
+        # заголовка в словаре остается первое значение, как в Starlette
+        self.header_items: List[Tuple[str, str]] = [
+            (name.decode("latin-1"), value.decode("latin-1"))
+            for name, value in scope.get("headers", ())
+        ]
+        self.headers: Dict[str, str] = {}
+        for name, value in self.header_items:
+            self.headers.setdefault(name, value)
+
+        self.client_ip = self._get_client_ip()
+        self.start_time = time.perf_counter() if start_time is None else start_time
+        self.status_code: Optional[int] = None
+        self.response_size = 0
+        self.error: Optional[BaseException] = None
+
+    def _get_client_ip(self) -> str:
+        """IP клиента с учетом заголовков прокси"""
+        forwarded_for = self.headers.get("x-forwarded-for")
+        if forwarded_for:
+            return forwarded_for.split(",")[0].strip()
+
+        real_ip = self.headers.get("x-real-ip")
+        if real_ip:
+            return real_ip
+
+        client = self.scope.get("client")
+        return client[0] if client else "unknown"
+
+    @property
+    def route_template(self) -> Optional[str]:
+        """Шаблон пути маршрута (/api/items/{item_id}), известен после маршрутизации"""
+        route = self.scope.get("route")
+        if route is None:
+            return None
+        return getattr(route, "path_format", None) or getattr(route, "path", None)
+
+    @property
+    def duration(self) -> float:
+        return time.perf_counter() - self.start_time
+
+
+def get_request_context(scope) -> Optional[RequestContext]:
+    """Контекст запроса, созданный RequestPipeline"""
+    return scope.get("state", {}).get("request_context")
+
+
+class PipelineStage:
+    """Этап конвейера
+
+    Реализации переопределяют только нужные методы: конвейер вызывает
+    этап лишь для переопределенных методов.
+    """
+
+    async def on_request(self, context: RequestContext) -> Optional[Response]:
+        """Проверка запроса до приложения; ответ прерывает обработку"""
+        return None
+
+    def on_response_start(self, context: RequestContext, headers: RawHeaders):
+        """Начало ответа: статус известен, заголовки можно дополнить"""
+
+    def on_response_end(self, context: RequestContext):
+        """Завершение запроса, в том числе с исключением (context.error)"""
+
+
+class RequestPipeline:
+    """Один ASGI middleware, выполняющий этапы с общим RequestContext
+
+    В отличие от BaseHTTPMiddleware ответ не буферизуется: сообщения
+    приложения передаются дальше сразу, поэтому потоковые ответы
+    работают без задержек. Этапы вложены, как отдельные middleware в
+    порядке списка: ответ, возвращенный этапом из on_request, проходит
+    через хуки ответа этого этапа и предшествующих ему, а последующие
+    этапы запрос не видят.
+    """
+
+    def __init__(self, app, stages: Sequence[PipelineStage] = ()):
+        self.app = app
+        self.stages = list(stages)
+        self._request_stages = self._overriding(stages, "on_request")
+        self._start_stages = self._overriding(stages, "on_response_start")
+        self._end_stages = self._overriding(stages, "on_response_end")
+
+    @staticmethod
+    def _overriding(stages, method: str) -> List[Tuple[int, PipelineStage]]:
+        """Этапы, переопределившие метод, с их позицией в конвейере"""
+        default = getattr(PipelineStage, method)
+        return [
+            (index, stage)
+            for index, stage in enumerate(stages)
+            if getattr(type(stage), method) is not default
+        ]
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        context = RequestContext(scope)
+        scope.setdefault("state", {})["request_context"] = context
+        # Число этапов, до которых дошел запрос
+        depth = len(self.stages)
+
+        async def send_wrapper(message):
+            message_type = message["type"]
+            if message_type == "http.response.start":
+                context.status_code = message["status"]
+                # Копия списка: объект Response может переиспользоваться
+                headers = list(message.get("headers", ()))
+                for index, stage in self._start_stages:
+                    if index < depth:
+                        stage.on_response_start(context, headers)
+                message["headers"] = headers
+            elif message_type == "http.response.body":
+                context.response_size += len(message.get("body", b""))
+            await send(message)
+
+        try:
+            for index, stage in self._request_stages:
+                try:
+                    response = await stage.on_request(context)
+                except BaseException:
+                    depth = index
+                    raise
+                if response is not None:
+                    depth = index + 1
+                    await response(scope, receive, send_wrapper)
+                    return
+
+            await self.app(scope, receive, send_wrapper)
+        except BaseException as e:
+            context.error = e
+            raise
+        finally:
+            for index, stage in self._end_stages:
+                if index < depth:
+                    stage.on_response_end(context)
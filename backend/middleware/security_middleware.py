@@ -2,35 +2,57 @@
 Middleware для усиления безопасности
 """
 
-from fastapi import Request, HTTPException, status
+from fastapi import status
 from fastapi.responses import JSONResponse
-from starlette.middleware.base import BaseHTTPMiddleware
-from typing import Callable
+from typing import Optional
+from urllib.parse import unquote_plus
 import logging
-import time
-from datetime import datetime, timezone
-import asyncio
 
+from config import settings
+from middleware.pipeline import PipelineStage, RawHeaders, RequestContext
 from services.security_service import security_service
 
 logger = logging.getLogger(__name__)
 
 
-class SecurityMiddleware(BaseHTTPMiddleware):
-    """Middleware для усиления безопасности"""
+class SecurityStage(PipelineStage):
+    """Этап конвейера для усиления безопасности
 
-    def __init__(self, app, **kwargs):
-        super().__init__(app)
-        self.rate_limit_cache = {}
-        self.request_times = {}
+    Заголовки безопасности добавляются к каждому ответу. Проверки запроса
+    (черный список IP, лимит запросов, паттерны атак) выполняются при
+    enforce=True, по умолчанию - по настройке SECURITY_ENFORCE_REQUESTS.
+    """
 
-    async def dispatch(self, request: Request, call_next: Callable):
-        """Обработка запроса через middleware безопасности"""
-        start_time = time.time()
+    SECURITY_HEADERS: RawHeaders = [
+        (b"x-content-type-options", b"nosniff"),
+        (b"x-frame-options", b"DENY"),
+        (b"x-xss-protection", b"1; mode=block"),
+        (b"strict-transport-security", b"max-age=31536000; includeSubDomains"),
+        (b"referrer-policy", b"strict-origin-when-cross-origin"),
+        (b"content-security-policy", b"default-src 'self'"),
+        (b"permissions-policy", b"geolocation=(), microphone=(), camera=()"),
+    ]
+
+    # Заголовки, которые могут раскрыть информацию о сервере
+    HIDDEN_HEADERS = frozenset({b"server", b"x-powered-by"})
+
+    SLOW_REQUEST_SECONDS = 1.0
+
+    def __init__(self, enforce: Optional[bool] = None):
+        self.enforce = (
+            settings.SECURITY_ENFORCE_REQUESTS if enforce is None else enforce
+        )
+        self._replaced = self.HIDDEN_HEADERS | {
+            name for name, _ in self.SECURITY_HEADERS
+        }
+
+    async def on_request(self, context: RequestContext):
+        """Проверка запроса до передачи приложению"""
+        if not self.enforce:
+            return None
 
         try:
-            # Получаем IP адрес клиента
-            client_ip = self._get_client_ip(request)
+            client_ip = context.client_ip
 
             # Проверяем IP в черном списке
             if not await security_service.check_ip_blocklist(client_ip):
@@ -41,7 +63,7 @@ class SecurityMiddleware(BaseHTTPMiddleware):
                 )
 
             # Проверяем лимит запросов
-            endpoint = f"{request.method}:{request.url.path}"
+            endpoint = f"{context.method}:{context.path}"
             allowed, rate_info = await security_service.check_rate_limit(
                 client_ip, endpoint
             )
@@ -57,8 +79,8 @@ class SecurityMiddleware(BaseHTTPMiddleware):
                     headers={"Retry-After": str(rate_info.get("retry_after", 60))},
                 )
 
-            # Проверяем на атаки в URL и параметрах
-            attack_detected = await self._check_for_attacks(request)
+            # Проверяем на атаки в URL, параметрах и заголовках
+            attack_detected = self._check_for_attacks(context)
             if attack_detected:
                 logger.warning(
                     f"Attack pattern detected from IP {client_ip}: {attack_detected}"
@@ -73,18 +95,7 @@ class SecurityMiddleware(BaseHTTPMiddleware):
                     content={"detail": "Invalid request"},
                 )
 
-            # Добавляем заголовки безопасности
-            response = await call_next(request)
-
-            # Добавляем заголовки безопасности к ответу
-            response = self._add_security_headers(response)
-
-            # Логируем время выполнения
-            process_time = time.time() - start_time
-            if process_time > 1.0:  # Логируем медленные запросы
-                logger.warning(f"Slow request: {endpoint} took {process_time:.2f}s")
-
-            return response
+            return None
 
         except Exception as e:
             logger.error(f"Security middleware error: {e}")
@@ -93,51 +104,32 @@ class SecurityMiddleware(BaseHTTPMiddleware):
                 content={"detail": "Internal server error"},
             )
 
-    def _get_client_ip(self, request: Request) -> str:
-        """Получение IP адреса клиента"""
-        # Проверяем заголовки прокси
-        forwarded_for = request.headers.get("X-Forwarded-For")
-        if forwarded_for:
-            return forwarded_for.split(",")[0].strip()
-
-        real_ip = request.headers.get("X-Real-IP")
-        if real_ip:
-            return real_ip
-
-        # Возвращаем IP из соединения
-        if hasattr(request, "client") and request.client:
-            return request.client.host
-
-        return "unknown"
-
-    async def _check_for_attacks(self, request: Request) -> str:
+    def _check_for_attacks(self, context: RequestContext) -> Optional[str]:
         """Проверка на атаки в запросе"""
         try:
-            # Проверяем URL
-            url_attacks = await security_service.detect_attack_patterns(
-                str(request.url)
-            )
-            if url_attacks:
-                return f"URL attack: {url_attacks[0]['type']}"
-
-            # Проверяем параметры запроса
-            query_params = str(request.query_params)
-            if query_params:
-                query_attacks = await security_service.detect_attack_patterns(
-                    query_params
-                )
-                if query_attacks:
-                    return f"Query attack: {query_attacks[0]['type']}"
+            scanner = security_service.attack_scanner
+            query = context.query_string
 
-            # Проверяем заголовки
-            for header_name, header_value in request.headers.items():
-                header_attacks = await security_service.detect_attack_patterns(
-                    header_value
-                )
-                if header_attacks:
-                    return (
-                        f"Header attack in {header_name}: {header_attacks[0]['type']}"
-                    )
+            # Проверяем URL
+            url = f"{context.path}?{query}" if query else context.path
+            url_attack = scanner.scan(url)
+            if url_attack:
+                return f"URL attack: {url_attack}"
+
+            # Проверяем декодированные параметры запроса
+            if query:
+                decoded_query = unquote_plus(query)
+                if decoded_query != query:
+                    query_attack = scanner.scan(decoded_query)
+                    if query_attack:
+                        return f"Query attack: {query_attack}"
+
+            # Проверяем заголовки: значения повторяются от запроса к запросу,
+            # поэтому результат проверки кэшируется
+            for header_name, header_value in context.header_items:
+                header_attack = scanner.scan_cached(header_value)
+                if header_attack:
+                    return f"Header attack in {header_name}: {header_attack}"
 
             return None
 
@@ -145,114 +137,45 @@ class SecurityMiddleware(BaseHTTPMiddleware):
             logger.error(f"Error checking for attacks: {e}")
             return None
 
-    def _add_security_headers(self, response):
+    def on_response_start(self, context: RequestContext, headers: RawHeaders):
         """Добавление заголовков безопасности"""
-        # Защита от XSS
-        response.headers["X-Content-Type-Options"] = "nosniff"
-        response.headers["X-Frame-Options"] = "DENY"
-        response.headers["X-XSS-Protection"] = "1; mode=block"
-
-        # Строгая транспортная безопасность
-        response.headers["Strict-Transport-Security"] = (
-            "max-age=31536000; includeSubDomains"
-        )
-
-        # Политика реферера
-        response.headers["Referrer-Policy"] = "strict-origin-when-cross-origin"
-
-        # Политика разрешений
-        response.headers["Permissions-Policy"] = (
-            "geolocation=(), microphone=(), camera=()"
-        )
-
-        # Удаляем заголовки, которые могут раскрыть информацию о сервере
-        response.headers.pop("Server", None)
-        response.headers.pop("X-Powered-By", None)
+        # Обычно приложение не задает эти заголовки, и список только дополняется
+        if any(name.lower() in self._replaced for name, _ in headers):
+            headers[:] = [
+                header for header in headers if header[0].lower() not in self._replaced
+            ]
+        headers.extend(self.SECURITY_HEADERS)
+
+    def on_response_end(self, context: RequestContext):
+        """Логирование медленных запросов"""
+        process_time = context.duration
+        if process_time > self.SLOW_REQUEST_SECONDS:
+            logger.warning(
+                f"Slow request: {context.method}:{context.path} took {process_time:.2f}s"
+            )
 
-        return response
 
+class CSRFStage(PipelineStage):
+    """Этап конвейера для защиты от CSRF атак"""
 
-class CSRFMiddleware(BaseHTTPMiddleware):
-    """Middleware для защиты от CSRF атак"""
+    SAFE_METHODS = frozenset({"GET", "HEAD", "OPTIONS"})
 
-    def __init__(self, app, **kwargs):
-        super().__init__(app)
-        self.exempt_paths = ["/api/auth/login", "/api/auth/register", "/api/health"]
+    def __init__(self):
+        self.exempt_paths = {"/api/auth/login", "/api/auth/register", "/api/health"}
 
-    async def dispatch(self, request: Request, call_next: Callable):
+    async def on_request(self, context: RequestContext):
         """Проверка CSRF токена"""
-        try:
-            # Пропускаем GET запросы и исключенные пути
-            if request.method == "GET" or request.url.path in self.exempt_paths:
-                return await call_next(request)
-
-            # Получаем CSRF токен из заголовка
-            csrf_token = request.headers.get("X-CSRF-Token")
-
-            # Для демонстрации всегда разрешаем (в реальном приложении нужна проверка)
-            if not csrf_token:
-                logger.warning(
-                    f"Missing CSRF token for {request.method} {request.url.path}"
-                )
-                # В реальном приложении здесь должна быть проверка токена
-                # return JSONResponse(
-                #     status_code=status.HTTP_403_FORBIDDEN,
-                #     content={"detail": "CSRF token required"}
-                # )
-
-            return await call_next(request)
-
-        except Exception as e:
-            logger.error(f"CSRF middleware error: {e}")
-            return await call_next(request)
-
-
-class RequestLoggingMiddleware(BaseHTTPMiddleware):
-    """Middleware для логирования запросов"""
-
-    def __init__(self, app, **kwargs):
-        super().__init__(app)
-
-    async def dispatch(self, request: Request, call_next: Callable):
-        """Логирование запросов"""
-        start_time = time.time()
-
-        # Логируем входящий запрос
-        logger.info(
-            f"Incoming request: {request.method} {request.url.path} from {self._get_client_ip(request)}"
-        )
-
-        try:
-            response = await call_next(request)
-
-            # Логируем ответ
-            process_time = time.time() - start_time
-            logger.info(
-                f"Request completed: {request.method} {request.url.path} "
-                f"-> {response.status_code} in {process_time:.3f}s"
-            )
-
-            return response
-
-        except Exception as e:
-            process_time = time.time() - start_time
-            logger.error(
-                f"Request failed: {request.method} {request.url.path} "
-                f"-> ERROR in {process_time:.3f}s: {e}"
-            )
-            raise
-
-    def _get_client_ip(self, request: Request) -> str:
-        """Получение IP адреса клиента"""
-        forwarded_for = request.headers.get("X-Forwarded-For")
-        if forwarded_for:
-            return forwarded_for.split(",")[0].strip()
-
-        real_ip = request.headers.get("X-Real-IP")
-        if real_ip:
-            return real_ip
+        # Пропускаем безопасные методы и исключенные пути
+        if context.method in self.SAFE_METHODS or context.path in self.exempt_paths:
+            return None
 
-        if hasattr(request, "client") and request.client:
-            return request.client.host
+        # Для демонстрации всегда разрешаем (в реальном приложении нужна проверка)
+        if "x-csrf-token" not in context.headers:
+            logger.warning(f"Missing CSRF token for {context.method} {context.path}")
+            # В реальном приложении здесь должна быть проверка токена
+            # return JSONResponse(
+            #     status_code=status.HTTP_403_FORBIDDEN,
+            #     content={"detail": "CSRF token required"}
+            # )
 
-        return "unknown"
+        return None
@@ -1,11 +1,72 @@
 from sqlalchemy import create_engine, Column, Integer, String, DateTime, Boolean
 from sqlalchemy.orm import sessionmaker, declarative_base, relationship
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
 from sqlalchemy.sql import func
 from config import settings
+from utils.database import InstrumentedQueuePool, InstrumentedAsyncQueuePool
+
+# Async-драйверы для синхронных URL из DATABASE_URL
+ASYNC_DRIVERS = {
+    "postgresql": "postgresql+asyncpg",
+    "postgresql+psycopg2": "postgresql+asyncpg",
+    "sqlite": "sqlite+aiosqlite",
+}
+
+
+def get_async_database_url(database_url: str) -> str:
+    """URL для async engine на основе синхронного DATABASE_URL"""
+    scheme, separator, rest = database_url.partition("://")
+    if scheme in ASYNC_DRIVERS:
+        return f"{ASYNC_DRIVERS[scheme]}{separator}{rest}"
+    return database_url
+
+
+def get_engine_options(db_settings, async_mode: bool = False) -> dict:
+    """Параметры engine и пула соединений из настроек"""
+    if db_settings.DATABASE_URL.startswith("sqlite"):
+        return {}
+
+    options = {
+        "poolclass": (
+            InstrumentedAsyncQueuePool if async_mode else InstrumentedQueuePool
+        ),
+        "pool_size": db_settings.DB_POOL_SIZE,
+        "max_overflow": db_settings.DB_MAX_OVERFLOW,
+        "pool_timeout": db_settings.DB_POOL_TIMEOUT,
+        "pool_recycle": db_settings.DB_POOL_RECYCLE,
+        "pool_pre_ping": db_settings.DB_POOL_PRE_PING,
+    }
+
+    if db_settings.DB_STATEMENT_TIMEOUT_MS > 0 and db_settings.DATABASE_URL.startswith(
+        "postgresql"
+    ):
+        if async_mode:
+            # asyncpg не поддерживает libpq-параметр options
+            options["connect_args"] = {
+                "server_settings": {
+                    "statement_timeout": str(db_settings.DB_STATEMENT_TIMEOUT_MS)
+                }
+            }
+        else:
+            options["connect_args"] = {
+                "options": f"-c statement_timeout={db_settings.DB_STATEMENT_TIMEOUT_MS}"
+            }
+
+    return options
+
 
 # Создаем подключение к базе данных
-engine = create_engine(settings.DATABASE_URL)
+engine = create_engine(settings.DATABASE_URL, **get_engine_options(settings))
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+# Async engine для обработчиков, не занимающих поток пула на время ожидания БД
+async_engine = create_async_engine(
+    get_async_database_url(settings.DATABASE_URL),
+    **get_engine_options(settings, async_mode=True),
+)
+AsyncSessionLocal = async_sessionmaker(
+    bind=async_engine, autoflush=False, expire_on_commit=False
+)
 Base = declarative_base()
 
 
@@ -19,6 +80,11 @@ class User(Base):
     hashed_password = Column(String, nullable=False)
     is_active = Column(Boolean, default=True)
     is_verified = Column(Boolean, default=False)
+    # Денормализованные счетчики (пересчитываются CounterService)
+    posts_count = Column(Integer, default=0)
+    followers_count = Column(Integer, default=0)
+    following_count = Column(Integer, default=0)
+    articles_count = Column(Integer, default=0)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(
         DateTime(timezone=True), server_default=func.now(), onupdate=func.now()
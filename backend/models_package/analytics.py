@@ -8,6 +8,8 @@ from sqlalchemy import (
     ForeignKey,
     Float,
     JSON,
+    Index,
+    UniqueConstraint,
 )
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
@@ -31,6 +33,7 @@ class Metric(Base):
 
 class MetricData(Base):
     __tablename__ = "metric_data"
+    __table_args__ = (Index("ix_metric_data_metric_time", "metric_id", "timestamp"),)
 
     id = Column(Integer, primary_key=True, index=True)
     metric_id = Column(Integer, ForeignKey("metrics.id"), nullable=False)
@@ -42,6 +45,42 @@ class MetricData(Base):
     metric = relationship("Metric", back_populates="data_points")
 
 
+class MetricRollup(Base):
+    # Агрегаты значений метрики за интервал resolution секунд (1m, 1h, 1d),
+    # обновляются при записи значений (services/metric_store.py)
+    __tablename__ = "metric_rollups"
+    __table_args__ = (
+        UniqueConstraint(
+            "metric_id", "resolution", "bucket_start", name="uq_metric_rollups_bucket"
+        ),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    metric_id = Column(Integer, ForeignKey("metrics.id"), nullable=False)
+    resolution = Column(Integer, nullable=False)  # секунды
+    bucket_start = Column(DateTime(timezone=True), nullable=False)
+    count = Column(Integer, nullable=False, default=0)
+    sum = Column(Float, nullable=False, default=0.0)
+    min = Column(Float)
+    max = Column(Float)
+    sketch = Column(JSON)  # гистограмма для квантилей (QuantileSketch)
+
+
+class AnalyticsEvent(Base):
+    # События пишутся пачками фоновой задачей (services/event_pipeline.py)
+    __tablename__ = "analytics_events"
+    __table_args__ = (Index("ix_analytics_events_user_time", "user_id", "created_at"),)
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"))
+    event_type = Column(String(100), nullable=False, index=True)
+    event_data = Column(JSON)
+    source = Column(String(50), nullable=False, default="api")
+    user_agent = Column(Text)
+    ip_address = Column(String(45))
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+
 class Report(Base):
     __tablename__ = "reports"
 
@@ -6,6 +6,7 @@ from sqlalchemy import (
     Boolean,
     DateTime,
     ForeignKey,
+    Index,
     Enum,
 )
 from sqlalchemy.orm import relationship
@@ -28,6 +29,7 @@ class Category(Base):
     description = Column(Text)
     slug = Column(String(255), unique=True, nullable=False)
     is_active = Column(Boolean, default=True)
+    articles_count = Column(Integer, default=0)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
 
     # Relationships
@@ -36,6 +38,8 @@ class Category(Base):
 
 class Article(Base):
     __tablename__ = "articles"
+    # Индекс для курсорной пагинации по (created_at, id)
+    __table_args__ = (Index("ix_articles_created_at_id", "created_at", "id"),)
 
     id = Column(Integer, primary_key=True, index=True)
     title = Column(String(255), nullable=False)
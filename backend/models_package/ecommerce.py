@@ -7,6 +7,7 @@ from sqlalchemy import (
     Boolean,
     DateTime,
     ForeignKey,
+    Index,
 )
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
@@ -15,6 +16,8 @@ from models import Base
 
 class Product(Base):
     __tablename__ = "products"
+    # Индекс для курсорной пагинации по (created_at, id)
+    __table_args__ = (Index("ix_products_created_at_id", "created_at", "id"),)
 
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String(255), nullable=False)
@@ -53,6 +56,8 @@ class CartItem(Base):
 
 class Order(Base):
     __tablename__ = "orders"
+    # Индекс для курсорной пагинации по (created_at, id)
+    __table_args__ = (Index("ix_orders_created_at_id", "created_at", "id"),)
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
@@ -1,4 +1,13 @@
-from sqlalchemy import Column, Integer, String, Text, Boolean, DateTime, ForeignKey
+from sqlalchemy import (
+    Column,
+    Integer,
+    String,
+    Text,
+    Boolean,
+    DateTime,
+    ForeignKey,
+    Index,
+)
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from models import Base
@@ -6,12 +15,16 @@ from models import Base
 
 class Post(Base):
     __tablename__ = "posts"
+    # Индекс для курсорной пагинации по (created_at, id)
+    __table_args__ = (Index("ix_posts_created_at_id", "created_at", "id"),)
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     content = Column(Text, nullable=False)
     image_url = Column(String(500))
     is_public = Column(Boolean, default=True)
+    likes_count = Column(Integer, default=0)
+    comments_count = Column(Integer, default=0)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(
         DateTime(timezone=True), server_default=func.now(), onupdate=func.now()
@@ -6,6 +6,7 @@ from sqlalchemy import (
     Boolean,
     DateTime,
     ForeignKey,
+    Index,
     Enum,
 )
 from sqlalchemy.orm import relationship
@@ -29,6 +30,8 @@ class TaskPriority(enum.Enum):
 
 class Board(Base):
     __tablename__ = "boards"
+    # Индекс для курсорной пагинации по (created_at, id)
+    __table_args__ = (Index("ix_boards_created_at_id", "created_at", "id"),)
 
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String(255), nullable=False)
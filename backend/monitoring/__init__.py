@@ -2,15 +2,20 @@
 Мониторинг и метрики
 """
 
-from .metrics import MetricsCollector, PrometheusMetrics, MetricsEndpoint
+from .metrics import MetricsCollector, MetricsStage, PrometheusMetrics, MetricsEndpoint
 from .health import HealthChecker, HealthEndpoint
+from .system import SystemMetricsSampler, SystemSnapshot, system_sampler
 from .logging import StructuredLogger
 
 __all__ = [
     "MetricsCollector",
+    "MetricsStage",
     "PrometheusMetrics",
     "MetricsEndpoint",
     "HealthChecker",
     "HealthEndpoint",
+    "SystemMetricsSampler",
+    "SystemSnapshot",
+    "system_sampler",
     "StructuredLogger",
 ]
@@ -3,60 +3,145 @@
 """
 
 import asyncio
+import threading
 import time
-from typing import Dict, Any, List, Optional
-from sqlalchemy.orm import Session
-from models import SessionLocal
-import psutil
+from typing import Awaitable, Callable, Dict, Any, List, Optional, Tuple
+from sqlalchemy import text
+from config import settings
+from models import engine
+from monitoring.system import system_sampler
 import logging
 
 logger = logging.getLogger(__name__)
 
+HealthCheck = Callable[[], Awaitable[Dict[str, Any]]]
 
-class HealthChecker:
-    """Проверка здоровья различных компонентов системы"""
 
-    def __init__(self):
-        self.checks = {
+class HealthChecker:
+    """Проверка здоровья различных компонентов системы
+
+    Проверки группы выполняются параллельно, каждая ограничена таймаутом
+    HEALTH_CHECK_TIMEOUT; блокирующий ввод-вывод (БД, MongoDB) вынесен в
+    пул потоков. Результат группы кэшируется на HEALTH_CHECK_CACHE_TTL
+    секунд, а одновременные запросы ждут одну выполняющуюся проверку,
+    поэтому частые пробы Kubernetes не умножают нагрузку на зависимости.
+
+    Недоступность критичной проверки делает группу "unhealthy",
+    некритичной - "degraded".
+    """
+
+    # Состояние процесса: ресурсы узла из снимка фонового сборщика
+    SYSTEM_CHECKS = ("memory", "disk", "cpu")
+    # Готовность принимать запросы: внешние зависимости
+    READINESS_CHECKS = ("database", "redis", "mongo")
+
+    def __init__(
+        self, timeout: Optional[float] = None, cache_ttl: Optional[float] = None
+    ):
+        self.timeout = settings.HEALTH_CHECK_TIMEOUT if timeout is None else timeout
+        self.cache_ttl = (
+            settings.HEALTH_CHECK_CACHE_TTL if cache_ttl is None else cache_ttl
+        )
+        self.checks: Dict[str, HealthCheck] = {
             "database": self._check_database,
+            "redis": self._check_redis,
+            "mongo": self._check_mongo,
             "memory": self._check_memory,
             "disk": self._check_disk,
             "cpu": self._check_cpu,
+            "external_api": self._check_external_api,
         }
+        # Redis обязателен, только если на нем работает кэш или лимиты;
+        # данные приложения в MongoDB пока не хранятся
+        uses_redis = "redis" in (
+            settings.CACHE_BACKEND.lower(),
+            settings.RATE_LIMIT_BACKEND.lower(),
+        )
+        self.critical = {"database", "memory", "disk", "cpu"}
+        if uses_redis:
+            self.critical.add("redis")
+
+        self._cache: Dict[Tuple[str, ...], Tuple[float, Dict[str, Any]]] = {}
+        self._inflight: Dict[Tuple[str, ...], asyncio.Task] = {}
+        self._mongo_client = None
+        self._mongo_lock = threading.Lock()
 
     async def check_all(self) -> Dict[str, Any]:
         """Проверить все компоненты системы"""
-        results = {}
-        overall_status = "healthy"
+        return await self.run_checks(tuple(self.checks))
+
+    async def check_readiness(self) -> Dict[str, Any]:
+        """Проверить зависимости, без которых сервис не может обслуживать запросы"""
+        return await self.run_checks(self.READINESS_CHECKS)
+
+    async def run_checks(self, names: Tuple[str, ...]) -> Dict[str, Any]:
+        """Выполнить проверки names или вернуть недавний результат"""
+        cached = self._cache.get(names)
+        if cached is not None and time.monotonic() - cached[0] < self.cache_ttl:
+            return cached[1]
+
+        task = self._inflight.get(names)
+        loop = asyncio.get_running_loop()
+        if task is None or task.get_loop() is not loop:
+            task = loop.create_task(self._run_group(names))
+            self._inflight[names] = task
+            task.add_done_callback(lambda done: self._forget(names, done))
+
+        # Отмена одного запроса не должна прерывать общую проверку
+        return await asyncio.shield(task)
 
-        for check_name, check_func in self.checks.items():
-            try:
-                result = await check_func()
-                results[check_name] = result
-
-                if result["status"] != "healthy":
-                    overall_status = "unhealthy"
-
-            except Exception as e:
-                logger.error(f"Health check failed for {check_name}: {e}")
-                results[check_name] = {
-                    "status": "unhealthy",
-                    "error": str(e),
-                    "timestamp": time.time(),
-                }
+    def _forget(self, names: Tuple[str, ...], task: asyncio.Task):
+        if self._inflight.get(names) is task:
+            del self._inflight[names]
+
+    async def _run_group(self, names: Tuple[str, ...]) -> Dict[str, Any]:
+        results = await asyncio.gather(*(self._run_check(name) for name in names))
+        checks = dict(zip(names, results))
+
+        overall_status = "healthy"
+        for check_name, result in checks.items():
+            if result["status"] == "healthy":
+                continue
+            if check_name in self.critical:
                 overall_status = "unhealthy"
+                break
+            overall_status = "degraded"
 
-        return {"status": overall_status, "timestamp": time.time(), "checks": results}
+        report = {"status": overall_status, "timestamp": time.time(), "checks": checks}
+        self._cache[names] = (time.monotonic(), report)
+        return report
+
+    async def _run_check(self, check_name: str) -> Dict[str, Any]:
+        """Выполнить одну проверку с таймаутом"""
+        start_time = time.perf_counter()
+        try:
+            result = await asyncio.wait_for(
+                self.checks[check_name](), timeout=self.timeout
+            )
+        except asyncio.TimeoutError:
+            logger.error(f"Health check {check_name} timed out after {self.timeout}s")
+            result = {
+                "status": "unhealthy",
+                "error": f"Timed out after {self.timeout}s",
+                "timestamp": time.time(),
+            }
+        except Exception as e:
+            logger.error(f"Health check failed for {check_name}: {e}")
+            result = {
+                "status": "unhealthy",
+                "error": str(e),
+                "timestamp": time.time(),
+            }
+
+        result["critical"] = check_name in self.critical
+        result["duration_ms"] = round((time.perf_counter() - start_time) * 1000, 2)
+        return result
 
     async def _check_database(self) -> Dict[str, Any]:
         """Проверка подключения к базе данных"""
         try:
-            db = SessionLocal()
-            # Простой запрос для проверки подключения
-            from sqlalchemy import text
-
-            db.execute(text("SELECT 1"))
-            db.close()
+            # Соединение берется из пула в отдельном потоке
+            await asyncio.to_thread(self._ping_database)
 
             return {
                 "status": "healthy",
@@ -70,10 +155,15 @@ class HealthChecker:
                 "timestamp": time.time(),
             }
 
+    @staticmethod
+    def _ping_database():
+        with engine.connect() as connection:
+            connection.execute(text("SELECT 1"))
+
     async def _check_memory(self) -> Dict[str, Any]:
         """Проверка использования памяти"""
-        memory = psutil.virtual_memory()
-        memory_percent = memory.percent
+        snapshot = system_sampler.snapshot
+        memory_percent = snapshot.memory_percent
 
         status = "healthy"
         if memory_percent > 90:
@@ -84,15 +174,15 @@ class HealthChecker:
         return {
             "status": status,
             "memory_percent": memory_percent,
-            "memory_available_gb": memory.available / (1024**3),
-            "memory_total_gb": memory.total / (1024**3),
+            "memory_available_gb": snapshot.memory_available / (1024**3),
+            "memory_total_gb": snapshot.memory_total / (1024**3),
             "timestamp": time.time(),
         }
 
     async def _check_disk(self) -> Dict[str, Any]:
         """Проверка использования диска"""
-        disk = psutil.disk_usage("/")
-        disk_percent = (disk.used / disk.total) * 100
+        snapshot = system_sampler.snapshot
+        disk_percent = (snapshot.disk_used / snapshot.disk_total) * 100
 
         status = "healthy"
         if disk_percent > 95:
@@ -103,14 +193,15 @@ class HealthChecker:
         return {
             "status": status,
             "disk_percent": disk_percent,
-            "disk_free_gb": disk.free / (1024**3),
-            "disk_total_gb": disk.total / (1024**3),
+            "disk_free_gb": snapshot.disk_free / (1024**3),
+            "disk_total_gb": snapshot.disk_total / (1024**3),
             "timestamp": time.time(),
         }
 
     async def _check_cpu(self) -> Dict[str, Any]:
         """Проверка использования CPU"""
-        cpu_percent = psutil.cpu_percent(interval=1)
+        snapshot = system_sampler.snapshot
+        cpu_percent = snapshot.cpu_percent
 
         status = "healthy"
         if cpu_percent > 90:
@@ -121,37 +212,76 @@ class HealthChecker:
         return {
             "status": status,
             "cpu_percent": cpu_percent,
-            "cpu_count": psutil.cpu_count(),
+            "cpu_count": snapshot.cpu_count,
             "timestamp": time.time(),
         }
 
     async def check_dependencies(self) -> Dict[str, Any]:
         """Проверка внешних зависимостей"""
-        dependencies = {
-            "database": await self._check_database(),
-            "redis": await self._check_redis(),
-            "external_api": await self._check_external_api(),
-        }
-
-        overall_status = "healthy"
-        for dep_name, dep_result in dependencies.items():
-            if dep_result["status"] != "healthy":
-                overall_status = "degraded"
+        report = await self.run_checks(self.READINESS_CHECKS + ("external_api",))
 
         return {
-            "status": overall_status,
-            "dependencies": dependencies,
-            "timestamp": time.time(),
+            "status": report["status"],
+            "dependencies": report["checks"],
+            "timestamp": report["timestamp"],
         }
 
     async def _check_redis(self) -> Dict[str, Any]:
-        """Проверка Redis (если используется)"""
-        # Заглушка для Redis - в реальном приложении здесь будет проверка Redis
-        return {
-            "status": "healthy",
-            "message": "Redis not configured",
-            "timestamp": time.time(),
-        }
+        """Проверка Redis (REDIS_URL)"""
+        import redis.asyncio as redis_asyncio
+
+        # Клиент привязан к event loop, поэтому создается на время проверки
+        client = redis_asyncio.from_url(
+            settings.REDIS_URL,
+            socket_connect_timeout=self.timeout,
+            socket_timeout=self.timeout,
+        )
+        try:
+            await client.ping()
+            return {
+                "status": "healthy",
+                "message": "Redis connection successful",
+                "timestamp": time.time(),
+            }
+        except Exception as e:
+            return {
+                "status": "unhealthy",
+                "message": f"Redis connection failed: {str(e)}",
+                "timestamp": time.time(),
+            }
+        finally:
+            await client.aclose()
+
+    async def _check_mongo(self) -> Dict[str, Any]:
+        """Проверка MongoDB (MONGO_URL)"""
+        try:
+            await asyncio.to_thread(self._ping_mongo)
+            return {
+                "status": "healthy",
+                "message": "MongoDB connection successful",
+                "timestamp": time.time(),
+            }
+        except Exception as e:
+            return {
+                "status": "unhealthy",
+                "message": f"MongoDB connection failed: {str(e)}",
+                "timestamp": time.time(),
+            }
+
+    def _ping_mongo(self):
+        # MongoClient держит пул и фоновые потоки, поэтому создается один раз
+        with self._mongo_lock:
+            if self._mongo_client is None:
+                from pymongo import MongoClient
+
+                timeout_ms = int(self.timeout * 1000)
+                self._mongo_client = MongoClient(
+                    settings.MONGO_URL,
+                    serverSelectionTimeoutMS=timeout_ms,
+                    connectTimeoutMS=timeout_ms,
+                )
+            client = self._mongo_client
+        client.admin.command("ping")
 
     async def _check_external_api(self) -> Dict[str, Any]:
         """Проверка внешних API"""
@@ -185,10 +315,11 @@ class HealthEndpoint:
         }
 
     async def get_ready(self) -> Dict[str, Any]:
-        """Проверка готовности к работе"""
-        health_status = await self.health_checker.check_all()
+        """Проверка готовности к работе: доступность зависимостей"""
+        health_status = await self.health_checker.check_readiness()
 
-        if health_status["status"] == "healthy":
+        # Некритичные зависимости не снимают сервис с балансировки
+        if health_status["status"] != "unhealthy":
             return {
                 "status": "ready",
                 "message": "Service is ready to accept requests",
@@ -207,7 +338,7 @@ class HealthEndpoint:
             }
 
     async def get_live(self) -> Dict[str, Any]:
-        """Проверка жизнеспособности"""
+        """Проверка жизнеспособности: процесс отвечает, зависимости не проверяются"""
         return {
             "status": "alive",
             "message": "Service is alive",
@@ -3,8 +3,8 @@
 """
 
 import time
-import psutil
-from typing import Dict, Any, Optional
+import threading
+from typing import Dict, Any, Optional, Tuple
 from prometheus_client import (
     Counter,
     Histogram,
@@ -12,18 +12,34 @@ from prometheus_client import (
     generate_latest,
     CONTENT_TYPE_LATEST,
 )
-from fastapi import Request, Response
+from fastapi import Response
 import logging
 
+from config import settings
+from middleware.pipeline import PipelineStage, RequestContext, RequestPipeline
+from monitoring.system import SystemMetricsSampler, system_sampler
+
 logger = logging.getLogger(__name__)
 
 
 class MetricsCollector:
-    """Сборщик метрик приложения"""
+    """Сборщик метрик приложения
+
+    Метка endpoint - шаблон маршрута FastAPI (/api/social/posts/{post_id}).
+    Число ее значений ограничено METRICS_MAX_ENDPOINTS: новые значения
+    сверх лимита записываются как "other", запросы без маршрута - как
+    "unmatched". Нестандартные HTTP-методы также сводятся к "other".
+    """
 
     _instance = None
     _initialized = False
 
+    UNMATCHED_ENDPOINT = "unmatched"
+    OVERFLOW_LABEL = "other"
+    HTTP_METHODS = frozenset(
+        {"GET", "HEAD", "POST", "PUT", "PATCH", "DELETE", "OPTIONS", "TRACE", "CONNECT"}
+    )
+
     def __new__(cls):
         if cls._instance is None:
             cls._instance = super(MetricsCollector, cls).__new__(cls)
@@ -34,6 +50,12 @@ class MetricsCollector:
             return
 
         self._initialized = True
+        self.max_endpoints = settings.METRICS_MAX_ENDPOINTS
+        self._endpoints = set()
+        self._endpoints_lock = threading.Lock()
+        # Дочерние метрики по меткам: labels() на каждый запрос заметно дороже
+        self._request_metrics: Dict[Tuple[str, str, str], tuple] = {}
+
         self.request_count = Counter(
             "http_requests_total",
             "Total HTTP requests",
@@ -44,20 +66,129 @@ class MetricsCollector:
             "http_request_duration_seconds",
             "HTTP request duration in seconds",
             ["method", "endpoint"],
+            buckets=settings.METRICS_LATENCY_BUCKETS,
+        )
+
+        self.response_size = Histogram(
+            "http_response_size_bytes",
+            "HTTP response body size in bytes",
+            ["method", "endpoint"],
+            buckets=settings.METRICS_SIZE_BUCKETS,
         )
 
         self.active_connections = Gauge(
             "http_active_connections", "Number of active HTTP connections"
         )
 
+        self.requests_in_flight = Gauge(
+            "http_requests_in_flight",
+            "Number of HTTP requests being processed",
+            ["method"],
+        )
+
         self.database_connections = Gauge(
             "database_connections_active", "Number of active database connections"
         )
 
+        self.db_pool_size = Gauge(
+            "database_pool_size", "Configured database connection pool size"
+        )
+
+        self.db_pool_overflow = Gauge(
+            "database_pool_overflow",
+            "Number of overflow connections currently open above pool size",
+        )
+
+        self.db_pool_checkouts = Counter(
+            "database_pool_checkouts_total", "Total connection checkouts from the pool"
+        )
+
+        self.db_pool_checkins = Counter(
+            "database_pool_checkins_total", "Total connection checkins to the pool"
+        )
+
+        self.db_pool_wait_time = Histogram(
+            "database_pool_wait_seconds",
+            "Time spent waiting for a pooled database connection",
+            buckets=(0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0),
+        )
+
+        self.db_pool_timeouts = Counter(
+            "database_pool_timeouts_total",
+            "Total connection requests that timed out waiting for the pool",
+        )
+
+        self._instrumented_pools = set()
+
+        self.auth_cache_requests = Counter(
+            "auth_cache_requests_total",
+            "Authentication cache lookups",
+            ["cache", "result"],
+        )
+
+        self.response_cache_requests = Counter(
+            "http_response_cache_requests_total",
+            "HTTP response cache lookups",
+            ["cache", "result"],
+        )
+
+        self.analytics_events = Counter(
+            "analytics_events_total",
+            "Analytics events by pipeline outcome (accepted, dropped, written, failed)",
+            ["outcome"],
+        )
+
+        self.analytics_queue_depth = Gauge(
+            "analytics_queue_depth", "Analytics events waiting to be written"
+        )
+
+        self.analytics_flush_duration = Histogram(
+            "analytics_flush_duration_seconds",
+            "Time to write one batch of analytics events",
+        )
+
+        self.search_source_duration = Histogram(
+            "search_source_duration_seconds",
+            "Time for one source of the global search",
+            ["source"],
+        )
+
+        self.search_source_requests = Counter(
+            "search_source_requests_total",
+            "Global search sources by outcome (ok, timeout, error)",
+            ["source", "status"],
+        )
+
+        self.websocket_messages = Counter(
+            "websocket_messages_total",
+            "Outbound WebSocket messages by outcome (sent, dropped, failed)",
+            ["outcome"],
+        )
+
+        self.websocket_slow_consumers = Counter(
+            "websocket_slow_consumers_total",
+            "WebSocket connections closed as slow consumers",
+        )
+
         self.memory_usage = Gauge("memory_usage_bytes", "Memory usage in bytes")
 
         self.cpu_usage = Gauge("cpu_usage_percent", "CPU usage percentage")
 
+        self.disk_usage = Gauge("disk_usage_percent", "Disk usage percentage")
+
+        self.network_bytes_sent = Gauge(
+            "network_bytes_sent", "Bytes sent over network interfaces since boot"
+        )
+
+        self.network_bytes_recv = Gauge(
+            "network_bytes_received",
+            "Bytes received over network interfaces since boot",
+        )
+
+        self.system_metrics_age = Gauge(
+            "system_metrics_age_seconds", "Age of the latest system metrics sample"
+        )
+
         self.error_count = Counter(
             "http_errors_total",
             "Total HTTP errors",
@@ -78,103 +209,191 @@ class MetricsCollector:
             ),
         }
 
+    def method_label(self, method: str) -> str:
+        """Значение метки method: произвольные методы не создают новых рядов"""
+        return method if method in self.HTTP_METHODS else self.OVERFLOW_LABEL
+
+    def endpoint_label(self, endpoint: Optional[str]) -> str:
+        """Значение метки endpoint с ограничением числа различных значений"""
+        if endpoint is None:
+            return self.UNMATCHED_ENDPOINT
+        if endpoint in self._endpoints:
+            return endpoint
+
+        with self._endpoints_lock:
+            if endpoint in self._endpoints:
+                return endpoint
+            if len(self._endpoints) >= self.max_endpoints:
+                return self.OVERFLOW_LABEL
+            self._endpoints.add(endpoint)
+            if len(self._endpoints) == self.max_endpoints:
+                logger.warning(
+                    f"Metrics endpoint label limit reached ({self.max_endpoints}), "
+                    f"new endpoints are recorded as '{self.OVERFLOW_LABEL}'"
+                )
+        return endpoint
+
     def record_request(
-        self, method: str, endpoint: str, status_code: int, duration: float
+        self,
+        method: str,
+        endpoint: Optional[str],
+        status_code: int,
+        duration: float,
+        response_size: Optional[int] = None,
     ):
         """Записать метрику запроса"""
-        self.request_count.labels(
-            method=method, endpoint=endpoint, status_code=str(status_code)
-        ).inc()
+        method = self.method_label(method)
+        endpoint = self.endpoint_label(endpoint)
+        key = (method, endpoint, str(status_code))
+
+        metrics = self._request_metrics.get(key)
+        if metrics is None:
+            metrics = self._request_metrics[key] = (
+                self.request_count.labels(
+                    method=method, endpoint=endpoint, status_code=key[2]
+                ),
+                self.request_duration.labels(method=method, endpoint=endpoint),
+                self.response_size.labels(method=method, endpoint=endpoint),
+            )
 
-        self.request_duration.labels(method=method, endpoint=endpoint).observe(duration)
+        count, duration_histogram, size_histogram = metrics
+        count.inc()
+        duration_histogram.observe(duration)
+        if response_size is not None:
+            size_histogram.observe(response_size)
 
-    def record_error(self, method: str, endpoint: str, error_type: str):
+    def record_error(self, method: str, endpoint: Optional[str], error_type: str):
         """Записать метрику ошибки"""
         self.error_count.labels(
-            method=method, endpoint=endpoint, error_type=error_type
+            method=self.method_label(method),
+            endpoint=self.endpoint_label(endpoint),
+            error_type=error_type,
         ).inc()
 
+    def request_started(self, method: str):
+        """Учесть начало обработки HTTP-запроса"""
+        self.active_connections.inc()
+        self.requests_in_flight.labels(method=self.method_label(method)).inc()
+
+    def request_finished(self, method: str):
+        """Учесть завершение обработки HTTP-запроса"""
+        self.active_connections.dec()
+        self.requests_in_flight.labels(method=self.method_label(method)).dec()
+
     def record_business_metric(self, metric_name: str, value: float = 1.0):
         """Записать бизнес-метрику"""
         if metric_name in self.business_metrics:
             self.business_metrics[metric_name].inc(value)
 
-    def update_system_metrics(self):
-        """Обновить системные метрики"""
-        # Память
-        memory = psutil.virtual_memory()
-        self.memory_usage.set(memory.used)
-
-        # CPU
-        cpu_percent = psutil.cpu_percent(interval=1)
-        self.cpu_usage.set(cpu_percent)
+    def instrument_engine(self, engine):
+        """Подключить метрики пула соединений SQLAlchemy engine"""
+        from sqlalchemy import event
+        from utils.database import InstrumentedQueuePool
 
-    def get_metrics(self) -> str:
-        """Получить метрики в формате Prometheus"""
-        self.update_system_metrics()
-        return generate_latest()
+        pool = engine.pool
+        if id(pool) in self._instrumented_pools:
+            return
+        self._instrumented_pools.add(id(pool))
+
+        def update_overflow():
+            if hasattr(pool, "overflow"):
+                self.db_pool_overflow.set(max(pool.overflow(), 0))
+
+        # Событие checkin срабатывает до возврата соединения в пул, поэтому
+        # активные соединения считаем инкрементально, а не через checkedout()
+        def on_checkout(dbapi_connection, connection_record, connection_proxy):
+            self.db_pool_checkouts.inc()
+            self.database_connections.inc()
+            update_overflow()
+
+        def on_checkin(dbapi_connection, connection_record):
+            self.db_pool_checkins.inc()
+            self.database_connections.dec()
+            update_overflow()
+
+        event.listen(pool, "checkout", on_checkout)
+        event.listen(pool, "checkin", on_checkin)
+
+        # Размеры пулов нескольких engine (sync и async) суммируются
+        if hasattr(pool, "size"):
+            self.db_pool_size.inc(pool.size())
+
+        if isinstance(pool, InstrumentedQueuePool):
+            pool.wait_observers.append(self.record_pool_wait)
+
+    def record_auth_cache(self, cache: str, hit: bool):
+        """Записать попадание или промах кэша аутентификации"""
+        self.auth_cache_requests.labels(
+            cache=cache, result="hit" if hit else "miss"
+        ).inc()
 
+    def record_response_cache(self, cache: str, result: str):
+        """Записать обращение к HTTP-кэшу ответов (hit, miss, not_modified)"""
+        self.response_cache_requests.labels(cache=cache, result=result).inc()
 
-class PrometheusMetrics:
-    """Middleware для сбора метрик Prometheus"""
+    def record_search_source(self, source: str, status: str):
+        """Записать исход источника глобального поиска"""
+        self.search_source_requests.labels(source=source, status=status).inc()
 
-    def __init__(self, app, metrics_collector: MetricsCollector):
-        self.app = app
-        self.metrics = metrics_collector
+    def record_pool_wait(self, wait_time: float, timed_out: bool = False):
+        """Записать время ожидания соединения из пула"""
+        self.db_pool_wait_time.observe(wait_time)
+        if timed_out:
+            self.db_pool_timeouts.inc()
 
-    async def __call__(self, scope, receive, send):
-        if scope["type"] != "http":
-            await self.app(scope, receive, send)
-            return
+    def update_system_metrics(self, sampler: Optional[SystemMetricsSampler] = None):
+        """Обновить системные метрики из последнего снимка фонового сборщика"""
+        snapshot = (sampler or system_sampler).snapshot
 
-        request = Request(scope, receive)
-        start_time = time.time()
+        self.memory_usage.set(snapshot.memory_used)
+        self.cpu_usage.set(snapshot.cpu_percent)
+        self.disk_usage.set(snapshot.disk_percent)
+        self.network_bytes_sent.set(snapshot.network_bytes_sent)
+        self.network_bytes_recv.set(snapshot.network_bytes_recv)
+        self.system_metrics_age.set(snapshot.age)
 
-        # Обработка запроса
-        response_sent = False
-        status_code = 500
+    def get_metrics(self) -> str:
+        """Получить метрики в формате Prometheus"""
+        self.update_system_metrics()
+        return generate_latest()
 
-        async def send_wrapper(message):
-            nonlocal response_sent, status_code
-            if message["type"] == "http.response.start" and not response_sent:
-                response_sent = True
-                status_code = message.get("status", 500)
 
-                # Записать метрики
-                duration = time.time() - start_time
-                method = request.method
-                endpoint = self._get_endpoint_name(request.url.path)
+class MetricsStage(PipelineStage):
+    """Этап конвейера для сбора метрик Prometheus
 
-                self.metrics.record_request(method, endpoint, status_code, duration)
+    Запросы группируются по шаблону маршрута, который известен после
+    маршрутизации, поэтому метрики записываются по завершении запроса.
+    """
 
-                # Записать ошибку если статус >= 400
-                if status_code >= 400:
-                    error_type = self._get_error_type(status_code)
-                    self.metrics.record_error(method, endpoint, error_type)
+    def __init__(self, metrics_collector: MetricsCollector):
+        self.metrics = metrics_collector
 
-            await send(message)
+    async def on_request(self, context: RequestContext):
+        self.metrics.request_started(context.method)
+        return None
 
-        try:
-            await self.app(scope, receive, send_wrapper)
-        except Exception as e:
-            # Записать метрику исключения
-            duration = time.time() - start_time
-            method = request.method
-            endpoint = self._get_endpoint_name(request.url.path)
+    def on_response_end(self, context: RequestContext):
+        """Записать метрики запроса, в том числе завершившегося исключением"""
+        method = context.method
+        endpoint = context.route_template
+        duration = context.duration
+        self.metrics.request_finished(method)
 
+        if context.status_code is None:
+            # Ответ не начат: запрос завершился исключением
             self.metrics.record_request(method, endpoint, 500, duration)
             self.metrics.record_error(method, endpoint, "exception")
+            return
 
-            raise
+        status_code = context.status_code
+        self.metrics.record_request(
+            method, endpoint, status_code, duration, context.response_size
+        )
 
-    def _get_endpoint_name(self, path: str) -> str:
-        """Получить имя endpoint для метрик"""
-        # Упрощаем путь для группировки метрик
-        if path.startswith("/api/"):
-            parts = path.split("/")
-            if len(parts) >= 3:
-                return f"/api/{parts[2]}"  # /api/auth, /api/ecommerce, etc.
-        return path
+        # Записать ошибку если статус >= 400
+        if status_code >= 400:
+            error_type = self._get_error_type(status_code)
+            self.metrics.record_error(method, endpoint, error_type)
 
     def _get_error_type(self, status_code: int) -> str:
         """Получить тип ошибки по статус коду"""
@@ -186,6 +405,13 @@ class PrometheusMetrics:
             return "unknown"
 
 
+class PrometheusMetrics(RequestPipeline):
+    """Отдельный middleware сбора метрик (конвейер из одного MetricsStage)"""
+
+    def __init__(self, app, metrics_collector: MetricsCollector):
+        super().__init__(app, [MetricsStage(metrics_collector)])
+
+
 class MetricsEndpoint:
     """Endpoint для получения метрик"""
 
@@ -199,19 +425,16 @@ class MetricsEndpoint:
 
     async def get_health(self) -> Dict[str, Any]:
         """Получить статус здоровья системы"""
-        self.metrics.update_system_metrics()
-
-        memory = psutil.virtual_memory()
-        cpu_percent = psutil.cpu_percent(interval=1)
+        snapshot = system_sampler.snapshot
 
         return {
             "status": "healthy",
             "timestamp": time.time(),
             "system": {
-                "memory_usage_percent": memory.percent,
-                "memory_available_gb": memory.available / (1024**3),
-                "cpu_usage_percent": cpu_percent,
-                "disk_usage_percent": psutil.disk_usage("/").percent,
+                "memory_usage_percent": snapshot.memory_percent,
+                "memory_available_gb": snapshot.memory_available / (1024**3),
+                "cpu_usage_percent": snapshot.cpu_percent,
+                "disk_usage_percent": snapshot.disk_percent,
             },
             "metrics": {
                 "total_requests": sum(
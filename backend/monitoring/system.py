@@ -0,0 +1,142 @@
+"""
+Фоновый сбор системных метрик
+"""
+
+import asyncio
+import time
+from dataclasses import dataclass, asdict
+from typing import Any, Dict, List, Optional
+import logging
+
+import psutil
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class SystemSnapshot:
+    """Снимок системных метрик на момент timestamp"""
+
+    timestamp: float
+    cpu_percent: float
+    cpu_count: int
+    memory_percent: float
+    memory_used: int
+    memory_available: int
+    memory_total: int
+    disk_percent: float
+    disk_used: int
+    disk_free: int
+    disk_total: int
+    network_bytes_sent: int
+    network_bytes_recv: int
+    network_connections: int
+    load_average: List[float]
+
+    @property
+    def age(self) -> float:
+        return time.time() - self.timestamp
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+class SystemMetricsSampler:
+    """Периодический сбор CPU, памяти, диска и сети в общий снимок
+
+    psutil.cpu_percent(interval=1) блокирует вызывающий код на секунду,
+    поэтому загрузка CPU считается без ожидания - между соседними
+    замерами. Замеры выполняются в пуле потоков фоновой задачей раз в
+    interval секунд, а сбор метрик Prometheus и проверки здоровья только
+    читают готовый снимок.
+    """
+
+    def __init__(self, interval: Optional[float] = None, disk_path: str = "/"):
+        self.interval = (
+            settings.SYSTEM_METRICS_INTERVAL if interval is None else interval
+        )
+        self.disk_path = disk_path
+        self._snapshot: Optional[SystemSnapshot] = None
+        self._task: Optional[asyncio.Task] = None
+        # Первый вызов без интервала задает точку отсчета и возвращает 0.0
+        psutil.cpu_percent(interval=None)
+
+    def sample(self) -> SystemSnapshot:
+        """Снять метрики и сохранить снимок (без блокирующих ожиданий)"""
+        memory = psutil.virtual_memory()
+        disk = psutil.disk_usage(self.disk_path)
+        network = psutil.net_io_counters()
+
+        try:
+            network_connections = len(psutil.net_connections())
+        except (psutil.AccessDenied, OSError):
+            network_connections = 0
+
+        load_average = (
+            list(psutil.getloadavg()) if hasattr(psutil, "getloadavg") else [0.0] * 3
+        )
+
+        self._snapshot = SystemSnapshot(
+            timestamp=time.time(),
+            cpu_percent=psutil.cpu_percent(interval=None),
+            cpu_count=psutil.cpu_count() or 0,
+            memory_percent=memory.percent,
+            memory_used=memory.used,
+            memory_available=memory.available,
+            memory_total=memory.total,
+            disk_percent=disk.percent,
+            disk_used=disk.used,
+            disk_free=disk.free,
+            disk_total=disk.total,
+            network_bytes_sent=network.bytes_sent if network else 0,
+            network_bytes_recv=network.bytes_recv if network else 0,
+            network_connections=network_connections,
+            load_average=load_average,
+        )
+        return self._snapshot
+
+    @property
+    def snapshot(self) -> SystemSnapshot:
+        """Последний снимок
+
+        Пока фоновая задача не запущена (тесты, скрипты), устаревший снимок
+        обновляется при обращении.
+        """
+        snapshot = self._snapshot
+        if snapshot is None or (not self.running and snapshot.age >= self.interval):
+            snapshot = self.sample()
+        return snapshot
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self):
+        """Запустить фоновую задачу в текущем event loop"""
+        if not self.running:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Остановить фоновую задачу"""
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.to_thread(self.sample)
+            except Exception as e:
+                logger.error(f"Error sampling system metrics: {e}")
+            await asyncio.sleep(self.interval)
+
+
+# Глобальный экземпляр, запускается в lifespan приложения
+system_sampler = SystemMetricsSampler()
@@ -19,8 +19,9 @@ class ReportRequest(BaseModel):
     filters: Optional[Dict[str, Any]] = None
 
 
+# Обработчики, читающие БД, синхронные: FastAPI выполняет их в пуле потоков
 @router.get("/dashboard")
-async def get_dashboard_metrics(
+def get_dashboard_metrics(
     time_period: str = Query("7d", description="Time period for metrics"),
     current_user: User = Depends(get_current_user),
 ):
@@ -36,6 +37,8 @@ async def get_dashboard_metrics(
             "generated_at": "2025-01-28T10:00:00Z",
         }
 
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(
             status_code=500, detail=f"Ошибка получения метрик дашборда: {str(e)}"
@@ -85,7 +88,7 @@ async def get_content_analytics(
 
 
 @router.get("/business")
-async def get_business_analytics(
+def get_business_analytics(
     time_period: str = Query("30d", description="Time period for business analytics"),
     current_user: User = Depends(get_current_user),
 ):
@@ -98,6 +101,8 @@ async def get_business_analytics(
             "user_id": current_user.id,
         }
 
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(
             status_code=500, detail=f"Ошибка получения бизнес аналитики: {str(e)}"
@@ -124,7 +129,7 @@ async def get_performance_analytics(
 
 
 @router.post("/reports")
-async def generate_report(
+def generate_report(
     request: ReportRequest,
     current_user: User = Depends(get_current_user),
 ):
@@ -135,6 +140,8 @@ async def generate_report(
         )
         return report
 
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(
             status_code=500, detail=f"Ошибка генерации отчета: {str(e)}"
@@ -142,7 +149,7 @@ async def generate_report(
 
 
 @router.get("/trending/{metric_type}")
-async def get_trending_metrics(
+def get_trending_metrics(
     metric_type: str,
     time_period: str = Query("7d", description="Time period for trending metrics"),
     current_user: User = Depends(get_current_user),
@@ -159,6 +166,8 @@ async def get_trending_metrics(
             "user_id": current_user.id,
         }
 
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(
             status_code=500, detail=f"Ошибка получения трендовых метрик: {str(e)}"
@@ -166,7 +175,7 @@ async def get_trending_metrics(
 
 
 @router.get("/export/{report_type}")
-async def export_analytics_data(
+def export_analytics_data(
     report_type: str,
     time_period: str = Query("30d", description="Time period for export"),
     format: str = Query("json", description="Export format (json, csv, xlsx)"),
@@ -195,6 +204,10 @@ async def export_analytics_data(
             "download_url": f"/api/analytics/advanced/download/{report_type}_{time_period}.{format}",
         }
 
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Ошибка экспорта данных: {str(e)}")
 
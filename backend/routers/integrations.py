@@ -180,7 +180,10 @@ async def track_analytics_event(
     """Отправка события в аналитику"""
     try:
         result = await integration_service.track_analytics_event(
-            request.event_name, request.properties, request.provider
+            request.event_name,
+            request.properties,
+            request.provider,
+            user_id=current_user.id,
         )
         return {
             "result": result,
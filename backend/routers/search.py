@@ -2,15 +2,25 @@
 API для поиска и фильтрации
 """
 
-from fastapi import APIRouter, Depends, HTTPException, Query
+import asyncio
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
 from typing import List, Optional, Dict, Any
 from pydantic import BaseModel
 from services.search_service import search_service
+from services.response_cache import ResponseCache
 from auth import get_current_user
+from config import settings
 from models import User
 
 router = APIRouter(prefix="/api/search", tags=["search"])
 
+# Популярные запросы - общий агрегат по всем пользователям: сбрасывать его
+# на каждый поиск бессмысленно, актуальность ограничена TTL. Эндпоинт требует
+# аутентификации, поэтому ответ не разрешено хранить общим прокси-кэшам.
+popular_searches_cache = ResponseCache(
+    "search:popular", ttl=settings.HTTP_CACHE_POPULAR_SEARCHES_TTL, private=True
+)
+
 
 class SearchFilters(BaseModel):
     category: Optional[str] = None
@@ -33,8 +43,9 @@ class SearchResponse(BaseModel):
     filters: Optional[Dict[str, Any]] = None
 
 
+# Поиск читает БД синхронно: обработчики выполняются в пуле потоков
 @router.get("/posts", response_model=SearchResponse)
-async def search_posts(
+def search_posts(
     q: str = Query(..., description="Поисковый запрос"),
     page: int = Query(1, ge=1, description="Номер страницы"),
     per_page: int = Query(
@@ -83,12 +94,14 @@ async def search_posts(
             filters=result["filters"],
         )
 
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Некорректный фильтр: {str(e)}")
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Ошибка поиска постов: {str(e)}")
 
 
 @router.get("/users", response_model=SearchResponse)
-async def search_users(
+def search_users(
     q: str = Query(..., description="Поисковый запрос"),
     page: int = Query(1, ge=1, description="Номер страницы"),
     per_page: int = Query(
@@ -137,7 +150,7 @@ async def search_users(
 
 
 @router.get("/tags", response_model=SearchResponse)
-async def search_tags(
+def search_tags(
     q: Optional[str] = Query(None, description="Поисковый запрос"),
     page: int = Query(1, ge=1, description="Номер страницы"),
     per_page: int = Query(
@@ -168,7 +181,7 @@ async def search_tags(
 
 
 @router.get("/suggestions")
-async def get_search_suggestions(
+def get_search_suggestions(
     q: str = Query(..., min_length=2, description="Поисковый запрос"),
     limit: int = Query(10, ge=1, le=20, description="Количество предложений"),
     current_user: User = Depends(get_current_user),
@@ -191,14 +204,20 @@ async def get_search_suggestions(
 
 @router.get("/popular")
 async def get_popular_searches(
+    request: Request,
     limit: int = Query(10, ge=1, le=50, description="Количество популярных запросов"),
     current_user: User = Depends(get_current_user),
 ):
     """Получение популярных поисковых запросов"""
-    try:
-        popular = search_service.get_popular_searches(limit=limit)
+
+    async def build_response() -> dict:
+        # Первый вызов дочитывает популярность из БД
+        popular = await asyncio.to_thread(search_service.get_popular_searches, limit)
         return {"popular_searches": popular}
 
+    try:
+        return await popular_searches_cache.respond(request, build_response)
+
     except Exception as e:
         raise HTTPException(
             status_code=500, detail=f"Ошибка получения популярных запросов: {str(e)}"
@@ -206,7 +225,7 @@ async def get_popular_searches(
 
 
 @router.get("/history")
-async def get_search_history(
+def get_search_history(
     limit: int = Query(20, ge=1, le=50, description="Количество записей истории"),
     current_user: User = Depends(get_current_user),
 ):
@@ -225,7 +244,7 @@ async def get_search_history(
 
 
 @router.delete("/history")
-async def clear_search_history(
+def clear_search_history(
     current_user: User = Depends(get_current_user),
 ):
     """Очистка истории поиска пользователя"""
@@ -245,7 +264,7 @@ async def clear_search_history(
 
 
 @router.get("/global")
-async def global_search(
+def global_search(
     q: str = Query(..., description="Поисковый запрос"),
     page: int = Query(1, ge=1, description="Номер страницы"),
     per_page: int = Query(
@@ -253,48 +272,19 @@ async def global_search(
     ),
     current_user: User = Depends(get_current_user),
 ):
-    """Глобальный поиск по всем типам контента"""
-    try:
-        # Выполняем поиск по всем типам
-        posts_result = search_service.search_posts(
-            query=q,
-            user_id=current_user.id,
-            page=1,
-            per_page=5,  # Ограничиваем для глобального поиска
-        )
-
-        users_result = search_service.search_users(
-            query=q,
-            user_id=current_user.id,
-            page=1,
-            per_page=5,  # Ограничиваем для глобального поиска
-        )
+    """Глобальный поиск по всем типам контента
 
-        tags_result = search_service.search_tags(
+    Посты, пользователи и теги ищутся параллельно; источник, не
+    ответивший за SEARCH_GLOBAL_TIMEOUT, возвращается пустым, а в
+    metadata.sources указываются статус и время каждого источника.
+    """
+    try:
+        return search_service.global_search(
             query=q,
             user_id=current_user.id,
-            page=1,
             per_page=5,  # Ограничиваем для глобального поиска
         )
 
-        return {
-            "query": q,
-            "results": {
-                "posts": {
-                    "items": posts_result["posts"],
-                    "total": posts_result["total"],
-                },
-                "users": {
-                    "items": users_result["users"],
-                    "total": users_result["total"],
-                },
-                "tags": {
-                    "items": tags_result["tags"],
-                    "total": tags_result["total"],
-                },
-            },
-        }
-
     except Exception as e:
         raise HTTPException(
             status_code=500, detail=f"Ошибка глобального поиска: {str(e)}"
@@ -56,6 +56,24 @@ class MetricListResponse(BaseSchema):
     limit: int = Field(..., description="Лимит метрик")
 
 
+class MetricSample(BaseSchema):
+    """Схема значения метрики"""
+
+    value: float = Field(..., description="Значение")
+    timestamp: Optional[datetime] = Field(
+        None, description="Время значения (по умолчанию текущее)"
+    )
+    labels: Optional[Dict[str, Any]] = Field(None, description="Метки значения")
+
+
+class MetricSamplesCreate(BaseSchema):
+    """Схема пачки значений метрики"""
+
+    samples: List[MetricSample] = Field(
+        ..., min_length=1, max_length=10000, description="Значения метрики"
+    )
+
+
 class ChartDataPoint(BaseSchema):
     """Схема точки данных для графика"""
 
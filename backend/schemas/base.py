@@ -29,6 +29,17 @@ class PaginationParams(BaseModel):
     limit: int = Field(20, ge=1, le=100, description="Количество записей для возврата")
 
 
+class CursorParams(BaseModel):
+    """Параметры курсорной (keyset) пагинации"""
+
+    cursor: Optional[str] = Field(
+        None, description="Курсор следующей страницы (next_cursor из ответа)"
+    )
+    include_total: bool = Field(
+        False, description="Считать общее количество записей (дорогой COUNT)"
+    )
+
+
 class SearchParams(BaseModel):
     """Параметры поиска"""
 
@@ -141,9 +141,12 @@ class ArticleListResponse(BaseSchema):
     """Схема ответа со списком статей"""
 
     items: List[ArticleResponse] = Field(..., description="Список статей")
-    total: int = Field(..., description="Общее количество статей")
+    total: Optional[int] = Field(
+        None, description="Общее количество статей (в режиме cursor - по запросу)"
+    )
     skip: int = Field(..., description="Количество пропущенных статей")
     limit: int = Field(..., description="Лимит статей")
+    next_cursor: Optional[str] = Field(None, description="Курсор следующей страницы")
 
 
 class ArticleCommentBase(BaseSchema):
@@ -63,9 +63,12 @@ class ProductListResponse(BaseSchema):
     """Схема ответа со списком товаров"""
 
     items: List[ProductResponse] = Field(..., description="Список товаров")
-    total: int = Field(..., description="Общее количество товаров")
+    total: Optional[int] = Field(
+        None, description="Общее количество товаров (в режиме cursor - по запросу)"
+    )
     skip: int = Field(..., description="Количество пропущенных товаров")
     limit: int = Field(..., description="Лимит товаров")
+    next_cursor: Optional[str] = Field(None, description="Курсор следующей страницы")
 
 
 class CartItemCreate(BaseSchema):
@@ -175,9 +178,12 @@ class OrderListResponse(BaseSchema):
     """Схема ответа со списком заказов"""
 
     items: List[OrderResponse] = Field(..., description="Список заказов")
-    total: int = Field(..., description="Общее количество заказов")
+    total: Optional[int] = Field(
+        None, description="Общее количество заказов (в режиме cursor - по запросу)"
+    )
     skip: int = Field(..., description="Количество пропущенных заказов")
     limit: int = Field(..., description="Лимит заказов")
+    next_cursor: Optional[str] = Field(None, description="Курсор следующей страницы")
 
 
 class ProductFilters(BaseSchema):
@@ -53,9 +53,12 @@ class PostListResponse(BaseSchema):
     """Схема ответа со списком постов"""
 
     items: List[PostResponse] = Field(..., description="Список постов")
-    total: int = Field(..., description="Общее количество постов")
+    total: Optional[int] = Field(
+        None, description="Общее количество постов (в режиме cursor - по запросу)"
+    )
     skip: int = Field(..., description="Количество пропущенных постов")
     limit: int = Field(..., description="Лимит постов")
+    next_cursor: Optional[str] = Field(None, description="Курсор следующей страницы")
 
 
 class CommentBase(BaseSchema):
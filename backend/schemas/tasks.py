@@ -53,9 +53,12 @@ class BoardListResponse(BaseSchema):
     """Схема ответа со списком досок"""
 
     items: List[BoardResponse] = Field(..., description="Список досок")
-    total: int = Field(..., description="Общее количество досок")
+    total: Optional[int] = Field(
+        None, description="Общее количество досок (в режиме cursor - по запросу)"
+    )
     skip: int = Field(..., description="Количество пропущенных досок")
     limit: int = Field(..., description="Лимит досок")
+    next_cursor: Optional[str] = Field(None, description="Курсор следующей страницы")
 
 
 class CardBase(BaseSchema):
@@ -218,3 +221,9 @@ class CardFilters(BaseSchema):
     overdue: Optional[bool] = Field(None, description="Только просроченные")
     deadline_from: Optional[datetime] = Field(None, description="Дедлайн с даты")
     deadline_to: Optional[datetime] = Field(None, description="Дедлайн до даты")
+    due_date_from: Optional[datetime] = Field(
+        None, description="Карточки с даты выполнения"
+    )
+    due_date_to: Optional[datetime] = Field(
+        None, description="Карточки до даты выполнения"
+    )
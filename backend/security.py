@@ -12,6 +12,7 @@ from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 from config import settings
+from services.rate_limiter import MemoryRateLimitBackend, RateLimit
 import logging
 
 logger = logging.getLogger(__name__)
@@ -289,53 +290,23 @@ class SecurityUtils:
 
 
 class RateLimiter:
-    """Rate limiter для ограничения количества запросов"""
+    """Rate limiter для ограничения количества запросов по IP
 
-    def __init__(self):
-        self.requests = {}  # {ip: [(timestamp, count)]}
+    Синхронная обертка над MemoryRateLimitBackend: тот же алгоритм GCRA
+    с фиксированным объемом памяти на IP и удалением неактивных адресов.
+    """
+
+    def __init__(self, backend: Optional[MemoryRateLimitBackend] = None):
+        self.limit = RateLimit(RATE_LIMIT_REQUESTS, RATE_LIMIT_WINDOW)
+        self.backend = backend if backend is not None else MemoryRateLimitBackend()
 
     def is_allowed(self, ip: str) -> bool:
         """Проверка, разрешен ли запрос"""
-        now = datetime.now(timezone.utc)
-        window_start = now - timedelta(seconds=RATE_LIMIT_WINDOW)
-
-        # Очистка старых записей
-        if ip in self.requests:
-            self.requests[ip] = [
-                (timestamp, count)
-                for timestamp, count in self.requests[ip]
-                if timestamp > window_start
-            ]
-        else:
-            self.requests[ip] = []
-
-        # Подсчет запросов в окне
-        current_requests = len(self.requests[ip])
-
-        if current_requests >= RATE_LIMIT_REQUESTS:
-            return False
-
-        # Добавление текущего запроса
-        self.requests[ip].append((now, 1))
-        return True
+        return self.backend.hit_sync(ip, self.limit).allowed
 
     def get_remaining_requests(self, ip: str) -> int:
         """Получение количества оставшихся запросов"""
-        now = datetime.now(timezone.utc)
-        window_start = now - timedelta(seconds=RATE_LIMIT_WINDOW)
-
-        if ip not in self.requests:
-            return RATE_LIMIT_REQUESTS
-
-        # Очистка старых записей
-        self.requests[ip] = [
-            (timestamp, count)
-            for timestamp, count in self.requests[ip]
-            if timestamp > window_start
-        ]
-
-        current_requests = len(self.requests[ip])
-        return max(0, RATE_LIMIT_REQUESTS - current_requests)
+        return self.backend.peek_sync(ip, self.limit).remaining
 
 
 # Глобальный экземпляр rate limiter
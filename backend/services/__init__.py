@@ -4,6 +4,7 @@ from .social_service import SocialService
 from .tasks_service import TasksService
 from .content_service import ContentService
 from .analytics_service import AnalyticsService
+from .counter_service import CounterService
 
 __all__ = [
     "EcommerceService",
@@ -11,4 +12,5 @@ __all__ = [
     "TasksService",
     "ContentService",
     "AnalyticsService",
+    "CounterService",
 ]
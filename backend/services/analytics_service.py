@@ -5,7 +5,7 @@
 from typing import List, Optional, Dict, Any
 from sqlalchemy.orm import Session
 from sqlalchemy import and_, or_, func, text
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 
 import models_package.analytics as analytics_models
 from models import User
@@ -19,14 +19,19 @@ from schemas.analytics import (
     AlertCreate,
     AlertUpdate,
     AlertFilters,
+    MetricSamplesCreate,
 )
+from services.event_pipeline import event_pipeline
+from services.metric_store import MetricStore, from_epoch, to_epoch
 from utils.database import QueryBuilder, PaginationHelper, SearchHelper
 from utils.exceptions import (
     DashboardNotFoundError,
     ReportNotFoundError,
     AlertNotFoundError,
+    MetricNotFoundError,
     NotFoundError,
     BusinessLogicError,
+    ServiceUnavailableError,
 )
 
 
@@ -562,6 +567,53 @@ class AnalyticsService:
         self.db.refresh(alert)
         return alert
 
+    # Metric data methods
+    def _find_metric(self, metric_id: int) -> analytics_models.Metric:
+        metric = (
+            self.db.query(analytics_models.Metric)
+            .filter(analytics_models.Metric.id == metric_id)
+            .first()
+        )
+        if not metric:
+            raise MetricNotFoundError(str(metric_id))
+        return metric
+
+    def get_metric_data(
+        self,
+        metric_id: int,
+        user: User,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        step: Optional[int] = None,
+    ) -> Dict[str, Any]:
+        """Временной ряд метрики за период (по умолчанию последние сутки)"""
+        self._find_metric(metric_id)
+        # Время без зоны из параметров запроса считается UTC
+        end = from_epoch(to_epoch(end)) if end else datetime.now(timezone.utc)
+        start = from_epoch(to_epoch(start)) if start else end - timedelta(days=1)
+        if start > end:
+            raise BusinessLogicError("Начало периода позже его окончания")
+        try:
+            return MetricStore(self.db).query(metric_id, start, end, step=step)
+        except ValueError as e:
+            raise BusinessLogicError(str(e))
+
+    def add_metric_data(
+        self, metric_id: int, samples: MetricSamplesCreate, user: User
+    ) -> Dict[str, Any]:
+        """Записать пачку значений метрики"""
+        metric = self._find_metric(metric_id)
+        if not metric.is_active:
+            raise BusinessLogicError("Метрика отключена")
+        written = MetricStore(self.db).ingest(
+            metric_id,
+            (
+                (sample.value, sample.timestamp, sample.labels)
+                for sample in samples.samples
+            ),
+        )
+        return {"metric_id": metric_id, "written": written}
+
     # Analytics methods
     def get_system_analytics(self, user: User) -> Dict[str, Any]:
         """Получить системную аналитику"""
@@ -669,17 +721,57 @@ class AnalyticsService:
         }
 
     def track_event(self, event_data, user: User) -> dict:
-        """Отслеживание события"""
-        # Простое логирование события (модель Event не существует)
-        event_info = {
-            "name": getattr(
+        """Отслеживание события
+
+        Событие ставится в очередь и записывается в БД фоновой задачей
+        пачкой вместе с другими (services/event_pipeline.py).
+        """
+        event = event_pipeline.track(
+            event_type=getattr(
                 event_data, "name", getattr(event_data, "event_type", "unknown")
             ),
-            "properties": getattr(
+            event_data=getattr(
                 event_data, "properties", getattr(event_data, "event_data", {})
             ),
+            user_id=user.id,
+            user_agent=getattr(event_data, "user_agent", None),
+            ip_address=getattr(event_data, "ip_address", None),
+        )
+        if event is None:
+            raise ServiceUnavailableError(
+                "Очередь событий аналитики переполнена", retry_after=1
+            )
+
+        return {
+            "name": event["event_type"],
+            "properties": event["event_data"],
             "user_id": user.id,
-            "timestamp": datetime.now().isoformat(),
+            "timestamp": event["created_at"].isoformat(),
         }
-        # В реальном приложении здесь было бы сохранение в БД
-        return event_info
+
+    def get_events(
+        self,
+        user: User,
+        skip: int = 0,
+        limit: int = 50,
+        event_type: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        """Получить записанные события пользователя (новые сначала)"""
+        Event = analytics_models.AnalyticsEvent
+        query = self.db.query(Event).filter(Event.user_id == user.id)
+        if event_type:
+            query = query.filter(Event.event_type == event_type)
+        query = query.order_by(Event.created_at.desc(), Event.id.desc())
+
+        result = PaginationHelper.paginate_query(query, skip, limit, max_limit=200)
+        result["items"] = [
+            {
+                "id": event.id,
+                "name": event.event_type,
+                "properties": event.event_data or {},
+                "source": event.source,
+                "timestamp": event.created_at.isoformat(),
+            }
+            for event in result["items"]
+        ]
+        return result
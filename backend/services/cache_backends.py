@@ -0,0 +1,471 @@
+"""
+Хранилища для сервиса кэширования
+
+CacheService работает с хранилищем через интерфейс CacheBackend:
+- MemoryCacheBackend - кэш в памяти процесса (по умолчанию)
+- RedisCacheBackend - общий кэш в Redis для всех воркеров
+
+Хранилище выбирается настройкой CACHE_BACKEND.
+"""
+
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+import asyncio
+import heapq
+import logging
+import pickle
+import sys
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class CacheBackend(ABC):
+    """Интерфейс хранилища кэша"""
+
+    name = "base"
+
+    @abstractmethod
+    async def get(self, key: str) -> Optional[Any]:
+        """Получить значение или None"""
+
+    async def get_many(self, keys: Iterable[str]) -> Dict[str, Any]:
+        """Получить несколько значений, отсутствующие ключи не возвращаются"""
+        result = {}
+        for key in keys:
+            value = await self.get(key)
+            if value is not None:
+                result[key] = value
+        return result
+
+    @abstractmethod
+    async def set(self, key: str, value: Any, ttl: int) -> None:
+        """Сохранить значение на ttl секунд"""
+
+    async def set_many(self, items: Dict[str, Any], ttl: int) -> None:
+        """Сохранить несколько значений на ttl секунд"""
+        for key, value in items.items():
+            await self.set(key, value, ttl)
+
+    @abstractmethod
+    async def add(self, key: str, value: Any, ttl: int) -> bool:
+        """Сохранить значение, только если ключа нет; True при успехе"""
+
+    @abstractmethod
+    async def delete(self, key: str) -> bool:
+        """Удалить ключ, возвращает True если он существовал"""
+
+    @abstractmethod
+    async def delete_pattern(self, pattern: str) -> int:
+        """Удалить все ключи, содержащие pattern"""
+
+    @abstractmethod
+    async def clear(self) -> None:
+        """Удалить все ключи кэша"""
+
+    async def get_stats(self) -> Dict[str, Any]:
+        """Статистика хранилища"""
+        return {"backend": self.name}
+
+    async def close(self) -> None:
+        """Освободить ресурсы хранилища"""
+
+
+class FrequencySketch:
+    """Count-Min Sketch частот обращений к ключам для допуска TinyLFU
+
+    Счетчики периодически делятся пополам, чтобы старая популярность
+    постепенно забывалась.
+    """
+
+    DEPTH = 4
+
+    def __init__(self, width: int):
+        self.width = max(width, 64)
+        self.rows = [[0] * self.width for _ in range(self.DEPTH)]
+        self.sample_size = self.width * 10
+        self.additions = 0
+
+    def _indexes(self, key: str):
+        # Двойное хеширование: независимые позиции в строках из одного хеша
+        key_hash = hash(key) & 0xFFFFFFFFFFFFFFFF
+        first = key_hash & 0xFFFFFFFF
+        second = (key_hash >> 32) | 1
+        for row in range(self.DEPTH):
+            yield row, (first + row * second) % self.width
+
+    def increment(self, key: str) -> None:
+        """Учесть обращение к ключу"""
+        for row, index in self._indexes(key):
+            self.rows[row][index] += 1
+
+        self.additions += 1
+        if self.additions >= self.sample_size:
+            self._reset()
+
+    def estimate(self, key: str) -> int:
+        """Оценка частоты обращений к ключу"""
+        return min(self.rows[row][index] for row, index in self._indexes(key))
+
+    def _reset(self) -> None:
+        """Старение: уменьшить все счетчики вдвое"""
+        for row in self.rows:
+            for index, value in enumerate(row):
+                row[index] = value >> 1
+        self.additions //= 2
+
+
+class CacheEntry:
+    """Запись кэша в памяти"""
+
+    __slots__ = ("value", "expires_at", "size")
+
+    def __init__(self, value: Any, expires_at: float, size: int):
+        self.value = value
+        self.expires_at = expires_at
+        self.size = size
+
+
+class MemoryCacheBackend(CacheBackend):
+    """Кэш в памяти процесса
+
+    Записи хранятся в OrderedDict в порядке последнего обращения (LRU):
+    обращение и вытеснение выполняются за O(1). Сроки действия лежат в
+    куче, поэтому очистка истекших записей не перебирает весь кэш. Политика
+    "tinylfu" дополнительно не допускает новый ключ, если он обращался
+    реже вытесняемого.
+    """
+
+    name = "memory"
+
+    EVICTION_POLICIES = ("lru", "tinylfu")
+
+    def __init__(
+        self,
+        max_items: int = 1000,
+        max_bytes: int = 0,
+        eviction_policy: str = "lru",
+        cleanup_interval: int = 60,
+    ):
+        if eviction_policy not in self.EVICTION_POLICIES:
+            raise ValueError(f"Unknown eviction policy: {eviction_policy}")
+
+        self.memory_cache: "OrderedDict[str, CacheEntry]" = OrderedDict()
+        self.max_memory_items = max_items
+        self.max_bytes = max_bytes
+        self.eviction_policy = eviction_policy
+        self.cleanup_interval = cleanup_interval
+        self.sketch = (
+            FrequencySketch(max_items * 4) if eviction_policy == "tinylfu" else None
+        )
+
+        # Куча (expires_at, key); устаревшие элементы пропускаются при извлечении
+        self._expiry_heap: List[Tuple[float, str]] = []
+        self.total_bytes = 0
+        self.expired_count = 0
+        self.evicted_count = 0
+        self.rejected_count = 0
+        self._cleanup_task: Optional[asyncio.Task] = None
+
+    async def get(self, key: str) -> Optional[Any]:
+        if self.sketch is not None:
+            self.sketch.increment(key)
+
+        entry = self.memory_cache.get(key)
+        if entry is None:
+            return None
+
+        # Проверяем срок действия
+        if entry.expires_at <= time.monotonic():
+            self._remove(key)
+            self.expired_count += 1
+            return None
+
+        self.memory_cache.move_to_end(key)
+        return entry.value
+
+    async def set(self, key: str, value: Any, ttl: int) -> None:
+        self._store(key, value, ttl)
+
+    async def add(self, key: str, value: Any, ttl: int) -> bool:
+        entry = self.memory_cache.get(key)
+        if entry is not None and entry.expires_at > time.monotonic():
+            return False
+        # Служебные записи (блокировки) не проходят допуск TinyLFU
+        return self._store(key, value, ttl, admit=False)
+
+    def _store(self, key: str, value: Any, ttl: int, admit: bool = True) -> bool:
+        """Сохранить запись с учетом лимитов, возвращает True если она принята"""
+        self._ensure_cleanup_task()
+        now = time.monotonic()
+        self._purge_expired(now)
+
+        size = self._estimate_size(value) if self.max_bytes else 0
+        if self.max_bytes and size > self.max_bytes:
+            self.rejected_count += 1
+            return False
+
+        if key in self.memory_cache:
+            self._remove(key)
+        elif admit and not self._admit(key):
+            self.rejected_count += 1
+            return False
+
+        entry = CacheEntry(value, now + ttl, size)
+        self.memory_cache[key] = entry
+        self.total_bytes += size
+        heapq.heappush(self._expiry_heap, (entry.expires_at, key))
+        self._evict_to_fit()
+        return key in self.memory_cache
+
+    async def delete(self, key: str) -> bool:
+        return self._remove(key)
+
+    async def delete_pattern(self, pattern: str) -> int:
+        keys_to_delete = [key for key in self.memory_cache.keys() if pattern in key]
+        for key in keys_to_delete:
+            self._remove(key)
+        return len(keys_to_delete)
+
+    async def clear(self) -> None:
+        self.memory_cache.clear()
+        self._expiry_heap.clear()
+        self.total_bytes = 0
+
+    async def get_stats(self) -> Dict[str, Any]:
+        return {
+            "backend": self.name,
+            "eviction_policy": self.eviction_policy,
+            "expired": self.expired_count,
+            "evictions": self.evicted_count,
+            "rejected": self.rejected_count,
+            "memory_items": len(self.memory_cache),
+            "memory_bytes": self.total_bytes,
+            "memory_usage_mb": round(self.total_bytes / 1024 / 1024, 2),
+        }
+
+    async def close(self) -> None:
+        if self._cleanup_task is not None:
+            self._cleanup_task.cancel()
+            self._cleanup_task = None
+
+    @staticmethod
+    def _estimate_size(value: Any) -> int:
+        """Размер значения в байтах (по сериализованному представлению)"""
+        try:
+            return len(pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL))
+        except Exception:
+            return sys.getsizeof(value)
+
+    def _remove(self, key: str) -> bool:
+        """Удалить запись; элемент кучи станет устаревшим"""
+        entry = self.memory_cache.pop(key, None)
+        if entry is None:
+            return False
+        self.total_bytes -= entry.size
+        return True
+
+    def _admit(self, key: str) -> bool:
+        """Решение TinyLFU: допустить новый ключ в заполненный кэш"""
+        if self.sketch is None or len(self.memory_cache) < self.max_memory_items:
+            return True
+
+        victim = next(iter(self.memory_cache))
+        return self.sketch.estimate(key) > self.sketch.estimate(victim)
+
+    def _over_budget(self) -> bool:
+        if len(self.memory_cache) > self.max_memory_items:
+            return True
+        return bool(self.max_bytes) and self.total_bytes > self.max_bytes
+
+    def _evict_to_fit(self):
+        """Вытеснить наименее давно использованные записи сверх лимитов"""
+        while self.memory_cache and self._over_budget():
+            key, entry = self.memory_cache.popitem(last=False)
+            self.total_bytes -= entry.size
+            self.evicted_count += 1
+
+    def _purge_expired(self, now: float, limit: Optional[int] = 100) -> int:
+        """Удалить истекшие записи с вершины кучи
+
+        limit ограничивает работу на пути записи; фоновая очистка вызывает
+        метод без ограничения.
+        """
+        purged = 0
+        heap = self._expiry_heap
+        while heap and heap[0][0] <= now and (limit is None or purged < limit):
+            expires_at, key = heapq.heappop(heap)
+            entry = self.memory_cache.get(key)
+            # Запись могла быть перезаписана или удалена
+            if entry is not None and entry.expires_at == expires_at:
+                self._remove(key)
+                self.expired_count += 1
+                purged += 1
+
+        # Перестраиваем кучу, если в ней накопилось много устаревших элементов
+        if len(heap) > 2 * len(self.memory_cache) + 1024:
+            self._expiry_heap = [
+                (entry.expires_at, key) for key, entry in self.memory_cache.items()
+            ]
+            heapq.heapify(self._expiry_heap)
+
+        return purged
+
+    def _ensure_cleanup_task(self):
+        """Запустить фоновую очистку при первом использовании в event loop"""
+        if self._cleanup_task is not None and not self._cleanup_task.done():
+            return
+        try:
+            self._cleanup_task = asyncio.get_running_loop().create_task(
+                self._cleanup_expired()
+            )
+        except RuntimeError:
+            self._cleanup_task = None
+
+    async def _cleanup_expired(self):
+        """Очистка истекших элементов (запускается в фоне)"""
+        while True:
+            try:
+                await asyncio.sleep(self.cleanup_interval)
+
+                purged = self._purge_expired(time.monotonic(), limit=None)
+                if purged:
+                    logger.info(f"Cleaned up {purged} expired cache items")
+
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Error in cache cleanup: {e}")
+
+
+class RedisCacheBackend(CacheBackend):
+    """Общий кэш в Redis
+
+    Значения сериализуются pickle, массовые операции выполняются одним
+    запросом (MGET) или конвейером, удаление по шаблону использует SCAN.
+    """
+
+    name = "redis"
+
+    # Символы glob-шаблонов Redis, которые нужно экранировать в pattern
+    GLOB_SPECIAL_CHARS = "\\*?[]^"
+
+    def __init__(
+        self,
+        client: Any = None,
+        url: Optional[str] = None,
+        key_prefix: str = "cache:",
+        scan_count: int = 500,
+    ):
+        if client is None:
+            import redis.asyncio as redis_asyncio
+
+            client = redis_asyncio.from_url(url)
+
+        self.client = client
+        self.key_prefix = key_prefix
+        self.scan_count = scan_count
+
+    def _key(self, key: str) -> str:
+        """Ключ Redis с префиксом приложения"""
+        return f"{self.key_prefix}{key}"
+
+    @staticmethod
+    def _dumps(value: Any) -> bytes:
+        return pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+
+    @staticmethod
+    def _loads(data: bytes) -> Any:
+        return pickle.loads(data)
+
+    @classmethod
+    def _escape_glob(cls, pattern: str) -> str:
+        """Экранировать pattern для использования в SCAN MATCH"""
+        return "".join(
+            f"\\{char}" if char in cls.GLOB_SPECIAL_CHARS else char for char in pattern
+        )
+
+    async def get(self, key: str) -> Optional[Any]:
+        data = await self.client.get(self._key(key))
+        return None if data is None else self._loads(data)
+
+    async def get_many(self, keys: Iterable[str]) -> Dict[str, Any]:
+        keys = list(keys)
+        if not keys:
+            return {}
+
+        values = await self.client.mget([self._key(key) for key in keys])
+        return {
+            key: self._loads(data)
+            for key, data in zip(keys, values)
+            if data is not None
+        }
+
+    async def set(self, key: str, value: Any, ttl: int) -> None:
+        await self.client.set(self._key(key), self._dumps(value), ex=ttl)
+
+    async def set_many(self, items: Dict[str, Any], ttl: int) -> None:
+        if not items:
+            return
+
+        # MSET не поддерживает TTL, поэтому SET EX отправляются одним конвейером
+        async with self.client.pipeline(transaction=False) as pipe:
+            for key, value in items.items():
+                pipe.set(self._key(key), self._dumps(value), ex=ttl)
+            await pipe.execute()
+
+    async def add(self, key: str, value: Any, ttl: int) -> bool:
+        return bool(
+            await self.client.set(self._key(key), self._dumps(value), ex=ttl, nx=True)
+        )
+
+    async def delete(self, key: str) -> bool:
+        return bool(await self.client.delete(self._key(key)))
+
+    async def delete_pattern(self, pattern: str) -> int:
+        match = f"{self._escape_glob(self.key_prefix)}*{self._escape_glob(pattern)}*"
+        return await self._delete_matching(match)
+
+    async def clear(self) -> None:
+        # Redis может быть общим, поэтому удаляем только ключи кэша, без FLUSHDB
+        await self._delete_matching(f"{self._escape_glob(self.key_prefix)}*")
+
+    async def _delete_matching(self, match: str) -> int:
+        """Удалить ключи по шаблону SCAN пакетами через UNLINK"""
+        deleted = 0
+        batch = []
+        async for key in self.client.scan_iter(match=match, count=self.scan_count):
+            batch.append(key)
+            if len(batch) >= self.scan_count:
+                deleted += await self.client.unlink(*batch)
+                batch = []
+        if batch:
+            deleted += await self.client.unlink(*batch)
+        return deleted
+
+    async def get_stats(self) -> Dict[str, Any]:
+        return {"backend": self.name, "key_prefix": self.key_prefix}
+
+    async def close(self) -> None:
+        await self.client.aclose()
+
+
+def create_cache_backend(cache_settings) -> CacheBackend:
+    """Создать хранилище кэша по настройкам"""
+    backend = cache_settings.CACHE_BACKEND.lower()
+
+    if backend == "memory":
+        return MemoryCacheBackend(
+            max_items=cache_settings.CACHE_MAX_ITEMS,
+            max_bytes=cache_settings.CACHE_MAX_BYTES,
+            eviction_policy=cache_settings.CACHE_EVICTION_POLICY,
+        )
+
+    if backend == "redis":
+        return RedisCacheBackend(
+            url=cache_settings.CACHE_REDIS_URL or cache_settings.REDIS_URL,
+            key_prefix=cache_settings.CACHE_KEY_PREFIX,
+        )
+
+    raise ValueError(f"Unknown cache backend: {cache_settings.CACHE_BACKEND}")
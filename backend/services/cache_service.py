@@ -2,130 +2,304 @@
 Сервис кэширования для оптимизации производительности
 """
 
-from typing import Any, Optional, Dict, List
-from datetime import datetime, timedelta, timezone
+from typing import Any, Awaitable, Callable, Optional, Dict, List, Iterable
+import asyncio
 import json
 import logging
 import hashlib
-import asyncio
+import math
+import random
+import time
 from functools import wraps
 
+from config import settings
+from services.cache_backends import CacheBackend, create_cache_backend
+
 logger = logging.getLogger(__name__)
 
 
+class CachedResult:
+    """Результат функции в кэше вместе с метаданными для обновления
+
+    expires_at - логический срок свежести (время Unix), delta - сколько
+    секунд заняло вычисление. Физический TTL записи может быть больше
+    на время stale_ttl.
+    """
+
+    __slots__ = ("value", "expires_at", "delta")
+
+    def __init__(self, value: Any, expires_at: float, delta: float):
+        self.value = value
+        self.expires_at = expires_at
+        self.delta = delta
+
+    def __getstate__(self):
+        return (self.value, self.expires_at, self.delta)
+
+    def __setstate__(self, state):
+        self.value, self.expires_at, self.delta = state
+
+
 class CacheService:
     """Сервис кэширования для оптимизации производительности"""
 
-    def __init__(self):
-        # В реальном приложении здесь будет Redis или другой кэш
-        self.memory_cache = {}  # In-memory кэш
+    def __init__(self, backend: Optional[CacheBackend] = None):
+        # Хранилище выбирается настройкой CACHE_BACKEND (memory или redis)
+        self.backend = backend or create_cache_backend(settings)
         self.cache_stats = {
             "hits": 0,
             "misses": 0,
             "sets": 0,
             "deletes": 0,
-            "expired": 0,
+            "errors": 0,
         }
 
         # Настройки кэширования
-        self.default_ttl = 3600  # 1 час по умолчанию
-        self.max_memory_items = 1000  # Максимум элементов в памяти
+        self.default_ttl = settings.CACHE_DEFAULT_TTL
+        self.lock_timeout = settings.CACHE_LOCK_TIMEOUT
 
-        # Запускаем очистку истекших элементов
-        asyncio.create_task(self._cleanup_expired())
+        # Вычисления, выполняющиеся сейчас в этом процессе, по ключу кэша
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._background_tasks = set()
 
     async def get(self, key: str) -> Optional[Any]:
         """Получить значение из кэша"""
         try:
-            if key in self.memory_cache:
-                cache_item = self.memory_cache[key]
-
-                # Проверяем срок действия
-                if (
-                    cache_item["expires_at"]
-                    and datetime.now(timezone.utc) > cache_item["expires_at"]
-                ):
-                    del self.memory_cache[key]
-                    self.cache_stats["expired"] += 1
-                    self.cache_stats["misses"] += 1
-                    return None
-
-                self.cache_stats["hits"] += 1
-                logger.debug(f"Cache hit for key: {key}")
-                return cache_item["value"]
+            value = await self.backend.get(key)
+        except Exception as e:
+            self.cache_stats["errors"] += 1
+            logger.error(f"Error getting from cache: {e}")
+            return None
 
+        if value is None:
             self.cache_stats["misses"] += 1
             logger.debug(f"Cache miss for key: {key}")
             return None
 
+        self.cache_stats["hits"] += 1
+        logger.debug(f"Cache hit for key: {key}")
+        return value
+
+    async def get_many(self, keys: Iterable[str]) -> Dict[str, Any]:
+        """Получить несколько значений одним обращением к хранилищу"""
+        keys = list(keys)
+        try:
+            values = await self.backend.get_many(keys)
         except Exception as e:
-            logger.error(f"Error getting from cache: {e}")
-            return None
+            self.cache_stats["errors"] += 1
+            logger.error(f"Error getting many from cache: {e}")
+            return {}
+
+        self.cache_stats["hits"] += len(values)
+        self.cache_stats["misses"] += len(keys) - len(values)
+        return values
 
     async def set(self, key: str, value: Any, ttl: Optional[int] = None) -> bool:
         """Установить значение в кэш"""
         try:
             ttl = ttl or self.default_ttl
-            expires_at = datetime.now(timezone.utc) + timedelta(seconds=ttl)
-
-            # Очищаем старые элементы если достигли лимита
-            if len(self.memory_cache) >= self.max_memory_items:
-                await self._evict_oldest()
-
-            self.memory_cache[key] = {
-                "value": value,
-                "expires_at": expires_at,
-                "created_at": datetime.now(timezone.utc),
-            }
-
+            await self.backend.set(key, value, ttl)
             self.cache_stats["sets"] += 1
             logger.debug(f"Cache set for key: {key}, TTL: {ttl}s")
             return True
 
         except Exception as e:
+            self.cache_stats["errors"] += 1
             logger.error(f"Error setting cache: {e}")
             return False
 
+    async def set_many(self, items: Dict[str, Any], ttl: Optional[int] = None) -> bool:
+        """Установить несколько значений одним обращением к хранилищу"""
+        try:
+            await self.backend.set_many(items, ttl or self.default_ttl)
+            self.cache_stats["sets"] += len(items)
+            return True
+
+        except Exception as e:
+            self.cache_stats["errors"] += 1
+            logger.error(f"Error setting many in cache: {e}")
+            return False
+
+    async def add(self, key: str, value: Any, ttl: Optional[int] = None) -> bool:
+        """Установить значение, только если ключа еще нет"""
+        try:
+            return await self.backend.add(key, value, ttl or self.default_ttl)
+
+        except Exception as e:
+            self.cache_stats["errors"] += 1
+            logger.error(f"Error adding to cache: {e}")
+            return False
+
+    async def get_or_set(
+        self,
+        key: str,
+        compute: Callable[[], Awaitable[Any]],
+        ttl: Optional[int] = None,
+        stale_ttl: int = 0,
+        early_refresh_beta: float = 0.0,
+    ) -> Any:
+        """Получить значение или вычислить его с объединением запросов
+
+        Одновременные промахи по одному ключу выполняют compute один раз:
+        внутри процесса ожидают общую задачу, между процессами разделяемого
+        хранилища координируются блокировкой в кэше.
+
+        stale_ttl - сколько секунд после истечения отдавать устаревшее
+        значение, обновляя его в фоне (stale-while-revalidate).
+        early_refresh_beta - коэффициент вероятностного досрочного
+        обновления (XFetch), 0 - отключено.
+        """
+        ttl = ttl or self.default_ttl
+        cached = await self.get(key)
+
+        if cached is not None:
+            if not isinstance(cached, CachedResult):
+                return cached
+
+            now = time.time()
+            if now < cached.expires_at:
+                if early_refresh_beta > 0 and self._should_refresh_early(
+                    cached, now, early_refresh_beta
+                ):
+                    self._refresh_in_background(key, compute, ttl, stale_ttl)
+                return cached.value
+
+            if stale_ttl > 0:
+                self._refresh_in_background(key, compute, ttl, stale_ttl)
+                return cached.value
+
+        return await self._single_flight(key, compute, ttl, stale_ttl)
+
+    @staticmethod
+    def _should_refresh_early(cached: CachedResult, now: float, beta: float) -> bool:
+        """XFetch: вероятность обновления растет к концу срока свежести"""
+        # 1 - random() лежит в (0, 1], поэтому логарифм определен
+        gap = -cached.delta * beta * math.log(1.0 - random.random())
+        return now + gap >= cached.expires_at
+
+    def _single_flight(
+        self,
+        key: str,
+        compute: Callable[[], Awaitable[Any]],
+        ttl: int,
+        stale_ttl: int,
+    ) -> "asyncio.Future":
+        """Общая задача вычисления значения для ключа"""
+        future = self._inflight.get(key)
+        if future is None:
+            future = asyncio.ensure_future(
+                self._compute_and_store(key, compute, ttl, stale_ttl)
+            )
+            self._inflight[key] = future
+            future.add_done_callback(lambda _: self._inflight.pop(key, None))
+        # shield: отмена одного ожидающего не отменяет вычисление для остальных
+        return asyncio.shield(future)
+
+    def _refresh_in_background(
+        self,
+        key: str,
+        compute: Callable[[], Awaitable[Any]],
+        ttl: int,
+        stale_ttl: int,
+    ):
+        """Запустить фоновое обновление, если оно еще не выполняется"""
+        if key in self._inflight:
+            return
+
+        task = asyncio.ensure_future(self._single_flight(key, compute, ttl, stale_ttl))
+        self._background_tasks.add(task)
+        task.add_done_callback(self._on_background_refresh_done)
+
+    def _on_background_refresh_done(self, task: "asyncio.Future"):
+        self._background_tasks.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            logger.error(f"Background cache refresh failed: {task.exception()}")
+
+    async def _compute_and_store(
+        self,
+        key: str,
+        compute: Callable[[], Awaitable[Any]],
+        ttl: int,
+        stale_ttl: int,
+    ) -> Any:
+        """Вычислить значение под блокировкой и сохранить в кэш"""
+        lock_key = f"{key}:lock"
+        locked = await self.add(lock_key, True, self.lock_timeout)
+
+        if not locked:
+            # Значение вычисляет другой процесс
+            cached = await self._wait_for_value(key)
+            if cached is not None:
+                return cached.value
+
+        try:
+            start_time = time.time()
+            value = await compute()
+            delta = time.time() - start_time
+
+            if value is not None:
+                await self.set(
+                    key,
+                    CachedResult(value, time.time() + ttl, delta),
+                    ttl + stale_ttl,
+                )
+            return value
+        finally:
+            if locked:
+                await self.delete(lock_key)
+
+    async def _wait_for_value(self, key: str) -> Optional[CachedResult]:
+        """Дождаться свежего значения от другого процесса (не дольше lock_timeout)"""
+        deadline = time.monotonic() + self.lock_timeout
+        delay = 0.01
+        while time.monotonic() < deadline:
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, 0.2)
+            try:
+                cached = await self.backend.get(key)
+            except Exception as e:
+                logger.error(f"Error waiting for cache value: {e}")
+                return None
+            if isinstance(cached, CachedResult) and cached.expires_at > time.time():
+                return cached
+        return None
+
     async def delete(self, key: str) -> bool:
         """Удалить значение из кэша"""
         try:
-            if key in self.memory_cache:
-                del self.memory_cache[key]
+            deleted = await self.backend.delete(key)
+            if deleted:
                 self.cache_stats["deletes"] += 1
                 logger.debug(f"Cache delete for key: {key}")
-                return True
-            return False
+            return deleted
 
         except Exception as e:
+            self.cache_stats["errors"] += 1
             logger.error(f"Error deleting from cache: {e}")
             return False
 
     async def delete_pattern(self, pattern: str) -> int:
         """Удалить все ключи по паттерну"""
         try:
-            deleted_count = 0
-            keys_to_delete = [key for key in self.memory_cache.keys() if pattern in key]
-
-            for key in keys_to_delete:
-                del self.memory_cache[key]
-                deleted_count += 1
-
+            deleted_count = await self.backend.delete_pattern(pattern)
             self.cache_stats["deletes"] += deleted_count
             logger.debug(f"Cache delete pattern '{pattern}': {deleted_count} items")
             return deleted_count
 
         except Exception as e:
+            self.cache_stats["errors"] += 1
             logger.error(f"Error deleting pattern from cache: {e}")
             return 0
 
     async def clear(self) -> bool:
         """Очистить весь кэш"""
         try:
-            self.memory_cache.clear()
+            await self.backend.clear()
             logger.info("Cache cleared")
             return True
 
         except Exception as e:
+            self.cache_stats["errors"] += 1
             logger.error(f"Error clearing cache: {e}")
             return False
 
@@ -138,68 +312,22 @@ class CacheService:
             else 0
         )
 
+        try:
+            backend_stats = await self.backend.get_stats()
+        except Exception as e:
+            logger.error(f"Error getting cache backend stats: {e}")
+            backend_stats = {"backend": self.backend.name}
+
         return {
             **self.cache_stats,
+            **backend_stats,
             "total_requests": total_requests,
             "hit_rate": round(hit_rate, 2),
-            "memory_items": len(self.memory_cache),
-            "memory_usage_mb": self._get_memory_usage(),
         }
 
-    def _get_memory_usage(self) -> float:
-        """Получить использование памяти в МБ"""
-        try:
-            import sys
-
-            total_size = 0
-            for item in self.memory_cache.values():
-                total_size += sys.getsizeof(item)
-            return round(total_size / 1024 / 1024, 2)
-        except:
-            return 0.0
-
-    async def _evict_oldest(self):
-        """Удалить самые старые элементы"""
-        try:
-            if not self.memory_cache:
-                return
-
-            # Сортируем по времени создания и удаляем 20% самых старых
-            sorted_items = sorted(
-                self.memory_cache.items(), key=lambda x: x[1]["created_at"]
-            )
-
-            items_to_remove = len(sorted_items) // 5  # 20%
-            for key, _ in sorted_items[:items_to_remove]:
-                del self.memory_cache[key]
-
-            logger.info(f"Evicted {items_to_remove} oldest cache items")
-
-        except Exception as e:
-            logger.error(f"Error evicting oldest items: {e}")
-
-    async def _cleanup_expired(self):
-        """Очистка истекших элементов (запускается в фоне)"""
-        while True:
-            try:
-                await asyncio.sleep(300)  # Каждые 5 минут
-
-                current_time = datetime.now(timezone.utc)
-                expired_keys = []
-
-                for key, item in self.memory_cache.items():
-                    if item["expires_at"] and current_time > item["expires_at"]:
-                        expired_keys.append(key)
-
-                for key in expired_keys:
-                    del self.memory_cache[key]
-                    self.cache_stats["expired"] += 1
-
-                if expired_keys:
-                    logger.info(f"Cleaned up {len(expired_keys)} expired cache items")
-
-            except Exception as e:
-                logger.error(f"Error in cache cleanup: {e}")
+    async def close(self):
+        """Закрыть соединения хранилища"""
+        await self.backend.close()
 
     def generate_cache_key(self, prefix: str, *args, **kwargs) -> str:
         """Генерировать ключ кэша на основе аргументов"""
@@ -219,17 +347,27 @@ class CacheService:
                 sorted_kwargs = sorted(kwargs.items())
                 key_parts.append(json.dumps(sorted_kwargs, sort_keys=True))
 
-            # Создаем хэш
+            # Префикс сохраняется в ключе, чтобы его можно было сбросить
+            # через delete_pattern
             key_string = "|".join(key_parts)
-            return hashlib.md5(key_string.encode()).hexdigest()
+            return f"{prefix}:{hashlib.md5(key_string.encode()).hexdigest()}"
 
         except Exception as e:
             logger.error(f"Error generating cache key: {e}")
             return f"{prefix}_{hash(str(args) + str(kwargs))}"
 
 
-def cache_result(ttl: int = 3600, key_prefix: str = ""):
-    """Декоратор для кэширования результатов функций"""
+def cache_result(
+    ttl: int = 3600,
+    key_prefix: str = "",
+    stale_ttl: int = 0,
+    early_refresh_beta: float = 0.0,
+):
+    """Декоратор для кэширования результатов функций
+
+    Одновременные промахи по одному ключу объединяются в одно вычисление.
+    stale_ttl и early_refresh_beta описаны в CacheService.get_or_set.
+    """
 
     def decorator(func):
         @wraps(func)
@@ -239,18 +377,13 @@ def cache_result(ttl: int = 3600, key_prefix: str = ""):
                 key_prefix or func.__name__, *args, **kwargs
             )
 
-            # Пытаемся получить из кэша
-            cached_result = await cache_service.get(cache_key)
-            if cached_result is not None:
-                logger.debug(f"Cache hit for function {func.__name__}")
-                return cached_result
-
-            # Выполняем функцию и кэшируем результат
-            result = await func(*args, **kwargs)
-            await cache_service.set(cache_key, result, ttl)
-            logger.debug(f"Cached result for function {func.__name__}")
-
-            return result
+            return await cache_service.get_or_set(
+                cache_key,
+                lambda: func(*args, **kwargs),
+                ttl=ttl,
+                stale_ttl=stale_ttl,
+                early_refresh_beta=early_refresh_beta,
+            )
 
         return wrapper
 
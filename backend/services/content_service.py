@@ -20,7 +20,13 @@ from schemas.content import (
     MediaFileUpdate,
     MediaFileFilters,
 )
-from utils.database import QueryBuilder, PaginationHelper, SearchHelper
+from schemas.base import CursorParams
+from utils.database import (
+    QueryBuilder,
+    PaginationHelper,
+    SearchHelper,
+    CounterHelper,
+)
 from utils.exceptions import (
     ArticleNotFoundError,
     CategoryNotFoundError,
@@ -42,6 +48,7 @@ class ContentService:
         limit: int = 20,
         filters: Optional[ArticleFilters] = None,
         user: Optional[User] = None,
+        cursor_params: Optional[CursorParams] = None,
     ) -> Dict[str, Any]:
         """Получить список статей с фильтрацией"""
         query = self.db.query(content_models.Article)
@@ -104,7 +111,11 @@ class ContentService:
         # Сортировка по дате публикации (новые сначала)
         query = query.order_by(content_models.Article.published_at.desc())
 
-        result = PaginationHelper.paginate_query(query, skip, limit)
+        # В курсорном режиме статьи упорядочены по (created_at, id): у черновиков
+        # published_at пустой и не годится для ключа курсора
+        result = PaginationHelper.paginate(
+            query, content_models.Article, skip, limit, cursor_params
+        )
 
         # Добавляем дополнительную информацию для каждой статьи
         articles_with_stats = []
@@ -183,6 +194,10 @@ class ContentService:
             meta_description=getattr(article_data, "meta_description", None),
         )
         self.db.add(article)
+        CounterHelper.increment(self.db, User, user.id, "articles_count")
+        CounterHelper.increment(
+            self.db, content_models.Category, article.category_id, "articles_count"
+        )
         self.db.commit()
         self.db.refresh(article)
         return article
@@ -199,6 +214,24 @@ class ContentService:
             raise NotFoundError("Article", str(article_id))
 
         update_data = article_data.dict(exclude_unset=True)
+        if (
+            "category_id" in update_data
+            and update_data["category_id"] != article.category_id
+        ):
+            # Переносим статью между категориями в той же транзакции
+            CounterHelper.decrement(
+                self.db,
+                content_models.Category,
+                article.category_id,
+                "articles_count",
+            )
+            CounterHelper.increment(
+                self.db,
+                content_models.Category,
+                update_data["category_id"],
+                "articles_count",
+            )
+
         for field, value in update_data.items():
             setattr(article, field, value)
 
@@ -216,6 +249,10 @@ class ContentService:
             raise NotFoundError("Article", str(article_id))
 
         self.db.delete(article)
+        CounterHelper.decrement(self.db, User, article.author_id, "articles_count")
+        CounterHelper.decrement(
+            self.db, content_models.Category, article.category_id, "articles_count"
+        )
         self.db.commit()
         return True
 
@@ -258,13 +295,9 @@ class ContentService:
         """Получить список категорий с фильтрацией"""
         query = self.db.query(content_models.Category)
 
+        # Иерархии у модели категорий нет, поэтому фильтр по parent_id
+        # не применяется
         if filters:
-            # Фильтр по родительской категории
-            if filters.parent_id is not None:
-                query = query.filter(
-                    content_models.Category.parent_id == filters.parent_id
-                )
-
             # Поиск
             if filters.search:
                 query = SearchHelper.add_search_filters(
@@ -279,30 +312,15 @@ class ContentService:
 
         result = PaginationHelper.paginate_query(query, skip, limit)
 
-        # Добавляем статистику для каждой категории
-        categories_with_stats = []
-        for category in result["items"]:
-            # Подсчитываем количество статей в категории
-            articles_count = (
-                self.db.query(content_models.Article)
-                .filter(content_models.Article.category_id == category.id)
-                .count()
-            )
-
-            # Подсчитываем количество подкатегорий
-            subcategories_count = (
-                self.db.query(content_models.Category)
-                .filter(content_models.Category.parent_id == category.id)
-                .count()
-            )
-
-            categories_with_stats.append(
-                {
-                    "category": category,
-                    "articles_count": articles_count,
-                    "subcategories_count": subcategories_count,
-                }
-            )
+        # Счетчик статей хранится в самой категории, подкатегорий у модели нет
+        categories_with_stats = [
+            {
+                "category": category,
+                "articles_count": category.articles_count or 0,
+                "subcategories_count": 0,
+            }
+            for category in result["items"]
+        ]
 
         result["items"] = categories_with_stats
         return result
@@ -318,23 +336,10 @@ class ContentService:
         if not category:
             raise CategoryNotFoundError(str(category_id))
 
-        # Подсчитываем статистику
-        articles_count = (
-            self.db.query(content_models.Article)
-            .filter(content_models.Article.category_id == category_id)
-            .count()
-        )
-
-        subcategories_count = (
-            self.db.query(content_models.Category)
-            .filter(content_models.Category.parent_id == category_id)
-            .count()
-        )
-
         return {
             "category": category,
-            "articles_count": articles_count,
-            "subcategories_count": subcategories_count,
+            "articles_count": category.articles_count or 0,
+            "subcategories_count": 0,
         }
 
     def create_category(
@@ -0,0 +1,188 @@
+"""
+Сервис сверки денормализованных счетчиков
+
+Счетчики (likes_count, comments_count, followers_count, articles_count и т.д.)
+поддерживаются сервисами в той же транзакции, что и исходная запись. Этот
+сервис пересчитывает их из исходных таблиц и исправляет расхождения, например
+после ручных правок в БД или заполнения таблиц в обход сервисов.
+
+Запуск как задания (с добавлением недостающих колонок):
+python -m services.counter_service
+"""
+
+import logging
+from typing import Dict, List, Tuple, Any
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+from sqlalchemy import inspect, select, func, text
+
+import models_package.social as social_models
+import models_package.content as content_models
+from models import User
+
+logger = logging.getLogger(__name__)
+
+
+class CounterService:
+    """Сервис пересчета денормализованных счетчиков"""
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    @staticmethod
+    def _counter_specs() -> List[Tuple[str, Any, str, Any, Any]]:
+        """Описание счетчиков: (имя, модель, поле, исходная модель, условие)"""
+        Post = social_models.Post
+        PostLike = social_models.PostLike
+        Comment = social_models.Comment
+        Follow = social_models.Follow
+        Article = content_models.Article
+        Category = content_models.Category
+
+        return [
+            (
+                "posts.likes_count",
+                Post,
+                "likes_count",
+                PostLike,
+                PostLike.post_id == Post.id,
+            ),
+            (
+                "posts.comments_count",
+                Post,
+                "comments_count",
+                Comment,
+                Comment.post_id == Post.id,
+            ),
+            ("users.posts_count", User, "posts_count", Post, Post.user_id == User.id),
+            (
+                "users.followers_count",
+                User,
+                "followers_count",
+                Follow,
+                Follow.following_id == User.id,
+            ),
+            (
+                "users.following_count",
+                User,
+                "following_count",
+                Follow,
+                Follow.follower_id == User.id,
+            ),
+            (
+                "users.articles_count",
+                User,
+                "articles_count",
+                Article,
+                Article.author_id == User.id,
+            ),
+            (
+                "categories.articles_count",
+                Category,
+                "articles_count",
+                Article,
+                Article.category_id == Category.id,
+            ),
+        ]
+
+    def reconcile_counter(
+        self, model: Any, field: str, source_model: Any, condition: Any
+    ) -> int:
+        """Пересчитать один счетчик, возвращает количество исправленных строк"""
+        column = getattr(model, field)
+        actual = (
+            select(func.count(source_model.id))
+            .where(condition)
+            .correlate(model)
+            .scalar_subquery()
+        )
+
+        values = {column: actual}
+        if hasattr(model, "updated_at"):
+            values[model.updated_at] = model.updated_at
+
+        # Обновляем только строки, где значение расходится с фактическим
+        return (
+            self.db.query(model)
+            .filter(column.is_distinct_from(actual))
+            .update(values, synchronize_session=False)
+        )
+
+    def reconcile_all(self) -> Dict[str, int]:
+        """Пересчитать все счетчики в одной транзакции"""
+        fixed = {}
+        try:
+            for name, model, field, source_model, condition in self._counter_specs():
+                fixed[name] = self.reconcile_counter(
+                    model, field, source_model, condition
+                )
+            self.db.commit()
+        except Exception:
+            self.db.rollback()
+            raise
+
+        # Загруженные в сессию объекты могут содержать старые значения
+        self.db.expire_all()
+        return fixed
+
+
+def install_counter_columns(bind: Engine) -> List[str]:
+    """Добавить колонки счетчиков в существующие таблицы и пересчитать их
+
+    create_all не изменяет уже созданные таблицы, поэтому в базе, созданной
+    до появления счетчиков, колонки добавляются через ALTER TABLE. Если
+    что-то добавлено, счетчики сразу пересчитываются из исходных таблиц.
+    Возвращает имена добавленных колонок.
+
+    Это миграция схемы: она запускается из init_db или заданием
+    python -m services.counter_service, но не при старте воркеров
+    приложения, которые выполняли бы ALTER TABLE одновременно.
+    """
+    inspector = inspect(bind)
+    added = []
+    with bind.begin() as connection:
+        for name, model, field, _, _ in CounterService._counter_specs():
+            table = model.__table__
+            if not inspector.has_table(table.name):
+                continue
+            existing = {column["name"] for column in inspector.get_columns(table.name)}
+            if field in existing:
+                continue
+            column_type = table.c[field].type.compile(dialect=bind.dialect)
+            connection.execute(
+                text(
+                    f"ALTER TABLE {table.name} ADD COLUMN {field} "
+                    f"{column_type} DEFAULT 0"
+                )
+            )
+            added.append(name)
+
+    if added:
+        db = Session(bind=bind)
+        try:
+            CounterService(db).reconcile_all()
+        finally:
+            db.close()
+        logger.info(f"Counter columns added and reconciled: {', '.join(added)}")
+    return added
+
+
+def main():
+    """Точка входа для запуска сверки как отдельного задания"""
+    from models import SessionLocal, create_db_and_tables, engine
+
+    create_db_and_tables()
+    for name in install_counter_columns(engine):
+        print(f"✅ Добавлена колонка {name}")
+    db = SessionLocal()
+    try:
+        fixed = CounterService(db).reconcile_all()
+    finally:
+        db.close()
+
+    for name, rows in fixed.items():
+        print(f"✅ {name}: исправлено строк - {rows}")
+
+
+if __name__ == "__main__":
+    main()
@@ -17,6 +17,7 @@ from schemas.ecommerce import (
     OrderCreate,
     OrderUpdate,
 )
+from schemas.base import CursorParams
 from utils.database import QueryBuilder, PaginationHelper, SearchHelper
 from utils.exceptions import (
     ProductNotFoundError,
@@ -38,6 +39,7 @@ class EcommerceService:
         skip: int = 0,
         limit: int = 20,
         filters: Optional[ProductFilters] = None,
+        cursor_params: Optional[CursorParams] = None,
     ) -> Dict[str, Any]:
         """Получить список товаров с фильтрацией"""
         query = self.db.query(ecommerce_models.Product).filter(
@@ -77,7 +79,9 @@ class EcommerceService:
         # Сортировка по дате создания (новые сначала)
         query = query.order_by(ecommerce_models.Product.created_at.desc())
 
-        return PaginationHelper.paginate_query(query, skip, limit)
+        return PaginationHelper.paginate(
+            query, ecommerce_models.Product, skip, limit, cursor_params
+        )
 
     def get_product(self, product_id: int) -> ecommerce_models.Product:
         """Получить товар по ID"""
@@ -254,13 +258,21 @@ class EcommerceService:
         return True
 
     # Orders methods
-    def get_orders(self, user: User, skip: int = 0, limit: int = 20) -> Dict[str, Any]:
+    def get_orders(
+        self,
+        user: User,
+        skip: int = 0,
+        limit: int = 20,
+        cursor_params: Optional[CursorParams] = None,
+    ) -> Dict[str, Any]:
         """Получить заказы пользователя"""
         query = self.db.query(ecommerce_models.Order).filter(
             ecommerce_models.Order.user_id == user.id
         )
 
-        return PaginationHelper.paginate_query(query, skip, limit)
+        return PaginationHelper.paginate(
+            query, ecommerce_models.Order, skip, limit, cursor_params
+        )
 
     def get_order(self, order_id: int, user: User) -> ecommerce_models.Order:
         """Получить заказ по ID"""
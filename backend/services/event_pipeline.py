@@ -0,0 +1,200 @@
+"""
+Пакетная запись событий аналитики
+"""
+
+import asyncio
+import logging
+import threading
+import time
+from collections import deque
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional
+
+from sqlalchemy import insert
+
+import models_package.analytics as analytics_models
+from config import settings
+from monitoring.metrics import MetricsCollector
+
+logger = logging.getLogger(__name__)
+metrics_collector = MetricsCollector()
+
+
+class EventPipeline:
+    """Ограниченная очередь событий с фоновой записью пачками
+
+    submit только кладет событие в очередь в памяти и не обращается к БД,
+    поэтому его можно вызывать из async- и sync-обработчиков (последние
+    выполняются в пуле потоков). Фоновая задача записывает события
+    пачками по batch_size одним executemany - как только набралась
+    пачка или прошло flush_interval секунд. Переполненная очередь
+    отклоняет новые события: вызывающий код возвращает 503, а не копит
+    память. При остановке очередь дописывается в БД (не дольше
+    drain_timeout секунд).
+    """
+
+    def __init__(
+        self,
+        max_size: Optional[int] = None,
+        batch_size: Optional[int] = None,
+        flush_interval: Optional[float] = None,
+        drain_timeout: Optional[float] = None,
+        session_factory: Optional[Callable] = None,
+    ):
+        self.max_size = max_size or settings.ANALYTICS_QUEUE_SIZE
+        self.batch_size = batch_size or settings.ANALYTICS_BATCH_SIZE
+        self.flush_interval = (
+            settings.ANALYTICS_FLUSH_INTERVAL
+            if flush_interval is None
+            else flush_interval
+        )
+        self.drain_timeout = (
+            settings.ANALYTICS_DRAIN_TIMEOUT if drain_timeout is None else drain_timeout
+        )
+        self._session_factory = session_factory
+        self._events: deque = deque()
+        self._lock = threading.Lock()
+        self._task: Optional[asyncio.Task] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._batch_ready: Optional[asyncio.Event] = None
+
+        self._accepted = metrics_collector.analytics_events.labels(outcome="accepted")
+        self._dropped = metrics_collector.analytics_events.labels(outcome="dropped")
+        self._written = metrics_collector.analytics_events.labels(outcome="written")
+        self._failed = metrics_collector.analytics_events.labels(outcome="failed")
+
+    def __len__(self) -> int:
+        return len(self._events)
+
+    def submit(self, event: Dict[str, Any]) -> bool:
+        """Поставить событие в очередь; False, если очередь заполнена"""
+        with self._lock:
+            if len(self._events) >= self.max_size:
+                self._dropped.inc()
+                return False
+            self._events.append(event)
+            size = len(self._events)
+
+        self._accepted.inc()
+        metrics_collector.analytics_queue_depth.set(size)
+        # Будим запись один раз, когда набралась пачка
+        if size == self.batch_size and self._loop is not None:
+            self._loop.call_soon_threadsafe(self._batch_ready.set)
+        return True
+
+    def track(
+        self,
+        event_type: str,
+        event_data: Optional[Dict[str, Any]] = None,
+        user_id: Optional[int] = None,
+        source: str = "api",
+        user_agent: Optional[str] = None,
+        ip_address: Optional[str] = None,
+    ) -> Optional[Dict[str, Any]]:
+        """Собрать событие и поставить в очередь; None, если очередь заполнена"""
+        event = {
+            "event_type": event_type,
+            "event_data": event_data or {},
+            "user_id": user_id,
+            "source": source,
+            "user_agent": user_agent,
+            "ip_address": ip_address,
+            "created_at": datetime.now(timezone.utc),
+        }
+        return event if self.submit(event) else None
+
+    def _take_batch(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            count = min(self.batch_size, len(self._events))
+            batch = [self._events.popleft() for _ in range(count)]
+            size = len(self._events)
+        metrics_collector.analytics_queue_depth.set(size)
+        return batch
+
+    def _write(self, batch: List[Dict[str, Any]]):
+        if self._session_factory is None:
+            from models import SessionLocal
+
+            self._session_factory = SessionLocal
+
+        db = self._session_factory()
+        try:
+            db.execute(insert(analytics_models.AnalyticsEvent), batch)
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    async def flush(self) -> int:
+        """Записать одну пачку; возвращает число записанных событий"""
+        batch = self._take_batch()
+        if not batch:
+            return 0
+
+        start_time = time.perf_counter()
+        try:
+            await asyncio.to_thread(self._write, batch)
+        except Exception as e:
+            # Повтор пачки при недоступной БД только заполнил бы очередь
+            self._failed.inc(len(batch))
+            logger.error(f"Error writing {len(batch)} analytics events: {e}")
+            return 0
+        metrics_collector.analytics_flush_duration.observe(
+            time.perf_counter() - start_time
+        )
+        self._written.inc(len(batch))
+        return len(batch)
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self):
+        """Запустить фоновую запись в текущем event loop"""
+        if not self.running:
+            self._loop = asyncio.get_running_loop()
+            self._batch_ready = asyncio.Event()
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Остановить фоновую запись и дописать очередь"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+            self._loop = None
+
+        deadline = time.monotonic() + self.drain_timeout
+        while self._events and time.monotonic() < deadline:
+            await self.flush()
+        if self._events:
+            logger.warning(f"Dropped {len(self._events)} analytics events on shutdown")
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.wait_for(
+                    self._batch_ready.wait(), timeout=self.flush_interval
+                )
+                # Набралась пачка: пишем только полные пачки
+                minimum = self.batch_size
+            except asyncio.TimeoutError:
+                # Истек интервал: пишем все, что накопилось
+                minimum = 1
+            self._batch_ready.clear()
+
+            try:
+                while len(self._events) >= minimum:
+                    if not await self.flush():
+                        break
+            except Exception as e:
+                logger.error(f"Error in analytics event flusher: {e}")
+
+
+# Глобальный экземпляр, запускается в lifespan приложения
+event_pipeline = EventPipeline()
@@ -11,6 +11,8 @@ import logging
 import asyncio
 import aiohttp
 
+from services.event_pipeline import event_pipeline
+
 logger = logging.getLogger(__name__)
 
 
@@ -201,22 +203,31 @@ class IntegrationService:
         event_name: str,
         properties: Dict[str, Any],
         provider: str = "google_analytics",
+        user_id: Optional[int] = None,
     ) -> Dict[str, Any]:
-        """Отправка события в аналитику"""
-        try:
-            # В реальном приложении здесь будет вызов Google Analytics/Mixpanel API
-            logger.info(f"Tracking event {event_name} with {provider}")
+        """Отправка события в аналитику
 
-            # Имитация отправки
-            await asyncio.sleep(0.1)
+        Событие ставится в очередь записи пачками (services/event_pipeline.py)
+        с источником provider; запрос не ждет ни БД, ни внешнего API.
+        """
+        try:
+            event = event_pipeline.track(
+                event_name, properties, user_id=user_id, source=provider
+            )
+            if event is None:
+                return {
+                    "success": False,
+                    "error": "Analytics event queue is full",
+                    "provider": provider,
+                    "event_name": event_name,
+                }
 
             return {
                 "success": True,
-                "event_id": f"evt_{random.randint(100000, 999999)}",
                 "provider": provider,
                 "event_name": event_name,
                 "properties": properties,
-                "tracked_at": datetime.now().isoformat(),
+                "tracked_at": event["created_at"].isoformat(),
             }
 
         except Exception as e:
@@ -0,0 +1,419 @@
+"""
+Хранилище временных рядов метрик с агрегатами по интервалам
+
+Значения пишутся пачками: сырые точки добавляются в metric_data одним
+executemany, а агрегаты за минуту, час и день (count, sum, min, max и
+гистограмма для квантилей) в metric_rollups обновляются в той же
+транзакции. Запрос за период читает самые крупные агрегаты, которые
+укладываются в запрошенный шаг, поэтому график за 30 дней строится по
+сотням строк вместо миллионов сырых точек.
+"""
+
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, Optional, Tuple
+import math
+
+from sqlalchemy import delete, insert, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+import models_package.analytics as analytics_models
+from config import settings
+
+# Интервалы агрегатов в секундах, от крупных к мелким
+ROLLUP_RESOLUTIONS: Dict[str, int] = {"1d": 86400, "1h": 3600, "1m": 60}
+RAW_RESOLUTION = "raw"
+
+
+def to_epoch(value: datetime) -> float:
+    """Секунды эпохи; время без зоны считается UTC"""
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.timestamp()
+
+
+def from_epoch(value: float) -> datetime:
+    return datetime.fromtimestamp(value, tz=timezone.utc)
+
+
+class QuantileSketch:
+    """Логарифмическая гистограмма значений с относительной ошибкой квантилей
+
+    Значение v > 0 попадает в корзину ceil(log(v) / log(gamma)), поэтому
+    гистограммы разных интервалов складываются без потери точности:
+    квантиль объединенного интервала считается так же, как по сырым
+    значениям, с относительной ошибкой не больше (gamma - 1) / (gamma + 1).
+    """
+
+    GAMMA = 1.02
+    _LOG_GAMMA = math.log(GAMMA)
+
+    def __init__(self):
+        self.positive: Dict[int, int] = {}
+        self.negative: Dict[int, int] = {}
+        self.zero = 0
+        self.count = 0
+
+    def add(self, value: float, count: int = 1):
+        if value > 0:
+            key = math.ceil(math.log(value) / self._LOG_GAMMA)
+            self.positive[key] = self.positive.get(key, 0) + count
+        elif value < 0:
+            key = math.ceil(math.log(-value) / self._LOG_GAMMA)
+            self.negative[key] = self.negative.get(key, 0) + count
+        else:
+            self.zero += count
+        self.count += count
+
+    def merge(self, other: "QuantileSketch"):
+        for key, count in other.positive.items():
+            self.positive[key] = self.positive.get(key, 0) + count
+        for key, count in other.negative.items():
+            self.negative[key] = self.negative.get(key, 0) + count
+        self.zero += other.zero
+        self.count += other.count
+
+    def _value(self, key: int) -> float:
+        """Середина корзины с минимальной относительной ошибкой"""
+        return 2 * self.GAMMA**key / (self.GAMMA + 1)
+
+    def quantile(self, q: float) -> Optional[float]:
+        if self.count == 0:
+            return None
+        rank = q * (self.count - 1)
+        seen = 0
+        for key in sorted(self.negative, reverse=True):
+            seen += self.negative[key]
+            if seen > rank:
+                return -self._value(key)
+        seen += self.zero
+        if seen > rank:
+            return 0.0
+        for key in sorted(self.positive):
+            seen += self.positive[key]
+            if seen > rank:
+                return self._value(key)
+        return self._value(max(self.positive)) if self.positive else 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        # Ключи JSON - строки
+        return {
+            "p": {str(key): count for key, count in self.positive.items()},
+            "n": {str(key): count for key, count in self.negative.items()},
+            "z": self.zero,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Optional[Dict[str, Any]]) -> "QuantileSketch":
+        sketch = cls()
+        if data:
+            sketch.positive = {int(key): count for key, count in data["p"].items()}
+            sketch.negative = {int(key): count for key, count in data["n"].items()}
+            sketch.zero = data["z"]
+            sketch.count = (
+                sum(sketch.positive.values())
+                + sum(sketch.negative.values())
+                + sketch.zero
+            )
+        return sketch
+
+
+@dataclass
+class Aggregate:
+    """Агрегат значений за интервал"""
+
+    count: int = 0
+    sum: float = 0.0
+    min: Optional[float] = None
+    max: Optional[float] = None
+    sketch: QuantileSketch = field(default_factory=QuantileSketch)
+
+    def add(self, value: float):
+        self.count += 1
+        self.sum += value
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+        self.sketch.add(value)
+
+    def merge(self, other: "Aggregate"):
+        self.count += other.count
+        self.sum += other.sum
+        if other.min is not None:
+            self.min = other.min if self.min is None else min(self.min, other.min)
+        if other.max is not None:
+            self.max = other.max if self.max is None else max(self.max, other.max)
+        self.sketch.merge(other.sketch)
+
+    @classmethod
+    def from_rollup(cls, row: analytics_models.MetricRollup) -> "Aggregate":
+        return cls(
+            count=row.count,
+            sum=row.sum,
+            min=row.min,
+            max=row.max,
+            sketch=QuantileSketch.from_dict(row.sketch),
+        )
+
+    def to_point(self, bucket_start: float) -> Dict[str, Any]:
+        p95 = self.sketch.quantile(0.95)
+        if p95 is not None:
+            # Оценка по гистограмме не выходит за фактический диапазон
+            p95 = min(max(p95, self.min), self.max)
+        return {
+            "timestamp": from_epoch(bucket_start).isoformat(),
+            "count": self.count,
+            "avg": self.sum / self.count if self.count else None,
+            "min": self.min,
+            "max": self.max,
+            "p95": p95,
+        }
+
+
+Sample = Tuple[float, Optional[datetime], Optional[Dict[str, Any]]]
+
+
+class MetricStore:
+    """Запись значений метрики и выборка временного ряда"""
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def ingest(self, metric_id: int, samples: Iterable[Sample]) -> int:
+        """Записать пачку значений (value, timestamp, labels) одной транзакцией
+
+        Возвращает количество записанных значений. Конфликт при
+        одновременном создании агрегата другим процессом повторяется один
+        раз: к этому моменту строка агрегата уже существует.
+        """
+        now = datetime.now(timezone.utc)
+        rows = [
+            {
+                "metric_id": metric_id,
+                "value": float(value),
+                "timestamp": from_epoch(to_epoch(timestamp)) if timestamp else now,
+                "labels": labels,
+            }
+            for value, timestamp, labels in samples
+        ]
+        if not rows:
+            return 0
+
+        for attempt in range(2):
+            try:
+                self.db.execute(insert(analytics_models.MetricData), rows)
+                for seconds in ROLLUP_RESOLUTIONS.values():
+                    partials = self._aggregate(
+                        ((row["value"], to_epoch(row["timestamp"])) for row in rows),
+                        seconds,
+                    )
+                    self._merge_rollups(metric_id, seconds, partials)
+                self.db.commit()
+                return len(rows)
+            except IntegrityError:
+                self.db.rollback()
+                if attempt:
+                    raise
+        return 0
+
+    @staticmethod
+    def _aggregate(
+        points: Iterable[Tuple[float, float]], step: int
+    ) -> Dict[float, Aggregate]:
+        """Агрегаты (значение, время) по интервалам step, выровненным по эпохе"""
+        buckets: Dict[float, Aggregate] = {}
+        for value, epoch in points:
+            start = epoch - epoch % step
+            aggregate = buckets.get(start)
+            if aggregate is None:
+                aggregate = buckets[start] = Aggregate()
+            aggregate.add(value)
+        return buckets
+
+    def _merge_rollups(
+        self, metric_id: int, resolution: int, partials: Dict[float, Aggregate]
+    ):
+        """Добавить частичные агрегаты к сохраненным (строки блокируются)"""
+        if not partials:
+            return
+        Rollup = analytics_models.MetricRollup
+        # Диапазон вместо IN: пачка обычно покрывает несколько соседних интервалов
+        existing = {
+            to_epoch(row.bucket_start): row
+            for row in self.db.scalars(
+                select(Rollup)
+                .where(
+                    Rollup.metric_id == metric_id,
+                    Rollup.resolution == resolution,
+                    Rollup.bucket_start >= from_epoch(min(partials)),
+                    Rollup.bucket_start <= from_epoch(max(partials)),
+                )
+                .with_for_update()
+            )
+        }
+
+        new_rows = []
+        for bucket_start, partial in partials.items():
+            row = existing.get(bucket_start)
+            if row is None:
+                new_rows.append(
+                    {
+                        "metric_id": metric_id,
+                        "resolution": resolution,
+                        "bucket_start": from_epoch(bucket_start),
+                        "count": partial.count,
+                        "sum": partial.sum,
+                        "min": partial.min,
+                        "max": partial.max,
+                        "sketch": partial.sketch.to_dict(),
+                    }
+                )
+                continue
+
+            aggregate = Aggregate.from_rollup(row)
+            aggregate.merge(partial)
+            row.count = aggregate.count
+            row.sum = aggregate.sum
+            row.min = aggregate.min
+            row.max = aggregate.max
+            row.sketch = aggregate.sketch.to_dict()
+
+        self.db.flush()
+        if new_rows:
+            self.db.execute(insert(Rollup), new_rows)
+
+    @staticmethod
+    def choose_step(
+        start: datetime,
+        end: datetime,
+        step: Optional[int] = None,
+        max_points: Optional[int] = None,
+    ) -> Tuple[int, str]:
+        """Шаг ряда и источник данных
+
+        Явный шаг обслуживается самым крупным агрегатом, интервал которого
+        делит шаг без остатка, иначе сырыми значениями; шаг, дающий больше
+        max_points точек, отклоняется (ValueError). Без явного шага
+        берется наименьший интервал агрегата, при котором точек не больше
+        max_points (для длинных периодов - кратный суткам).
+        """
+        max_points = max_points or settings.METRIC_QUERY_MAX_POINTS
+        span = max(to_epoch(end) - to_epoch(start), 1)
+        if step is None:
+            needed = math.ceil(span / max_points)
+            for name, seconds in reversed(ROLLUP_RESOLUTIONS.items()):
+                if seconds >= needed:
+                    return seconds, name
+            day = ROLLUP_RESOLUTIONS["1d"]
+            return math.ceil(needed / day) * day, "1d"
+
+        if span / step > max_points:
+            raise ValueError(
+                f"Шаг {step} с дает больше {max_points} точек: "
+                f"нужен шаг не меньше {math.ceil(span / max_points)} с"
+            )
+        for name, seconds in ROLLUP_RESOLUTIONS.items():
+            if step % seconds == 0:
+                return step, name
+        return step, RAW_RESOLUTION
+
+    def query(
+        self,
+        metric_id: int,
+        start: datetime,
+        end: datetime,
+        step: Optional[int] = None,
+        max_points: Optional[int] = None,
+    ) -> Dict[str, Any]:
+        """Временной ряд за [start, end] с шагом step секунд
+
+        Точки выровнены по эпохе: первая точка может включать значения
+        чуть раньше start, в пределах своего интервала.
+        """
+        start, end = from_epoch(to_epoch(start)), from_epoch(to_epoch(end))
+        step, source = self.choose_step(start, end, step, max_points)
+        first = to_epoch(start)
+        first -= first % step
+
+        if source == RAW_RESOLUTION:
+            Data = analytics_models.MetricData
+            rows = self.db.execute(
+                select(Data.value, Data.timestamp)
+                .where(
+                    Data.metric_id == metric_id,
+                    Data.timestamp >= from_epoch(first),
+                    Data.timestamp <= end,
+                )
+                .order_by(Data.timestamp)
+            )
+            buckets = self._aggregate(
+                ((value, to_epoch(timestamp)) for value, timestamp in rows), step
+            )
+        else:
+            Rollup = analytics_models.MetricRollup
+            rollups = self.db.scalars(
+                select(Rollup)
+                .where(
+                    Rollup.metric_id == metric_id,
+                    Rollup.resolution == ROLLUP_RESOLUTIONS[source],
+                    Rollup.bucket_start >= from_epoch(first),
+                    Rollup.bucket_start <= end,
+                )
+                .order_by(Rollup.bucket_start)
+            )
+            buckets: Dict[float, Aggregate] = {}
+            for row in rollups:
+                epoch = to_epoch(row.bucket_start)
+                bucket_start = epoch - epoch % step
+                aggregate = buckets.get(bucket_start)
+                if aggregate is None:
+                    buckets[bucket_start] = Aggregate.from_rollup(row)
+                else:
+                    aggregate.merge(Aggregate.from_rollup(row))
+
+        return {
+            "metric_id": metric_id,
+            "start": start.isoformat(),
+            "end": end.isoformat(),
+            "step": step,
+            "resolution": source,
+            "points": [
+                buckets[bucket_start].to_point(bucket_start)
+                for bucket_start in sorted(buckets)
+            ],
+        }
+
+    def rebuild_rollups(self, metric_id: int, chunk_size: int = 10000) -> int:
+        """Пересчитать агрегаты метрики по сырым значениям
+
+        Нужен для значений, записанных до появления агрегатов. Возвращает
+        количество обработанных значений.
+        """
+        Data = analytics_models.MetricData
+        self.db.execute(
+            delete(analytics_models.MetricRollup).where(
+                analytics_models.MetricRollup.metric_id == metric_id
+            )
+        )
+
+        partials = {seconds: {} for seconds in ROLLUP_RESOLUTIONS.values()}
+        total = 0
+        rows = self.db.execute(
+            select(Data.value, Data.timestamp)
+            .where(Data.metric_id == metric_id, Data.timestamp.is_not(None))
+            .execution_options(yield_per=chunk_size)
+        )
+        for value, timestamp in rows:
+            epoch = to_epoch(timestamp)
+            for seconds, buckets in partials.items():
+                bucket_start = epoch - epoch % seconds
+                aggregate = buckets.get(bucket_start)
+                if aggregate is None:
+                    aggregate = buckets[bucket_start] = Aggregate()
+                aggregate.add(value)
+            total += 1
+
+        for seconds, buckets in partials.items():
+            self._merge_rollups(metric_id, seconds, buckets)
+        self.db.commit()
+        return total
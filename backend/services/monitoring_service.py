@@ -7,11 +7,13 @@ from datetime import datetime, timedelta, timezone
 import logging
 import json
 import asyncio
-import psutil
 import time
 from dataclasses import dataclass, asdict
 from enum import Enum
 
+from monitoring.system import system_sampler
+from utils.ring_buffer import RingBuffer
+
 logger = logging.getLogger(__name__)
 
 
@@ -65,13 +67,27 @@ class ApplicationMetrics:
     error_rate: float
 
 
+def _parse_timestamp(value: str) -> float:
+    """ISO-время в секунды эпохи; время без зоны считается UTC"""
+    parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.timestamp()
+
+
 class MonitoringService:
-    """Сервис мониторинга и логирования"""
+    """Сервис мониторинга и логирования
+
+    Логи и метрики хранятся в кольцевых буферах фиксированной емкости:
+    при переполнении вытесняется самая старая запись без копирования
+    списка. Буфер логов индексирован по level, module и user_id, поэтому
+    get_logs перебирает только подходящие записи от новых к старым и
+    останавливается на limit без сортировки.
+    """
+
+    LOG_INDEXES = ("level", "module", "user_id")
 
     def __init__(self):
-        self.logs = []  # В реальном приложении здесь будет база данных
-        self.system_metrics = []
-        self.application_metrics = []
         self.alerts = []
 
         # Настройки мониторинга
@@ -89,6 +105,11 @@ class MonitoringService:
             "log_retention_days": 30,
         }
 
+        # В реальном приложении здесь будет база данных
+        self.logs = RingBuffer(self.config["max_logs"], indexes=self.LOG_INDEXES)
+        self.system_metrics = RingBuffer(self.config["max_metrics"])
+        self.application_metrics = RingBuffer(self.config["max_metrics"])
+
         # Запускаем сбор метрик только если есть event loop
         try:
             loop = asyncio.get_running_loop()
@@ -111,8 +132,9 @@ class MonitoringService:
     ):
         """Логирование события"""
         try:
+            now = datetime.now(timezone.utc)
             log_entry = LogEntry(
-                timestamp=datetime.now(timezone.utc).isoformat(),
+                timestamp=now.isoformat(),
                 level=level.value,
                 message=message,
                 module=module,
@@ -123,12 +145,8 @@ class MonitoringService:
                 extra_data=extra_data,
             )
 
-            # Добавляем в список логов
-            self.logs.append(log_entry)
-
-            # Ограничиваем количество логов
-            if len(self.logs) > self.config["max_logs"]:
-                self.logs = self.logs[-self.config["max_logs"] :]
+            # Добавляем в буфер логов, самая старая запись вытесняется
+            self.logs.append(log_entry, now.timestamp())
 
             # Логируем в стандартный логгер
             logger_method = getattr(logger, level.value.lower())
@@ -152,46 +170,28 @@ class MonitoringService:
     ) -> List[Dict[str, Any]]:
         """Получение логов с фильтрацией"""
         try:
-            filtered_logs = self.logs.copy()
-
-            # Фильтрация по уровню
+            filters = {}
             if level:
-                filtered_logs = [
-                    log for log in filtered_logs if log.level == level.upper()
-                ]
+                filters["level"] = [level.upper()]
 
-            # Фильтрация по модулю
+            # Фильтр по модулю - подстрока, поэтому выбираем подходящие
+            # значения индекса
             if module:
-                filtered_logs = [log for log in filtered_logs if module in log.module]
-
-            # Фильтрация по пользователю
-            if user_id:
-                filtered_logs = [log for log in filtered_logs if log.user_id == user_id]
-
-            # Фильтрация по времени
-            if start_time:
-                start_dt = datetime.fromisoformat(start_time.replace("Z", "+00:00"))
-                filtered_logs = [
-                    log
-                    for log in filtered_logs
-                    if datetime.fromisoformat(log.timestamp.replace("Z", "+00:00"))
-                    >= start_dt
+                filters["module"] = [
+                    name for name in self.logs.values("module") if module in name
                 ]
 
-            if end_time:
-                end_dt = datetime.fromisoformat(end_time.replace("Z", "+00:00"))
-                filtered_logs = [
-                    log
-                    for log in filtered_logs
-                    if datetime.fromisoformat(log.timestamp.replace("Z", "+00:00"))
-                    <= end_dt
-                ]
-
-            # Сортировка по времени (новые сначала)
-            filtered_logs.sort(key=lambda x: x.timestamp, reverse=True)
-
-            # Ограничение количества
-            filtered_logs = filtered_logs[:limit]
+            if user_id:
+                filters["user_id"] = [user_id]
+
+            # Записи идут от новых к старым, перебор заканчивается на limit
+            # или на первой записи старше start_time
+            filtered_logs = self.logs.query(
+                filters=filters,
+                start_time=_parse_timestamp(start_time) if start_time else None,
+                end_time=_parse_timestamp(end_time) if end_time else None,
+                limit=limit,
+            )
 
             # Конвертируем в словари
             return [asdict(log) for log in filtered_logs]
@@ -203,7 +203,7 @@ class MonitoringService:
     async def get_system_metrics(self, limit: int = 100) -> List[Dict[str, Any]]:
         """Получение системных метрик"""
         try:
-            metrics = self.system_metrics[-limit:] if self.system_metrics else []
+            metrics = self.system_metrics.latest(limit)
             return [asdict(metric) for metric in metrics]
         except Exception as e:
             logger.error(f"Error getting system metrics: {e}")
@@ -212,9 +212,7 @@ class MonitoringService:
     async def get_application_metrics(self, limit: int = 100) -> List[Dict[str, Any]]:
         """Получение метрик приложения"""
         try:
-            metrics = (
-                self.application_metrics[-limit:] if self.application_metrics else []
-            )
+            metrics = self.application_metrics.latest(limit)
             return [asdict(metric) for metric in metrics]
         except Exception as e:
             logger.error(f"Error getting application metrics: {e}")
@@ -223,35 +221,30 @@ class MonitoringService:
     async def _collect_system_metrics(self) -> SystemMetrics:
         """Сбор системных метрик"""
         try:
-            # CPU
-            cpu_percent = psutil.cpu_percent(interval=1)
+            # Снимок фонового сборщика: замер CPU не блокирует event loop
+            snapshot = system_sampler.snapshot
+
+            cpu_percent = snapshot.cpu_percent
 
             # Память
-            memory = psutil.virtual_memory()
-            memory_percent = memory.percent
-            memory_used_mb = memory.used / 1024 / 1024
-            memory_available_mb = memory.available / 1024 / 1024
+            memory_percent = snapshot.memory_percent
+            memory_used_mb = snapshot.memory_used / 1024 / 1024
+            memory_available_mb = snapshot.memory_available / 1024 / 1024
 
             # Диск
-            disk = psutil.disk_usage("/")
-            disk_usage_percent = disk.percent
-            disk_used_gb = disk.used / 1024 / 1024 / 1024
-            disk_free_gb = disk.free / 1024 / 1024 / 1024
+            disk_usage_percent = snapshot.disk_percent
+            disk_used_gb = snapshot.disk_used / 1024 / 1024 / 1024
+            disk_free_gb = snapshot.disk_free / 1024 / 1024 / 1024
 
             # Сеть
-            network = psutil.net_io_counters()
-            network_bytes_sent = network.bytes_sent
-            network_bytes_recv = network.bytes_recv
+            network_bytes_sent = snapshot.network_bytes_sent
+            network_bytes_recv = snapshot.network_bytes_recv
 
             # Соединения
-            active_connections = len(psutil.net_connections())
+            active_connections = snapshot.network_connections
 
             # Нагрузка системы
-            load_average = (
-                list(psutil.getloadavg())
-                if hasattr(psutil, "getloadavg")
-                else [0.0, 0.0, 0.0]
-            )
+            load_average = list(snapshot.load_average)
 
             return SystemMetrics(
                 timestamp=datetime.now(timezone.utc).isoformat(),
@@ -292,12 +285,9 @@ class MonitoringService:
             # Пока используем моковые данные
 
             total_requests = len(self.logs)
-            successful_requests = len(
-                [log for log in self.logs if log.level in ["INFO", "DEBUG"]]
-            )
-            failed_requests = len(
-                [log for log in self.logs if log.level in ["ERROR", "CRITICAL"]]
-            )
+            by_level = self.logs.counts("level")
+            successful_requests = by_level.get("INFO", 0) + by_level.get("DEBUG", 0)
+            failed_requests = by_level.get("ERROR", 0) + by_level.get("CRITICAL", 0)
 
             average_response_time = 0.5  # Моковое значение
             active_users = 1  # Моковое значение
@@ -346,17 +336,6 @@ class MonitoringService:
                 app_metrics = await self._collect_application_metrics()
                 self.application_metrics.append(app_metrics)
 
-                # Ограничиваем количество метрик
-                if len(self.system_metrics) > self.config["max_metrics"]:
-                    self.system_metrics = self.system_metrics[
-                        -self.config["max_metrics"] :
-                    ]
-
-                if len(self.application_metrics) > self.config["max_metrics"]:
-                    self.application_metrics = self.application_metrics[
-                        -self.config["max_metrics"] :
-                    ]
-
                 # Проверяем на алерты
                 await self._check_metric_alerts(system_metrics, app_metrics)
 
@@ -435,7 +414,9 @@ class MonitoringService:
                 )
 
             # Множественные ошибки
-            recent_errors = [log for log in self.logs[-10:] if log.level == "ERROR"]
+            recent_errors = [
+                log for log in self.logs.latest(10) if log.level == "ERROR"
+            ]
             if len(recent_errors) >= 5:
                 await self._create_alert(
                     "multiple_errors",
@@ -528,16 +509,12 @@ class MonitoringService:
             # Статистика логов
             log_stats = {
                 "total": len(self.logs),
-                "by_level": {},
+                "by_level": self.logs.counts("level"),
                 "recent_errors": len(
-                    [log for log in self.logs[-100:] if log.level == "ERROR"]
+                    [log for log in self.logs.latest(100) if log.level == "ERROR"]
                 ),
             }
 
-            for log in self.logs:
-                level = log.level
-                log_stats["by_level"][level] = log_stats["by_level"].get(level, 0) + 1
-
             # Активные алерты
             active_alerts = [alert for alert in self.alerts if not alert["resolved"]]
 
@@ -574,28 +551,12 @@ class MonitoringService:
                     days=self.config["log_retention_days"]
                 )
 
-                # Очищаем старые логи
-                self.logs = [
-                    log
-                    for log in self.logs
-                    if datetime.fromisoformat(log.timestamp.replace("Z", "+00:00"))
-                    > cutoff_time
-                ]
-
-                # Очищаем старые метрики
-                self.system_metrics = [
-                    metric
-                    for metric in self.system_metrics
-                    if datetime.fromisoformat(metric.timestamp.replace("Z", "+00:00"))
-                    > cutoff_time
-                ]
-
-                self.application_metrics = [
-                    metric
-                    for metric in self.application_metrics
-                    if datetime.fromisoformat(metric.timestamp.replace("Z", "+00:00"))
-                    > cutoff_time
-                ]
+                # Записи в буферах упорядочены по времени, поэтому старые
+                # удаляются с начала без перебора остальных
+                cutoff = cutoff_time.timestamp()
+                self.logs.drop_older_than(cutoff)
+                self.system_metrics.drop_older_than(cutoff)
+                self.application_metrics.drop_older_than(cutoff)
 
                 logger.info("Cleaned up old monitoring data")
 
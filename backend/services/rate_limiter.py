@@ -0,0 +1,332 @@
+"""
+Ограничение частоты запросов (GCRA) с хранилищем в памяти или в Redis
+"""
+
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+import logging
+import threading
+import time
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class RateLimit:
+    """Лимит: не более requests запросов за window секунд"""
+
+    requests: int
+    window: float
+
+    @property
+    def interval(self) -> float:
+        """Интервал между запросами при равномерной нагрузке"""
+        return self.window / self.requests
+
+    @classmethod
+    def parse(cls, value: str) -> "RateLimit":
+        """Разобрать строку вида "100/60" (запросов/секунд)"""
+        requests, _, window = value.partition("/")
+        limit = cls(int(requests), float(window or 1))
+        if limit.requests <= 0 or limit.window <= 0:
+            raise ValueError(f"Invalid rate limit: {value}")
+        return limit
+
+
+@dataclass
+class RateLimitResult:
+    """Результат проверки лимита"""
+
+    allowed: bool
+    limit: RateLimit
+    remaining: int
+    retry_after: float = 0.0  # через сколько секунд будет разрешен запрос
+    reset_after: float = 0.0  # через сколько секунд лимит восстановится полностью
+
+
+def _remaining(limit: RateLimit, backlog: float) -> int:
+    """Сколько запросов еще допускается при накопленной задержке backlog"""
+    # Погрешность float не должна отнимать целый запрос
+    return max(0, int((limit.window - backlog) / limit.interval + 1e-9))
+
+
+class RateLimitBackend(ABC):
+    """Базовый класс хранилища состояния лимитов
+
+    Используется GCRA (Generic Cell Rate Algorithm): для ключа хранится одно
+    число - теоретическое время прибытия следующего запроса (TAT). Проверка
+    выполняется за O(1) и занимает фиксированный объем памяти на ключ.
+    """
+
+    name = "base"
+
+    @abstractmethod
+    async def hit(self, key: str, limit: RateLimit) -> RateLimitResult:
+        """Учесть запрос и вернуть результат проверки"""
+
+    @abstractmethod
+    async def peek(self, key: str, limit: RateLimit) -> RateLimitResult:
+        """Результат проверки без учета запроса"""
+
+    @abstractmethod
+    async def reset(self, key: str) -> None:
+        """Сбросить состояние ключа"""
+
+    async def close(self) -> None:
+        """Освободить ресурсы хранилища"""
+
+
+class MemoryRateLimitBackend(RateLimitBackend):
+    """Лимиты в памяти процесса
+
+    Ключи хранятся в OrderedDict в порядке последнего запроса. Ключ, TAT
+    которого уже в прошлом, полностью восстановил лимит и удаляется без
+    изменения поведения, поэтому при каждом обращении проверяется несколько
+    самых старых ключей. Сверх max_keys вытесняются давно неактивные ключи.
+    """
+
+    name = "memory"
+
+    # Сколько старых ключей проверять за одно обращение
+    EVICTION_BATCH = 4
+
+    def __init__(self, max_keys: int = 100_000, clock=time.monotonic):
+        self.max_keys = max_keys
+        self.clock = clock
+        self._tats: "OrderedDict[str, float]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def hit_sync(self, key: str, limit: RateLimit) -> RateLimitResult:
+        """Синхронная проверка для кода вне event loop"""
+        now = self.clock()
+        with self._lock:
+            self._evict(now)
+
+            tat = max(self._tats.pop(key, now), now)
+            new_tat = tat + limit.interval
+            allow_at = new_tat - limit.window
+
+            if allow_at > now:
+                self._tats[key] = tat
+                return RateLimitResult(
+                    allowed=False,
+                    limit=limit,
+                    remaining=0,
+                    retry_after=allow_at - now,
+                    reset_after=tat - now,
+                )
+
+            self._tats[key] = new_tat
+            return RateLimitResult(
+                allowed=True,
+                limit=limit,
+                remaining=_remaining(limit, new_tat - now),
+                reset_after=new_tat - now,
+            )
+
+    def peek_sync(self, key: str, limit: RateLimit) -> RateLimitResult:
+        now = self.clock()
+        with self._lock:
+            tat = max(self._tats.get(key, now), now)
+        allow_at = tat + limit.interval - limit.window
+        return RateLimitResult(
+            allowed=allow_at <= now,
+            limit=limit,
+            remaining=_remaining(limit, tat - now),
+            retry_after=max(0.0, allow_at - now),
+            reset_after=tat - now,
+        )
+
+    def _evict(self, now: float):
+        """Удалить восстановившиеся ключи и соблюсти max_keys"""
+        for _ in range(self.EVICTION_BATCH):
+            if not self._tats:
+                return
+            key, tat = next(iter(self._tats.items()))
+            if tat > now:
+                break
+            del self._tats[key]
+
+        while len(self._tats) >= self.max_keys:
+            self._tats.popitem(last=False)
+
+    async def hit(self, key: str, limit: RateLimit) -> RateLimitResult:
+        return self.hit_sync(key, limit)
+
+    async def peek(self, key: str, limit: RateLimit) -> RateLimitResult:
+        return self.peek_sync(key, limit)
+
+    async def reset(self, key: str) -> None:
+        with self._lock:
+            self._tats.pop(key, None)
+
+    def __len__(self) -> int:
+        return len(self._tats)
+
+
+class RedisRateLimitBackend(RateLimitBackend):
+    """Лимиты в Redis, общие для всех воркеров
+
+    Проверка и обновление TAT выполняются атомарно одним Lua-скриптом,
+    время берется из Redis (TIME), поэтому расхождение часов воркеров не
+    влияет на лимит. Ключ живет, пока лимит не восстановится полностью.
+    """
+
+    name = "redis"
+
+    # KEYS[1] - ключ, ARGV[1] - интервал, ARGV[2] - окно, ARGV[3] - 1 для учета запроса
+    GCRA_SCRIPT = """
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+local interval = tonumber(ARGV[1])
+local window = tonumber(ARGV[2])
+
+local tat = tonumber(redis.call('GET', KEYS[1]))
+if tat == nil or tat < now then
+    tat = now
+end
+
+local new_tat = tat + interval
+local allow_at = new_tat - window
+if allow_at > now then
+    return {0, tostring(allow_at - now), tostring(tat - now)}
+end
+
+if ARGV[3] == '1' then
+    local ttl = math.ceil((new_tat - now) * 1000)
+    redis.call('SET', KEYS[1], tostring(new_tat), 'PX', ttl)
+    return {1, '0', tostring(new_tat - now)}
+end
+return {1, '0', tostring(tat - now)}
+"""
+
+    def __init__(
+        self,
+        client: Any = None,
+        url: Optional[str] = None,
+        key_prefix: str = "ratelimit:",
+    ):
+        if client is None:
+            import redis.asyncio as redis_asyncio
+
+            client = redis_asyncio.from_url(url)
+
+        self.client = client
+        self.key_prefix = key_prefix
+        self._script = client.register_script(self.GCRA_SCRIPT)
+
+    async def _run(self, key: str, limit: RateLimit, consume: bool):
+        allowed, retry_after, backlog = await self._script(
+            keys=[f"{self.key_prefix}{key}"],
+            args=[repr(limit.interval), repr(limit.window), "1" if consume else "0"],
+        )
+        backlog = float(backlog)
+        return RateLimitResult(
+            allowed=bool(allowed),
+            limit=limit,
+            remaining=_remaining(limit, backlog) if allowed else 0,
+            retry_after=float(retry_after),
+            reset_after=backlog,
+        )
+
+    async def hit(self, key: str, limit: RateLimit) -> RateLimitResult:
+        return await self._run(key, limit, consume=True)
+
+    async def peek(self, key: str, limit: RateLimit) -> RateLimitResult:
+        return await self._run(key, limit, consume=False)
+
+    async def reset(self, key: str) -> None:
+        await self.client.delete(f"{self.key_prefix}{key}")
+
+    async def close(self) -> None:
+        await self.client.aclose()
+
+
+class RateLimiter:
+    """Проверка лимитов с правилами для отдельных маршрутов
+
+    Правила задаются словарем "METHOD:/path" -> "запросов/секунд"; правило,
+    оканчивающееся на "*", применяется ко всем путям с этим префиксом.
+    Запросы без правила учитываются в общем лимите клиента, поэтому число
+    ключей не зависит от количества разных URL.
+    """
+
+    DEFAULT_RULE = "*"
+
+    def __init__(
+        self,
+        backend: Optional[RateLimitBackend] = None,
+        routes: Optional[Dict[str, str]] = None,
+    ):
+        self.backend = backend if backend is not None else MemoryRateLimitBackend()
+        self.routes: Dict[str, RateLimit] = {}
+        self.prefix_routes: List[Tuple[str, RateLimit]] = []
+        for rule, value in (routes or {}).items():
+            self.add_route(rule, RateLimit.parse(value))
+
+    def add_route(self, rule: str, limit: RateLimit):
+        """Добавить или заменить правило маршрута"""
+        if rule.endswith("*"):
+            self.prefix_routes = [
+                (prefix, route_limit)
+                for prefix, route_limit in self.prefix_routes
+                if prefix != rule[:-1]
+            ]
+            self.prefix_routes.append((rule[:-1], limit))
+            # Более длинный префикс точнее и проверяется первым
+            self.prefix_routes.sort(key=lambda item: len(item[0]), reverse=True)
+        else:
+            self.routes[rule] = limit
+
+    def resolve(self, endpoint: str, default: RateLimit) -> Tuple[str, RateLimit]:
+        """Правило и лимит для endpoint вида "METHOD:/path" """
+        limit = self.routes.get(endpoint)
+        if limit is not None:
+            return endpoint, limit
+
+        for prefix, limit in self.prefix_routes:
+            if endpoint.startswith(prefix):
+                return f"{prefix}*", limit
+
+        return self.DEFAULT_RULE, default
+
+    async def hit(
+        self, identity: str, endpoint: str, default: RateLimit
+    ) -> RateLimitResult:
+        """Учесть запрос клиента identity к endpoint"""
+        rule, limit = self.resolve(endpoint, default)
+        return await self.backend.hit(f"{identity}:{rule}", limit)
+
+    async def close(self):
+        await self.backend.close()
+
+
+def create_rate_limit_backend(limit_settings) -> RateLimitBackend:
+    """Создать хранилище лимитов по настройкам"""
+    backend = limit_settings.RATE_LIMIT_BACKEND.lower()
+
+    if backend == "memory":
+        return MemoryRateLimitBackend(max_keys=limit_settings.RATE_LIMIT_MAX_KEYS)
+
+    if backend == "redis":
+        return RedisRateLimitBackend(
+            url=limit_settings.RATE_LIMIT_REDIS_URL or limit_settings.REDIS_URL
+        )
+
+    raise ValueError(f"Unknown rate limit backend: {limit_settings.RATE_LIMIT_BACKEND}")
+
+
+def create_rate_limiter(limit_settings) -> RateLimiter:
+    """Создать RateLimiter с хранилищем и правилами из настроек"""
+    return RateLimiter(
+        backend=create_rate_limit_backend(limit_settings),
+        routes=limit_settings.RATE_LIMIT_ROUTES,
+    )
+
+
+# Глобальный экземпляр: хранилище и правила маршрутов из настроек
+rate_limiter = create_rate_limiter(settings)
@@ -0,0 +1,155 @@
+"""
+HTTP-кэш сериализованных ответов GET-эндпоинтов с поддержкой ETag
+"""
+
+from email.utils import formatdate, parsedate_to_datetime
+from typing import Any, Awaitable, Callable, Optional, Tuple
+import hashlib
+import json
+import logging
+import time
+
+import anyio
+from fastapi import Request, Response
+from fastapi.encoders import jsonable_encoder
+
+from monitoring.metrics import MetricsCollector
+from services.cache_service import CacheService, cache_service
+
+logger = logging.getLogger(__name__)
+metrics_collector = MetricsCollector()
+
+# Тело ответа, ETag и время формирования (Unix)
+CachedResponse = Tuple[bytes, str, float]
+
+
+class ResponseCache:
+    """Кэш готовых JSON-ответов одной группы эндпоинтов
+
+    Ключ строится из пути, отсортированных параметров запроса и области
+    видимости (scope): для общих данных scope не задается, для данных
+    пользователя передается его идентификатор. Зависимости эндпоинта,
+    включая аутентификацию, выполняются до обращения к кэшу.
+
+    Все ключи группы начинаются с "http:<name>:", поэтому эндпоинты записи
+    сбрасывают группу целиком через invalidate.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        ttl: int,
+        private: bool = False,
+        cache: Optional[CacheService] = None,
+    ):
+        self.name = name
+        self.ttl = ttl
+        self.private = private
+        self.cache = cache or cache_service
+        self.key_prefix = f"http:{name}"
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl > 0
+
+    def make_key(self, request: Request, scope: Optional[str] = None) -> str:
+        """Ключ кэша для запроса"""
+        query = sorted(request.query_params.multi_items())
+        return self.cache.generate_cache_key(
+            self.key_prefix, request.url.path, query, scope or "public"
+        )
+
+    async def respond(
+        self,
+        request: Request,
+        compute: Callable[[], Awaitable[Any]],
+        scope: Optional[str] = None,
+    ) -> Any:
+        """Вернуть ответ из кэша или вычислить и сериализовать его один раз
+
+        При совпадении If-None-Match (или If-Modified-Since) возвращается
+        304 без тела.
+        """
+        if not self.enabled:
+            return await compute()
+
+        computed = False
+
+        async def build() -> CachedResponse:
+            nonlocal computed
+            computed = True
+            body = self.serialize(await compute())
+            return body, self.make_etag(body), time.time()
+
+        body, etag, last_modified = await self.cache.get_or_set(
+            self.make_key(request, scope), build, ttl=self.ttl
+        )
+
+        headers = self.make_headers(etag, last_modified)
+        if self.is_not_modified(request, etag, last_modified):
+            metrics_collector.record_response_cache(self.name, "not_modified")
+            return Response(status_code=304, headers=headers)
+
+        metrics_collector.record_response_cache(
+            self.name, "miss" if computed else "hit"
+        )
+        return Response(content=body, media_type="application/json", headers=headers)
+
+    async def invalidate(self) -> int:
+        """Сбросить все закэшированные ответы группы"""
+        deleted = await self.cache.delete_pattern(f"{self.key_prefix}:")
+        logger.debug(f"Response cache '{self.name}' invalidated: {deleted} items")
+        return deleted
+
+    def invalidate_sync(self) -> int:
+        """Сбросить кэш из синхронного эндпоинта (выполняется в пуле потоков)"""
+        if not self.enabled:
+            return 0
+        return anyio.from_thread.run(self.invalidate)
+
+    @staticmethod
+    def serialize(content: Any) -> bytes:
+        """Сериализация как у JSONResponse FastAPI"""
+        return json.dumps(
+            jsonable_encoder(content),
+            ensure_ascii=False,
+            allow_nan=False,
+            indent=None,
+            separators=(",", ":"),
+        ).encode("utf-8")
+
+    @staticmethod
+    def make_etag(body: bytes) -> str:
+        return f'"{hashlib.md5(body).hexdigest()}"'
+
+    def make_headers(self, etag: str, last_modified: float) -> dict:
+        visibility = "private" if self.private else "public"
+        return {
+            "ETag": etag,
+            "Last-Modified": formatdate(last_modified, usegmt=True),
+            "Cache-Control": f"{visibility}, max-age={self.ttl}",
+        }
+
+    @staticmethod
+    def is_not_modified(request: Request, etag: str, last_modified: float) -> bool:
+        """Проверка условных заголовков запроса (RFC 9110, 13.1)"""
+        if_none_match = request.headers.get("if-none-match")
+        if if_none_match is not None:
+            if if_none_match.strip() == "*":
+                return True
+            # Для GET используется слабое сравнение: W/ не учитывается
+            candidates = {
+                tag.strip().removeprefix("W/") for tag in if_none_match.split(",")
+            }
+            return etag in candidates
+
+        if_modified_since = request.headers.get("if-modified-since")
+        if if_modified_since is not None:
+            try:
+                since = parsedate_to_datetime(if_modified_since).timestamp()
+            except (TypeError, ValueError):
+                return False
+            # Last-Modified передается с точностью до секунды
+            return int(last_modified) <= since
+
+        return False
@@ -3,20 +3,114 @@
 """
 
 import re
-from typing import List, Dict, Optional, Any, Tuple
-from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FuturesTimeout
+from contextlib import contextmanager
+from typing import List, Dict, Optional, Any, Tuple, Callable
+from datetime import datetime, timedelta, timezone
+from collections import defaultdict, deque
 import logging
+import threading
+import time
+
+from sqlalchemy import delete, func, literal, or_, select, true, union_all
+from sqlalchemy.orm import Session, selectinload
+
+import models_package.analytics as analytics_models
+import models_package.content as content_models
+import models_package.social as social_models
+from config import settings
+from models import User
+from monitoring.metrics import MetricsCollector
+from services.event_pipeline import event_pipeline
+from utils.cache import TTLCache
+from utils.full_text import FullTextSearch
+from utils.heavy_hitters import HeavyHitters
+from utils.prefix_index import PrefixIndex
 
 logger = logging.getLogger(__name__)
+metrics_collector = MetricsCollector()
 
+SEARCH_EVENT = "search"
+# Отметка очистки истории: события поиска до нее в историю не попадают
+SEARCH_HISTORY_CLEARED_EVENT = "search_history_cleared"
+# Источники глобального поиска, опрашиваемые параллельно
+GLOBAL_SEARCH_SOURCES = ("posts", "users", "tags")
+# Во сколько раз недавняя частота запроса должна отличаться от базовой,
+# чтобы считать тренд растущим или падающим
+TREND_THRESHOLD = 1.25
 
-class SearchService:
-    """Сервис для поиска и фильтрации контента"""
 
-    def __init__(self):
-        self.search_history = {}  # В реальном приложении - БД
-        self.popular_searches = {}  # В реальном приложении - БД
-        self.search_suggestions = {}  # В реальном приложении - БД
+def normalize_term(text: str) -> str:
+    """Термин подсказки: нижний регистр, пробелы схлопнуты"""
+    return " ".join(text.lower().split())
+
+
+class SearchService:
+    """Сервис для поиска и фильтрации контента
+
+    Посты, статьи и пользователи ищутся в БД по полнотекстовому индексу
+    (utils/full_text.py) и сортируются по рангу совпадения.
+    """
+
+    def __init__(self, session_factory: Optional[Callable[[], Session]] = None):
+        self._session_factory = session_factory
+        # История: последние запросы пользователей, подгружаются из БД при
+        # промахе; запросы пишутся событиями "search" (services/event_pipeline.py).
+        # Значение - (время последней очистки, очередь запросов)
+        self._histories = TTLCache(
+            max_size=settings.SEARCH_HISTORY_USERS, ttl=settings.SEARCH_HISTORY_TTL
+        )
+        self._history_lock = threading.Lock()
+        # Популярность: недавняя (top-K) и базовая частота для тренда
+        self.popularity = HeavyHitters(
+            k=settings.SEARCH_POPULAR_TOP_K,
+            half_life=settings.SEARCH_POPULAR_HALF_LIFE,
+        )
+        self.baseline_popularity = HeavyHitters(
+            k=0, half_life=settings.SEARCH_POPULAR_BASELINE_HALF_LIFE
+        )
+        # Различные пользователи запроса: чужие запросы показываются в
+        # популярных и подсказках только после нескольких авторов
+        # (SEARCH_POPULAR_MIN_USERS, SEARCH_SUGGESTIONS_MIN_USERS)
+        self._query_users = TTLCache(
+            max_size=settings.SEARCH_QUERY_USERS_TERMS,
+            ttl=settings.SEARCH_POPULAR_WARMUP,
+        )
+        self._query_users_lock = threading.Lock()
+        self._started_at = datetime.now(timezone.utc)
+        self._popularity_loaded = False
+        self._popularity_lock = threading.Lock()
+        # Подсказки: история запросов и словарь тегов и заголовков
+        self.suggestion_index = PrefixIndex(
+            max_terms=settings.SEARCH_SUGGESTIONS_MAX_TERMS
+        )
+        self._vocabulary: Dict[str, float] = {}
+        self._vocabulary_loaded_at: Optional[float] = None
+        self._refreshing = False
+        self._refresh_lock = threading.Lock()
+        self._vocabulary_lock = threading.Lock()
+        self._trigram_available = True
+        # Источники глобального поиска выполняются параллельно: по потоку на
+        # источник для каждого из SEARCH_GLOBAL_CONCURRENCY одновременных
+        # запросов, иначе запросы ждут друг друга в очереди пула
+        self._executor = ThreadPoolExecutor(
+            max_workers=len(GLOBAL_SEARCH_SOURCES) * settings.SEARCH_GLOBAL_CONCURRENCY,
+            thread_name_prefix="search",
+        )
+
+    @contextmanager
+    def _session(self):
+        if self._session_factory is None:
+            from models import SessionLocal
+
+            self._session_factory = SessionLocal
+
+        db = self._session_factory()
+        try:
+            yield db
+        finally:
+            db.close()
 
     def search_posts(
         self,
@@ -25,27 +119,18 @@ class SearchService:
         filters: Optional[Dict] = None,
         page: int = 1,
         per_page: int = 20,
+        record: bool = True,
     ) -> Dict[str, Any]:
-        """Поиск постов по тексту и фильтрам"""
+        """Поиск постов и статей по тексту и фильтрам"""
         try:
-            # В реальном приложении здесь будет запрос к БД
-            # Пока возвращаем моковые данные с учетом фильтров
-
             # Сохраняем поисковый запрос
-            self._save_search_query(query, user_id)
+            if record:
+                self._save_search_query(query, user_id)
 
-            # Применяем фильтры
-            filtered_posts = self._apply_post_filters(filters or {})
-
-            # Ищем по тексту
-            if query:
-                filtered_posts = self._search_in_posts(filtered_posts, query)
-
-            # Пагинация
-            total = len(filtered_posts)
-            start = (page - 1) * per_page
-            end = start + per_page
-            posts = filtered_posts[start:end]
+            with self._session() as db:
+                total, posts = self._search_content(
+                    db, query.strip(), user_id, filters or {}, page, per_page
+                )
 
             return {
                 "posts": posts,
@@ -56,6 +141,8 @@ class SearchService:
                 "filters": filters,
             }
 
+        except ValueError:
+            raise
         except Exception as e:
             logger.error(f"Error searching posts: {e}")
             raise Exception(f"Ошибка поиска постов: {str(e)}")
@@ -67,27 +154,18 @@ class SearchService:
         filters: Optional[Dict] = None,
         page: int = 1,
         per_page: int = 20,
+        record: bool = True,
     ) -> Dict[str, Any]:
-        """Поиск пользователей по имени, email, username"""
+        """Поиск пользователей по username и имени"""
         try:
-            # В реальном приложении здесь будет запрос к БД
-            # Пока возвращаем моковые данные
-
             # Сохраняем поисковый запрос
-            self._save_search_query(query, user_id)
-
-            # Применяем фильтры
-            filtered_users = self._apply_user_filters(filters or {})
-
-            # Ищем по тексту
-            if query:
-                filtered_users = self._search_in_users(filtered_users, query)
+            if record:
+                self._save_search_query(query, user_id)
 
-            # Пагинация
-            total = len(filtered_users)
-            start = (page - 1) * per_page
-            end = start + per_page
-            users = filtered_users[start:end]
+            with self._session() as db:
+                total, users = self._search_users(
+                    db, query.strip(), filters or {}, page, per_page
+                )
 
             return {
                 "users": users,
@@ -108,6 +186,7 @@ class SearchService:
         user_id: int,
         page: int = 1,
         per_page: int = 20,
+        record: bool = True,
     ) -> Dict[str, Any]:
         """Поиск тегов"""
         try:
@@ -115,7 +194,8 @@ class SearchService:
             # Пока возвращаем моковые данные
 
             # Сохраняем поисковый запрос
-            self._save_search_query(query, user_id)
+            if record:
+                self._save_search_query(query, user_id)
 
             # Моковые теги
             all_tags = [
@@ -160,86 +240,308 @@ class SearchService:
             logger.error(f"Error searching tags: {e}")
             raise Exception(f"Ошибка поиска тегов: {str(e)}")
 
+    def global_search(
+        self,
+        query: str,
+        user_id: int,
+        per_page: int = 5,
+        timeout: Optional[float] = None,
+    ) -> Dict[str, Any]:
+        """Поиск по всем типам контента: источники опрашиваются параллельно
+
+        Каждый источник выполняется в пуле потоков сервиса и ждется не
+        дольше timeout секунд от начала запроса. Источник, не успевший к
+        сроку или завершившийся ошибкой, возвращается пустым со статусом
+        timeout/error, остальные результаты отдаются как есть. Запрос
+        записывается в историю один раз.
+        """
+        timeout = settings.SEARCH_GLOBAL_TIMEOUT if timeout is None else timeout
+        self._save_search_query(query, user_id)
+
+        sources = {
+            "posts": lambda: self.search_posts(
+                query, user_id, page=1, per_page=per_page, record=False
+            ),
+            "users": lambda: self.search_users(
+                query, user_id, page=1, per_page=per_page, record=False
+            ),
+            "tags": lambda: self.search_tags(
+                query, user_id, page=1, per_page=per_page, record=False
+            ),
+        }
+        started = time.perf_counter()
+        futures = {
+            source: self._executor.submit(self._timed_source, source, search)
+            for source, search in sources.items()
+        }
+
+        deadline = started + timeout
+        results, metadata = {}, {}
+        for source, future in futures.items():
+            try:
+                result, latency = future.result(
+                    timeout=max(deadline - time.perf_counter(), 0)
+                )
+                status = "ok"
+                results[source] = {"items": result[source], "total": result["total"]}
+            except FuturesTimeout:
+                # Источник, еще ждущий в очереди пула, снимается и не занимает
+                # поток; запущенный поток доработает сам, ответ его не ждет
+                future.cancel()
+                status, latency = "timeout", time.perf_counter() - started
+                logger.warning(f"Global search source {source} timed out")
+            except Exception as e:
+                status, latency = "error", time.perf_counter() - started
+                logger.error(f"Global search source {source} failed: {e}")
+            if status != "ok":
+                results[source] = {"items": [], "total": 0}
+            metrics_collector.record_search_source(source, status)
+            metadata[source] = {
+                "status": status,
+                "latency_ms": round(latency * 1000, 2),
+            }
+
+        return {
+            "query": query,
+            "results": results,
+            "metadata": {
+                "sources": metadata,
+                "partial": any(item["status"] != "ok" for item in metadata.values()),
+                "took_ms": round((time.perf_counter() - started) * 1000, 2),
+            },
+        }
+
+    @staticmethod
+    def _timed_source(source: str, search: Callable[[], Dict[str, Any]]):
+        started = time.perf_counter()
+        try:
+            return search(), time.perf_counter() - started
+        finally:
+            # Время фиксируется и для источников, не успевших к сроку
+            metrics_collector.search_source_duration.labels(source=source).observe(
+                time.perf_counter() - started
+            )
+
     def get_search_suggestions(
         self, query: str, user_id: int, limit: int = 10
     ) -> List[str]:
-        """Получение предложений для автодополнения"""
+        """Получение предложений для автодополнения
+
+        Сначала идут собственные запросы пользователя из истории, затем
+        индекс префиксов в памяти: словарь тегов и заголовков статей и
+        запросы, которые искали не меньше SEARCH_SUGGESTIONS_MIN_USERS
+        пользователей, упорядоченные по популярности. Если по префиксу
+        ничего нет (например, в запросе опечатка), в PostgreSQL выполняется
+        нечеткий поиск через pg_trgm.
+        """
         try:
-            if len(query) < 2:
+            prefix = normalize_term(query)
+            if len(prefix) < 2:
                 return []
 
-            # В реальном приложении здесь будет запрос к БД
-            # Пока возвращаем моковые предложения
-
-            suggestions = [
-                "python programming",
-                "javascript tutorial",
-                "react hooks",
-                "vue components",
-                "angular services",
-                "nodejs backend",
-                "fastapi async",
-                "django models",
-                "flask routes",
-                "sqlalchemy queries",
-            ]
-
-            # Фильтруем по запросу
-            filtered_suggestions = [
-                suggestion
-                for suggestion in suggestions
-                if query.lower() in suggestion.lower()
-            ]
-
-            return filtered_suggestions[:limit]
+            self._refresh_vocabulary_if_stale()
+            history = self._history(user_id)
+            with self._history_lock:
+                own = [term for term in history if term.startswith(prefix)]
+            suggestions = own[:limit]
+            suggestions += [
+                term
+                for term, _ in self.suggestion_index.suggest(prefix, limit)
+                if term not in suggestions
+            ][: limit - len(suggestions)]
+            if not suggestions:
+                suggestions = self._fuzzy_suggestions(prefix, limit)
+            return suggestions
 
         except Exception as e:
             logger.error(f"Error getting search suggestions: {e}")
             return []
 
-    def get_popular_searches(self, limit: int = 10) -> List[Dict[str, Any]]:
-        """Получение популярных поисковых запросов"""
-        try:
-            # В реальном приложении здесь будет запрос к БД
-            # Пока возвращаем моковые данные
+    def refresh_vocabulary(self) -> int:
+        """Перечитать теги и заголовки статей и применить разницу весов к индексу
+
+        Вес тега - 1 плюс число статей с ним, вес заголовка опубликованной
+        статьи - 1. Возвращает размер словаря.
+        """
+        Tag = content_models.Tag
+        ArticleTag = content_models.ArticleTag
+        Article = content_models.Article
+
+        vocabulary: Dict[str, float] = defaultdict(float)
+        with self._vocabulary_lock, self._session() as db:
+            tags = (
+                select(Tag.name, func.count(ArticleTag.id))
+                .outerjoin(ArticleTag, ArticleTag.tag_id == Tag.id)
+                .group_by(Tag.id, Tag.name)
+            )
+            for name, articles in db.execute(tags):
+                vocabulary[normalize_term(name)] += 1.0 + articles
 
-            popular = [
-                {"query": "python", "count": 150, "trend": "up"},
-                {"query": "javascript", "count": 200, "trend": "up"},
-                {"query": "react", "count": 180, "trend": "stable"},
-                {"query": "vue", "count": 120, "trend": "down"},
-                {"query": "angular", "count": 100, "trend": "stable"},
-                {"query": "nodejs", "count": 160, "trend": "up"},
-                {"query": "fastapi", "count": 80, "trend": "up"},
-                {"query": "django", "count": 90, "trend": "stable"},
-                {"query": "flask", "count": 70, "trend": "down"},
-                {"query": "sqlalchemy", "count": 60, "trend": "stable"},
+            titles = select(Article.title).where(
+                Article.status == content_models.ArticleStatus.PUBLISHED
+            )
+            for (title,) in db.execute(titles.execution_options(yield_per=5000)):
+                vocabulary[normalize_term(title)] += 1.0
+
+            vocabulary.pop("", None)
+            previous = self._vocabulary
+            changes = [
+                (term, weight - previous.get(term, 0.0))
+                for term, weight in vocabulary.items()
+                if weight != previous.get(term, 0.0)
             ]
+            changes.extend(
+                (term, -weight)
+                for term, weight in previous.items()
+                if term not in vocabulary
+            )
+            self.suggestion_index.update(changes)
+            self._vocabulary = dict(vocabulary)
+        return len(vocabulary)
+
+    def _refresh_vocabulary_if_stale(self):
+        """Запустить перечитывание словаря в фоне, если он устарел
+
+        Выборка подсказок не ждет БД: до окончания загрузки используются
+        текущие веса индекса.
+        """
+        with self._refresh_lock:
+            now = time.monotonic()
+            if self._refreshing or (
+                self._vocabulary_loaded_at is not None
+                and now - self._vocabulary_loaded_at
+                < settings.SEARCH_SUGGESTIONS_REFRESH
+            ):
+                return
+            self._refreshing = True
+            self._vocabulary_loaded_at = now
+
+        def refresh():
+            try:
+                self.refresh_vocabulary()
+            except Exception as e:
+                logger.error(f"Error refreshing search vocabulary: {e}")
+            finally:
+                self._refreshing = False
+
+        threading.Thread(target=refresh, daemon=True).start()
+
+    def _fuzzy_suggestions(self, prefix: str, limit: int) -> List[str]:
+        """Похожие теги и заголовки по триграммам (только PostgreSQL с pg_trgm)"""
+        if not self._trigram_available:
+            return []
+
+        Tag = content_models.Tag
+        Article = content_models.Article
+        with self._session() as db:
+            if db.get_bind().dialect.name != "postgresql":
+                self._trigram_available = False
+                return []
+            try:
+                suggestions: Dict[str, float] = {}
+                for column, condition in (
+                    (Tag.name, true()),
+                    (
+                        Article.title,
+                        Article.status == content_models.ArticleStatus.PUBLISHED,
+                    ),
+                ):
+                    similarity = func.similarity(column, prefix)
+                    rows = db.execute(
+                        select(column, similarity)
+                        .where(column.op("%")(prefix), condition)
+                        .order_by(similarity.desc())
+                        .limit(limit)
+                    )
+                    for value, score in rows:
+                        term = normalize_term(value)
+                        suggestions[term] = max(score, suggestions.get(term, 0.0))
+            except Exception as e:
+                # Расширение pg_trgm не установлено: нечеткий поиск отключается
+                logger.warning(f"Fuzzy search suggestions disabled: {e}")
+                self._trigram_available = False
+                return []
+
+        ranked = sorted(suggestions.items(), key=lambda item: (-item[1], item[0]))
+        return [term for term, _ in ranked[:limit]]
+
+    def get_popular_searches(self, limit: int = 10) -> List[Dict[str, Any]]:
+        """Популярные запросы по затухающей частоте за последние часы
 
-            return popular[:limit]
+        trend сравнивает недавнюю частоту с базовой (период полураспада
+        SEARCH_POPULAR_BASELINE_HALF_LIFE): при равномерном потоке
+        затухающий счетчик пропорционален периоду полураспада, поэтому
+        отношения нормируются на него.
+        """
+        try:
+            self._load_popularity()
+
+            popular = []
+            for query, count in self.popularity.top():
+                # Запрос одного-двух пользователей не показывается остальным
+                if self._distinct_users(query) < settings.SEARCH_POPULAR_MIN_USERS:
+                    continue
+                if len(popular) == limit:
+                    break
+                recent = count / self.popularity.half_life
+                baseline = (
+                    self.baseline_popularity.estimate(query)
+                    / self.baseline_popularity.half_life
+                )
+                ratio = recent / baseline if baseline else 1.0
+                if ratio > TREND_THRESHOLD:
+                    trend = "up"
+                elif ratio < 1 / TREND_THRESHOLD:
+                    trend = "down"
+                else:
+                    trend = "stable"
+                popular.append({"query": query, "count": round(count), "trend": trend})
+            return popular
 
         except Exception as e:
             logger.error(f"Error getting popular searches: {e}")
             return []
 
     def get_user_search_history(self, user_id: int, limit: int = 20) -> List[str]:
-        """Получение истории поиска пользователя"""
+        """Последние запросы пользователя, начиная с самого свежего"""
         try:
-            # В реальном приложении здесь будет запрос к БД
-            # Пока возвращаем моковые данные
-
-            history = self.search_history.get(user_id, [])
-            return history[-limit:] if history else []
+            history = self._history(user_id)
+            with self._history_lock:
+                return list(history)[:limit]
 
         except Exception as e:
             logger.error(f"Error getting search history: {e}")
             return []
 
     def clear_search_history(self, user_id: int) -> bool:
-        """Очистка истории поиска пользователя"""
+        """Очистка истории поиска пользователя
+
+        Записанные события поиска удаляются, а время очистки сохраняется
+        событием-отметкой. События, созданные раньше отметки (в том числе
+        еще стоящие в очереди записи), в историю не загружаются, а другие
+        воркеры сверяют с отметкой свою закэшированную историю.
+        """
         try:
-            if user_id in self.search_history:
-                del self.search_history[user_id]
+            AnalyticsEvent = analytics_models.AnalyticsEvent
+            with self._session() as db:
+                db.execute(
+                    delete(AnalyticsEvent).where(
+                        AnalyticsEvent.user_id == user_id,
+                        AnalyticsEvent.event_type.in_(
+                            [SEARCH_EVENT, SEARCH_HISTORY_CLEARED_EVENT]
+                        ),
+                    )
+                )
+                db.add(
+                    AnalyticsEvent(
+                        user_id=user_id,
+                        event_type=SEARCH_HISTORY_CLEARED_EVENT,
+                        event_data={},
+                        created_at=datetime.now(timezone.utc),
+                    )
+                )
+                db.commit()
+            self._histories.delete(user_id)
             return True
 
         except Exception as e:
@@ -247,261 +549,353 @@ class SearchService:
             return False
 
     def _save_search_query(self, query: str, user_id: int) -> None:
-        """Сохранение поискового запроса"""
-        if not query or len(query.strip()) < 2:
+        """Сохранение поискового запроса в историю, подсказки и популярность"""
+        query = normalize_term(query)
+        if len(query) < 2:
             return
 
-        query = query.strip().lower()
-
-        # Сохраняем в историю пользователя
-        if user_id not in self.search_history:
-            self.search_history[user_id] = []
-
-        # Удаляем дубликаты
-        if query in self.search_history[user_id]:
-            self.search_history[user_id].remove(query)
-
-        # Добавляем в начало
-        self.search_history[user_id].insert(0, query)
-
-        # Ограничиваем размер истории
-        if len(self.search_history[user_id]) > 50:
-            self.search_history[user_id] = self.search_history[user_id][:50]
-
-        # Обновляем статистику популярных запросов
-        if query not in self.popular_searches:
-            self.popular_searches[query] = 0
-        self.popular_searches[query] += 1
-
-    def _apply_post_filters(self, filters: Dict) -> List[Dict]:
-        """Применение фильтров к постам"""
-        # В реальном приложении здесь будет запрос к БД с WHERE условиями
-        # Пока возвращаем моковые данные
-
-        mock_posts = [
-            {
-                "id": 1,
-                "title": "Python Programming Tips",
-                "content": "Learn advanced Python techniques...",
-                "author": {"id": 1, "name": "John Doe", "username": "johndoe"},
-                "tags": ["python", "programming", "tutorial"],
-                "created_at": "2025-01-28T10:00:00Z",
-                "likes_count": 25,
-                "comments_count": 5,
-                "views_count": 150,
-                "category": "programming",
-                "is_published": True,
-            },
-            {
-                "id": 2,
-                "title": "React Hooks Guide",
-                "content": "Complete guide to React hooks...",
-                "author": {"id": 2, "name": "Jane Smith", "username": "janesmith"},
-                "tags": ["react", "javascript", "hooks"],
-                "created_at": "2025-01-27T15:30:00Z",
-                "likes_count": 40,
-                "comments_count": 8,
-                "views_count": 200,
-                "category": "programming",
-                "is_published": True,
-            },
-            {
-                "id": 3,
-                "title": "Vue.js Components",
-                "content": "Building reusable Vue components...",
-                "author": {"id": 3, "name": "Bob Wilson", "username": "bobwilson"},
-                "tags": ["vue", "javascript", "components"],
-                "created_at": "2025-01-26T09:15:00Z",
-                "likes_count": 30,
-                "comments_count": 3,
-                "views_count": 120,
-                "category": "programming",
-                "is_published": True,
-            },
-        ]
-
-        # Применяем фильтры
-        filtered_posts = mock_posts
-
-        # Фильтр по категории
-        if "category" in filters and filters["category"]:
-            filtered_posts = [
-                post
-                for post in filtered_posts
-                if post.get("category") == filters["category"]
-            ]
-
-        # Фильтр по тегам
-        if "tags" in filters and filters["tags"]:
-            tag_list = (
-                filters["tags"]
-                if isinstance(filters["tags"], list)
-                else [filters["tags"]]
+        self.popularity.add(query)
+        self.baseline_popularity.add(query)
+        # Чужие запросы попадают в общие подсказки только после нескольких
+        # авторов: запрос одного пользователя остается в его истории
+        if self._count_user(query, user_id) >= settings.SEARCH_SUGGESTIONS_MIN_USERS:
+            self.suggestion_index.add(query)
+
+        history = self._history(user_id)
+        with self._history_lock:
+            # История ограничена SEARCH_HISTORY_SIZE: remove и appendleft
+            # работают с короткой очередью
+            if query in history:
+                history.remove(query)
+            history.appendleft(query)
+
+        # В БД запрос пишется пачкой вместе с другими событиями; при
+        # переполненной очереди он остается только в памяти
+        event_pipeline.track(SEARCH_EVENT, {"query": query}, user_id=user_id)
+
+    def _count_user(self, query: str, user_id: Optional[int]) -> int:
+        """Учесть автора запроса; вернуть число различных авторов (до порога)"""
+        with self._query_users_lock:
+            users = self._query_users.get(query) or set()
+            threshold = max(
+                settings.SEARCH_POPULAR_MIN_USERS, settings.SEARCH_SUGGESTIONS_MIN_USERS
             )
-            filtered_posts = [
-                post
-                for post in filtered_posts
-                if any(tag in post.get("tags", []) for tag in tag_list)
-            ]
-
-        # Фильтр по дате
-        if "date_from" in filters and filters["date_from"]:
-            # В реальном приложении здесь будет сравнение дат
-            pass
-
-        if "date_to" in filters and filters["date_to"]:
-            # В реальном приложении здесь будет сравнение дат
-            pass
-
-        # Фильтр по автору
-        if "author_id" in filters and filters["author_id"]:
-            filtered_posts = [
-                post
-                for post in filtered_posts
-                if post.get("author", {}).get("id") == filters["author_id"]
-            ]
+            if user_id is not None and len(users) < threshold:
+                users.add(user_id)
+            self._query_users.set(query, users)
+            return len(users)
+
+    def _distinct_users(self, query: str) -> int:
+        """Число различных авторов запроса (не больше порога)"""
+        with self._query_users_lock:
+            return len(self._query_users.get(query) or ())
+
+    def _history(self, user_id: int) -> deque:
+        """История пользователя из кэша или из событий поиска в БД
+
+        Кэш используется, только если с момента его загрузки историю не
+        очищали (в том числе в другом воркере): отметка очистки читается
+        из БД на каждый вызов одним запросом по индексу пользователя.
+        """
+        AnalyticsEvent = analytics_models.AnalyticsEvent
+        cleared = select(func.max(AnalyticsEvent.created_at)).where(
+            AnalyticsEvent.user_id == user_id,
+            AnalyticsEvent.event_type == SEARCH_HISTORY_CLEARED_EVENT,
+        )
+        with self._session() as db:
+            cleared_at = db.scalar(cleared)
+            cached = self._histories.get(user_id)
+            if cached is not None and cached[0] == cleared_at:
+                return cached[1]
+
+            recent = (
+                select(AnalyticsEvent.event_data)
+                .where(
+                    AnalyticsEvent.user_id == user_id,
+                    AnalyticsEvent.event_type == SEARCH_EVENT,
+                )
+                .order_by(AnalyticsEvent.created_at.desc(), AnalyticsEvent.id.desc())
+                # С запасом на повторы одного и того же запроса
+                .limit(settings.SEARCH_HISTORY_SIZE * 4)
+            )
+            if cleared_at is not None:
+                # События из очереди записи, созданные до очистки
+                recent = recent.where(AnalyticsEvent.created_at > cleared_at)
+            queries = [(data or {}).get("query") for data in db.scalars(recent)]
+
+        # deque с maxlen оставляет последние элементы: обрезаем заранее
+        size = settings.SEARCH_HISTORY_SIZE
+        loaded = deque(
+            [query for query in dict.fromkeys(queries) if query][:size], maxlen=size
+        )
+        with self._history_lock:
+            # Параллельный запрос мог загрузить историю раньше
+            cached = self._histories.get(user_id)
+            if cached is not None and cached[0] == cleared_at:
+                return cached[1]
+            self._histories.set(user_id, (cleared_at, loaded))
+        return loaded
+
+    def _load_popularity(self):
+        """Один раз учесть в популярности запросы, записанные до старта"""
+        if self._popularity_loaded:
+            return
 
-        # Фильтр по статусу публикации
-        if "is_published" in filters:
-            filtered_posts = [
-                post
-                for post in filtered_posts
-                if post.get("is_published") == filters["is_published"]
-            ]
+        with self._popularity_lock:
+            if self._popularity_loaded:
+                return
+
+            AnalyticsEvent = analytics_models.AnalyticsEvent
+            since = self._started_at - timedelta(seconds=settings.SEARCH_POPULAR_WARMUP)
+            # Запросы после старта уже учтены в _save_search_query
+            events = select(
+                AnalyticsEvent.event_data,
+                AnalyticsEvent.created_at,
+                AnalyticsEvent.user_id,
+            ).where(
+                AnalyticsEvent.event_type == SEARCH_EVENT,
+                AnalyticsEvent.created_at >= since,
+                AnalyticsEvent.created_at < self._started_at,
+            )
+            with self._session() as db:
+                for data, created_at, user_id in db.execute(
+                    events.execution_options(yield_per=5000)
+                ):
+                    query = (data or {}).get("query")
+                    if not query:
+                        continue
+                    if created_at.tzinfo is None:
+                        created_at = created_at.replace(tzinfo=timezone.utc)
+                    at = created_at.timestamp()
+                    self.popularity.add(query, at=at)
+                    self.baseline_popularity.add(query, at=at)
+                    self._count_user(query, user_id)
+            self._popularity_loaded = True
+
+    @staticmethod
+    def _date_range(filters: Dict) -> Tuple[Optional[datetime], Optional[datetime]]:
+        """Границы периода из date_from/date_to; дата без времени - весь день"""
+        date_from = filters.get("date_from")
+        date_to = filters.get("date_to")
+        start = datetime.fromisoformat(date_from) if date_from else None
+        end = None
+        if date_to:
+            end = datetime.fromisoformat(date_to)
+            if len(date_to) == 10:
+                end += timedelta(days=1)
+        return start, end
+
+    @staticmethod
+    def _match(fts: FullTextSearch, model, term: str):
+        if not term:
+            return true(), literal(0.0)
+        return fts.match(model, term)
+
+    def _post_hits(self, fts: FullTextSearch, term: str, user_id: int, filters: Dict):
+        Post = social_models.Post
+        condition, rank = self._match(fts, Post, term)
+        query = select(
+            literal("post").label("type"),
+            Post.id.label("id"),
+            rank.label("rank"),
+            Post.created_at.label("created_at"),
+        ).where(condition, or_(Post.is_public.is_(True), Post.user_id == user_id))
+
+        start, end = self._date_range(filters)
+        if start:
+            query = query.where(Post.created_at >= start)
+        if end:
+            query = query.where(Post.created_at < end)
+        if filters.get("author_id"):
+            query = query.where(Post.user_id == filters["author_id"])
+        if filters.get("is_published") is not None:
+            query = query.where(Post.is_public.is_(filters["is_published"]))
+        return query
+
+    def _article_hits(
+        self, fts: FullTextSearch, term: str, user_id: int, filters: Dict
+    ):
+        Article = content_models.Article
+        published = Article.status == content_models.ArticleStatus.PUBLISHED
+        condition, rank = self._match(fts, Article, term)
+        query = select(
+            literal("article").label("type"),
+            Article.id.label("id"),
+            rank.label("rank"),
+            Article.created_at.label("created_at"),
+        ).where(condition, or_(published, Article.author_id == user_id))
+
+        start, end = self._date_range(filters)
+        if start:
+            query = query.where(Article.created_at >= start)
+        if end:
+            query = query.where(Article.created_at < end)
+        if filters.get("author_id"):
+            query = query.where(Article.author_id == filters["author_id"])
+        if filters.get("is_published") is not None:
+            query = query.where(published if filters["is_published"] else ~published)
+        if filters.get("category"):
+            Category = content_models.Category
+            query = query.join(Category, Category.id == Article.category_id).where(
+                or_(
+                    Category.slug == filters["category"],
+                    Category.name == filters["category"],
+                )
+            )
+        if filters.get("tags"):
+            tags = filters["tags"]
+            tags = tags if isinstance(tags, list) else [tags]
+            Tag = content_models.Tag
+            tagged = (
+                select(content_models.ArticleTag.article_id)
+                .join(Tag, Tag.id == content_models.ArticleTag.tag_id)
+                .where(or_(Tag.name.in_(tags), Tag.slug.in_(tags)))
+            )
+            query = query.where(Article.id.in_(tagged))
+        return query
 
-        return filtered_posts
+    def _search_content(
+        self,
+        db: Session,
+        term: str,
+        user_id: int,
+        filters: Dict,
+        page: int,
+        per_page: int,
+    ) -> Tuple[int, List[Dict[str, Any]]]:
+        """Одна выдача по постам и статьям, отсортированная по рангу"""
+        fts = FullTextSearch(db.get_bind())
+        queries = [self._article_hits(fts, term, user_id, filters)]
+        # Категории и теги есть только у статей
+        if not filters.get("category") and not filters.get("tags"):
+            queries.insert(0, self._post_hits(fts, term, user_id, filters))
+        hits = (union_all(*queries) if len(queries) > 1 else queries[0]).subquery()
+
+        total = db.scalar(select(func.count()).select_from(hits))
+        rows = db.execute(
+            select(hits.c.type, hits.c.id, hits.c.rank)
+            .order_by(hits.c.rank.desc(), hits.c.created_at.desc(), hits.c.id.desc())
+            .offset((page - 1) * per_page)
+            .limit(per_page)
+        ).all()
+
+        ids = defaultdict(list)
+        for row in rows:
+            ids[row.type].append(row.id)
+        documents = {}
+        if ids["post"]:
+            for post in (
+                db.query(social_models.Post)
+                .options(selectinload(social_models.Post.user))
+                .filter(social_models.Post.id.in_(ids["post"]))
+            ):
+                documents["post", post.id] = self._post_to_dict(post)
+        if ids["article"]:
+            Article = content_models.Article
+            for article in (
+                db.query(Article)
+                .options(
+                    selectinload(Article.author),
+                    selectinload(Article.category),
+                    selectinload(Article.tags).selectinload(
+                        content_models.ArticleTag.tag
+                    ),
+                )
+                .filter(Article.id.in_(ids["article"]))
+            ):
+                documents["article", article.id] = self._article_to_dict(article)
 
-    def _apply_user_filters(self, filters: Dict) -> List[Dict]:
-        """Применение фильтров к пользователям"""
-        # В реальном приложении здесь будет запрос к БД с WHERE условиями
-        # Пока возвращаем моковые данные
+        results = []
+        for row in rows:
+            document = documents[row.type, row.id]
+            document["rank"] = round(float(row.rank), 4)
+            results.append(document)
+        return total, results
+
+    def _search_users(
+        self, db: Session, term: str, filters: Dict, page: int, per_page: int
+    ) -> Tuple[int, List[Dict[str, Any]]]:
+        condition, rank = self._match(FullTextSearch(db.get_bind()), User, term)
+        query = select(User, rank.label("rank")).where(
+            condition, User.is_active.is_(True)
+        )
+
+        if filters.get("is_verified") is not None:
+            query = query.where(User.is_verified.is_(filters["is_verified"]))
+        if filters.get("min_followers") is not None:
+            query = query.where(
+                func.coalesce(User.followers_count, 0) >= filters["min_followers"]
+            )
+        # Фильтр location не применяется: в профиле нет такого поля
 
-        mock_users = [
-            {
-                "id": 1,
-                "username": "johndoe",
-                "email": "john@example.com",
-                "full_name": "John Doe",
-                "bio": "Python developer with 5 years experience",
-                "location": "New York, USA",
-                "followers_count": 150,
-                "following_count": 75,
-                "posts_count": 25,
-                "is_verified": True,
-                "created_at": "2024-01-15T10:00:00Z",
-            },
-            {
-                "id": 2,
-                "username": "janesmith",
-                "email": "jane@example.com",
-                "full_name": "Jane Smith",
-                "bio": "React developer and UI/UX designer",
-                "location": "San Francisco, USA",
-                "followers_count": 200,
-                "following_count": 100,
-                "posts_count": 30,
-                "is_verified": True,
-                "created_at": "2024-02-20T14:30:00Z",
-            },
+        total = db.scalar(select(func.count()).select_from(query.subquery()))
+        rows = db.execute(
+            query.order_by(
+                rank.desc(), func.coalesce(User.followers_count, 0).desc(), User.id
+            )
+            .offset((page - 1) * per_page)
+            .limit(per_page)
+        ).all()
+        return total, [
             {
-                "id": 3,
-                "username": "bobwilson",
-                "email": "bob@example.com",
-                "full_name": "Bob Wilson",
-                "bio": "Vue.js enthusiast and full-stack developer",
-                "location": "London, UK",
-                "followers_count": 80,
-                "following_count": 50,
-                "posts_count": 15,
-                "is_verified": False,
-                "created_at": "2024-03-10T09:15:00Z",
-            },
+                "id": user.id,
+                "username": user.username,
+                "full_name": user.full_name,
+                "followers_count": user.followers_count or 0,
+                "following_count": user.following_count or 0,
+                "posts_count": user.posts_count or 0,
+                "is_verified": bool(user.is_verified),
+                "created_at": user.created_at.isoformat() if user.created_at else None,
+                "rank": round(float(row_rank), 4),
+            }
+            for user, row_rank in rows
         ]
 
-        # Применяем фильтры
-        filtered_users = mock_users
-
-        # Фильтр по верификации
-        if "is_verified" in filters:
-            filtered_users = [
-                user
-                for user in filtered_users
-                if user.get("is_verified") == filters["is_verified"]
-            ]
-
-        # Фильтр по локации
-        if "location" in filters and filters["location"]:
-            filtered_users = [
-                user
-                for user in filtered_users
-                if filters["location"].lower() in user.get("location", "").lower()
-            ]
-
-        # Фильтр по количеству подписчиков
-        if "min_followers" in filters:
-            filtered_users = [
-                user
-                for user in filtered_users
-                if user.get("followers_count", 0) >= filters["min_followers"]
-            ]
-
-        return filtered_users
-
-    def _search_in_posts(self, posts: List[Dict], query: str) -> List[Dict]:
-        """Поиск по тексту в постах"""
-        query_lower = query.lower()
-        results = []
-
-        for post in posts:
-            # Поиск в заголовке
-            if query_lower in post.get("title", "").lower():
-                results.append(post)
-                continue
-
-            # Поиск в содержимом
-            if query_lower in post.get("content", "").lower():
-                results.append(post)
-                continue
-
-            # Поиск в тегах
-            if any(query_lower in tag.lower() for tag in post.get("tags", [])):
-                results.append(post)
-                continue
-
-            # Поиск в имени автора
-            if query_lower in post.get("author", {}).get("name", "").lower():
-                results.append(post)
-                continue
-
-        return results
-
-    def _search_in_users(self, users: List[Dict], query: str) -> List[Dict]:
-        """Поиск по тексту в пользователях"""
-        query_lower = query.lower()
-        results = []
-
-        for user in users:
-            # Поиск в username
-            if query_lower in user.get("username", "").lower():
-                results.append(user)
-                continue
-
-            # Поиск в полном имени
-            if query_lower in user.get("full_name", "").lower():
-                results.append(user)
-                continue
-
-            # Поиск в email
-            if query_lower in user.get("email", "").lower():
-                results.append(user)
-                continue
-
-            # Поиск в bio
-            if query_lower in user.get("bio", "").lower():
-                results.append(user)
-                continue
-
-        return results
+    @staticmethod
+    def _author_to_dict(user: Optional[User]) -> Optional[Dict[str, Any]]:
+        if user is None:
+            return None
+        return {
+            "id": user.id,
+            "name": user.full_name or user.username,
+            "username": user.username,
+        }
+
+    def _post_to_dict(self, post) -> Dict[str, Any]:
+        # У постов нет заголовка: показываем первую строку текста
+        title = post.content.strip().split("\n", 1)[0]
+        return {
+            "id": post.id,
+            "type": "post",
+            "title": title[:100],
+            "content": post.content,
+            "author": self._author_to_dict(post.user),
+            "tags": [],
+            "created_at": post.created_at.isoformat() if post.created_at else None,
+            "likes_count": post.likes_count or 0,
+            "comments_count": post.comments_count or 0,
+            "views_count": None,
+            "category": None,
+            "is_published": bool(post.is_public),
+        }
+
+    def _article_to_dict(self, article) -> Dict[str, Any]:
+        return {
+            "id": article.id,
+            "type": "article",
+            "title": article.title,
+            "content": article.excerpt or article.content,
+            "author": self._author_to_dict(article.author),
+            "tags": [link.tag.name for link in article.tags if link.tag],
+            "created_at": (
+                article.created_at.isoformat() if article.created_at else None
+            ),
+            "likes_count": article.likes_count or 0,
+            "comments_count": 0,
+            "views_count": article.views_count or 0,
+            "category": article.category.name if article.category else None,
+            "is_published": article.status == content_models.ArticleStatus.PUBLISHED,
+        }
 
 
 # Глобальный экземпляр сервиса
@@ -9,12 +9,159 @@ import hashlib
 import secrets
 import re
 import ipaddress
-from functools import wraps
+from functools import lru_cache, wraps
 import asyncio
+import math
+
+from services.rate_limiter import RateLimit, rate_limiter
 
 logger = logging.getLogger(__name__)
 
 
+class AttackPatternScanner:
+    """Поиск паттернов атак с общим предфильтром
+
+    Паттерны компилируются один раз. Ветви паттернов, начинающиеся с
+    ключевого слова на границе слова (\\b(union|select)...), проверяются
+    по множеству слов строки, остальные ветви объединены в одно выражение
+    без групп: движок re пропускает строку до первых символов ветвей,
+    поэтому чистая строка проверяется за один проход. Только если
+    предфильтр сработал, каждый паттерн проверяется отдельно. Результаты
+    для повторяющихся значений заголовков (User-Agent, Accept) запоминаются
+    в LRU.
+    """
+
+    # Ветвь вида \b(kw1|kw2)... и признак того, что слово за ней заканчивается
+    KEYWORD_BRANCH = re.compile(r"^\\b\(((?:\w+\|)*\w+)\)")
+    WORD_END = ("\\b", "\\s+", "\\W")
+    WORD = re.compile(r"\w+")
+
+    def __init__(
+        self,
+        attack_patterns: Dict[str, List[str]],
+        cache_size: int = 1024,
+        max_cached_length: int = 2048,
+    ):
+        self.patterns: List[Tuple[str, str, "re.Pattern"]] = [
+            (attack_type, pattern, re.compile(pattern, re.IGNORECASE))
+            for attack_type, patterns in attack_patterns.items()
+            for pattern in patterns
+        ]
+
+        branches = []
+        keywords = set()
+        keyword_prefixes = set()
+        for _, pattern, _ in self.patterns:
+            for branch in self._split_alternatives(pattern):
+                keyword_branch = self.KEYWORD_BRANCH.match(branch)
+                rest = branch[keyword_branch.end() :] if keyword_branch else ""
+                # Необязательная группа ключевых слов не может служить фильтром
+                if keyword_branch is None or rest.startswith(("?", "*", "{")):
+                    branches.append(f"(?:{branch})")
+                    continue
+                words = keyword_branch.group(1).casefold().split("|")
+                if rest.startswith(self.WORD_END):
+                    keywords.update(words)
+                else:
+                    # За ключевым словом могут идти буквы: проверяем префикс слова
+                    keyword_prefixes.update(words)
+
+        self.prefilter = re.compile("|".join(branches) or "(?!)", re.IGNORECASE)
+        self.keywords = frozenset(keywords)
+        self.keyword_prefixes = frozenset(keyword_prefixes)
+        self.prefix_lengths = sorted({len(word) for word in keyword_prefixes})
+        # Поиск подстроки без \b и IGNORECASE (по строке после casefold)
+        # быстрый и отсекает большинство строк до проверки префиксов слов
+        self.prefix_prefilter = re.compile("|".join(sorted(keyword_prefixes)) or "(?!)")
+        self.max_cached_length = max_cached_length
+        self._scan_cached = lru_cache(maxsize=cache_size)(self.scan)
+
+    @staticmethod
+    def _split_alternatives(pattern: str) -> List[str]:
+        """Разбить паттерн на ветви верхнего уровня, раскрывая внешние группы"""
+        branches = []
+        depth = 0
+        in_class = False
+        escaped = False
+        start = 0
+        # Паттерн целиком обернут в одну группу (без флагов и (?:...))
+        wrapped = pattern.startswith("(") and not pattern.startswith("(?")
+        for index, char in enumerate(pattern):
+            if escaped:
+                escaped = False
+            elif char == "\\":
+                escaped = True
+            elif in_class:
+                in_class = char != "]"
+            elif char == "[":
+                in_class = True
+            elif char == "(":
+                depth += 1
+            elif char == ")":
+                depth -= 1
+                if depth == 0 and index != len(pattern) - 1:
+                    wrapped = False
+            elif char == "|" and depth == 0:
+                branches.append(pattern[start:index])
+                start = index + 1
+
+        if branches:
+            branches.append(pattern[start:])
+            return [
+                part
+                for branch in branches
+                for part in AttackPatternScanner._split_alternatives(branch)
+            ]
+        if wrapped and pattern.endswith(")"):
+            return AttackPatternScanner._split_alternatives(pattern[1:-1])
+        return [pattern]
+
+    def _may_match(self, input_data: str) -> bool:
+        """Предфильтр: False означает, что ни один паттерн не совпадет"""
+        if self.prefilter.search(input_data):
+            return True
+
+        folded = input_data.casefold()
+        words = set(self.WORD.findall(folded))
+        if not self.keywords.isdisjoint(words):
+            return True
+        if not self.prefix_prefilter.search(folded):
+            return False
+        return any(
+            word[:length] in self.keyword_prefixes
+            for word in words
+            for length in self.prefix_lengths
+        )
+
+    def matches(self, input_data: str) -> List[Tuple[str, str]]:
+        """Все совпавшие паттерны в порядке объявления: (тип атаки, паттерн)"""
+        if not self._may_match(input_data):
+            return []
+        return [
+            (attack_type, pattern)
+            for attack_type, pattern, compiled in self.patterns
+            if compiled.search(input_data)
+        ]
+
+    def scan(self, input_data: str) -> Optional[str]:
+        """Тип первой обнаруженной атаки или None"""
+        if not self._may_match(input_data):
+            return None
+        for attack_type, _, compiled in self.patterns:
+            if compiled.search(input_data):
+                return attack_type
+        return None
+
+    def scan_cached(self, input_data: str) -> Optional[str]:
+        """scan с запоминанием результата для часто повторяющихся значений"""
+        if len(input_data) > self.max_cached_length:
+            return self.scan(input_data)
+        return self._scan_cached(input_data)
+
+    def cache_info(self):
+        return self._scan_cached.cache_info()
+
+
 class SecurityService:
     """Сервис для усиления безопасности"""
 
@@ -44,16 +191,21 @@ class SecurityService:
         # Паттерны для обнаружения атак
         self.attack_patterns = {
             "sql_injection": [
-                r"('|(\\')|(;)|(--)|(/\*)|(\*/)|(\b(union|select|insert|update|delete|drop|create|alter)\b)",
+                r"(('|\")\s*\)*\s*(;|--|#|/\*))",
+                r"(('|\")\s*\)*\s*\b(or|and|union|select|insert|update|delete|drop)\b)",
+                r"(;\s*\b(select|insert|update|delete|drop|create|alter|truncate|exec)\b)",
                 r"(\b(or|and)\s+\d+\s*=\s*\d+)",
-                r"(\b(union|select).*from)",
-                r"(\b(insert|update|delete).*into)",
-                r"(\b(drop|create|alter).*table)",
+                r"(\b(union)\s+(all\s+)?select\b)",
+                r"(\b(select)\s+[\w*.,\s]+?\s+from\s+\w)",
+                r"(\b(insert)\s+into\b)",
+                r"(\b(delete)\s+from\b)",
+                r"(\b(update)\s+\w+\s+set\b)",
+                r"(\b(drop|create|alter|truncate)\s+table\b)",
             ],
             "xss": [
                 r"<script[^>]*>.*?</script>",
                 r"javascript:",
-                r"on\w+\s*=",
+                r"<[^>]*\bon\w+\s*=",
                 r"<iframe[^>]*>",
                 r"<object[^>]*>",
                 r"<embed[^>]*>",
@@ -69,13 +221,22 @@ class SecurityService:
                 r"\.\.%5c",
             ],
             "command_injection": [
-                r"[;&|`$]",
-                r"\b(cat|ls|dir|type|more|less|head|tail|grep|find|awk|sed|cut|sort|uniq|wc|ps|top|kill|killall|pkill|pgrep|netstat|ss|lsof|tcpdump|nmap|ping|traceroute|wget|curl|nc|telnet|ssh|ftp|scp|rsync)\b",
+                r"(`|\$\(|\$\{)",
+                r"[;&|]\s*\b(cat|ls|dir|type|more|less|head|tail|grep|find|awk|sed|cut|sort|uniq|wc|ps|top|kill|killall|pkill|pgrep|netstat|ss|lsof|tcpdump|nmap|ping|traceroute|wget|curl|nc|telnet|ssh|ftp|scp|rsync)\b(?!\s*=)",
             ],
         }
 
-        # Запускаем очистку старых записей
-        asyncio.create_task(self._cleanup_old_records())
+        self.attack_scanner = AttackPatternScanner(self.attack_patterns)
+        self.rate_limiter = rate_limiter
+
+        # Очистка старых записей запускается при первом запросе: сервис
+        # создается при импорте, когда event loop еще не запущен
+        self._cleanup_task = None
+
+    def _ensure_cleanup_task(self):
+        """Запустить фоновую очистку старых записей, если она не запущена"""
+        if self._cleanup_task is None or self._cleanup_task.done():
+            self._cleanup_task = asyncio.create_task(self._cleanup_old_records())
 
     async def validate_password_strength(self, password: str) -> Dict[str, Any]:
         """Валидация силы пароля"""
@@ -168,17 +329,15 @@ class SecurityService:
         try:
             detected_attacks = []
 
-            for attack_type, patterns in self.attack_patterns.items():
-                for pattern in patterns:
-                    if re.search(pattern, input_data, re.IGNORECASE):
-                        detected_attacks.append(
-                            {
-                                "type": attack_type,
-                                "pattern": pattern,
-                                "severity": self._get_attack_severity(attack_type),
-                                "timestamp": datetime.now(timezone.utc).isoformat(),
-                            }
-                        )
+            for attack_type, pattern in self.attack_scanner.matches(input_data):
+                detected_attacks.append(
+                    {
+                        "type": attack_type,
+                        "pattern": pattern,
+                        "severity": self._get_attack_severity(attack_type),
+                        "timestamp": datetime.now(timezone.utc).isoformat(),
+                    }
+                )
 
             return detected_attacks
 
@@ -200,28 +359,17 @@ class SecurityService:
         self, ip_address: str, endpoint: str
     ) -> Tuple[bool, Dict[str, Any]]:
         """Проверка лимита запросов"""
+        self._ensure_cleanup_task()
         try:
-            current_time = datetime.now(timezone.utc)
-            key = f"{ip_address}:{endpoint}"
-
-            # Получаем историю запросов
-            if key not in self.failed_attempts:
-                self.failed_attempts[key] = []
-
-            # Очищаем старые записи
-            cutoff_time = current_time - timedelta(
-                seconds=self.config["rate_limit_window"]
+            # Лимит по умолчанию берется из конфигурации, правила отдельных
+            # маршрутов - из настроек RATE_LIMIT_ROUTES
+            default_limit = RateLimit(
+                self.config["rate_limit_requests"], self.config["rate_limit_window"]
             )
-            self.failed_attempts[key] = [
-                timestamp
-                for timestamp in self.failed_attempts[key]
-                if timestamp > cutoff_time
-            ]
+            result = await self.rate_limiter.hit(ip_address, endpoint, default_limit)
+            limit = result.limit
 
-            # Проверяем лимит
-            request_count = len(self.failed_attempts[key])
-
-            if request_count >= self.config["rate_limit_requests"]:
+            if not result.allowed:
                 # Блокируем IP
                 self.blocked_ips.add(ip_address)
 
@@ -229,25 +377,22 @@ class SecurityService:
                 await self._log_suspicious_activity(
                     ip_address,
                     "rate_limit_exceeded",
-                    f"Rate limit exceeded: {request_count} requests in {self.config['rate_limit_window']}s",
+                    f"Rate limit exceeded: {limit.requests} requests in {limit.window:g}s on {endpoint}",
                 )
 
                 return False, {
                     "allowed": False,
                     "reason": "rate_limit_exceeded",
-                    "retry_after": self.config["rate_limit_window"],
-                    "current_requests": request_count,
-                    "limit": self.config["rate_limit_requests"],
+                    "retry_after": math.ceil(result.retry_after),
+                    "current_requests": limit.requests,
+                    "limit": limit.requests,
                 }
 
-            # Добавляем текущий запрос
-            self.failed_attempts[key].append(current_time)
-
             return True, {
                 "allowed": True,
-                "current_requests": request_count + 1,
-                "limit": self.config["rate_limit_requests"],
-                "reset_in": self.config["rate_limit_window"],
+                "current_requests": limit.requests - result.remaining,
+                "limit": limit.requests,
+                "reset_in": math.ceil(result.reset_after),
             }
 
         except Exception as e:
@@ -3,7 +3,7 @@
 """
 
 from typing import List, Optional, Dict, Any
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, selectinload
 from sqlalchemy import and_, or_, func
 from datetime import datetime
 
@@ -17,7 +17,13 @@ from schemas.social import (
     CommentUpdate,
     FollowCreate,
 )
-from utils.database import QueryBuilder, PaginationHelper, SearchHelper
+from schemas.base import CursorParams
+from utils.database import (
+    QueryBuilder,
+    PaginationHelper,
+    SearchHelper,
+    CounterHelper,
+)
 from utils.exceptions import PostNotFoundError, NotFoundError
 
 
@@ -34,9 +40,13 @@ class SocialService:
         limit: int = 20,
         filters: Optional[PostFilters] = None,
         user: Optional[User] = None,
+        cursor_params: Optional[CursorParams] = None,
     ) -> Dict[str, Any]:
         """Получить список постов с фильтрацией"""
-        query = self.db.query(social_models.Post)
+        # Авторов подгружаем одним запросом на страницу
+        query = self.db.query(social_models.Post).options(
+            selectinload(social_models.Post.user)
+        )
 
         if filters:
             # Фильтр по автору
@@ -65,49 +75,10 @@ class SocialService:
         # Сортировка по дате создания (новые сначала)
         query = query.order_by(social_models.Post.created_at.desc())
 
-        result = PaginationHelper.paginate_query(query, skip, limit)
-
-        # Добавляем дополнительную информацию для каждого поста
-        posts_with_stats = []
-        for post in result["items"]:
-            # Подсчитываем лайки и комментарии
-            likes_count = (
-                self.db.query(social_models.PostLike)
-                .filter(social_models.PostLike.post_id == post.id)
-                .count()
-            )
-
-            comments_count = (
-                self.db.query(social_models.Comment)
-                .filter(social_models.Comment.post_id == post.id)
-                .count()
-            )
-
-            # Проверяем, лайкнул ли текущий пользователь
-            is_liked = False
-            if user:
-                is_liked = (
-                    self.db.query(social_models.PostLike)
-                    .filter(
-                        and_(
-                            social_models.PostLike.post_id == post.id,
-                            social_models.PostLike.user_id == user.id,
-                        )
-                    )
-                    .first()
-                    is not None
-                )
-
-            posts_with_stats.append(
-                {
-                    "post": post,
-                    "likes_count": likes_count,
-                    "comments_count": comments_count,
-                    "is_liked": is_liked,
-                }
-            )
-
-        result["items"] = posts_with_stats
+        result = PaginationHelper.paginate(
+            query, social_models.Post, skip, limit, cursor_params
+        )
+        result["items"] = self._attach_post_stats(result["items"], user)
         return result
 
     def get_post(self, post_id: int, user: Optional[User] = None) -> Dict[str, Any]:
@@ -121,19 +92,6 @@ class SocialService:
         if not post:
             raise PostNotFoundError(str(post_id))
 
-        # Подсчитываем статистику
-        likes_count = (
-            self.db.query(social_models.PostLike)
-            .filter(social_models.PostLike.post_id == post.id)
-            .count()
-        )
-
-        comments_count = (
-            self.db.query(social_models.Comment)
-            .filter(social_models.Comment.post_id == post.id)
-            .count()
-        )
-
         # Проверяем, лайкнул ли текущий пользователь
         is_liked = False
         if user:
@@ -151,8 +109,8 @@ class SocialService:
 
         return {
             "post": post,
-            "likes_count": likes_count,
-            "comments_count": comments_count,
+            "likes_count": post.likes_count or 0,
+            "comments_count": post.comments_count or 0,
             "is_liked": is_liked,
         }
 
@@ -165,6 +123,7 @@ class SocialService:
             is_public=post_data.is_public,
         )
         self.db.add(post)
+        CounterHelper.increment(self.db, User, user.id, "posts_count")
         self.db.commit()
         self.db.refresh(post)
         return post
@@ -196,6 +155,7 @@ class SocialService:
             raise NotFoundError("Post", str(post_id))
 
         self.db.delete(post)
+        CounterHelper.decrement(self.db, User, post.user_id, "posts_count")
         self.db.commit()
         return True
 
@@ -220,6 +180,7 @@ class SocialService:
 
         like = social_models.PostLike(user_id=user.id, post_id=post_id)
         self.db.add(like)
+        CounterHelper.increment(self.db, social_models.Post, post_id, "likes_count")
         self.db.commit()
         return True
 
@@ -240,6 +201,7 @@ class SocialService:
             return False  # Не лайкал
 
         self.db.delete(like)
+        CounterHelper.decrement(self.db, social_models.Post, post_id, "likes_count")
         self.db.commit()
         return True
 
@@ -269,6 +231,9 @@ class SocialService:
             content=comment_data.content,
         )
         self.db.add(comment)
+        CounterHelper.increment(
+            self.db, social_models.Post, comment_data.post_id, "comments_count"
+        )
         self.db.commit()
         self.db.refresh(comment)
         return comment
@@ -311,6 +276,9 @@ class SocialService:
             raise NotFoundError("Comment", str(comment_id))
 
         self.db.delete(comment)
+        CounterHelper.decrement(
+            self.db, social_models.Post, comment.post_id, "comments_count"
+        )
         self.db.commit()
         return True
 
@@ -343,6 +311,10 @@ class SocialService:
             following_id=follow_data.following_id,
         )
         self.db.add(follow)
+        CounterHelper.increment(self.db, User, user.id, "following_count")
+        CounterHelper.increment(
+            self.db, User, follow_data.following_id, "followers_count"
+        )
         self.db.commit()
         self.db.refresh(follow)
         return follow
@@ -364,6 +336,8 @@ class SocialService:
             return False
 
         self.db.delete(follow)
+        CounterHelper.decrement(self.db, User, user.id, "following_count")
+        CounterHelper.decrement(self.db, User, following_id, "followers_count")
         self.db.commit()
         return True
 
@@ -399,25 +373,6 @@ class SocialService:
         if not user:
             raise NotFoundError("User", str(user_id))
 
-        # Подсчитываем статистику
-        posts_count = (
-            self.db.query(social_models.Post)
-            .filter(social_models.Post.user_id == user_id)
-            .count()
-        )
-
-        followers_count = (
-            self.db.query(social_models.Follow)
-            .filter(social_models.Follow.following_id == user_id)
-            .count()
-        )
-
-        following_count = (
-            self.db.query(social_models.Follow)
-            .filter(social_models.Follow.follower_id == user_id)
-            .count()
-        )
-
         # Проверяем, подписан ли текущий пользователь
         is_following = False
         if current_user and current_user.id != user_id:
@@ -435,13 +390,19 @@ class SocialService:
 
         return {
             "user": user,
-            "posts_count": posts_count,
-            "followers_count": followers_count,
-            "following_count": following_count,
+            "posts_count": user.posts_count or 0,
+            "followers_count": user.followers_count or 0,
+            "following_count": user.following_count or 0,
             "is_following": is_following,
         }
 
-    def get_feed(self, user: User, skip: int = 0, limit: int = 20) -> Dict[str, Any]:
+    def get_feed(
+        self,
+        user: User,
+        skip: int = 0,
+        limit: int = 20,
+        cursor_params: Optional[CursorParams] = None,
+    ) -> Dict[str, Any]:
         """Получить ленту пользователя (посты от подписок)"""
         # Получаем ID пользователей, на которых подписан текущий пользователь
         following_ids = [
@@ -457,49 +418,47 @@ class SocialService:
         # Получаем посты
         query = (
             self.db.query(social_models.Post)
+            .options(selectinload(social_models.Post.user))
             .filter(social_models.Post.user_id.in_(following_ids))
             .filter(social_models.Post.is_public == True)
             .order_by(social_models.Post.created_at.desc())
         )
 
-        result = PaginationHelper.paginate_query(query, skip, limit)
-
-        # Добавляем статистику для каждого поста
-        posts_with_stats = []
-        for post in result["items"]:
-            likes_count = (
-                self.db.query(social_models.PostLike)
-                .filter(social_models.PostLike.post_id == post.id)
-                .count()
-            )
+        result = PaginationHelper.paginate(
+            query, social_models.Post, skip, limit, cursor_params
+        )
+        result["items"] = self._attach_post_stats(result["items"], user)
+        return result
 
-            comments_count = (
-                self.db.query(social_models.Comment)
-                .filter(social_models.Comment.post_id == post.id)
-                .count()
-            )
+    def _attach_post_stats(
+        self, posts: List[social_models.Post], user: Optional[User] = None
+    ) -> List[Dict[str, Any]]:
+        """Добавить статистику к странице постов одним запросом на страницу"""
+        post_ids = [post.id for post in posts]
+        if not post_ids:
+            return []
 
-            # Проверяем, лайкнул ли текущий пользователь
-            is_liked = (
-                self.db.query(social_models.PostLike)
+        # Посты страницы, которые лайкнул текущий пользователь
+        liked_post_ids = set()
+        if user:
+            liked_post_ids = {
+                post_id
+                for (post_id,) in self.db.query(social_models.PostLike.post_id)
                 .filter(
                     and_(
-                        social_models.PostLike.post_id == post.id,
+                        social_models.PostLike.post_id.in_(post_ids),
                         social_models.PostLike.user_id == user.id,
                     )
                 )
-                .first()
-                is not None
-            )
-
-            posts_with_stats.append(
-                {
-                    "post": post,
-                    "likes_count": likes_count,
-                    "comments_count": comments_count,
-                    "is_liked": is_liked,
-                }
-            )
-
-        result["items"] = posts_with_stats
-        return result
+                .all()
+            }
+
+        return [
+            {
+                "post": post,
+                "likes_count": post.likes_count or 0,
+                "comments_count": post.comments_count or 0,
+                "is_liked": post.id in liked_post_ids,
+            }
+            for post in posts
+        ]
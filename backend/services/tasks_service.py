@@ -19,6 +19,7 @@ from schemas.tasks import (
     CardCommentCreate,
     CardCommentUpdate,
 )
+from schemas.base import CursorParams
 from utils.database import QueryBuilder, PaginationHelper, SearchHelper
 from utils.exceptions import (
     BoardNotFoundError,
@@ -41,6 +42,7 @@ class TasksService:
         limit: int = 20,
         filters: Optional[BoardFilters] = None,
         user: Optional[User] = None,
+        cursor_params: Optional[CursorParams] = None,
     ) -> Dict[str, Any]:
         """Получить список досок с фильтрацией"""
         query = self.db.query(tasks_models.Board)
@@ -78,7 +80,9 @@ class TasksService:
         # Сортировка по дате создания (новые сначала)
         query = query.order_by(tasks_models.Board.created_at.desc())
 
-        result = PaginationHelper.paginate_query(query, skip, limit)
+        result = PaginationHelper.paginate(
+            query, tasks_models.Board, skip, limit, cursor_params
+        )
 
         # Добавляем статистику для каждой доски
         boards_with_stats = []
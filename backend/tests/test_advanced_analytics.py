@@ -0,0 +1,299 @@
+"""
+Тесты агрегации расширенной аналитики
+"""
+
+import random
+import pytest
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from models import Base, User
+import models_package.ecommerce as ecommerce_models
+import models_package.social as social_models
+import models_package.tasks
+import models_package.content
+import models_package.analytics as analytics_models
+from services.advanced_analytics_service import (
+    AdvancedAnalyticsService,
+    TimeWindow,
+    growth_rate,
+)
+
+engine = create_engine(
+    "sqlite://",
+    connect_args={"check_same_thread": False},
+    poolclass=StaticPool,
+)
+TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+NOW = datetime(2024, 3, 15, 12, 30, tzinfo=timezone.utc)
+TODAY = datetime(2024, 3, 15, tzinfo=timezone.utc)
+
+
+@pytest.fixture
+def data():
+    """Два месяца заказов, событий, лайков и подписок"""
+    Base.metadata.create_all(bind=engine)
+    session = TestingSessionLocal()
+    rng = random.Random(7)
+
+    users = [
+        User(email=f"user{i}@example.com", username=f"user{i}", hashed_password="x")
+        for i in range(6)
+    ]
+    products = [
+        ecommerce_models.Product(name=f"Product {i}", price=10.0 * (i + 1))
+        for i in range(4)
+    ]
+    session.add_all(users + products)
+    session.flush()
+    posts = [
+        social_models.Post(user_id=users[i].id, content=f"Post {i}") for i in range(3)
+    ]
+    session.add_all(posts)
+    session.flush()
+
+    orders, events, likes = [], [], []
+    for _ in range(400):
+        created_at = NOW - timedelta(minutes=rng.randrange(60 * 24 * 60))
+        # Последний товар не продается: он первый среди худших
+        product = rng.choice(products[:3])
+        quantity = rng.randint(1, 3)
+        order = ecommerce_models.Order(
+            user_id=rng.choice(users).id,
+            total_amount=product.price * quantity,
+            created_at=created_at,
+        )
+        session.add(order)
+        session.flush()
+        session.add(
+            ecommerce_models.OrderItem(
+                order_id=order.id,
+                product_id=product.id,
+                quantity=quantity,
+                price=product.price,
+            )
+        )
+        orders.append((created_at, order.user_id, product.id, quantity, product.price))
+
+    for _ in range(600):
+        created_at = NOW - timedelta(minutes=rng.randrange(60 * 24 * 20))
+        user_id = rng.choice(users).id
+        session.add(
+            analytics_models.AnalyticsEvent(
+                event_type="page_view", user_id=user_id, created_at=created_at
+            )
+        )
+        events.append((created_at, user_id))
+
+    for _ in range(150):
+        created_at = NOW - timedelta(minutes=rng.randrange(60 * 24 * 14))
+        post = rng.choices(posts, weights=[1, 3, 6])[0]
+        session.add(
+            social_models.PostLike(
+                user_id=rng.choice(users).id, post_id=post.id, created_at=created_at
+            )
+        )
+        likes.append((created_at, post.id))
+
+    for follower, following, days_ago in [(1, 2, 1), (3, 2, 2), (4, 2, 10), (1, 5, 3)]:
+        session.add(
+            social_models.Follow(
+                follower_id=users[follower].id,
+                following_id=users[following].id,
+                created_at=NOW - timedelta(days=days_ago),
+            )
+        )
+    session.commit()
+
+    yield {
+        "orders": orders,
+        "events": events,
+        "likes": likes,
+        "products": [product.id for product in products],
+        "users": [user.id for user in users],
+        "posts": [post.id for post in posts],
+    }
+    session.close()
+    Base.metadata.drop_all(bind=engine)
+
+
+@pytest.fixture
+def service():
+    return AdvancedAnalyticsService(
+        session_factory=TestingSessionLocal, clock=lambda: NOW
+    )
+
+
+def expected_series(values_by_day, days):
+    """Ряд по дням с нулями, скользящим средним за 7 дней и ростом"""
+    values = [
+        values_by_day.get(TODAY - timedelta(days=days - 1 - i), 0) for i in range(days)
+    ]
+    series = []
+    for i, value in enumerate(values):
+        window = values[max(i - 6, 0) : i + 1]
+        series.append(
+            {
+                "date": (TODAY - timedelta(days=days - 1 - i)).strftime("%Y-%m-%d"),
+                "value": value,
+                "moving_average": sum(window) / len(window),
+                "growth": growth_rate(value, values[i - 1]) if i else 0.0,
+            }
+        )
+    return series
+
+
+def day_of(moment):
+    return moment.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def assert_series(actual, expected):
+    assert [point["date"] for point in actual] == [p["date"] for p in expected]
+    for point, reference in zip(actual, expected):
+        assert point["value"] == pytest.approx(reference["value"], abs=0.01)
+        assert point["moving_average"] == pytest.approx(
+            reference["moving_average"], abs=0.01
+        )
+        assert point["growth"] == pytest.approx(reference["growth"], abs=0.01)
+
+
+class TestTimeWindow:
+    """Тесты разбиения периода на интервалы"""
+
+    def test_periods(self):
+        """Тест: периоды выравниваются по часам и суткам"""
+        hourly = TimeWindow("24h", NOW)
+        assert (hourly.bucket, hourly.buckets) == (3600, 24)
+        assert hourly.start == datetime(2024, 3, 14, 13, tzinfo=timezone.utc)
+        assert hourly.label(23) == "2024-03-15 12:00"
+
+        monthly = TimeWindow("1m", NOW)
+        assert (monthly.bucket, monthly.buckets) == (86400, 30)
+        assert monthly.previous_start == TODAY - timedelta(days=59)
+
+        for period in ("7", "0d", "7x", "d7", "169h", "367d", "2y", "50y"):
+            with pytest.raises(ValueError):
+                TimeWindow(period, NOW)
+        assert TimeWindow("168h", NOW).buckets == 168
+        assert TimeWindow("1y", NOW).buckets == 365
+
+
+class TestAdvancedAnalyticsService:
+    """Тесты метрик по данным БД"""
+
+    def test_dashboard_metrics(self, data, service):
+        """Тест: ряды и итоги дашборда совпадают с расчетом в Python"""
+        metrics = service.get_dashboard_metrics(1, "7d")
+        start = TODAY - timedelta(days=6)
+
+        active_by_day = defaultdict(set)
+        for created_at, user_id in data["events"]:
+            if created_at >= start:
+                active_by_day[day_of(created_at)].add(user_id)
+        assert_series(
+            metrics["user_engagement"]["daily_active_users"],
+            expected_series(
+                {day: len(users) for day, users in active_by_day.items()}, 7
+            ),
+        )
+
+        current = [o for o in data["orders"] if o[0] >= start]
+        previous = [
+            o for o in data["orders"] if start - timedelta(days=7) <= o[0] < start
+        ]
+        revenue = sum(o[3] * o[4] for o in current)
+        overview = metrics["overview"]
+        assert overview["total_users"] == len(data["users"])
+        assert overview["active_users"] == len(set().union(*active_by_day.values()))
+        assert overview["total_orders"] == len(current)
+        assert overview["revenue"] == pytest.approx(revenue)
+        assert overview["growth_rate"] == pytest.approx(
+            growth_rate(revenue, sum(o[3] * o[4] for o in previous)), abs=0.01
+        )
+        assert metrics["ecommerce_metrics"]["orders_today"] == len(
+            [o for o in current if o[0] >= TODAY]
+        )
+
+        top_content = metrics["content_performance"]["top_content"]
+        assert [item["id"] for item in top_content] == data["posts"][::-1]
+        assert sum(item["likes"] for item in top_content) == len(
+            [like for like in data["likes"] if like[0] >= start]
+        )
+
+    def test_business_analytics(self, data, service):
+        """Тест: выручка по дням и топ товаров совпадают с расчетом в Python"""
+        analytics = service.get_business_analytics("30d")
+        start = TODAY - timedelta(days=29)
+
+        revenue_by_day = defaultdict(float)
+        sales = defaultdict(lambda: [0, 0.0])
+        for created_at, _, product_id, quantity, price in data["orders"]:
+            if created_at >= start:
+                revenue_by_day[day_of(created_at)] += quantity * price
+                sales[product_id][0] += quantity
+                sales[product_id][1] += quantity * price
+        assert_series(
+            analytics["revenue"]["daily"], expected_series(revenue_by_day, 30)
+        )
+
+        top = sorted(sales, key=lambda product_id: -sales[product_id][1])
+        top_selling = analytics["products"]["top_selling"]
+        assert [item["id"] for item in top_selling] == top
+        for item in top_selling:
+            assert item["sales"] == sales[item["id"]][0]
+            assert item["revenue"] == pytest.approx(sales[item["id"]][1])
+
+        low_performing = analytics["products"]["low_performing"]
+        assert low_performing[0]["id"] == data["products"][-1]
+        assert low_performing[0]["revenue"] == 0
+
+        customers = analytics["customers"]
+        buyers = {o[1] for o in data["orders"] if o[0] >= start}
+        earlier = {o[1] for o in data["orders"] if o[0] < start}
+        assert customers["active_customers"] == len(buyers)
+        assert customers["returning_customers"] == len(buyers & earlier)
+        assert customers["new_customers"] == len(buyers - earlier)
+
+    def test_trending_metrics(self, data, service):
+        """Тест: трендовые метрики отсортированы по значению за период"""
+        content = service.get_trending_metrics("content", "7d")
+        assert [item["id"] for item in content] == data["posts"][::-1]
+
+        users = service.get_trending_metrics("users", "7d")
+        assert [(item["user_id"], item["new_followers"]) for item in users] == [
+            (data["users"][2], 2),
+            (data["users"][5], 1),
+        ]
+        assert users[0]["growth"] == 100.0
+
+        products = service.get_trending_metrics("products", "7d")
+        assert data["products"][-1] not in [item["id"] for item in products]
+        assert service.get_trending_metrics("unknown") == []
+
+    def test_results_cached_per_period(self, data, service):
+        """Тест: повторный запрос за тот же период берется из кэша"""
+        first = service.get_dashboard_metrics(1, "7d")
+
+        session = TestingSessionLocal()
+        session.add(
+            ecommerce_models.Order(
+                user_id=data["users"][0], total_amount=1000.0, created_at=NOW
+            )
+        )
+        session.commit()
+        session.close()
+
+        assert service.get_dashboard_metrics(2, "7d") is first
+        fresh = service.get_dashboard_metrics(1, "14d")
+        assert (
+            fresh["overview"]["total_orders"]
+            == len([o for o in data["orders"] if o[0] >= TODAY - timedelta(days=13)])
+            + 1
+        )
+
+        with pytest.raises(ValueError):
+            service.get_business_analytics("month")
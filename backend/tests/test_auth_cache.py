@@ -0,0 +1,207 @@
+"""
+Тесты кэша аутентификации
+"""
+
+import pytest
+from datetime import timedelta
+from fastapi import HTTPException
+from fastapi.security import HTTPAuthorizationCredentials
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+import auth
+from models import Base, User
+import models_package.ecommerce
+import models_package.social
+import models_package.tasks
+import models_package.content
+import models_package.analytics
+
+engine = create_engine(
+    "sqlite://",
+    connect_args={"check_same_thread": False},
+    poolclass=StaticPool,
+)
+TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+
+class QueryCounter:
+    """Счетчик SQL-запросов, выполненных через engine"""
+
+    def __init__(self, bind):
+        self.bind = bind
+        self.count = 0
+
+    def _on_execute(self, *args, **kwargs):
+        self.count += 1
+
+    def __enter__(self):
+        event.listen(self.bind, "before_cursor_execute", self._on_execute)
+        return self
+
+    def __exit__(self, *exc):
+        event.remove(self.bind, "before_cursor_execute", self._on_execute)
+
+
+@pytest.fixture(scope="module", autouse=True)
+def database():
+    """Тестовая база с одним пользователем"""
+    Base.metadata.create_all(bind=engine)
+    db = TestingSessionLocal()
+    db.add(
+        User(
+            email="cached@example.com",
+            username="cacheduser",
+            full_name="Cached User",
+            hashed_password=auth.get_password_hash("cachedpass123"),
+        )
+    )
+    db.commit()
+    db.close()
+    yield
+    Base.metadata.drop_all(bind=engine)
+
+
+@pytest.fixture(autouse=True)
+def clear_caches():
+    """Каждый тест начинается с пустых кэшей"""
+    auth.token_cache.clear()
+    auth.user_cache.clear()
+    yield
+    auth.token_cache.clear()
+    auth.user_cache.clear()
+
+
+def credentials_for(email, expires_delta=None):
+    """Bearer-учетные данные для пользователя"""
+    token = auth.create_access_token({"sub": email}, expires_delta)
+    return HTTPAuthorizationCredentials(scheme="Bearer", credentials=token)
+
+
+def resolve_user(credentials):
+    """Вызвать get_current_user в новой сессии, как это делает FastAPI"""
+    db = TestingSessionLocal()
+    with QueryCounter(engine) as counter:
+        user = auth.get_current_user(credentials=credentials, db=db)
+        user_data = (user.id, user.full_name, user.is_active)
+    db.close()
+    return user_data, counter.count
+
+
+class TestAuthCache:
+    """Тесты кэша пользователей и токенов"""
+
+    def test_repeated_requests_skip_query_and_decode(self, monkeypatch):
+        """Тест: повторный запрос с тем же токеном не обращается к БД и JWT"""
+        credentials = credentials_for("cached@example.com")
+        decode_calls = []
+        original_decode = auth.jwt.decode
+
+        def counting_decode(*args, **kwargs):
+            decode_calls.append(args)
+            return original_decode(*args, **kwargs)
+
+        monkeypatch.setattr(auth.jwt, "decode", counting_decode)
+
+        first, first_queries = resolve_user(credentials)
+        second, second_queries = resolve_user(credentials)
+
+        assert first == second
+        assert first_queries == 1
+        assert second_queries == 0
+        assert len(decode_calls) == 1
+
+    def test_cached_user_is_attached_to_session(self):
+        """Тест: пользователь из кэша изменяется и сохраняется как обычно"""
+        credentials = credentials_for("cached@example.com")
+        resolve_user(credentials)
+
+        db = TestingSessionLocal()
+        user = auth.get_current_user(credentials=credentials, db=db)
+        assert user in db
+        user.full_name = "Renamed User"
+        db.commit()
+        db.close()
+
+        (_, full_name, _), queries = resolve_user(credentials)
+        assert full_name == "Renamed User"
+        # Изменение профиля сбросило кэш, пользователь загружен заново
+        assert queries == 1
+
+    def test_deactivation_invalidates_cache(self):
+        """Тест: деактивация пользователя сразу видна в get_current_user"""
+        credentials = credentials_for("cached@example.com")
+        (_, _, is_active), _ = resolve_user(credentials)
+        assert is_active is True
+
+        db = TestingSessionLocal()
+        user = db.query(User).filter(User.email == "cached@example.com").first()
+        user.is_active = False
+        db.commit()
+
+        (_, _, is_active), queries = resolve_user(credentials)
+        assert is_active is False
+        assert queries == 1
+
+        user.is_active = True
+        db.commit()
+        db.close()
+
+    def test_expired_token_not_served_from_cache(self):
+        """Тест: истекший токен отклоняется даже при наличии записи в кэше"""
+        credentials = credentials_for("cached@example.com", timedelta(seconds=-1))
+        auth.token_cache.set(credentials.credentials, ("cached@example.com", 0), ttl=60)
+
+        with pytest.raises(HTTPException) as exc_info:
+            resolve_user(credentials)
+        assert exc_info.value.status_code == 401
+
+    def test_cache_metrics(self):
+        """Тест: попадания и промахи попадают в метрики"""
+        counter = auth.metrics_collector.auth_cache_requests
+        hits_before = counter.labels(cache="user", result="hit")._value.get()
+        misses_before = counter.labels(cache="user", result="miss")._value.get()
+
+        credentials = credentials_for("cached@example.com")
+        resolve_user(credentials)
+        resolve_user(credentials)
+
+        assert counter.labels(cache="user", result="hit")._value.get() == (
+            hits_before + 1
+        )
+        assert counter.labels(cache="user", result="miss")._value.get() == (
+            misses_before + 1
+        )
+
+    def test_counters_not_served_from_cache(self):
+        """Тест: счетчики после подписки не берутся из кэша пользователя"""
+        from schemas.social import FollowCreate
+        from services.social_service import SocialService
+
+        db = TestingSessionLocal()
+        author = User(
+            email="author@example.com", username="author", hashed_password="x"
+        )
+        db.add(author)
+        db.commit()
+        author_id = author.id
+        db.close()
+
+        credentials = credentials_for("cached@example.com")
+        resolve_user(credentials)
+
+        db = TestingSessionLocal()
+        user = auth.get_current_user(credentials=credentials, db=db)
+        service = SocialService(db)
+        service.follow_user(FollowCreate(following_id=author_id), user)
+        db.close()
+
+        db = TestingSessionLocal()
+        user = auth.get_current_user(credentials=credentials, db=db)
+        profile = SocialService(db).get_user_profile(user.id, user)
+        assert profile["following_count"] == 1
+        assert (
+            SocialService(db).get_user_profile(author_id, user)["followers_count"] == 1
+        )
+        db.close()
@@ -0,0 +1,376 @@
+"""
+Тесты сервиса кэширования
+"""
+
+import asyncio
+import pytest
+from fakeredis import FakeAsyncRedis, FakeServer
+
+import services.cache_backends as cache_backends
+import services.cache_service as cache_module
+from config import Settings
+from services.cache_service import CacheService, cache_result
+from services.cache_backends import (
+    CacheBackend,
+    MemoryCacheBackend,
+    RedisCacheBackend,
+    create_cache_backend,
+)
+
+
+def make_backend(kind, server=None):
+    """Хранилище кэша: в памяти или в Redis-заглушке"""
+    if kind == "memory":
+        return MemoryCacheBackend()
+    client = FakeAsyncRedis(server=server or FakeServer())
+    return RedisCacheBackend(client=client, key_prefix="test-cache:")
+
+
+@pytest.fixture(params=["memory", "redis"])
+def cache(request):
+    """Сервис кэширования для каждого хранилища"""
+    return CacheService(make_backend(request.param))
+
+
+class TestCacheService:
+    """Тесты операций кэша на всех хранилищах"""
+
+    @pytest.mark.asyncio
+    async def test_get_set_delete(self, cache):
+        """Тест базовых операций"""
+        value = {"items": [1, 2, 3], "total": 3}
+
+        assert await cache.get("products:1") is None
+        assert await cache.set("products:1", value, ttl=60) is True
+        assert await cache.get("products:1") == value
+        assert await cache.delete("products:1") is True
+        assert await cache.get("products:1") is None
+
+        stats = await cache.get_stats()
+        assert stats["hits"] == 1
+        assert stats["misses"] == 2
+
+    @pytest.mark.asyncio
+    async def test_get_many_set_many(self, cache):
+        """Тест массовых операций"""
+        await cache.set_many({"a": 1, "b": [2], "c": {"x": 3}}, ttl=60)
+
+        assert await cache.get_many(["a", "b", "c", "missing"]) == {
+            "a": 1,
+            "b": [2],
+            "c": {"x": 3},
+        }
+
+    @pytest.mark.asyncio
+    async def test_delete_pattern(self, cache):
+        """Тест удаления по шаблону, включая спецсимволы glob"""
+        await cache.set("products:1", 1)
+        await cache.set("products:2", 2)
+        await cache.set("orders:1", 3)
+        await cache.set("weird*[key]", 4)
+
+        assert await cache.delete_pattern("products:") == 2
+        assert await cache.delete_pattern("*[") == 1
+        assert await cache.get("orders:1") == 3
+
+    @pytest.mark.asyncio
+    async def test_cache_result_decorator(self, cache, monkeypatch):
+        """Тест декоратора cache_result и сброса по префиксу функции"""
+        monkeypatch.setattr(cache_module, "cache_service", cache)
+        calls = []
+
+        @cache_result(ttl=60, key_prefix="popular_products")
+        async def load(limit, category=None):
+            calls.append(limit)
+            return [{"id": i, "category": category} for i in range(limit)]
+
+        first = await load(3, category="books")
+        second = await load(3, category="books")
+        await load(5, category="books")
+
+        assert first == second
+        assert calls == [3, 5]
+
+        assert await cache.delete_pattern("popular_products") == 2
+        await load(3, category="books")
+        assert calls == [3, 5, 3]
+
+
+class TestCacheResultCoalescing:
+    """Тесты объединения запросов и фонового обновления в cache_result"""
+
+    @pytest.mark.asyncio
+    async def test_concurrent_misses_compute_once(self, cache, monkeypatch):
+        """Тест: одновременные промахи по ключу выполняют функцию один раз"""
+        monkeypatch.setattr(cache_module, "cache_service", cache)
+        calls = []
+
+        @cache_result(ttl=60, key_prefix="hot")
+        async def load(item_id):
+            calls.append(item_id)
+            await asyncio.sleep(0.05)
+            return {"id": item_id}
+
+        results = await asyncio.gather(*(load(1) for _ in range(50)), load(2))
+
+        assert calls.count(1) == 1
+        assert calls.count(2) == 1
+        assert all(result == {"id": 1} for result in results[:50])
+        assert cache._inflight == {}
+
+    @pytest.mark.asyncio
+    async def test_errors_reach_all_waiters_and_are_not_cached(self, cache):
+        """Тест: ошибка вычисления получают все ожидающие, кэш не заполняется"""
+        calls = []
+
+        async def failing():
+            calls.append(1)
+            await asyncio.sleep(0.01)
+            raise RuntimeError("database is down")
+
+        results = await asyncio.gather(
+            *(cache.get_or_set("broken", failing, ttl=60) for _ in range(5)),
+            return_exceptions=True,
+        )
+
+        assert len(calls) == 1
+        assert all(isinstance(result, RuntimeError) for result in results)
+        assert await cache.get("broken") is None
+        assert await cache.get("broken:lock") is None
+
+    @pytest.mark.asyncio
+    async def test_stale_while_revalidate(self, cache, monkeypatch):
+        """Тест: после истечения отдается старое значение и запускается обновление"""
+        now = [1000.0]
+        monkeypatch.setattr(cache_module.time, "time", lambda: now[0])
+        versions = iter(range(1, 100))
+
+        async def compute():
+            return next(versions)
+
+        assert await cache.get_or_set("swr", compute, ttl=10, stale_ttl=60) == 1
+
+        now[0] += 15
+        results = await asyncio.gather(
+            *(cache.get_or_set("swr", compute, ttl=10, stale_ttl=60) for _ in range(5))
+        )
+        # Первый вызов не ждет обновления; остальные могут увидеть уже новое
+        assert results[0] == 1
+        assert set(results) <= {1, 2}
+
+        # Единственное фоновое обновление сохранило новое значение
+        await asyncio.gather(*cache._background_tasks)
+        assert await cache.get_or_set("swr", compute, ttl=10, stale_ttl=60) == 2
+        assert next(versions) == 3
+
+    @pytest.mark.asyncio
+    async def test_probabilistic_early_refresh(self, cache, monkeypatch):
+        """Тест: XFetch обновляет значение до истечения срока"""
+        now = [1000.0]
+        monkeypatch.setattr(cache_module.time, "time", lambda: now[0])
+        versions = iter(range(1, 100))
+
+        async def compute():
+            now[0] += 2  # вычисление занимает 2 секунды
+            return next(versions)
+
+        await cache.get_or_set("early", compute, ttl=60, early_refresh_beta=1.0)
+
+        # Далеко от истечения обновление не происходит даже при малом random()
+        monkeypatch.setattr(cache_module.random, "random", lambda: 0.99)
+        assert (
+            await cache.get_or_set("early", compute, ttl=60, early_refresh_beta=1.0)
+            == 1
+        )
+        assert not cache._background_tasks
+
+        # За несколько секунд до истечения значение обновляется в фоне
+        now[0] += 55
+        assert (
+            await cache.get_or_set("early", compute, ttl=60, early_refresh_beta=1.0)
+            == 1
+        )
+        await asyncio.gather(*cache._background_tasks)
+        assert (
+            await cache.get_or_set("early", compute, ttl=60, early_refresh_beta=1.0)
+            == 2
+        )
+
+    @pytest.mark.asyncio
+    async def test_workers_coalesce_through_shared_lock(self):
+        """Тест: воркеры с общим Redis вычисляют значение один раз"""
+        server = FakeServer()
+        workers = [CacheService(make_backend("redis", server)) for _ in range(3)]
+        calls = []
+
+        async def compute():
+            calls.append(1)
+            await asyncio.sleep(0.1)
+            return "value"
+
+        results = await asyncio.gather(
+            *(worker.get_or_set("shared", compute, ttl=60) for worker in workers)
+        )
+
+        assert results == ["value"] * 3
+        assert len(calls) == 1
+
+
+class TestMemoryCacheBackend:
+    """Тесты вытеснения и сроков действия кэша в памяти"""
+
+    @pytest.mark.asyncio
+    async def test_lru_keeps_recently_used(self):
+        """Тест: вытесняется давно не использованный ключ, а не самый старый"""
+        backend = MemoryCacheBackend(max_items=3)
+        for key in ("a", "b", "c"):
+            await backend.set(key, key, ttl=60)
+
+        await backend.get("a")
+        await backend.set("d", "d", ttl=60)
+
+        assert await backend.get("b") is None
+        assert await backend.get("a") == "a"
+        assert len(backend.memory_cache) == 3
+        assert (await backend.get_stats())["evictions"] == 1
+
+    @pytest.mark.asyncio
+    async def test_byte_budget(self):
+        """Тест: бюджет памяти ограничивает суммарный размер значений"""
+        backend = MemoryCacheBackend(max_items=1000, max_bytes=5000)
+        for i in range(10):
+            await backend.set(f"blob:{i}", b"x" * 1000, ttl=60)
+
+        stats = await backend.get_stats()
+        assert 0 < stats["memory_bytes"] <= 5000
+        assert stats["memory_items"] < 10
+        assert await backend.get("blob:9") is not None
+
+        # Значение больше всего бюджета не вытесняет остальные записи
+        await backend.set("huge", b"x" * 10000, ttl=60)
+        assert await backend.get("huge") is None
+        assert await backend.get("blob:9") is not None
+
+    @pytest.mark.asyncio
+    async def test_expired_entries_purged_from_heap(self, monkeypatch):
+        """Тест: истекшие записи удаляются по куче сроков без полного обхода"""
+        now = [1000.0]
+        monkeypatch.setattr(cache_backends.time, "monotonic", lambda: now[0])
+        backend = MemoryCacheBackend()
+
+        await backend.set("short", 1, ttl=10)
+        await backend.set("long", 2, ttl=100)
+        # Перезапись оставляет устаревший элемент кучи, он не должен удалить ключ
+        await backend.set("short", 3, ttl=50)
+
+        now[0] += 20
+        assert backend._purge_expired(now[0]) == 0
+        assert await backend.get("short") == 3
+
+        now[0] += 40
+        assert backend._purge_expired(now[0]) == 1
+        assert "short" not in backend.memory_cache
+        assert await backend.get("long") == 2
+
+    @pytest.mark.asyncio
+    async def test_tinylfu_rejects_one_hit_wonders(self):
+        """Тест: TinyLFU не вытесняет популярные ключи редкими"""
+        backend = MemoryCacheBackend(max_items=2, eviction_policy="tinylfu")
+        for key in ("hot1", "hot2"):
+            await backend.set(key, key, ttl=60)
+            for _ in range(5):
+                await backend.get(key)
+
+        await backend.get("cold")
+        await backend.set("cold", "cold", ttl=60)
+
+        assert await backend.get("cold") is None
+        assert await backend.get("hot1") == "hot1"
+        assert await backend.get("hot2") == "hot2"
+        assert (await backend.get_stats())["rejected"] == 1
+
+        # Ключ, к которому часто обращаются, все же попадает в кэш
+        for _ in range(10):
+            await backend.get("warm")
+        await backend.set("warm", "warm", ttl=60)
+        assert await backend.get("warm") == "warm"
+
+
+class TestRedisCacheBackend:
+    """Тесты общего Redis-кэша"""
+
+    @pytest.mark.asyncio
+    async def test_cache_shared_between_workers(self):
+        """Тест: два воркера видят общий кэш и общую инвалидацию"""
+        server = FakeServer()
+        worker_a = CacheService(make_backend("redis", server))
+        worker_b = CacheService(make_backend("redis", server))
+
+        await worker_a.set("board:1:cards", ["card"])
+        assert await worker_b.get("board:1:cards") == ["card"]
+
+        assert await worker_b.delete_pattern("board:1") == 1
+        assert await worker_a.get("board:1:cards") is None
+
+    @pytest.mark.asyncio
+    async def test_clear_keeps_foreign_keys(self):
+        """Тест: clear удаляет только ключи кэша с префиксом"""
+        backend = make_backend("redis")
+        await backend.client.set("session:1", b"keep")
+        cache = CacheService(backend)
+        await cache.set("a", 1)
+
+        assert await cache.clear() is True
+        assert await cache.get("a") is None
+        assert await backend.client.get("session:1") == b"keep"
+
+    @pytest.mark.asyncio
+    async def test_ttl_is_set(self):
+        """Тест: значения сохраняются с TTL"""
+        backend = make_backend("redis")
+        await CacheService(backend).set("a", 1, ttl=120)
+
+        assert 0 < await backend.client.ttl("test-cache:a") <= 120
+
+    @pytest.mark.asyncio
+    async def test_backend_errors_degrade_to_miss(self):
+        """Тест: недоступный Redis не ломает вызывающий код"""
+
+        class BrokenClient:
+            async def get(self, key):
+                raise ConnectionError("Redis is down")
+
+            async def set(self, *args, **kwargs):
+                raise ConnectionError("Redis is down")
+
+        cache = CacheService(RedisCacheBackend(client=BrokenClient()))
+
+        assert await cache.get("a") is None
+        assert await cache.set("a", 1) is False
+        assert (await cache.get_stats())["errors"] == 2
+
+
+def test_backend_selected_by_settings():
+    """Тест выбора хранилища через настройки"""
+    assert isinstance(
+        create_cache_backend(Settings(CACHE_BACKEND="memory")), MemoryCacheBackend
+    )
+    redis_backend = create_cache_backend(
+        Settings(CACHE_BACKEND="redis", CACHE_KEY_PREFIX="app:")
+    )
+    assert isinstance(redis_backend, RedisCacheBackend)
+    assert redis_backend.key_prefix == "app:"
+
+    with pytest.raises(ValueError):
+        create_cache_backend(Settings(CACHE_BACKEND="memcached"))
+
+
+def test_incomplete_backend_rejected():
+    """Тест: хранилище без обязательных методов не создается"""
+
+    class GetOnlyBackend(CacheBackend):
+        async def get(self, key):
+            return None
+
+    with pytest.raises(TypeError):
+        GetOnlyBackend()
@@ -0,0 +1,130 @@
+"""
+Тесты пакетной записи событий аналитики
+"""
+
+import asyncio
+import pytest
+from prometheus_client import REGISTRY
+from sqlalchemy import create_engine, func, select
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from models import Base, User
+import models_package.ecommerce
+import models_package.social
+import models_package.tasks
+import models_package.content
+import models_package.analytics as analytics_models
+from schemas.analytics import EventCreate
+from services.analytics_service import AnalyticsService
+from services.event_pipeline import EventPipeline
+from utils.exceptions import ServiceUnavailableError
+
+engine = create_engine(
+    "sqlite://",
+    connect_args={"check_same_thread": False},
+    poolclass=StaticPool,
+)
+TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+
+@pytest.fixture
+def db():
+    Base.metadata.create_all(bind=engine)
+    session = TestingSessionLocal()
+    yield session
+    session.close()
+    Base.metadata.drop_all(bind=engine)
+
+
+def stored_events(session):
+    return session.scalar(
+        select(func.count()).select_from(analytics_models.AnalyticsEvent)
+    )
+
+
+def outcome(name):
+    return REGISTRY.get_sample_value("analytics_events_total", {"outcome": name}) or 0
+
+
+class TestEventPipeline:
+    """Тесты очереди событий"""
+
+    @pytest.mark.asyncio
+    async def test_batches_written_by_size_and_drained_on_stop(self, db):
+        """Тест: полные пачки пишутся сразу, остаток - при остановке"""
+        pipeline = EventPipeline(
+            batch_size=100, flush_interval=60, session_factory=TestingSessionLocal
+        )
+        pipeline.start()
+        for i in range(250):
+            assert pipeline.track("page_view", {"n": i}, user_id=1)
+
+        # Пачка уходит из очереди до коммита записи: ждем строки в БД
+        deadline = asyncio.get_running_loop().time() + 10
+        while stored_events(db) < 200:
+            assert asyncio.get_running_loop().time() < deadline
+            await asyncio.sleep(0.01)
+        assert stored_events(db) == 200
+        assert len(pipeline) == 50
+
+        await pipeline.stop()
+        assert stored_events(db) == 250
+        assert len(pipeline) == 0
+
+    @pytest.mark.asyncio
+    async def test_full_queue_rejects_events(self, db):
+        """Тест: переполненная очередь отклоняет события без записи в БД"""
+        pipeline = EventPipeline(max_size=3, session_factory=TestingSessionLocal)
+        dropped = outcome("dropped")
+
+        results = [pipeline.submit({"event_type": "click"}) for _ in range(5)]
+
+        assert results == [True, True, True, False, False]
+        assert outcome("dropped") - dropped == 2
+        assert stored_events(db) == 0
+
+    @pytest.mark.asyncio
+    async def test_write_failure_counted(self):
+        """Тест: ошибка записи не останавливает очередь и учитывается в метриках"""
+
+        def broken_session():
+            raise RuntimeError("database is down")
+
+        pipeline = EventPipeline(session_factory=broken_session)
+        failed = outcome("failed")
+        pipeline.track("click")
+
+        assert await pipeline.flush() == 0
+        assert outcome("failed") - failed == 1
+        assert pipeline.track("click") is not None
+
+
+class TestAnalyticsServiceEvents:
+    """Тесты событий через AnalyticsService"""
+
+    @pytest.mark.asyncio
+    async def test_track_and_read_events(self, db, monkeypatch):
+        """Тест: событие принимается без записи в БД и читается после сброса"""
+        pipeline = EventPipeline(max_size=2, session_factory=TestingSessionLocal)
+        monkeypatch.setattr("services.analytics_service.event_pipeline", pipeline)
+        user = User(email="events@example.com", username="events", hashed_password="x")
+        db.add(user)
+        db.commit()
+        service = AnalyticsService(db)
+        event = EventCreate(event_type="page_view", event_data={"page": "/"})
+
+        tracked = service.track_event(event, user)
+        service.track_event(event, user)
+        with pytest.raises(ServiceUnavailableError) as error:
+            service.track_event(event, user)
+
+        assert tracked["name"] == "page_view"
+        assert error.value.status_code == 503
+        assert error.value.headers == {"Retry-After": "1"}
+        assert service.get_events(user)["total"] == 0
+
+        await pipeline.flush()
+        result = service.get_events(user, event_type="page_view")
+        assert result["total"] == 2
+        assert result["items"][0]["properties"] == {"page": "/"}
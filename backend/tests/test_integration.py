@@ -7,11 +7,12 @@ import json
 from fastapi.testclient import TestClient
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
-from sqlalchemy.pool import StaticPool
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from sqlalchemy.pool import StaticPool, NullPool
 
 from app import app
-from models import Base, User
-from auth import get_password_hash, get_db
+from models import Base, User, get_async_database_url
+from auth import get_password_hash, get_db, get_async_db
 import models_package.ecommerce as ecommerce_models
 import models_package.social as social_models
 import models_package.tasks as tasks_models
@@ -26,6 +27,14 @@ engine = create_engine(
     poolclass=StaticPool,
 )
 TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# TestClient запускает запросы в разных event loop, поэтому соединения asyncpg
+# не переиспользуются между запросами
+async_engine = create_async_engine(
+    get_async_database_url(SQLALCHEMY_DATABASE_URL), poolclass=NullPool
+)
+AsyncTestingSessionLocal = async_sessionmaker(
+    bind=async_engine, autoflush=False, expire_on_commit=False
+)
 
 
 def override_get_db():
@@ -37,8 +46,15 @@ def override_get_db():
         db.close()
 
 
-# Переопределяем зависимость БД
+async def override_get_async_db():
+    """Переопределение асинхронной зависимости БД для тестов"""
+    async with AsyncTestingSessionLocal() as db:
+        yield db
+
+
+# Переопределяем зависимости БД
 app.dependency_overrides[get_db] = override_get_db
+app.dependency_overrides[get_async_db] = override_get_async_db
 
 client = TestClient(app)
 
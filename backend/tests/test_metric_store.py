@@ -0,0 +1,178 @@
+"""
+Тесты хранилища временных рядов метрик
+"""
+
+import random
+import pytest
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import create_engine, select, func
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from models import Base
+import models_package.ecommerce
+import models_package.social
+import models_package.tasks
+import models_package.content
+import models_package.analytics as analytics_models
+from services.analytics_service import AnalyticsService
+from utils.exceptions import BusinessLogicError
+from services.metric_store import MetricStore, QuantileSketch, to_epoch
+
+engine = create_engine(
+    "sqlite://",
+    connect_args={"check_same_thread": False},
+    poolclass=StaticPool,
+)
+TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+BASE_TIME = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+
+@pytest.fixture
+def db():
+    Base.metadata.create_all(bind=engine)
+    session = TestingSessionLocal()
+    metric = analytics_models.Metric(name="latency", metric_type="histogram")
+    session.add(metric)
+    session.commit()
+    yield session, metric.id
+    session.close()
+    Base.metadata.drop_all(bind=engine)
+
+
+def make_samples(count, seconds_apart, seed=1):
+    rng = random.Random(seed)
+    return [
+        (
+            rng.lognormvariate(3, 0.5),
+            BASE_TIME + timedelta(seconds=i * seconds_apart),
+            None,
+        )
+        for i in range(count)
+    ]
+
+
+def exact_p95(values):
+    ordered = sorted(values)
+    return ordered[int(0.95 * (len(ordered) - 1))]
+
+
+class TestMetricStore:
+    """Тесты записи значений и выборки по агрегатам"""
+
+    def test_rollups_match_raw_values(self, db):
+        """Тест: ряд из часовых агрегатов совпадает с расчетом по сырым значениям"""
+        session, metric_id = db
+        store = MetricStore(session)
+        samples = make_samples(6000, 7)
+
+        # Пачки пересекают границы интервалов: агрегаты дополняются
+        for offset in range(0, len(samples), 700):
+            store.ingest(metric_id, samples[offset : offset + 700])
+
+        result = store.query(
+            metric_id, BASE_TIME, BASE_TIME + timedelta(hours=12), step=3600
+        )
+
+        assert result["resolution"] == "1h"
+        assert len(result["points"]) == 12
+        for point in result["points"]:
+            start = datetime.fromisoformat(point["timestamp"])
+            values = [
+                value
+                for value, timestamp, _ in samples
+                if start <= timestamp < start + timedelta(hours=1)
+            ]
+            assert point["count"] == len(values)
+            assert point["avg"] == pytest.approx(sum(values) / len(values))
+            assert point["min"] == min(values)
+            assert point["max"] == max(values)
+            assert point["p95"] == pytest.approx(exact_p95(values), rel=0.02)
+
+    def test_coarsest_rollup_chosen(self, db):
+        """Тест: длинный период читается из самых крупных подходящих агрегатов"""
+        session, metric_id = db
+        store = MetricStore(session)
+        store.ingest(metric_id, make_samples(3000, 60 * 28))
+        end = BASE_TIME + timedelta(days=60)
+
+        month = store.query(metric_id, BASE_TIME, end, max_points=100)
+        assert month["resolution"] == "1d"
+        assert sum(point["count"] for point in month["points"]) == 3000
+
+        daily = store.query(metric_id, BASE_TIME, end, step=86400 * 7)
+        assert (daily["resolution"], daily["step"]) == ("1d", 86400 * 7)
+
+        raw = store.query(metric_id, BASE_TIME, BASE_TIME + timedelta(hours=1), step=90)
+        assert raw["resolution"] == "raw"
+        assert sum(point["count"] for point in raw["points"]) == 3
+
+        # Явный шаг не обходит ограничение числа точек
+        with pytest.raises(ValueError):
+            store.query(metric_id, BASE_TIME, end, step=1)
+        with pytest.raises(ValueError):
+            store.query(metric_id, BASE_TIME, end, step=86400, max_points=59)
+        days = store.query(metric_id, BASE_TIME, end, step=86400)
+        assert sum(point["count"] for point in days["points"]) == 3000
+
+    def test_rebuild_rollups(self, db):
+        """Тест: агрегаты пересчитываются по сырым значениям"""
+        session, metric_id = db
+        store = MetricStore(session)
+        store.ingest(metric_id, make_samples(500, 30))
+        before = store.query(
+            metric_id, BASE_TIME, BASE_TIME + timedelta(hours=5), step=3600
+        )
+
+        assert store.rebuild_rollups(metric_id, chunk_size=100) == 500
+        rollups = session.scalar(
+            select(func.count()).select_from(analytics_models.MetricRollup)
+        )
+        assert rollups == 250 + 5 + 1
+        after = store.query(
+            metric_id, BASE_TIME, BASE_TIME + timedelta(hours=5), step=3600
+        )
+        assert after["points"] == before["points"]
+
+    def test_service_accepts_naive_period(self, db):
+        """Тест: начало периода без часового пояса считается UTC"""
+        session, metric_id = db
+        MetricStore(session).ingest(metric_id, make_samples(120, 60))
+        service = AnalyticsService(session)
+
+        result = service.get_metric_data(
+            metric_id,
+            user=None,
+            start=datetime(2024, 1, 1),
+            end=BASE_TIME + timedelta(hours=2),
+            step=3600,
+        )
+        assert [point["count"] for point in result["points"]] == [60, 60]
+
+        with pytest.raises(BusinessLogicError):
+            service.get_metric_data(metric_id, user=None, start=BASE_TIME, step=1)
+
+        # Конец периода по умолчанию - текущее время в UTC
+        assert (
+            service.get_metric_data(
+                metric_id, user=None, start=datetime.now() - timedelta(hours=1)
+            )["points"]
+            == []
+        )
+
+    def test_sketch_merge(self):
+        """Тест: объединение гистограмм равно гистограмме всех значений"""
+        values = [-5.0, 0.0, 0.5, 1.0, 2.0, 3.5, 100.0, 250.0]
+        left, right, whole = QuantileSketch(), QuantileSketch(), QuantileSketch()
+        for i, value in enumerate(values):
+            (left if i % 2 else right).add(value)
+            whole.add(value)
+
+        left.merge(QuantileSketch.from_dict(right.to_dict()))
+
+        assert left.to_dict() == whole.to_dict()
+        assert left.quantile(0.0) == pytest.approx(-5.0, rel=0.02)
+        assert left.quantile(0.5) == pytest.approx(1.0, rel=0.02)
+        assert left.quantile(1.0) == pytest.approx(250.0, rel=0.02)
+        assert to_epoch(datetime(1970, 1, 1, 0, 1)) == 60
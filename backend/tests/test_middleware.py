@@ -0,0 +1,321 @@
+"""
+Тесты конвейера middleware
+"""
+
+import asyncio
+import pytest
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+from fastapi.testclient import TestClient
+from prometheus_client import REGISTRY
+
+from middleware import (
+    PipelineStage,
+    RequestContext,
+    RequestPipeline,
+    SecurityStage,
+    get_request_context,
+)
+from monitoring import MetricsCollector, MetricsStage
+from services.security_service import security_service
+
+
+class RecordingStage(PipelineStage):
+    """Этап, запоминающий контексты завершенных запросов"""
+
+    def __init__(self, reject_path=None):
+        self.reject_path = reject_path
+        self.finished = []
+
+    async def on_request(self, context):
+        if context.path == self.reject_path:
+            return JSONResponse({"detail": "Rate limit exceeded"}, status_code=429)
+        return None
+
+    def on_response_end(self, context):
+        self.finished.append(context)
+
+
+def make_app(*stages) -> FastAPI:
+    test_app = FastAPI()
+
+    @test_app.get("/items/{item_id}")
+    async def get_item(item_id: int, request: Request):
+        context = request.state.request_context
+        return {"client_ip": context.client_ip, "route": context.route_template}
+
+    @test_app.get("/framed")
+    async def framed():
+        return JSONResponse({}, headers={"X-Frame-Options": "SAMEORIGIN"})
+
+    @test_app.get("/fail")
+    async def fail():
+        raise RuntimeError("boom")
+
+    @test_app.get("/missing")
+    async def missing():
+        raise HTTPException(status_code=404)
+
+    test_app.add_middleware(RequestPipeline, stages=list(stages))
+    return test_app
+
+
+class TestRequestPipeline:
+    """Тесты RequestPipeline и общего контекста"""
+
+    def test_context_shared_with_endpoint(self):
+        """Тест: обработчик и этапы получают один и тот же контекст"""
+        stage = RecordingStage()
+        client = TestClient(make_app(stage))
+
+        response = client.get(
+            "/items/7?page=2", headers={"X-Forwarded-For": "203.0.113.9, 10.0.0.1"}
+        )
+
+        assert response.json() == {
+            "client_ip": "203.0.113.9",
+            "route": "/items/{item_id}",
+        }
+        context = stage.finished[0]
+        assert (context.method, context.path, context.query_string) == (
+            "GET",
+            "/items/7",
+            "page=2",
+        )
+        assert context.status_code == 200
+        assert context.response_size == len(response.content)
+        assert context.error is None
+
+    def test_rejected_request_passes_response_hooks(self):
+        """Тест: ответ этапа проходит через хуки предшествующих этапов"""
+        outer = RecordingStage()
+        stage = RecordingStage(reject_path="/items/1")
+        inner = RecordingStage()
+        client = TestClient(make_app(outer, SecurityStage(enforce=False), stage, inner))
+
+        response = client.get("/items/1")
+
+        assert response.status_code == 429
+        assert response.headers["x-frame-options"] == "DENY"
+        assert outer.finished[0].status_code == 429
+        assert outer.finished[0].route_template is None
+        assert len(stage.finished) == 1
+        assert inner.finished == []
+
+    def test_exception_recorded(self):
+        """Тест: исключение приложения доступно этапам и пробрасывается"""
+        stage = RecordingStage()
+        client = TestClient(make_app(stage), raise_server_exceptions=False)
+
+        assert client.get("/fail").status_code == 500
+        context = stage.finished[0]
+        assert isinstance(context.error, RuntimeError)
+        assert context.status_code is None
+
+    @pytest.mark.asyncio
+    async def test_streaming_response_not_buffered(self):
+        """Тест: части потокового ответа передаются до завершения генератора"""
+        produced = []
+
+        async def stream():
+            for chunk in (b"first", b"second"):
+                produced.append(chunk)
+                yield chunk
+
+        async def endpoint(scope, receive, send):
+            await StreamingResponse(stream())(scope, receive, send)
+
+        delivered = []
+
+        async def send(message):
+            if message["type"] == "http.response.body" and message.get("body"):
+                delivered.append((message["body"], len(produced)))
+
+        async def receive():
+            await asyncio.sleep(1)
+            return {"type": "http.disconnect"}
+
+        pipeline = RequestPipeline(endpoint, [SecurityStage(enforce=False)])
+        scope = {"type": "http", "method": "GET", "path": "/stream", "headers": []}
+        await pipeline(scope, receive, send)
+
+        assert delivered == [(b"first", 1), (b"second", 2)]
+        assert get_request_context(scope).response_size == len(b"firstsecond")
+
+    def test_duplicate_headers(self):
+        """Тест: заголовки разбираются один раз, первое значение побеждает"""
+        context = RequestContext(
+            {
+                "type": "http",
+                "method": "GET",
+                "path": "/",
+                "headers": [(b"x-real-ip", b"198.51.100.1"), (b"x-real-ip", b"x")],
+                "client": ("127.0.0.1", 5000),
+            }
+        )
+
+        assert context.client_ip == "198.51.100.1"
+        assert context.headers == {"x-real-ip": "198.51.100.1"}
+        assert len(context.header_items) == 2
+
+
+class TestSecurityStage:
+    """Тесты этапа безопасности"""
+
+    def test_security_headers_replace_app_values(self):
+        """Тест: заголовки безопасности добавляются и заменяют значения приложения"""
+        client = TestClient(make_app(SecurityStage(enforce=False)))
+
+        response = client.get("/framed")
+
+        assert response.headers["x-frame-options"] == "DENY"
+        assert response.headers.get_list("x-frame-options") == ["DENY"]
+        assert response.headers["content-security-policy"] == "default-src 'self'"
+        assert response.headers["permissions-policy"].startswith("geolocation=()")
+
+    def test_checks_disabled_by_default(self):
+        """Тест: проверки запроса выключены настройкой по умолчанию"""
+        client = TestClient(make_app(SecurityStage()))
+
+        assert client.get("/items/1?file=../../etc/passwd").status_code == 200
+
+    def test_enforced_checks(self, monkeypatch):
+        """Тест: черный список IP и паттерны атак отклоняют запрос"""
+        monkeypatch.setattr(security_service, "blocked_ips", {"203.0.113.66"})
+        client = TestClient(make_app(SecurityStage(enforce=True)))
+        # Accept: */* совпадает с паттерном SQL-комментария
+        headers = {"X-Forwarded-For": "10.1.2.3", "Accept": "application/json"}
+
+        assert client.get("/items/1", headers=headers).status_code == 200
+        assert client.get("/items/1?file=../../etc", headers=headers).status_code == 400
+        headers["X-Forwarded-For"] = "203.0.113.66"
+        response = client.get("/items/1", headers=headers)
+        assert response.status_code == 403
+        assert response.headers["x-content-type-options"] == "nosniff"
+
+
+class TestMetricsStage:
+    """Тесты этапа метрик"""
+
+    def sample(self, name, **labels):
+        return REGISTRY.get_sample_value(name, labels) or 0
+
+    def test_labels_use_route_template(self):
+        """Тест: метка endpoint - шаблон маршрута, а не путь запроса"""
+        client = TestClient(
+            make_app(MetricsStage(MetricsCollector())), raise_server_exceptions=False
+        )
+        series = {
+            "item": ("http_requests_total", "/items/{item_id}", "200"),
+            "unmatched": ("http_requests_total", "unmatched", "404"),
+        }
+        before = {
+            key: self.sample(name, method="GET", endpoint=endpoint, status_code=status)
+            for key, (name, endpoint, status) in series.items()
+        }
+        size_before = self.sample(
+            "http_response_size_bytes_sum", method="GET", endpoint="/items/{item_id}"
+        )
+        errors_before = {
+            "/missing": self.sample(
+                "http_errors_total",
+                method="GET",
+                endpoint="/missing",
+                error_type="client_error",
+            ),
+            "/fail": self.sample(
+                "http_errors_total",
+                method="GET",
+                endpoint="/fail",
+                error_type="exception",
+            ),
+        }
+
+        sizes = [len(client.get(f"/items/{i}").content) for i in range(3)]
+        client.get("/no/such/path/42")
+        client.get("/missing")
+        client.get("/fail")
+
+        for key, (name, endpoint, status) in series.items():
+            after = self.sample(
+                name, method="GET", endpoint=endpoint, status_code=status
+            )
+            assert after - before[key] == (3 if key == "item" else 1)
+        assert (
+            self.sample(
+                "http_requests_total",
+                method="GET",
+                endpoint="/items/0",
+                status_code="200",
+            )
+            == 0
+        )
+        assert self.sample(
+            "http_response_size_bytes_sum",
+            method="GET",
+            endpoint="/items/{item_id}",
+        ) - size_before == sum(sizes)
+        assert (
+            self.sample(
+                "http_errors_total",
+                method="GET",
+                endpoint="/missing",
+                error_type="client_error",
+            )
+            == errors_before["/missing"] + 1
+        )
+        assert (
+            self.sample(
+                "http_errors_total",
+                method="GET",
+                endpoint="/fail",
+                error_type="exception",
+            )
+            == errors_before["/fail"] + 1
+        )
+
+    def test_active_connections_tracked(self):
+        """Тест: запросы в обработке учитываются и снимаются по завершении"""
+        collector = MetricsCollector()
+        seen = []
+
+        class ProbeStage(PipelineStage):
+            async def on_request(self, context):
+                seen.append(
+                    (
+                        self.value("http_active_connections"),
+                        self.value("http_requests_in_flight", method="GET"),
+                    )
+                )
+
+            @staticmethod
+            def value(name, **labels):
+                return REGISTRY.get_sample_value(name, labels) or 0
+
+        client = TestClient(
+            make_app(MetricsStage(collector), ProbeStage()),
+            raise_server_exceptions=False,
+        )
+        active = self.sample("http_active_connections")
+        in_flight = self.sample("http_requests_in_flight", method="GET")
+
+        client.get("/items/1")
+        client.get("/fail")
+
+        assert seen == [(active + 1, in_flight + 1)] * 2
+        assert self.sample("http_active_connections") == active
+        assert self.sample("http_requests_in_flight", method="GET") == in_flight
+
+    def test_label_cardinality_capped(self, monkeypatch):
+        """Тест: новые значения меток сверх лимита сводятся к "other" """
+        collector = MetricsCollector()
+        monkeypatch.setattr(collector, "_endpoints", set())
+        monkeypatch.setattr(collector, "max_endpoints", 2)
+
+        assert collector.endpoint_label("/a") == "/a"
+        assert collector.endpoint_label("/b") == "/b"
+        assert collector.endpoint_label("/c") == "other"
+        assert collector.endpoint_label("/a") == "/a"
+        assert collector.endpoint_label(None) == "unmatched"
+        assert collector.method_label("GET") == "GET"
+        assert collector.method_label("BREW") == "other"
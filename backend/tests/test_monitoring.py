@@ -2,14 +2,34 @@
 Тесты мониторинга
 """
 
+import asyncio
+import time
 import pytest
+from dataclasses import replace
 from fastapi.testclient import TestClient
 from app import app
-from monitoring import MetricsCollector, HealthChecker
+from config import settings
+from monitoring import (
+    MetricsCollector,
+    HealthChecker,
+    SystemMetricsSampler,
+    system_sampler,
+)
+from services.monitoring_service import LogLevel, MonitoringService
+from utils.ring_buffer import RingBuffer
 
 client = TestClient(app)
 
 
+def pool_wait_count(collector):
+    """Число наблюдений гистограммы ожидания пула"""
+    return next(
+        sample.value
+        for sample in collector.db_pool_wait_time.collect()[0].samples
+        if sample.name.endswith("_count")
+    )
+
+
 class TestMonitoringEndpoints:
     """Тесты endpoints мониторинга"""
 
@@ -38,10 +58,11 @@ class TestMonitoringEndpoints:
         """Тест endpoint готовности"""
         response = client.get("/ready")
 
-        assert response.status_code == 200
+        # Без доступных зависимостей проба получает 503
         data = response.json()
         assert "status" in data
         assert "timestamp" in data
+        assert response.status_code == (200 if data["status"] == "ready" else 503)
 
     def test_metrics_endpoint(self):
         """Тест endpoint метрик"""
@@ -130,6 +151,90 @@ class TestMetricsCollector:
         cpu_usage = sum(sample.value for sample in cpu_samples)
         assert cpu_usage >= 0
 
+    def test_instrument_engine_pool_metrics(self, tmp_path):
+        """Тест метрик пула соединений БД"""
+        from sqlalchemy import create_engine, text
+        from models import get_engine_options
+        from config import Settings
+
+        collector = MetricsCollector()
+        db_settings = Settings(DB_POOL_SIZE=2, DB_MAX_OVERFLOW=1)
+        options = get_engine_options(db_settings)
+        options.pop("connect_args", None)
+        engine = create_engine(f"sqlite:///{tmp_path / 'pool.db'}", **options)
+
+        checkouts_before = collector.db_pool_checkouts._value.get()
+        active_before = collector.database_connections._value.get()
+        wait_sum_before = collector.db_pool_wait_time._sum.get()
+        wait_count_before = pool_wait_count(collector)
+        size_before = collector.db_pool_size._value.get()
+        collector.instrument_engine(engine)
+
+        connection = engine.connect()
+        connection.execute(text("SELECT 1"))
+        assert collector.database_connections._value.get() == active_before + 1
+        assert collector.db_pool_size._value.get() == size_before + 2
+
+        connection.close()
+        assert collector.database_connections._value.get() == active_before
+        assert collector.db_pool_checkouts._value.get() == checkouts_before + 1
+        assert collector.db_pool_checkins._value.get() >= 1
+        assert collector.db_pool_wait_time._sum.get() > wait_sum_before
+        # Ожидание записывается один раз на checkout, даже если приложение
+        # подключило к тому же сборщику другие engine
+        assert pool_wait_count(collector) == wait_count_before + 1
+        assert engine.pool.wait_observers == [collector.record_pool_wait]
+
+        engine.dispose()
+        assert engine.pool.wait_observers == [collector.record_pool_wait]
+
+    def test_engine_options_from_settings(self):
+        """Тест параметров пула из настроек"""
+        from models import get_engine_options
+        from config import Settings
+
+        options = get_engine_options(
+            Settings(
+                DATABASE_URL="postgresql://user:pass@db:5432/app",
+                DB_POOL_SIZE=20,
+                DB_MAX_OVERFLOW=5,
+                DB_POOL_RECYCLE=600,
+                DB_STATEMENT_TIMEOUT_MS=5000,
+            )
+        )
+
+        assert options["pool_size"] == 20
+        assert options["max_overflow"] == 5
+        assert options["pool_recycle"] == 600
+        assert options["pool_pre_ping"] is True
+        assert options["connect_args"] == {"options": "-c statement_timeout=5000"}
+
+    def test_async_engine_options_from_settings(self):
+        """Тест параметров async engine и URL драйвера asyncpg"""
+        from models import get_engine_options, get_async_database_url
+        from utils.database import InstrumentedAsyncQueuePool
+        from config import Settings
+
+        options = get_engine_options(
+            Settings(
+                DATABASE_URL="postgresql://user:pass@db:5432/app",
+                DB_STATEMENT_TIMEOUT_MS=5000,
+            ),
+            async_mode=True,
+        )
+
+        assert options["poolclass"] is InstrumentedAsyncQueuePool
+        assert options["connect_args"] == {
+            "server_settings": {"statement_timeout": "5000"}
+        }
+        assert (
+            get_async_database_url("postgresql://user:pass@db:5432/app")
+            == "postgresql+asyncpg://user:pass@db:5432/app"
+        )
+        assert get_async_database_url("sqlite:///./app.db") == (
+            "sqlite+aiosqlite:///./app.db"
+        )
+
 
 class TestHealthChecker:
     """Тесты проверки здоровья"""
@@ -211,7 +316,243 @@ class TestHealthChecker:
         assert "cpu" in result["checks"]
 
         # Проверяем, что статус валидный
-        assert result["status"] in ["healthy", "unhealthy"]
+        assert result["status"] in ["healthy", "degraded", "unhealthy"]
+
+
+class TestHealthCheckRunner:
+    """Тесты параллельного выполнения и кэширования проверок"""
+
+    def make_checker(self, checks, **kwargs):
+        checker = HealthChecker(**kwargs)
+        checker.checks = checks
+        checker.critical = {"fast", "slow"}
+        return checker
+
+    @pytest.mark.asyncio
+    async def test_checks_run_concurrently_with_timeout(self):
+        """Тест: проверки идут параллельно, зависшая ограничена таймаутом"""
+
+        async def fast():
+            await asyncio.sleep(0.05)
+            return {"status": "healthy"}
+
+        async def slow():
+            await asyncio.sleep(10)
+            return {"status": "healthy"}
+
+        async def optional():
+            await asyncio.sleep(0.05)
+            raise ConnectionError("refused")
+
+        checker = self.make_checker(
+            {"fast": fast, "fast2": fast, "optional": optional},
+            timeout=0.2,
+        )
+        checker.critical = {"fast", "fast2", "slow"}
+
+        start_time = time.perf_counter()
+        result = await checker.run_checks(("fast", "fast2", "optional"))
+        assert time.perf_counter() - start_time < 0.1
+        assert result["status"] == "degraded"
+        assert result["checks"]["optional"]["critical"] is False
+
+        checker.checks["slow"] = slow
+        start_time = time.perf_counter()
+        result = await checker.run_checks(("fast", "slow"))
+        assert time.perf_counter() - start_time < 0.5
+        assert result["status"] == "unhealthy"
+        assert "Timed out" in result["checks"]["slow"]["error"]
+
+    @pytest.mark.asyncio
+    async def test_results_cached_and_shared(self):
+        """Тест: одновременные и повторные пробы выполняют проверку один раз"""
+        calls = []
+
+        async def probe():
+            calls.append(1)
+            await asyncio.sleep(0.05)
+            return {"status": "healthy"}
+
+        checker = self.make_checker({"fast": probe}, cache_ttl=60)
+
+        results = await asyncio.gather(
+            *(checker.run_checks(("fast",)) for _ in range(20))
+        )
+        assert len(calls) == 1
+        assert all(result is results[0] for result in results)
+
+        await checker.run_checks(("fast",))
+        assert len(calls) == 1
+
+        checker.cache_ttl = 0
+        await checker.run_checks(("fast",))
+        assert len(calls) == 2
+
+    @pytest.mark.asyncio
+    async def test_blocking_database_check_off_loop(self, monkeypatch):
+        """Тест: блокирующая проверка БД не останавливает event loop"""
+        monkeypatch.setattr(
+            HealthChecker, "_ping_database", staticmethod(lambda: time.sleep(0.2))
+        )
+        checker = HealthChecker()
+        ticks = []
+
+        async def ticker():
+            for _ in range(5):
+                ticks.append(time.perf_counter())
+                await asyncio.sleep(0.02)
+
+        result, _ = await asyncio.gather(checker._check_database(), ticker())
+
+        assert result["status"] == "healthy"
+        assert ticks[-1] - ticks[0] < 0.15
+
+    def test_readiness_checks_dependencies_only(self):
+        """Тест: готовность определяется зависимостями, Redis - по настройкам"""
+        checker = HealthChecker()
+
+        assert set(HealthChecker.READINESS_CHECKS) == {"database", "redis", "mongo"}
+        assert "database" in checker.critical
+        assert "mongo" not in checker.critical
+        assert ("redis" in checker.critical) == (
+            "redis" in (settings.CACHE_BACKEND, settings.RATE_LIMIT_BACKEND)
+        )
+
+
+class TestSystemMetricsSampler:
+    """Тесты фонового сбора системных метрик"""
+
+    def test_scrape_does_not_block(self):
+        """Тест: сбор метрик и проверка здоровья читают готовый снимок"""
+        collector = MetricsCollector()
+        system_sampler.sample()
+
+        start_time = time.perf_counter()
+        collector.get_metrics()
+        asyncio.run(HealthChecker()._check_cpu())
+        elapsed = time.perf_counter() - start_time
+
+        # Прежде cpu_percent(interval=1) занимал секунду на каждый вызов
+        assert elapsed < 0.5
+
+    @pytest.mark.asyncio
+    async def test_background_refresh(self):
+        """Тест: фоновая задача обновляет снимок с заданным интервалом"""
+        sampler = SystemMetricsSampler(interval=0.01)
+        first = sampler.sample()
+
+        sampler.start()
+        assert sampler.running
+        # Снимок собирается в потоке (psutil, net_connections): под нагрузкой
+        # первый проход может занять заметно больше интервала
+        deadline = time.monotonic() + 5
+        while sampler.snapshot.timestamp <= first.timestamp:
+            assert time.monotonic() < deadline
+            await asyncio.sleep(0.01)
+
+        await sampler.stop()
+        assert not sampler.running
+        stopped = sampler.snapshot
+        await asyncio.sleep(0.05)
+        assert sampler._snapshot is stopped
+
+    @pytest.mark.asyncio
+    async def test_health_checks_use_snapshot(self, monkeypatch):
+        """Тест: статус проверок CPU и памяти определяется по снимку"""
+        snapshot = replace(
+            system_sampler.sample(), cpu_percent=95.0, memory_percent=85.0
+        )
+        monkeypatch.setattr(system_sampler, "_snapshot", snapshot)
+        checker = HealthChecker()
+
+        assert (await checker._check_cpu())["status"] == "critical"
+        assert (await checker._check_memory())["status"] == "warning"
+
+        collector = MetricsCollector()
+        collector.update_system_metrics()
+        assert collector.cpu_usage.collect()[0].samples[0].value == 95.0
+
+
+class TestRingBuffer:
+    """Тесты кольцевого буфера"""
+
+    def make_buffer(self, capacity=5):
+        return RingBuffer(capacity, indexes=("level",), key=lambda item, f: item[f])
+
+    def test_eviction_keeps_indexes_consistent(self):
+        """Тест: при переполнении вытесняется самая старая запись и ее индексы"""
+        buffer = self.make_buffer()
+        for i in range(8):
+            buffer.append({"n": i, "level": "ERROR" if i % 2 else "INFO"}, i)
+
+        assert [item["n"] for item in buffer] == [3, 4, 5, 6, 7]
+        assert buffer[-1]["n"] == 7
+        assert buffer.counts("level") == {"ERROR": 3, "INFO": 2}
+        assert [item["n"] for item in buffer.latest(2)] == [6, 7]
+
+        buffer.drop_older_than(6)
+        assert [item["n"] for item in buffer] == [6, 7]
+        assert buffer.counts("level") == {"INFO": 1, "ERROR": 1}
+
+    def test_query_newest_first(self):
+        """Тест: выборка по индексу от новых к старым с limit и интервалом"""
+        buffer = self.make_buffer(capacity=100)
+        for i in range(50):
+            buffer.append({"n": i, "level": ("INFO", "WARNING", "ERROR")[i % 3]}, i)
+
+        errors = buffer.query(filters={"level": ["ERROR"]}, limit=3)
+        assert [item["n"] for item in errors] == [47, 44, 41]
+
+        mixed = buffer.query(
+            filters={"level": ["ERROR", "WARNING"]}, start_time=40, end_time=45
+        )
+        assert [item["n"] for item in mixed] == [44, 43, 41, 40]
+        assert buffer.query(filters={"level": ["DEBUG"]}) == []
+        assert len(buffer.query(limit=10)) == 10
+
+
+class TestMonitoringServiceStorage:
+    """Тесты хранения логов и метрик MonitoringService"""
+
+    @pytest.mark.asyncio
+    async def test_get_logs_filters(self):
+        """Тест: фильтры get_logs по уровню, модулю, пользователю и времени"""
+        service = MonitoringService()
+        for i in range(30):
+            await service.log(
+                LogLevel.ERROR if i % 3 == 0 else LogLevel.INFO,
+                f"event {i}",
+                module="api.users" if i % 2 else "api.posts",
+                user_id=i % 5,
+            )
+
+        errors = await service.get_logs(level="error", limit=3)
+        assert [log["message"] for log in errors] == [
+            "event 27",
+            "event 24",
+            "event 21",
+        ]
+
+        users = await service.get_logs(module="users", user_id=3, limit=100)
+        assert [log["message"] for log in users] == ["event 23", "event 13", "event 3"]
+
+        middle = service.logs[10].timestamp
+        recent = await service.get_logs(start_time=middle, limit=1000)
+        assert all(log["timestamp"] >= middle for log in recent)
+        assert recent == sorted(recent, key=lambda log: log["timestamp"], reverse=True)
+
+    @pytest.mark.asyncio
+    async def test_capacity_bounded(self):
+        """Тест: число хранимых логов ограничено max_logs"""
+        service = MonitoringService()
+        service.logs = RingBuffer(10, indexes=MonitoringService.LOG_INDEXES)
+        for i in range(25):
+            await service.log(LogLevel.INFO, f"event {i}", module="api")
+
+        assert len(service.logs) == 10
+        assert service.logs[0].message == "event 15"
+        dashboard = await service.get_dashboard_data()
+        assert dashboard["log_stats"]["by_level"] == {"INFO": 10}
 
 
 class TestMonitoringIntegration:
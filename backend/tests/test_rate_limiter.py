@@ -0,0 +1,228 @@
+"""
+Тесты ограничения частоты запросов
+"""
+
+import pytest
+from fakeredis import FakeAsyncRedis, FakeServer
+
+from config import Settings
+from services.rate_limiter import (
+    MemoryRateLimitBackend,
+    RateLimitBackend,
+    RateLimit,
+    RateLimiter,
+    RedisRateLimitBackend,
+    create_rate_limit_backend,
+)
+from services.security_service import security_service
+
+
+class FakeClock:
+    """Управляемые часы для MemoryRateLimitBackend"""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestMemoryRateLimitBackend:
+    """Тесты GCRA в памяти"""
+
+    def test_burst_then_steady_rate(self):
+        """Тест: всплеск до лимита, затем один запрос на интервал"""
+        clock = FakeClock()
+        backend = MemoryRateLimitBackend(clock=clock)
+        limit = RateLimit(10, 60)
+
+        results = [backend.hit_sync("ip", limit) for _ in range(10)]
+        assert all(result.allowed for result in results)
+        assert [result.remaining for result in results] == list(range(9, -1, -1))
+
+        rejected = backend.hit_sync("ip", limit)
+        assert rejected.allowed is False
+        assert rejected.retry_after == pytest.approx(6)
+
+        clock.now += 6
+        assert backend.hit_sync("ip", limit).allowed is True
+        assert backend.hit_sync("ip", limit).allowed is False
+
+        clock.now += 60
+        assert backend.peek_sync("ip", limit).remaining == 10
+
+    def test_rejected_requests_do_not_extend_wait(self):
+        """Тест: отклоненные запросы не отодвигают восстановление лимита"""
+        clock = FakeClock()
+        backend = MemoryRateLimitBackend(clock=clock)
+        limit = RateLimit(2, 10)
+
+        backend.hit_sync("ip", limit)
+        backend.hit_sync("ip", limit)
+        for _ in range(100):
+            assert backend.hit_sync("ip", limit).allowed is False
+
+        clock.now += 5
+        assert backend.hit_sync("ip", limit).allowed is True
+
+    def test_idle_keys_evicted(self):
+        """Тест: ключи с восстановленным лимитом удаляются"""
+        clock = FakeClock()
+        backend = MemoryRateLimitBackend(clock=clock)
+        limit = RateLimit(100, 10)
+
+        for i in range(1000):
+            backend.hit_sync(f"scanner-{i}", limit)
+        assert len(backend) == 1000
+
+        # Через 0.1 секунды каждый ключ восстановил лимит
+        clock.now += 1
+        for _ in range(300):
+            backend.hit_sync("client", limit)
+        assert len(backend) == 1
+
+    def test_max_keys(self):
+        """Тест: число ключей ограничено max_keys"""
+        backend = MemoryRateLimitBackend(max_keys=100, clock=FakeClock())
+        limit = RateLimit(1, 3600)
+
+        for i in range(1000):
+            backend.hit_sync(f"ip-{i}", limit)
+
+        assert len(backend) == 100
+        assert backend.peek_sync("ip-999", limit).allowed is False
+        assert backend.peek_sync("ip-0", limit).allowed is True
+
+
+class TestRedisRateLimitBackend:
+    """Тесты GCRA в Redis через Lua-скрипт"""
+
+    @pytest.mark.asyncio
+    async def test_limit_shared_between_workers(self):
+        """Тест: два воркера с общим Redis делят один лимит"""
+        server = FakeServer()
+        workers = [
+            RedisRateLimitBackend(client=FakeAsyncRedis(server=server))
+            for _ in range(2)
+        ]
+        limit = RateLimit(5, 60)
+
+        results = [await workers[i % 2].hit("ip", limit) for i in range(6)]
+
+        assert [result.allowed for result in results] == [True] * 5 + [False]
+        assert [result.remaining for result in results[:5]] == [4, 3, 2, 1, 0]
+        assert results[-1].retry_after == pytest.approx(12, abs=0.5)
+
+        peeked = await workers[0].peek("other", limit)
+        assert (peeked.allowed, peeked.remaining) == (True, 5)
+
+        await workers[1].reset("ip")
+        assert (await workers[0].hit("ip", limit)).allowed is True
+
+    @pytest.mark.asyncio
+    async def test_key_expires_when_idle(self):
+        """Тест: ключ Redis живет не дольше времени восстановления лимита"""
+        client = FakeAsyncRedis(server=FakeServer())
+        backend = RedisRateLimitBackend(client=client, key_prefix="rl:")
+
+        await backend.hit("ip", RateLimit(10, 60))
+
+        ttl_ms = await client.pttl("rl:ip")
+        assert 0 < ttl_ms <= 6000
+
+
+class TestRateLimiter:
+    """Тесты правил маршрутов"""
+
+    def test_route_resolution(self):
+        """Тест: точное правило, затем самый длинный префикс, затем общий лимит"""
+        limiter = RateLimiter(
+            routes={
+                "POST:/api/auth/login": "5/60",
+                "GET:/api/*": "100/60",
+                "GET:/api/search/*": "30/60",
+            }
+        )
+        default = RateLimit(1000, 60)
+
+        assert limiter.resolve("POST:/api/auth/login", default) == (
+            "POST:/api/auth/login",
+            RateLimit(5, 60),
+        )
+        assert limiter.resolve("GET:/api/search/posts", default) == (
+            "GET:/api/search/*",
+            RateLimit(30, 60),
+        )
+        assert limiter.resolve("GET:/api/products/1", default)[1] == RateLimit(100, 60)
+        assert limiter.resolve("DELETE:/api/products/1", default) == ("*", default)
+
+    @pytest.mark.asyncio
+    async def test_unmatched_paths_share_client_budget(self):
+        """Тест: запросы к разным URL без правила создают один ключ"""
+        backend = MemoryRateLimitBackend()
+        limiter = RateLimiter(backend=backend, routes={"POST:/login": "1/60"})
+        default = RateLimit(100, 60)
+
+        for i in range(50):
+            await limiter.hit("10.0.0.1", f"GET:/items/{i}", default)
+        assert len(backend) == 1
+
+        assert (await limiter.hit("10.0.0.1", "POST:/login", default)).allowed
+        assert not (await limiter.hit("10.0.0.1", "POST:/login", default)).allowed
+        assert (await limiter.hit("10.0.0.2", "POST:/login", default)).allowed
+
+    def test_invalid_limit(self):
+        """Тест: некорректный лимит отклоняется при разборе"""
+        with pytest.raises(ValueError):
+            RateLimit.parse("0/60")
+
+    def test_backend_selected_by_settings(self):
+        """Тест: хранилище выбирается настройкой RATE_LIMIT_BACKEND"""
+        backend = create_rate_limit_backend(Settings(RATE_LIMIT_MAX_KEYS=10))
+        assert isinstance(backend, MemoryRateLimitBackend)
+        assert backend.max_keys == 10
+
+        backend = create_rate_limit_backend(
+            Settings(RATE_LIMIT_BACKEND="redis", REDIS_URL="redis://localhost:1")
+        )
+        assert isinstance(backend, RedisRateLimitBackend)
+
+        with pytest.raises(ValueError):
+            create_rate_limit_backend(Settings(RATE_LIMIT_BACKEND="unknown"))
+
+    def test_incomplete_backend_rejected(self):
+        """Тест: хранилище без обязательных методов не создается"""
+
+        class HitOnlyBackend(RateLimitBackend):
+            async def hit(self, key, limit):
+                return None
+
+        with pytest.raises(TypeError):
+            HitOnlyBackend()
+
+
+class TestSecurityServiceRateLimit:
+    """Тесты check_rate_limit сервиса безопасности"""
+
+    @pytest.mark.asyncio
+    async def test_exceeding_limit_blocks_ip(self, monkeypatch):
+        """Тест: превышение лимита блокирует IP и сообщает Retry-After"""
+        monkeypatch.setattr(
+            security_service, "rate_limiter", RateLimiter(MemoryRateLimitBackend())
+        )
+        monkeypatch.setitem(security_service.config, "rate_limit_requests", 3)
+        monkeypatch.setattr(security_service, "blocked_ips", set())
+
+        for _ in range(3):
+            allowed, info = await security_service.check_rate_limit(
+                "203.0.113.7", "GET:/api/items"
+            )
+            assert allowed is True
+        assert info["current_requests"] == 3
+
+        allowed, info = await security_service.check_rate_limit(
+            "203.0.113.7", "GET:/api/items"
+        )
+        assert allowed is False
+        assert info["retry_after"] == 20
+        assert not await security_service.check_ip_blocklist("203.0.113.7")
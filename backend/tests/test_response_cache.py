@@ -0,0 +1,253 @@
+"""
+Тесты HTTP-кэша ответов
+"""
+
+import asyncio
+import pytest
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from sqlalchemy.pool import NullPool
+
+from app import app
+from auth import get_db, get_async_db, create_access_token
+from models import Base, User
+import models_package.ecommerce as ecommerce_models
+import models_package.social
+import models_package.tasks
+import models_package.content
+import models_package.analytics
+from services.cache_backends import MemoryCacheBackend
+from services.cache_service import CacheService, cache_service
+from services.response_cache import ResponseCache
+
+
+def make_app(cache: ResponseCache, calls: list) -> FastAPI:
+    """Приложение с кэшируемым эндпоинтом и эндпоинтом записи"""
+    test_app = FastAPI()
+
+    @test_app.get("/items")
+    async def get_items(request: Request):
+        async def build_response():
+            calls.append(dict(request.query_params))
+            return {"items": ["тест"], "version": len(calls)}
+
+        scope = request.headers.get("x-user")
+        return await cache.respond(request, build_response, scope=scope)
+
+    @test_app.post("/items")
+    def create_item():
+        cache.invalidate_sync()
+        return {"message": "created"}
+
+    return test_app
+
+
+@pytest.fixture
+def calls():
+    return []
+
+
+@pytest.fixture
+def client(calls):
+    cache = ResponseCache("items", ttl=60, cache=CacheService(MemoryCacheBackend()))
+    return TestClient(make_app(cache, calls))
+
+
+class TestResponseCache:
+    """Тесты ResponseCache на отдельном приложении"""
+
+    def test_repeated_request_served_from_cache(self, client, calls):
+        """Тест: повторный запрос не вычисляет и не сериализует ответ"""
+        first = client.get("/items")
+        second = client.get("/items")
+
+        assert first.status_code == second.status_code == 200
+        assert first.content == second.content
+        assert first.json() == {"items": ["тест"], "version": 1}
+        assert len(calls) == 1
+        assert first.headers["etag"] == second.headers["etag"]
+        assert first.headers["cache-control"] == "public, max-age=60"
+        assert "last-modified" in first.headers
+
+    def test_if_none_match_returns_304(self, client):
+        """Тест: совпадающий ETag возвращает 304 без тела"""
+        etag = client.get("/items").headers["etag"]
+
+        for header in (etag, f"W/{etag}", f'"other", {etag}', "*"):
+            response = client.get("/items", headers={"If-None-Match": header})
+            assert response.status_code == 304
+            assert response.content == b""
+            assert response.headers["etag"] == etag
+
+        response = client.get("/items", headers={"If-None-Match": '"other"'})
+        assert response.status_code == 200
+
+    def test_if_modified_since(self, client):
+        """Тест: If-Modified-Since сравнивается с Last-Modified"""
+        last_modified = client.get("/items").headers["last-modified"]
+
+        response = client.get("/items", headers={"If-Modified-Since": last_modified})
+        assert response.status_code == 304
+
+        response = client.get(
+            "/items", headers={"If-Modified-Since": "Mon, 01 Jan 2001 00:00:00 GMT"}
+        )
+        assert response.status_code == 200
+
+    def test_key_includes_query_and_scope(self, client, calls):
+        """Тест: ключ учитывает параметры (без учета порядка) и scope"""
+        client.get("/items?a=1&b=2")
+        client.get("/items?b=2&a=1")
+        assert len(calls) == 1
+
+        client.get("/items?a=1&b=3")
+        client.get("/items?a=1&b=2", headers={"X-User": "user:1"})
+        client.get("/items?a=1&b=2", headers={"X-User": "user:2"})
+        assert len(calls) == 4
+
+    def test_write_endpoint_invalidates(self, client, calls):
+        """Тест: эндпоинт записи сбрасывает кэш группы"""
+        etag = client.get("/items").headers["etag"]
+
+        assert client.post("/items").status_code == 200
+
+        response = client.get("/items", headers={"If-None-Match": etag})
+        assert response.status_code == 200
+        assert response.json()["version"] == 2
+        assert response.headers["etag"] != etag
+
+    def test_disabled_cache(self, calls):
+        """Тест: ttl=0 отключает кэширование"""
+        cache = ResponseCache("items", ttl=0, cache=CacheService(MemoryCacheBackend()))
+        client = TestClient(make_app(cache, calls))
+
+        response = client.get("/items")
+        client.get("/items")
+        assert "etag" not in response.headers
+        assert len(calls) == 2
+        assert client.post("/items").status_code == 200
+
+
+@pytest.fixture
+def api_client(tmp_path):
+    """Клиент приложения на файловой SQLite с синхронной и асинхронной сессией"""
+    url = tmp_path / "response_cache.db"
+    engine = create_engine(
+        f"sqlite:///{url}", connect_args={"check_same_thread": False}
+    )
+    async_engine = create_async_engine(f"sqlite+aiosqlite:///{url}", poolclass=NullPool)
+    Base.metadata.create_all(bind=engine)
+    SessionLocal = sessionmaker(autoflush=False, bind=engine)
+    AsyncSessionLocal = async_sessionmaker(bind=async_engine, expire_on_commit=False)
+
+    db = SessionLocal()
+    db.add(User(email="seller@example.com", username="seller", hashed_password="x"))
+    db.add(
+        ecommerce_models.Product(
+            name="Cached product",
+            price=10.0,
+            category="books",
+            stock_quantity=5,
+        )
+    )
+    db.commit()
+    db.close()
+
+    def override_get_db():
+        db = SessionLocal()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    async def override_get_async_db():
+        async with AsyncSessionLocal() as session:
+            yield session
+
+    overrides = dict(app.dependency_overrides)
+    app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_async_db] = override_get_async_db
+    asyncio.run(cache_service.clear())
+
+    yield TestClient(app)
+
+    app.dependency_overrides.clear()
+    app.dependency_overrides.update(overrides)
+    asyncio.run(cache_service.clear())
+    asyncio.run(async_engine.dispose())
+    engine.dispose()
+
+
+def auth_headers():
+    token = create_access_token({"sub": "seller@example.com"})
+    return {"Authorization": f"Bearer {token}"}
+
+
+class TestCachedEndpoints:
+    """Тесты кэшируемых эндпоинтов приложения"""
+
+    def test_product_write_invalidates_list(self, api_client):
+        """Тест: создание товара сбрасывает кэш списка товаров и категорий"""
+        categories = api_client.get("/api/ecommerce/categories").json()
+        assert categories["categories"] == ["books"]
+
+        first = api_client.get("/api/ecommerce/products")
+        assert first.status_code == 200
+        assert first.json()["total"] == 1
+
+        etag = first.headers["etag"]
+        cached = api_client.get(
+            "/api/ecommerce/products", headers={"If-None-Match": etag}
+        )
+        assert cached.status_code == 304
+
+        response = api_client.post(
+            "/api/ecommerce/products",
+            json={
+                "name": "New product",
+                "description": "Fresh",
+                "price": 20.0,
+                "category": "games",
+                "stock_quantity": 3,
+            },
+            headers=auth_headers(),
+        )
+        assert response.status_code == 200
+
+        updated = api_client.get(
+            "/api/ecommerce/products", headers={"If-None-Match": etag}
+        )
+        assert updated.status_code == 200
+        assert updated.json()["total"] == 2
+        assert updated.headers["etag"] != etag
+
+        categories = api_client.get("/api/ecommerce/categories").json()
+        assert sorted(categories["categories"]) == ["books", "games"]
+
+    def test_content_categories_invalidated_by_write(self, api_client):
+        """Тест: список категорий контента кэшируется до создания категории"""
+        first = api_client.get("/api/content/categories")
+        assert first.status_code == 200
+        assert first.json()["total"] == 0
+
+        etag = first.headers["etag"]
+        response = api_client.get(
+            "/api/content/categories", headers={"If-None-Match": etag}
+        )
+        assert response.status_code == 304
+
+        response = api_client.post(
+            "/api/content/categories",
+            json={"name": "News", "slug": "news"},
+            headers=auth_headers(),
+        )
+        assert response.status_code == 200
+
+        response = api_client.get(
+            "/api/content/categories", headers={"If-None-Match": etag}
+        )
+        assert response.status_code == 200
+        assert [item["slug"] for item in response.json()["items"]] == ["news"]
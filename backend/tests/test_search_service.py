@@ -0,0 +1,589 @@
+"""
+Тесты поиска по постам, статьям и пользователям
+"""
+
+import asyncio
+import random
+import threading
+import time
+from collections import Counter
+import pytest
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import create_engine, select
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from config import settings
+from models import Base, User
+import models_package.ecommerce
+import models_package.social as social_models
+import models_package.tasks
+import models_package.content as content_models
+import models_package.analytics as analytics_models
+from services.event_pipeline import EventPipeline
+from services.search_service import SearchService
+from utils.database import SearchHelper
+from utils.full_text import SEARCH_DOCUMENTS, FullTextSearch, install_search_indexes
+from utils.heavy_hitters import HeavyHitters
+from utils.prefix_index import PrefixIndex
+
+engine = create_engine(
+    "sqlite://",
+    connect_args={"check_same_thread": False},
+    poolclass=StaticPool,
+)
+TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+
+@pytest.fixture
+def data():
+    Base.metadata.create_all(bind=engine)
+    session = TestingSessionLocal()
+    alice = User(
+        email="alice@example.com",
+        username="alice",
+        full_name="Alice Python",
+        hashed_password="x",
+        followers_count=10,
+        is_verified=True,
+    )
+    bob = User(
+        email="bob@example.com",
+        username="pythonista",
+        full_name="Bob",
+        hashed_password="x",
+        followers_count=3,
+    )
+    carol = User(email="carol@example.com", username="carol", hashed_password="x")
+    session.add_all([alice, bob, carol])
+    session.flush()
+
+    category = content_models.Category(name="Programming", slug="programming")
+    tag = content_models.Tag(name="python", slug="python")
+    session.add_all([category, tag])
+    session.flush()
+
+    def article(title, excerpt, content, status, author, day):
+        item = content_models.Article(
+            title=title,
+            excerpt=excerpt,
+            content=content,
+            status=status,
+            author_id=author.id,
+            category_id=category.id,
+            slug=title.lower().replace(" ", "-"),
+            created_at=datetime(2024, 1, day, tzinfo=timezone.utc),
+        )
+        session.add(item)
+        return item
+
+    published = content_models.ArticleStatus.PUBLISHED
+    draft = content_models.ArticleStatus.DRAFT
+    titled = article("Python Tips", "Short tips", "Generators", published, alice, 1)
+    article("Tooling", "Editors", "Writing python daily", published, bob, 2)
+    article("Python Drafts", "Unfinished", "python", draft, bob, 3)
+    session.flush()
+    session.add(content_models.ArticleTag(article_id=titled.id, tag_id=tag.id))
+
+    session.add_all(
+        [
+            social_models.Post(
+                user_id=alice.id,
+                content="Learning python today\nmore text",
+                created_at=datetime(2024, 1, 4, tzinfo=timezone.utc),
+            ),
+            social_models.Post(
+                user_id=bob.id,
+                content="private python notes",
+                is_public=False,
+                created_at=datetime(2024, 1, 5, tzinfo=timezone.utc),
+            ),
+            social_models.Post(user_id=bob.id, content="Unrelated post"),
+        ]
+    )
+    session.commit()
+    yield session, {"alice": alice.id, "bob": bob.id, "carol": carol.id}
+    session.close()
+    Base.metadata.drop_all(bind=engine)
+
+
+@pytest.fixture
+def service():
+    return SearchService(session_factory=TestingSessionLocal)
+
+
+class TestSearchService:
+    """Тесты выдачи поиска"""
+
+    def test_posts_ranked_across_posts_and_articles(self, data, service):
+        """Тест: совпадение в заголовке статьи выше совпадения в тексте"""
+        _, users = data
+
+        result = service.search_posts("python", users["carol"])
+
+        assert result["total"] == 3
+        titles = [(item["type"], item["title"]) for item in result["posts"]]
+        assert titles == [
+            ("post", "Learning python today"),
+            ("article", "Python Tips"),
+            ("article", "Tooling"),
+        ]
+        ranks = [item["rank"] for item in result["posts"]]
+        assert ranks == sorted(ranks, reverse=True)
+        assert result["posts"][1]["tags"] == ["python"]
+        assert result["posts"][1]["category"] == "Programming"
+
+    def test_visibility_filters_and_pagination(self, data, service):
+        """Тест: черновики и скрытые посты видны только автору, фильтры сужают выдачу"""
+        _, users = data
+
+        own = service.search_posts("python", users["bob"])
+        assert own["total"] == 5
+
+        tagged = service.search_posts("python", users["bob"], {"tags": ["python"]})
+        assert [item["title"] for item in tagged["posts"]] == ["Python Tips"]
+
+        drafts = service.search_posts(
+            "python", users["bob"], {"is_published": False, "category": "programming"}
+        )
+        assert [item["title"] for item in drafts["posts"]] == ["Python Drafts"]
+
+        dated = service.search_posts(
+            "python", users["bob"], {"date_from": "2024-01-02", "date_to": "2024-01-04"}
+        )
+        assert dated["total"] == 3
+
+        page = service.search_posts("python", users["bob"], page=2, per_page=2)
+        assert (page["total"], len(page["posts"])) == (5, 2)
+
+        with pytest.raises(ValueError):
+            service.search_posts("python", users["bob"], {"date_from": "yesterday"})
+
+    def test_users_ranked_by_field_weight(self, data, service):
+        """Тест: совпадение в username выше совпадения в имени"""
+        _, users = data
+
+        result = service.search_users("python", users["carol"])
+        assert [user["username"] for user in result["users"]] == [
+            "pythonista",
+            "alice",
+        ]
+        assert "email" not in result["users"][0]
+
+        verified = service.search_users(
+            "python", users["carol"], {"is_verified": True, "min_followers": 5}
+        )
+        assert [user["username"] for user in verified["users"]] == ["alice"]
+
+
+class TestFullTextSearch:
+    """Тесты построения полнотекстовых запросов"""
+
+    def test_postgres_query_uses_search_vector(self):
+        """Тест: в PostgreSQL условие строится по индексируемой колонке"""
+
+        class Bind:
+            dialect = postgresql.dialect()
+
+        condition, rank = FullTextSearch(Bind()).match(social_models.Post, "python")
+        sql = str(
+            select(rank)
+            .where(condition)
+            .compile(
+                dialect=postgresql.dialect(), compile_kwargs={"literal_binds": True}
+            )
+        )
+
+        assert (
+            "posts.search_vector @@ websearch_to_tsquery('simple'::regconfig, 'python')"
+            in sql
+        )
+        assert "ts_rank_cd(posts.search_vector" in sql
+        assert "GENERATED ALWAYS AS (setweight(to_tsvector('simple'::regconfig" in (
+            SEARCH_DOCUMENTS["articles"].ddl("simple")[0]
+        )
+        assert install_search_indexes(engine) is False
+
+    def test_list_filter_matches_partial_words(self, data):
+        """Тест: фильтр списков находит слово по его началу, как прежний ILIKE"""
+
+        class Bind:
+            dialect = postgresql.dialect()
+
+        condition, _ = FullTextSearch(Bind()).match(
+            social_models.Post, "Pyth tip's", prefix=True
+        )
+        sql = str(
+            condition.compile(
+                dialect=postgresql.dialect(), compile_kwargs={"literal_binds": True}
+            )
+        )
+        assert "to_tsquery('simple'::regconfig, 'Pyth:* & tip:* & s:*')" in sql
+
+        session, _ = data
+        found = SearchHelper.add_search_filters(
+            session.query(social_models.Post), social_models.Post, "pyth", ["content"]
+        )
+        assert found.count() == 2
+
+    def test_search_helper_uses_document_fields(self, data):
+        """Тест: SearchHelper ищет по документу модели только для его полей"""
+        session, _ = data
+        query = session.query(social_models.Post)
+
+        found = SearchHelper.add_search_filters(
+            query, social_models.Post, "PYTHON", ["content"]
+        )
+        assert found.count() == 2
+        assert FullTextSearch.document_for(content_models.Article, ["title"]) is None
+
+
+class TestPrefixIndex:
+    """Тесты индекса автодополнения"""
+
+    def test_top_k_matches_brute_force(self):
+        """Тест: выборка по префиксу совпадает с полным перебором"""
+        rng = random.Random(3)
+        index = PrefixIndex(buffer_size=40)
+        weights = {}
+        for _ in range(2000):
+            term = "".join(rng.choice("abc") for _ in range(rng.randint(1, 6)))
+            weight = max(rng.choice([1.0, 2.0, 5.0, -1.0]), -weights.get(term, 0.0))
+            index.add(term, weight)
+            weights[term] = weights.get(term, 0.0) + weight
+        index.rebuild()
+        index.add("abca", 1.0)
+        weights["abca"] = weights.get("abca", 0.0) + 1.0
+
+        for prefix in ("", "a", "ab", "abc", "cc", "d"):
+            expected = sorted(
+                (
+                    (term, weight)
+                    for term, weight in weights.items()
+                    if term.startswith(prefix) and weight > 0
+                ),
+                key=lambda item: (-item[1], item[0]),
+            )[:7]
+            assert index.suggest(prefix, 7) == expected
+
+    def test_rebuild_trims_to_max_terms(self):
+        """Тест: при перестроении остаются самые популярные термины"""
+        index = PrefixIndex(max_terms=2)
+        index.update([("python", 5.0), ("pytest", 1.0), ("pydantic", 3.0)])
+        index.add("python")
+        index.rebuild()
+
+        assert len(index) == 2
+        assert "pytest" not in index
+        assert index.suggest("py") == [("python", 6.0), ("pydantic", 3.0)]
+
+    def test_update_rebuilds_full_buffer(self):
+        """Тест: пакетное обновление не оставляет словарь в буфере"""
+        index = PrefixIndex(buffer_size=3)
+        index.update([("python", 5.0), ("pytest", 1.0)])
+        assert index._pending
+
+        index.update([("pydantic", 3.0), ("pyramid", 2.0)])
+        assert not index._pending
+        assert index.suggest("py", 2) == [("python", 5.0), ("pydantic", 3.0)]
+
+
+class TestSearchSuggestions:
+    """Тесты подсказок поиска"""
+
+    def test_suggestions_from_history_and_vocabulary(self, data, service):
+        """Тест: подсказки из истории запросов и словаря тегов и заголовков"""
+        _, users = data
+        for _ in range(3):
+            service.search_users("Python  Snippets", users["carol"])
+
+        assert service.refresh_vocabulary() == 3
+        assert service.get_search_suggestions("PY", users["carol"], limit=3) == [
+            "python snippets",
+            "python",
+            "python tips",
+        ]
+        assert service.get_search_suggestions("p", users["carol"]) == []
+
+        session, _ = data
+        session.query(content_models.Tag).delete()
+        session.commit()
+        service.refresh_vocabulary()
+        assert "python" not in service.suggestion_index
+        # Нечеткий поиск доступен только в PostgreSQL
+        assert service.get_search_suggestions("pyhton", users["carol"]) == []
+
+    def test_history_terms_shared_after_distinct_users(self, data, service):
+        """Тест: чужой запрос подсказывается только после нескольких авторов"""
+        _, users = data
+        service.refresh_vocabulary()
+        for _ in range(5):
+            service.search_tags("private diary", users["alice"])
+
+        assert service.get_search_suggestions("pri", users["alice"]) == [
+            "private diary"
+        ]
+        assert service.get_search_suggestions("pri", users["carol"]) == []
+        assert "private diary" not in service.suggestion_index
+
+        service.search_tags("private diary", users["bob"])
+        assert service.get_search_suggestions("pri", users["carol"]) == []
+        service.search_tags("private diary", users["carol"])
+        assert "private diary" in service.suggestion_index
+
+
+class TestGlobalSearch:
+    """Тесты параллельного глобального поиска"""
+
+    def test_sources_merged_and_history_recorded_once(self, data, service):
+        """Тест: результаты всех источников и одна запись в истории"""
+        _, users = data
+
+        result = service.global_search("python", users["carol"])
+
+        assert result["results"]["posts"]["total"] == 3
+        assert [user["username"] for user in result["results"]["users"]["items"]] == [
+            "pythonista",
+            "alice",
+        ]
+        assert result["results"]["tags"]["items"][0]["name"] == "python"
+        assert result["metadata"]["partial"] is False
+        assert {
+            source: item["status"]
+            for source, item in result["metadata"]["sources"].items()
+        } == {"posts": "ok", "users": "ok", "tags": "ok"}
+        assert service.get_user_search_history(users["carol"]) == ["python"]
+        assert service.popularity.estimate("python") == pytest.approx(1, rel=1e-3)
+
+    def test_slow_and_failing_sources_return_partial_results(
+        self, data, service, monkeypatch
+    ):
+        """Тест: медленный источник не задерживает ответ дольше срока"""
+        _, users = data
+        release = threading.Event()
+
+        def slow_tags(*args, **kwargs):
+            release.wait(5)
+            return {"tags": [{"name": "late"}], "total": 1}
+
+        def failing_users(*args, **kwargs):
+            raise RuntimeError("users database is down")
+
+        monkeypatch.setattr(service, "search_tags", slow_tags)
+        monkeypatch.setattr(service, "search_users", failing_users)
+
+        started = time.perf_counter()
+        result = service.global_search("python", users["carol"], timeout=0.2)
+        elapsed = time.perf_counter() - started
+        release.set()
+
+        assert elapsed < 1
+        assert result["results"]["posts"]["total"] == 3
+        assert result["results"]["tags"] == {"items": [], "total": 0}
+        assert result["results"]["users"] == {"items": [], "total": 0}
+        sources = result["metadata"]["sources"]
+        assert (sources["tags"]["status"], sources["users"]["status"]) == (
+            "timeout",
+            "error",
+        )
+        assert sources["tags"]["latency_ms"] >= 200
+        assert result["metadata"]["partial"] is True
+
+    def test_timed_out_sources_cancelled(self, data, service, monkeypatch):
+        """Тест: источники, не начатые к сроку, снимаются с очереди пула"""
+        from concurrent.futures import ThreadPoolExecutor
+
+        _, users = data
+        release = threading.Event()
+        calls = []
+
+        def slow_posts(*args, **kwargs):
+            release.wait(5)
+            return {"posts": [], "total": 0}
+
+        def tracked_users(*args, **kwargs):
+            calls.append("users")
+            return {"users": [], "total": 0}
+
+        monkeypatch.setattr(service, "search_posts", slow_posts)
+        monkeypatch.setattr(service, "search_users", tracked_users)
+        service._executor = ThreadPoolExecutor(max_workers=1)
+
+        result = service.global_search("python", users["carol"], timeout=0.1)
+        release.set()
+        service._executor.shutdown(wait=True)
+
+        assert {
+            source: item["status"]
+            for source, item in result["metadata"]["sources"].items()
+        } == {"posts": "timeout", "users": "timeout", "tags": "timeout"}
+        assert calls == []
+
+
+class TestHeavyHitters:
+    """Тесты потокового top-K"""
+
+    def test_top_k_matches_exact_counts(self):
+        """Тест: частые элементы потока и их оценки совпадают с точным подсчетом"""
+        rng = random.Random(5)
+        sketch = HeavyHitters(k=20, half_life=3600.0, width=2048, clock=lambda: 0.0)
+        counts = Counter()
+        for _ in range(50_000):
+            item = f"q{int(rng.paretovariate(1.0))}"
+            sketch.add(item)
+            counts[item] += 1
+
+        expected = [item for item, _ in counts.most_common(10)]
+        assert [item for item, _ in sketch.top(10)] == expected
+        for item, estimate in sketch.top(10):
+            assert counts[item] <= estimate <= counts[item] + 0.01 * 50_000
+        assert sketch.total == pytest.approx(50_000)
+
+    def test_counts_decay_and_survive_rescale(self):
+        """Тест: вклад события уменьшается вдвое за период полураспада"""
+        now = [0.0]
+        sketch = HeavyHitters(k=2, half_life=10.0, clock=lambda: now[0])
+        for _ in range(8):
+            sketch.add("old")
+        now[0] = 30.0
+        sketch.add("new")
+        sketch.add("new")
+
+        assert sketch.estimate("old") == pytest.approx(1.0)
+        assert sketch.top() == [
+            ("new", pytest.approx(2.0)),
+            ("old", pytest.approx(1.0)),
+        ]
+
+        # Событие из прошлого учитывается с уже затухшим весом
+        sketch.add("late", weight=12, at=0.0)
+        assert [item for item, _ in sketch.top()] == ["new", "late"]
+
+        now[0] = 10_000.0
+        sketch.add("new", weight=2**20)
+        assert sketch.top(1) == [("new", pytest.approx(2**20))]
+        assert sketch.estimate("late") == pytest.approx(0.0)
+
+
+class TestSearchHistory:
+    """Тесты хранения истории и популярных запросов"""
+
+    @pytest.fixture
+    def pipeline(self, monkeypatch):
+        pipeline = EventPipeline(session_factory=TestingSessionLocal)
+        monkeypatch.setattr("services.search_service.event_pipeline", pipeline)
+        return pipeline
+
+    def test_history_persisted_and_bounded(self, data, service, pipeline, monkeypatch):
+        """Тест: история пишется событиями и загружается после перезапуска"""
+        monkeypatch.setattr(settings, "SEARCH_HISTORY_SIZE", 3)
+        _, users = data
+        for query in ["alpha", "beta", "Alpha", "gamma", "delta", "x"]:
+            service.search_tags(query, users["alice"])
+
+        assert service.get_user_search_history(users["alice"]) == [
+            "delta",
+            "gamma",
+            "alpha",
+        ]
+        asyncio.run(pipeline.flush())
+
+        restarted = SearchService(session_factory=TestingSessionLocal)
+        assert restarted.get_user_search_history(users["alice"], limit=2) == [
+            "delta",
+            "gamma",
+        ]
+        assert restarted.get_user_search_history(users["bob"]) == []
+
+        assert restarted.clear_search_history(users["alice"]) is True
+        assert restarted.get_user_search_history(users["alice"]) == []
+        assert (
+            SearchService(session_factory=TestingSessionLocal).get_user_search_history(
+                users["alice"]
+            )
+            == []
+        )
+
+    def test_clear_applies_to_other_workers_and_queued_events(
+        self, data, service, pipeline
+    ):
+        """Тест: очищенная история не возвращается ни из кэша, ни из очереди"""
+        _, users = data
+        other_worker = SearchService(session_factory=TestingSessionLocal)
+        service.search_tags("alpha", users["alice"])
+        asyncio.run(pipeline.flush())
+        service.search_tags("beta", users["alice"])
+        assert other_worker.get_user_search_history(users["alice"]) == ["alpha"]
+
+        # "beta" еще в очереди записи, очистка идет через другой воркер
+        assert other_worker.clear_search_history(users["alice"]) is True
+        asyncio.run(pipeline.flush())
+        assert service.get_user_search_history(users["alice"]) == []
+        assert other_worker.get_user_search_history(users["alice"]) == []
+
+        service.search_tags("gamma", users["alice"])
+        asyncio.run(pipeline.flush())
+        assert service.get_user_search_history(users["alice"]) == ["gamma"]
+        assert (
+            SearchService(session_factory=TestingSessionLocal).get_user_search_history(
+                users["alice"]
+            )
+            == ["gamma"]
+        )
+
+    def test_popular_searches_trending(self, data, service, pipeline, monkeypatch):
+        """Тест: популярность учитывает историю из БД и показывает тренд"""
+        monkeypatch.setattr(settings, "SEARCH_POPULAR_MIN_USERS", 1)
+        session, users = data
+        now = datetime.now(timezone.utc)
+        # python - раз в час трое суток, java - всплеск двое суток назад
+        history = [
+            ("python", now - timedelta(hours=hours + 0.5)) for hours in range(72)
+        ]
+        history += [("java", now - timedelta(days=2))] * 500
+        session.add_all(
+            analytics_models.AnalyticsEvent(
+                event_type="search",
+                event_data={"query": query},
+                user_id=users["alice"],
+                created_at=created_at,
+            )
+            for query, created_at in history
+        )
+        session.commit()
+
+        # Запрос после старта сервиса уже записан, но из БД повторно не читается
+        service.search_tags("rust", users["bob"])
+        asyncio.run(pipeline.flush())
+
+        popular = service.get_popular_searches(limit=3)
+        assert [item["query"] for item in popular] == ["python", "rust", "java"]
+        # Равномерный поток: затухающий счетчик около частоты * T / ln 2
+        assert service.popularity.estimate("python") == pytest.approx(2**0.5, rel=1e-3)
+        assert service.popularity.estimate("rust") == pytest.approx(1, rel=1e-3)
+        assert [item["trend"] for item in popular] == ["stable", "up", "down"]
+
+    def test_popular_searches_need_distinct_users(self, data, service, pipeline):
+        """Тест: запрос попадает в популярные только от нескольких пользователей"""
+        session, users = data
+        now = datetime.now(timezone.utc)
+        session.add_all(
+            analytics_models.AnalyticsEvent(
+                event_type="search",
+                event_data={"query": "python"},
+                user_id=users[name],
+                created_at=now - timedelta(hours=1),
+            )
+            for name in ["alice", "bob"]
+        )
+        session.commit()
+
+        for _ in range(20):
+            service.search_tags("<img src=x onerror=alert(1)>", users["alice"])
+        assert service.get_popular_searches() == []
+
+        service.search_tags("python", users["bob"])
+        assert service.get_popular_searches() == []
+        service.search_tags("python", users["carol"])
+        assert [item["query"] for item in service.get_popular_searches()] == ["python"]
@@ -2,10 +2,15 @@
 Тесты безопасности
 """
 
+import asyncio
+import re
 import pytest
 from fastapi.testclient import TestClient
 from app import app
 from security import SecurityUtils, RateLimiter
+from middleware.pipeline import RequestContext
+from middleware.security_middleware import SecurityStage
+from services.security_service import AttackPatternScanner, security_service
 
 client = TestClient(app)
 
@@ -246,3 +251,216 @@ class TestSecureFilename:
 
         # Все имена должны быть уникальными
         assert len(set(generated)) == len(generated)
+
+
+ATTACK_SAMPLES = [
+    "hello world",
+    "application/json",
+    "gzip, deflate",
+    "page=2&per_page=20",
+    "' OR 1=1",
+    "1 and 2 = 2",
+    "SELECT name FROM users",
+    "<script>alert(1)</script>",
+    "<IFRAME src=x>",
+    "javascript:void(0)",
+    "../../etc/passwd",
+    "%2E%2E%2Fsecret",
+    "name; cat /etc/passwd",
+    "Mozilla/5.0 (X11; Linux x86_64)",
+    "UNIONALL everything FROM t",
+    "dropped the table",
+    "ſelect name from users",
+    "/usr/bin/CAT",
+]
+
+FUZZ_FRAGMENTS = [
+    "api",
+    "products",
+    "union",
+    "Select",
+    "from",
+    "into",
+    "update",
+    "or 1=1",
+    "and",
+    "cat",
+    "ls",
+    "dir",
+    "table",
+    "<",
+    ">",
+    "script",
+    "/",
+    ".",
+    "..",
+    "\\",
+    "%2e",
+    "%2f",
+    "on",
+    "load",
+    "=",
+    " ",
+    "'",
+    ";",
+    "-",
+    "*",
+    "&",
+    "x",
+    "1",
+    "Ж",
+    "javascript",
+    ":",
+    "iframe",
+]
+
+
+def make_context(path="/api/items", query=b"", headers=None):
+    """Контекст запроса без запуска приложения"""
+    return RequestContext(
+        {
+            "type": "http",
+            "method": "GET",
+            "scheme": "http",
+            "server": ("testserver", 80),
+            "path": path,
+            "query_string": query,
+            "headers": [
+                (name.lower().encode(), value.encode())
+                for name, value in (headers or {}).items()
+            ],
+        }
+    )
+
+
+class TestAttackPatternScanner:
+    """Тесты однопроходного поиска паттернов атак"""
+
+    def test_matches_per_pattern_search(self):
+        """Тест: результат совпадает с поиском по каждому паттерну отдельно"""
+        scanner = security_service.attack_scanner
+
+        for sample in ATTACK_SAMPLES:
+            expected = [
+                (attack_type, pattern)
+                for attack_type, patterns in security_service.attack_patterns.items()
+                for pattern in patterns
+                if re.search(pattern, sample, re.IGNORECASE)
+            ]
+            assert scanner.matches(sample) == expected, sample
+            assert scanner.scan(sample) == (expected[0][0] if expected else None)
+
+    def test_prefilter_never_misses(self):
+        """Тест: на случайных строках предфильтр не теряет совпадений"""
+        import random
+
+        scanner = security_service.attack_scanner
+        rng = random.Random(7)
+        for _ in range(3000):
+            sample = "".join(rng.choices(FUZZ_FRAGMENTS, k=rng.randint(1, 8)))
+            expected = [
+                (attack_type, pattern)
+                for attack_type, patterns in security_service.attack_patterns.items()
+                for pattern in patterns
+                if re.search(pattern, sample, re.IGNORECASE)
+            ]
+            assert scanner.matches(sample) == expected, sample
+
+    def test_benign_values_not_flagged(self):
+        """Тест: заголовки браузеров и обычный текст не считаются атакой"""
+        scanner = security_service.attack_scanner
+        benign = [
+            "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
+            "(KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
+            "Mozilla/5.0 (Macintosh; Intel Mac OS X 14_1) AppleWebKit/605.1.15 "
+            "(KHTML, like Gecko) Version/17.1 Safari/605.1.15",
+            "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
+            "image/avif,image/webp,image/*,*/*;q=0.8",
+            "ru-RU,ru;q=0.9,en-US;q=0.8,en;q=0.7",
+            "gzip, deflate, br",
+            "no-cache; max-age=0",
+            "O'Brien",
+            "how to update settings",
+            "select a plan and update your profile",
+            "q=python&sort=relevance",
+            "type=posts&page=2&type=x",
+            "condition=new",
+            "session_id=3f9a2c; theme=dark; sort=date",
+        ]
+        for value in benign:
+            assert scanner.scan(value) is None, value
+
+    def test_sql_injection_detected(self):
+        """Тест: типичные SQL-инъекции распознаются"""
+        scanner = security_service.attack_scanner
+        attacks = [
+            "admin'--",
+            "' OR '1'='1",
+            "1' UNION SELECT password FROM users",
+            "1; DROP TABLE users",
+            "x' /* comment */",
+            "id=1 or 1=1",
+            "INSERT INTO users VALUES (1)",
+        ]
+        for value in attacks:
+            assert scanner.scan(value) == "sql_injection", value
+        assert scanner.scan("name; cat /etc/passwd") == "command_injection"
+        assert scanner.scan("$(whoami)") == "command_injection"
+        assert scanner.scan("q=x&cat /etc/passwd") == "command_injection"
+        assert scanner.scan('<img src=x onerror="alert(1)">') == "xss"
+        assert scanner.scan("<body onload=alert(1)>") == "xss"
+
+    def test_split_alternatives(self):
+        """Тест: паттерн раскладывается на ветви верхнего уровня"""
+        split = AttackPatternScanner._split_alternatives
+        assert split(r"('|(;)|(\b(union|select)\b))") == [
+            "'",
+            ";",
+            r"\b(union|select)\b",
+        ]
+        assert split(r"(a)(b)") == ["(a)(b)"]
+        assert split(r"[(|]x") == ["[(|]x"]
+        assert split(r"(?:a|b)") == ["(?:a|b)"]
+
+    def test_detect_attack_patterns(self):
+        """Тест: сервис возвращает тип, паттерн и серьезность атаки"""
+        attacks = asyncio.run(
+            security_service.detect_attack_patterns("<script>alert(1)</script>")
+        )
+        assert [attack["type"] for attack in attacks] == ["xss"]
+        assert attacks[0]["severity"] == "high"
+        assert asyncio.run(security_service.detect_attack_patterns("hello")) == []
+
+    def test_header_values_cached(self):
+        """Тест: повторяющиеся значения проверяются один раз"""
+        scanner = AttackPatternScanner(
+            {"xss": [r"<script"]}, cache_size=8, max_cached_length=32
+        )
+
+        for _ in range(3):
+            assert scanner.scan_cached("application/json") is None
+            assert scanner.scan_cached("<script>") == "xss"
+        info = scanner.cache_info()
+        assert (info.hits, info.misses) == (4, 2)
+
+        # Длинные значения не занимают место в кэше
+        assert scanner.scan_cached("x" * 64 + "<script>") == "xss"
+        assert scanner.cache_info().currsize == 2
+
+    def test_middleware_check_for_attacks(self):
+        """Тест: middleware проверяет URL, параметры и заголовки"""
+        stage = SecurityStage()
+        clean_headers = {"host": "testserver", "accept": "application/json"}
+
+        assert stage._check_for_attacks(make_context(headers=clean_headers)) is None
+        assert (
+            stage._check_for_attacks(make_context(query=b"file=../../etc"))
+            == "URL attack: path_traversal"
+        )
+        assert (
+            stage._check_for_attacks(make_context(query=b"q=%3Ciframe+src%3Dx%3E"))
+            == "Query attack: xss"
+        )
+        assert stage._check_for_attacks(
+            make_context(headers={"x-note": "<iframe src=x>"})
+        ) == ("Header attack in x-note: xss")
@@ -0,0 +1,313 @@
+"""
+Тесты сервиса социальной сети
+"""
+
+import pytest
+from datetime import datetime, timedelta
+from sqlalchemy import create_engine, event, inspect, text
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from models import Base, User
+import models_package.ecommerce
+import models_package.social as social_models
+import models_package.tasks
+import models_package.content
+import models_package.analytics
+from services.social_service import SocialService
+from services.counter_service import CounterService, install_counter_columns
+from schemas.social import CommentCreate, FollowCreate
+from schemas.base import CursorParams
+from utils.exceptions import ValidationError
+
+# Отдельная in-memory база, чтобы считать SQL-запросы сервиса
+engine = create_engine(
+    "sqlite://",
+    connect_args={"check_same_thread": False},
+    poolclass=StaticPool,
+)
+TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+
+class QueryCounter:
+    """Счетчик SQL-запросов, выполненных через engine"""
+
+    def __init__(self, bind):
+        self.bind = bind
+        self.count = 0
+
+    def _on_execute(self, *args, **kwargs):
+        self.count += 1
+
+    def __enter__(self):
+        event.listen(self.bind, "before_cursor_execute", self._on_execute)
+        return self
+
+    def __exit__(self, *exc):
+        event.remove(self.bind, "before_cursor_execute", self._on_execute)
+
+
+@pytest.fixture(scope="module")
+def db():
+    """Сессия с наполненной тестовой базой"""
+    Base.metadata.create_all(bind=engine)
+    session = TestingSessionLocal()
+
+    users = [
+        User(
+            email=f"social{i}@example.com",
+            username=f"social{i}",
+            hashed_password="hashed",
+        )
+        for i in range(10)
+    ]
+    session.add_all(users)
+    session.flush()
+
+    # По три поста на каждую секунду, чтобы проверить разрешение равенства по id
+    base_time = datetime(2024, 1, 1, 12, 0, 0)
+    posts = [
+        social_models.Post(
+            user_id=users[i % 10].id,
+            content=f"Post {i}",
+            created_at=base_time + timedelta(seconds=i // 3),
+        )
+        for i in range(120)
+    ]
+    session.add_all(posts)
+    session.flush()
+
+    for i, post in enumerate(posts):
+        for user in users[: i % 4]:
+            session.add(social_models.PostLike(user_id=user.id, post_id=post.id))
+        for j in range(i % 3):
+            session.add(
+                social_models.Comment(
+                    user_id=users[j].id, post_id=post.id, content=f"Comment {j}"
+                )
+            )
+
+    for user in users[1:4]:
+        session.add(social_models.Follow(follower_id=users[0].id, following_id=user.id))
+    session.commit()
+
+    # Данные добавлены в обход сервиса, поэтому счетчики пересчитываем
+    CounterService(session).reconcile_all()
+
+    yield session
+
+    session.close()
+    Base.metadata.drop_all(bind=engine)
+
+
+class TestPostStatsBatching:
+    """Тесты пакетного подсчета статистики постов"""
+
+    def test_post_stats_are_correct(self, db):
+        """Тест корректности счетчиков и признака лайка"""
+        viewer = db.query(User).filter(User.username == "social0").first()
+        result = SocialService(db).get_posts(limit=100, user=viewer)
+
+        for item in result["items"]:
+            post = item["post"]
+            assert item["likes_count"] == len(post.likes)
+            assert item["comments_count"] == len(post.comments)
+            assert item["is_liked"] == any(
+                like.user_id == viewer.id for like in post.likes
+            )
+
+    @pytest.mark.parametrize("method", ["get_posts", "get_feed"])
+    def test_query_count_constant_per_page(self, db, method):
+        """Тест: число запросов на страницу не растет вместе с limit"""
+        viewer = db.query(User).filter(User.username == "social0").first()
+        service = SocialService(db)
+
+        query_counts = []
+        for limit in (5, 20, 100):
+            db.expire_all()
+            db.refresh(viewer)
+            with QueryCounter(engine) as counter:
+                result = getattr(service, method)(limit=limit, user=viewer)
+                for item in result["items"]:
+                    # Автор поста нужен при сериализации ответа
+                    item["post"].user.username
+            assert len(result["items"]) > 0
+            query_counts.append(counter.count)
+
+        assert len(set(query_counts)) == 1, query_counts
+
+
+class TestDenormalizedCounters:
+    """Тесты денормализованных счетчиков"""
+
+    def test_reconcile_fixes_drift(self, db):
+        """Тест: сверка восстанавливает испорченные счетчики"""
+        post = db.query(social_models.Post).first()
+        expected_likes = len(post.likes)
+        post.likes_count = expected_likes + 42
+        db.commit()
+
+        fixed = CounterService(db).reconcile_all()
+
+        assert fixed["posts.likes_count"] == 1
+        assert sum(fixed.values()) == 1
+        assert post.likes_count == expected_likes
+
+    def test_like_and_comment_maintain_post_counters(self, db):
+        """Тест: лайк и комментарий обновляют счетчики поста"""
+        service = SocialService(db)
+        author = db.query(User).filter(User.username == "social9").first()
+        post = (
+            db.query(social_models.Post)
+            .filter(social_models.Post.user_id == author.id)
+            .first()
+        )
+        likes_before = post.likes_count
+        comments_before = post.comments_count
+
+        assert service.like_post(post.id, author) is True
+        assert service.get_post(post.id)["likes_count"] == likes_before + 1
+
+        comment = service.create_comment(
+            CommentCreate(post_id=post.id, content="Counter comment"), author
+        )
+        assert service.get_post(post.id)["comments_count"] == comments_before + 1
+
+        service.delete_comment(comment.id, author)
+        assert service.unlike_post(post.id, author) is True
+        result = service.get_post(post.id)
+        assert result["likes_count"] == likes_before
+        assert result["comments_count"] == comments_before
+
+    def test_follow_maintains_profile_counters(self, db):
+        """Тест: подписка обновляет счетчики профиля без агрегатов"""
+        service = SocialService(db)
+        follower = db.query(User).filter(User.username == "social8").first()
+        target = db.query(User).filter(User.username == "social7").first()
+        followers_before = target.followers_count
+
+        service.follow_user(FollowCreate(following_id=target.id), follower)
+
+        target_id = target.id
+        db.expire_all()
+        with QueryCounter(engine) as counter:
+            profile = service.get_user_profile(target_id)
+        assert profile["followers_count"] == followers_before + 1
+        assert profile["posts_count"] == len(target.posts)
+        # Только выборка пользователя, без COUNT по подпискам и постам
+        assert counter.count == 1
+
+        service.unfollow_user(target.id, follower)
+        assert service.get_user_profile(target.id)["followers_count"] == (
+            followers_before
+        )
+        assert sum(CounterService(db).reconcile_all().values()) == 0
+
+    def test_install_adds_missing_columns(self):
+        """Тест: колонки счетчиков добавляются в базу, созданную до них"""
+        old_engine = create_engine("sqlite://", poolclass=StaticPool)
+        Base.metadata.create_all(bind=old_engine)
+        with old_engine.begin() as connection:
+            connection.execute(
+                text(
+                    "INSERT INTO users (id, email, username, hashed_password) "
+                    "VALUES (1, 'old@example.com', 'old', 'hashed')"
+                )
+            )
+            connection.execute(
+                text("INSERT INTO posts (id, user_id, content) VALUES (1, 1, 'Old')")
+            )
+            connection.execute(
+                text("INSERT INTO post_likes (user_id, post_id) VALUES (1, 1)")
+            )
+            connection.execute(text("ALTER TABLE posts DROP COLUMN likes_count"))
+
+        assert install_counter_columns(old_engine) == ["posts.likes_count"]
+        columns = {c["name"] for c in inspect(old_engine).get_columns("posts")}
+        assert "likes_count" in columns
+        with old_engine.connect() as connection:
+            likes = connection.execute(text("SELECT likes_count FROM posts")).scalar()
+        assert likes == 1
+        assert install_counter_columns(old_engine) == []
+        old_engine.dispose()
+
+
+class TestCursorPagination:
+    """Тесты курсорной пагинации ленты"""
+
+    def test_cursor_walk_matches_offset_order(self, db):
+        """Тест: обход по курсорам возвращает все посты без пропусков и дублей"""
+        service = SocialService(db)
+        expected = [
+            post.id
+            for post in db.query(social_models.Post)
+            .order_by(
+                social_models.Post.created_at.desc(), social_models.Post.id.desc()
+            )
+            .all()
+        ]
+
+        seen = []
+        cursor_params = CursorParams()
+        while True:
+            result = service.get_posts(limit=25, cursor_params=cursor_params)
+            assert result["total"] is None
+            seen.extend(item["post"].id for item in result["items"])
+            if not result["next_cursor"]:
+                break
+            cursor_params = CursorParams(cursor=result["next_cursor"])
+
+        assert seen == expected
+
+    def test_cursor_total_on_request(self, db):
+        """Тест: общее количество считается только по запросу"""
+        result = SocialService(db).get_posts(
+            limit=10, cursor_params=CursorParams(include_total=True)
+        )
+        assert result["total"] == db.query(social_models.Post).count()
+        assert result["has_next"] is True
+
+    def test_invalid_cursor(self, db):
+        """Тест: некорректный курсор приводит к ошибке валидации"""
+        with pytest.raises(ValidationError):
+            SocialService(db).get_posts(cursor_params=CursorParams(cursor="garbage"))
+
+
+class TestAsyncSession:
+    """Тесты работы сервиса через асинхронную сессию"""
+
+    @pytest.mark.asyncio
+    async def test_get_posts_through_run_sync(self):
+        """Тест: сервис выполняется в AsyncSession.run_sync без изменений"""
+        async_engine = create_async_engine(
+            "sqlite+aiosqlite://",
+            connect_args={"check_same_thread": False},
+            poolclass=StaticPool,
+        )
+        AsyncTestingSessionLocal = async_sessionmaker(
+            bind=async_engine, expire_on_commit=False
+        )
+        async with async_engine.begin() as connection:
+            await connection.run_sync(Base.metadata.create_all)
+
+        async with AsyncTestingSessionLocal() as session:
+            author = User(
+                email="async@example.com", username="async", hashed_password="hashed"
+            )
+            session.add(author)
+            await session.flush()
+            session.add_all(
+                social_models.Post(user_id=author.id, content=f"Async {i}")
+                for i in range(3)
+            )
+            await session.commit()
+
+            result = await session.run_sync(
+                lambda sync_session: SocialService(sync_session).get_posts(user=author)
+            )
+
+        assert len(result["items"]) == 3
+        # Автор загружен заранее и доступен после закрытия сессии
+        assert {item["post"].user.username for item in result["items"]} == {"async"}
+        await async_engine.dispose()
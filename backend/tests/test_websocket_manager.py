@@ -0,0 +1,183 @@
+"""
+Тесты рассылки WebSocket сообщений
+"""
+
+import asyncio
+import json
+import pytest
+from fastapi.testclient import TestClient
+
+from app import app
+import websocket_manager as websocket_module
+from websocket_manager import WebSocketManager
+
+
+class FakeWebSocket:
+    """Клиент в памяти; отправка блокируется, пока не снят флаг release"""
+
+    def __init__(self, blocked: bool = False):
+        self.messages = []
+        self.closed_with = None
+        self.release = asyncio.Event()
+        if not blocked:
+            self.release.set()
+
+    async def accept(self):
+        pass
+
+    async def send_text(self, text: str):
+        await self.release.wait()
+        self.messages.append(json.loads(text))
+
+    async def close(self, code: int = 1000):
+        self.closed_with = code
+
+
+async def connected(manager, count, **kwargs):
+    sockets = [FakeWebSocket(**kwargs) for _ in range(count)]
+    for websocket in sockets:
+        await manager.connect(websocket)
+    return sockets
+
+
+class TestWebSocketManager:
+    """Тесты очередей соединений"""
+
+    @pytest.mark.asyncio
+    async def test_fanout_serializes_once_and_disconnect_cleans_sets(self, monkeypatch):
+        """Тест: сообщение сериализуется один раз на рассылку"""
+        manager = WebSocketManager()
+        first, second = await connected(manager, 2)
+        user = FakeWebSocket()
+        await manager.connect(user, user_id="7")
+        manager.subscribe(first, "social")
+        manager.subscribe(user, "social")
+
+        dumps = []
+        real_dumps = json.dumps
+        monkeypatch.setattr(
+            websocket_module.json,
+            "dumps",
+            lambda message: dumps.append(message) or real_dumps(message),
+        )
+        assert await manager.send_to_subscribers("social", {"type": "post"}) == 2
+        assert await manager.broadcast({"type": "news"}) == 3
+        assert await manager.send_to_user({"type": "direct"}, "7") == 1
+        assert len(dumps) == 3
+        await manager.join()
+
+        assert [m["type"] for m in user.messages] == [
+            "connection",
+            "post",
+            "news",
+            "direct",
+        ]
+        assert [m["type"] for m in second.messages] == ["connection", "news"]
+
+        manager.disconnect(user)
+        manager.disconnect(user)
+        assert manager.subscriptions == {"social": {first}}
+        assert manager.user_connections == {}
+        assert await manager.send_to_user({"type": "direct"}, "7") == 0
+
+    @pytest.mark.asyncio
+    async def test_slow_consumer_messages_dropped(self):
+        """Тест: заполненная очередь медленного клиента не задерживает остальных"""
+        manager = WebSocketManager(queue_size=2, slow_consumer_policy="drop")
+        (slow,) = await connected(manager, 1, blocked=True)
+        (fast,) = await connected(manager, 1)
+        await asyncio.sleep(0)
+
+        for i in range(5):
+            await manager.broadcast({"type": "tick", "n": i})
+            # Задачи записи получают управление между рассылками
+            await asyncio.sleep(0)
+        await asyncio.wait_for(manager.active_connections[fast].queue.join(), timeout=1)
+        assert [m.get("n") for m in fast.messages] == [None, 0, 1, 2, 3, 4]
+
+        # Приветствие отправляется, два сообщения в очереди, остальные отброшены
+        assert manager.active_connections[slow].dropped == 3
+        slow.release.set()
+        await manager.join()
+        assert [m.get("n") for m in slow.messages] == [None, 0, 1]
+
+    @pytest.mark.asyncio
+    async def test_slow_consumer_disconnected(self):
+        """Тест: политика disconnect и таймаут отправки закрывают соединение"""
+        manager = WebSocketManager(queue_size=1, slow_consumer_policy="disconnect")
+        (slow,) = await connected(manager, 1, blocked=True)
+        await asyncio.sleep(0)
+
+        await manager.broadcast({"type": "tick"})
+        await manager.broadcast({"type": "tick"})
+        await asyncio.sleep(0)
+        assert slow not in manager.active_connections
+        assert slow.closed_with == WebSocketManager.SLOW_CONSUMER_CLOSE_CODE
+
+        manager = WebSocketManager(send_timeout=0.05)
+        (stuck,) = await connected(manager, 1, blocked=True)
+        await asyncio.sleep(0.2)
+        assert stuck not in manager.active_connections
+        assert stuck.closed_with == WebSocketManager.SLOW_CONSUMER_CLOSE_CODE
+
+        with pytest.raises(ValueError):
+            WebSocketManager(slow_consumer_policy="block")
+        with pytest.raises(ValueError):
+            WebSocketManager(send_timeout=0)
+
+    @pytest.mark.asyncio
+    async def test_disconnect_with_backlog_releases_join(self):
+        """Тест: отключение клиента с очередью не оставляет join() висеть"""
+        manager = WebSocketManager(queue_size=8)
+        (slow,) = await connected(manager, 1, blocked=True)
+        (fast,) = await connected(manager, 1)
+        for i in range(3):
+            await manager.broadcast({"type": "tick", "n": i})
+        await asyncio.sleep(0)
+
+        pending = asyncio.create_task(manager.join())
+        await asyncio.sleep(0)
+        assert not pending.done()
+
+        # Отправка приветствия висит, три сообщения ждут в очереди
+        manager.disconnect(slow)
+        await asyncio.wait_for(pending, timeout=1)
+        assert slow.messages == []
+        assert [m.get("n") for m in fast.messages] == [None, 0, 1, 2]
+
+        # Ошибка отправки тоже освобождает очередь
+        (broken,) = await connected(manager, 1, blocked=True)
+        for i in range(3):
+            await manager.broadcast({"type": "tick", "n": i})
+        await asyncio.sleep(0)
+        pending = asyncio.create_task(manager.join())
+
+        async def fail(text):
+            raise RuntimeError("connection reset")
+
+        broken.send_text = fail
+        broken.release.set()
+        await asyncio.wait_for(pending, timeout=1)
+        assert broken not in manager.active_connections
+
+
+class TestWebSocketEndpoint:
+    """Тесты эндпоинта /ws"""
+
+    def test_subscribe_and_ping(self):
+        """Тест: подтверждение подписки и ответ на ping"""
+        client = TestClient(app)
+        with client.websocket_connect("/ws") as websocket:
+            assert websocket.receive_json()["type"] == "connection"
+
+            websocket.send_text(
+                json.dumps({"type": "subscribe", "event_type": "tasks"})
+            )
+            assert websocket.receive_json() == {
+                "type": "subscription_confirmed",
+                "event_type": "tasks",
+                "message": "Subscribed to tasks events",
+            }
+
+            websocket.send_text(json.dumps({"type": "ping"}))
+            assert websocket.receive_json()["type"] == "pong"
@@ -11,6 +11,7 @@ from .database import (
     QueryBuilder,
     CRUDBase,
     PaginationHelper,
+    CounterHelper,
     SearchHelper,
 )
 from .logging import (
@@ -62,6 +63,7 @@ __all__ = [
     "QueryBuilder",
     "CRUDBase",
     "PaginationHelper",
+    "CounterHelper",
     "SearchHelper",
     # Logging
     "LoggerSetup",
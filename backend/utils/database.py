@@ -3,10 +3,17 @@
 """
 
 from typing import Any, Dict, List, Optional, Type, TypeVar
+from datetime import datetime
+from sqlalchemy import tuple_, literal
 from sqlalchemy.orm import Session, Query
-from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.exc import SQLAlchemyError, TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import QueuePool, AsyncAdaptedQueuePool
 from pydantic import BaseModel
+import base64
+import binascii
+import json
 import logging
+import time
 
 logger = logging.getLogger(__name__)
 
@@ -50,6 +57,41 @@ class DatabaseUtils:
             return False
 
 
+class InstrumentedQueuePool(QueuePool):
+    """QueuePool, сообщающий время ожидания свободного соединения"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Наблюдатели вызываются как observer(wait_seconds, timed_out)
+        self.wait_observers: List[Any] = []
+
+    def recreate(self):
+        # engine.dispose() заменяет пул новым: наблюдатели переходят в него
+        pool = super().recreate()
+        pool.wait_observers = list(self.wait_observers)
+        return pool
+
+    def _do_get(self):
+        start_time = time.perf_counter()
+        timed_out = False
+        try:
+            return super()._do_get()
+        except PoolTimeoutError:
+            timed_out = True
+            raise
+        finally:
+            wait_time = time.perf_counter() - start_time
+            for observer in self.wait_observers:
+                try:
+                    observer(wait_time, timed_out)
+                except Exception as e:
+                    logger.error(f"Pool wait observer error: {e}")
+
+
+class InstrumentedAsyncQueuePool(InstrumentedQueuePool, AsyncAdaptedQueuePool):
+    """Вариант InstrumentedQueuePool для async engine (asyncpg)"""
+
+
 class QueryBuilder:
     """Построитель запросов"""
 
@@ -209,8 +251,105 @@ class PaginationHelper:
             "has_prev": skip > 0,
             "pages": (total + limit - 1) // limit if limit > 0 else 0,
             "current_page": (skip // limit) + 1 if limit > 0 else 1,
+            "next_cursor": None,
+        }
+
+    @staticmethod
+    def encode_cursor(sort_value: Any, item_id: int) -> str:
+        """Закодировать позицию (значение сортировки, id) в непрозрачный курсор"""
+        if isinstance(sort_value, datetime):
+            sort_value = sort_value.isoformat()
+        raw = json.dumps([sort_value, item_id], separators=(",", ":"))
+        return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+    @staticmethod
+    def decode_cursor(cursor: str) -> tuple:
+        """Раскодировать курсор в (значение сортировки, id)"""
+        from .exceptions import ValidationError
+
+        try:
+            padded = cursor + "=" * (-len(cursor) % 4)
+            sort_value, item_id = json.loads(base64.urlsafe_b64decode(padded))
+            if isinstance(sort_value, str):
+                sort_value = datetime.fromisoformat(sort_value)
+            return sort_value, int(item_id)
+        except (ValueError, TypeError, binascii.Error):
+            raise ValidationError("Некорректный курсор пагинации", field="cursor")
+
+    @staticmethod
+    def paginate_keyset(
+        query: Query,
+        model: Type[T],
+        cursor: Optional[str] = None,
+        limit: int = 20,
+        max_limit: int = 100,
+        include_total: bool = False,
+        sort_field: str = "created_at",
+    ) -> Dict[str, Any]:
+        """Курсорная (keyset) пагинация по (sort_field, id) от новых к старым"""
+        limit = min(limit, max_limit)
+        sort_column = getattr(model, sort_field)
+
+        # COUNT(*) по всей выборке дорогой, считаем только по запросу
+        total = query.count() if include_total else None
+
+        query = query.order_by(None).order_by(sort_column.desc(), model.id.desc())
+        if cursor:
+            sort_value, item_id = PaginationHelper.decode_cursor(cursor)
+            # Значения курсора связываем с типами колонок, чтобы драйвер
+            # сериализовал их так же, как хранимые данные
+            query = query.filter(
+                tuple_(sort_column, model.id)
+                < tuple_(
+                    literal(sort_value, sort_column.type),
+                    literal(item_id, model.id.type),
+                )
+            )
+
+        # Берем на одну запись больше, чтобы узнать о следующей странице
+        items = query.limit(limit + 1).all()
+        has_next = len(items) > limit
+        items = items[:limit]
+
+        next_cursor = None
+        if has_next and items:
+            last = items[-1]
+            next_cursor = PaginationHelper.encode_cursor(
+                getattr(last, sort_field), last.id
+            )
+
+        return {
+            "items": items,
+            "total": total,
+            "skip": 0,
+            "limit": limit,
+            "has_next": has_next,
+            "has_prev": bool(cursor),
+            "next_cursor": next_cursor,
         }
 
+    @staticmethod
+    def paginate(
+        query: Query,
+        model: Type[T],
+        skip: int = 0,
+        limit: int = 20,
+        cursor_params: Optional[Any] = None,
+        sort_field: str = "created_at",
+    ) -> Dict[str, Any]:
+        """Пагинация в offset-режиме или, если переданы cursor_params, в курсорном"""
+        if cursor_params is None:
+            return PaginationHelper.paginate_query(query, skip, limit)
+
+        return PaginationHelper.paginate_keyset(
+            query,
+            model,
+            cursor=cursor_params.cursor,
+            limit=limit,
+            include_total=cursor_params.include_total,
+            sort_field=sort_field,
+        )
+
     @staticmethod
     def create_pagination_response(
         items: List[Any],
@@ -232,6 +371,39 @@ class PaginationHelper:
         }
 
 
+class CounterHelper:
+    """Помощник для денормализованных счетчиков"""
+
+    @staticmethod
+    def increment(
+        db: Session, model: Type[T], instance_id: Any, field: str, delta: int = 1
+    ) -> None:
+        """Атомарно изменить счетчик в текущей транзакции (без commit)"""
+        if instance_id is None:
+            return
+
+        from sqlalchemy import func
+
+        column = getattr(model, field)
+        values = {column: func.coalesce(column, 0) + delta}
+        # Изменение счетчика не должно сдвигать updated_at записи
+        if hasattr(model, "updated_at"):
+            values[model.updated_at] = model.updated_at
+
+        # UPDATE ... SET field = COALESCE(field, 0) + delta исключает потерю
+        # обновлений при конкурентных запросах
+        db.query(model).filter(model.id == instance_id).update(
+            values, synchronize_session="fetch"
+        )
+
+    @staticmethod
+    def decrement(
+        db: Session, model: Type[T], instance_id: Any, field: str, delta: int = 1
+    ) -> None:
+        """Атомарно уменьшить счетчик в текущей транзакции (без commit)"""
+        CounterHelper.increment(db, model, instance_id, field, -delta)
+
+
 class SearchHelper:
     """Помощник для поиска"""
 
@@ -239,11 +411,24 @@ class SearchHelper:
     def add_search_filters(
         query: Query, model: Type[T], search_term: str, search_fields: List[str]
     ) -> Query:
-        """Добавить фильтры поиска"""
+        """Добавить фильтры поиска
+
+        Для моделей с полнотекстовым индексом (utils/full_text.py) по тем же
+        полям используется индекс вместо ILIKE '%term%', который требует
+        полного просмотра таблицы. Слова ищутся по префиксу, поэтому
+        неполное слово ('pyth') по-прежнему находит 'python'.
+        """
         if not search_term or not search_fields:
             return query
 
         from sqlalchemy import or_
+        from utils.full_text import FullTextSearch
+
+        if FullTextSearch.document_for(model, search_fields) is not None:
+            condition, _ = FullTextSearch(query.session.get_bind()).match(
+                model, search_term, prefix=True
+            )
+            return query.filter(condition)
 
         search_conditions = []
         for field in search_fields:
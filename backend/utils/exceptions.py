@@ -121,6 +121,24 @@ class ExternalServiceError(BaseAPIException):
         )
 
 
+class ServiceUnavailableError(BaseAPIException):
+    """Сервис временно не принимает запросы"""
+
+    def __init__(
+        self,
+        detail: str = "Сервис временно недоступен",
+        retry_after: Optional[int] = None,
+    ):
+        super().__init__(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=detail,
+            error_code="SERVICE_UNAVAILABLE",
+            metadata={"retry_after": retry_after},
+        )
+        if retry_after is not None:
+            self.headers = {"Retry-After": str(retry_after)}
+
+
 class DatabaseError(BaseAPIException):
     """Ошибка базы данных"""
 
@@ -0,0 +1,183 @@
+"""
+Полнотекстовый поиск по документам PostgreSQL
+"""
+
+import logging
+import re
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy import case, func, literal, literal_column, or_, text
+from sqlalchemy.engine import Engine
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+SEARCH_VECTOR_COLUMN = "search_vector"
+# Веса ts_rank по умолчанию для меток A-D; используются и в ILIKE-ранжировании
+WEIGHTS = {"A": 1.0, "B": 0.4, "C": 0.2, "D": 0.1}
+# Слова префиксного запроса: без операторов синтаксиса to_tsquery
+PREFIX_WORD = re.compile(r"[^\W_]+")
+
+
+class SearchDocument:
+    """Поля таблицы, входящие в полнотекстовый индекс, с весами A-D
+
+    В PostgreSQL документ хранится в генерируемой колонке search_vector
+    (tsvector ... STORED) с GIN-индексом: колонку пересчитывает сама БД
+    при INSERT/UPDATE, поэтому триггеры и хуки записи не нужны. Колонка
+    создается install_search_indexes и не объявлена в моделях, чтобы
+    create_all работал и на других СУБД.
+    """
+
+    def __init__(self, table: str, fields: Sequence[Tuple[str, str]]):
+        self.table = table
+        self.fields = list(fields)
+
+    @property
+    def field_names(self) -> List[str]:
+        return [field for field, _ in self.fields]
+
+    def vector_sql(self, config: str) -> str:
+        return " || ".join(
+            f"setweight(to_tsvector('{config}'::regconfig, coalesce({field}, '')), "
+            f"'{weight}')"
+            for field, weight in self.fields
+        )
+
+    def ddl(self, config: str) -> List[str]:
+        return [
+            f"ALTER TABLE {self.table} ADD COLUMN IF NOT EXISTS "
+            f"{SEARCH_VECTOR_COLUMN} tsvector "
+            f"GENERATED ALWAYS AS ({self.vector_sql(config)}) STORED",
+            f"CREATE INDEX IF NOT EXISTS ix_{self.table}_{SEARCH_VECTOR_COLUMN} "
+            f"ON {self.table} USING GIN ({SEARCH_VECTOR_COLUMN})",
+        ]
+
+
+# Триграммные индексы для нечетких подсказок (расширение pg_trgm)
+TRIGRAM_INDEXES = {"tags": "name", "articles": "title"}
+
+SEARCH_DOCUMENTS: Dict[str, SearchDocument] = {
+    document.table: document
+    for document in (
+        SearchDocument("posts", [("content", "A")]),
+        SearchDocument(
+            "articles", [("title", "A"), ("excerpt", "B"), ("content", "C")]
+        ),
+        SearchDocument("users", [("username", "A"), ("full_name", "B")]),
+    )
+}
+
+
+def _text_config() -> str:
+    config = settings.SEARCH_TEXT_CONFIG
+    if not re.fullmatch(r"\w+", config):
+        raise ValueError(f"Некорректная конфигурация поиска: {config}")
+    return config
+
+
+def install_search_indexes(bind: Engine) -> bool:
+    """Создать колонки search_vector, GIN- и триграммные индексы (только PostgreSQL)
+
+    Операции идемпотентны. Добавление колонки в существующую таблицу
+    переписывает ее под ACCESS EXCLUSIVE, поэтому функция запускается из
+    init_db или заданием python -m utils.full_text, а не при старте
+    воркеров приложения. Смена SEARCH_TEXT_CONFIG требует пересоздать
+    колонки вручную.
+    """
+    if bind.dialect.name != "postgresql":
+        return False
+
+    config = _text_config()
+    with bind.begin() as connection:
+        for document in SEARCH_DOCUMENTS.values():
+            for statement in document.ddl(config):
+                connection.execute(text(statement))
+
+    # Для CREATE EXTENSION нужны права владельца БД: без них подсказки
+    # работают без нечеткого поиска
+    try:
+        with bind.begin() as connection:
+            connection.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+            for table, column in TRIGRAM_INDEXES.items():
+                connection.execute(
+                    text(
+                        f"CREATE INDEX IF NOT EXISTS ix_{table}_{column}_trgm "
+                        f"ON {table} USING GIN ({column} gin_trgm_ops)"
+                    )
+                )
+    except Exception as e:
+        logger.warning(f"Trigram indexes not created: {e}")
+    return True
+
+
+class FullTextSearch:
+    """Условие поиска и ранг для запросов к документам SEARCH_DOCUMENTS
+
+    В PostgreSQL это websearch_to_tsquery по search_vector (GIN-индекс) и
+    ts_rank_cd. На других СУБД (SQLite в тестах) - ILIKE по тем же полям,
+    ранг - сумма весов совпавших полей.
+    """
+
+    def __init__(self, bind: Any):
+        dialect = bind.dialect.name if bind is not None else None
+        self.native = dialect == "postgresql"
+
+    @staticmethod
+    def document_for(model, fields: Optional[Sequence[str]] = None):
+        document = SEARCH_DOCUMENTS.get(getattr(model, "__tablename__", None))
+        if document is None:
+            return None
+        if fields is not None and set(fields) != set(document.field_names):
+            return None
+        return document
+
+    def match(self, model, term: str, prefix: bool = False):
+        """Вернуть (условие, ранг) для поиска term в документе модели
+
+        prefix=True - каждое слово term ищется как начало слова документа
+        ('pyth' находит 'python'), как в фильтрах списков, где раньше
+        был ILIKE по подстроке.
+        """
+        document = self.document_for(model)
+        if document is None:
+            raise ValueError(f"Нет поискового документа для {model.__name__}")
+
+        words = PREFIX_WORD.findall(term) if prefix else None
+        if self.native and (words or not prefix):
+            vector = literal_column(f"{document.table}.{SEARCH_VECTOR_COLUMN}")
+            config = literal_column(f"'{_text_config()}'::regconfig")
+            if prefix:
+                query = func.to_tsquery(
+                    config, " & ".join(f"{word}:*" for word in words)
+                )
+            else:
+                query = func.websearch_to_tsquery(config, term)
+            return vector.op("@@")(query), func.ts_rank_cd(vector, query)
+
+        pattern = f"%{term}%"
+        matches = [
+            (getattr(model, field).ilike(pattern), WEIGHTS[weight])
+            for field, weight in document.fields
+        ]
+        rank = sum(
+            (case((condition, weight), else_=0.0) for condition, weight in matches),
+            literal(0.0),
+        )
+        return or_(*(condition for condition, _ in matches)), rank
+
+
+def main():
+    """Точка входа для установки индексов как отдельного задания"""
+    from models import create_db_and_tables, engine
+
+    create_db_and_tables()
+    if install_search_indexes(engine):
+        print("✅ Полнотекстовые индексы установлены")
+    else:
+        print("ℹ️ Полнотекстовые индексы нужны только для PostgreSQL")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+"""
+Потоковый подсчет популярных элементов с затуханием во времени
+"""
+
+from array import array
+from typing import Callable, Dict, List, Optional, Tuple
+import heapq
+import threading
+import time
+
+# Показатель степени, после которого счетчики приводятся к новой точке отсчета
+RESCALE_EXPONENT = 64.0
+
+
+class HeavyHitters:
+    """Count-Min sketch с экспоненциальным затуханием и top-K самых частых
+
+    Память фиксирована: depth строк по width счетчиков плюс до k
+    кандидатов в top-K, независимо от числа различных элементов. Оценка
+    частоты не меньше истинной и превышает ее не более чем на
+    e / width * total с вероятностью 1 - exp(-depth); счетчики
+    обновляются консервативно, что уменьшает эту погрешность.
+
+    Затухание прямое (forward decay): событие в момент t добавляет
+    2 ** ((t - landmark) / half_life), а при чтении все делится на
+    тот же множитель для текущего момента. Так вклад события убывает
+    вдвое каждые half_life секунд, а счетчики не нужно пересчитывать
+    со временем - только изредка переносить точку отсчета, чтобы
+    множитель не переполнился. События можно добавлять не по порядку
+    (например, при загрузке истории из БД).
+
+    Кандидаты top-K лежат в словаре и куче по возрастанию оценки с
+    ленивым удалением устаревших записей: вытеснение самого редкого
+    кандидата стоит O(log k), выборка top-K - O(k log k).
+    """
+
+    def __init__(
+        self,
+        k: int = 100,
+        half_life: float = 3600.0,
+        width: int = 16384,
+        depth: int = 4,
+        clock: Callable[[], float] = time.time,
+    ):
+        self.k = k
+        self.half_life = half_life
+        self.width = width
+        self.depth = depth
+        self._clock = clock
+        self._landmark = clock()
+        self._rows = [array("d", bytes(8 * width)) for _ in range(depth)]
+        self._total = 0.0
+        self._top: Dict[str, float] = {}
+        self._heap: List[Tuple[float, str]] = []
+        self._lock = threading.Lock()
+
+    def add(self, item: str, weight: float = 1.0, at: Optional[float] = None) -> float:
+        """Учесть событие в момент at (по умолчанию сейчас); вернуть оценку"""
+        at = self._clock() if at is None else at
+        with self._lock:
+            exponent = (at - self._landmark) / self.half_life
+            if exponent > RESCALE_EXPONENT:
+                self._rescale(at)
+                exponent = 0.0
+            scaled = weight * 2.0**exponent
+
+            indexes = self._indexes(item)
+            estimate = (
+                min(row[index] for row, index in zip(self._rows, indexes)) + scaled
+            )
+            for row, index in zip(self._rows, indexes):
+                if row[index] < estimate:
+                    row[index] = estimate
+            self._total += scaled
+
+            if self.k:
+                self._offer(item, estimate)
+            return estimate * self._decay()
+
+    def estimate(self, item: str) -> float:
+        """Оценка затухающей частоты элемента на текущий момент"""
+        indexes = self._indexes(item)
+        with self._lock:
+            value = min(row[index] for row, index in zip(self._rows, indexes))
+            return value * self._decay()
+
+    @property
+    def total(self) -> float:
+        """Затухающая сумма весов всех событий"""
+        with self._lock:
+            return self._total * self._decay()
+
+    def top(self, limit: Optional[int] = None) -> List[Tuple[str, float]]:
+        """Самые частые элементы по убыванию оценки"""
+        with self._lock:
+            decay = self._decay()
+            items = sorted(self._top.items(), key=lambda item: (-item[1], item[0]))
+            return [(item, value * decay) for item, value in items[:limit]]
+
+    def _indexes(self, item: str) -> List[int]:
+        # Двойное хеширование: depth независимых позиций из двух хешей
+        first = hash(item)
+        second = hash((item, self.width)) | 1
+        return [(first + row * second) % self.width for row in range(self.depth)]
+
+    def _decay(self) -> float:
+        return 2.0 ** -((self._clock() - self._landmark) / self.half_life)
+
+    def _offer(self, item: str, estimate: float):
+        top = self._top
+        if item not in top and len(top) >= self.k:
+            floor, rarest = self._rarest()
+            if estimate <= floor:
+                return
+            heapq.heappop(self._heap)
+            del top[rarest]
+
+        top[item] = estimate
+        heapq.heappush(self._heap, (estimate, item))
+        if len(self._heap) > 4 * self.k:
+            self._heap = [(value, item) for item, value in top.items()]
+            heapq.heapify(self._heap)
+
+    def _rarest(self) -> Tuple[float, str]:
+        # Оценки только растут: устаревшие записи кучи меньше актуальных
+        heap = self._heap
+        while heap[0][0] != self._top.get(heap[0][1]):
+            heapq.heappop(heap)
+        return heap[0]
+
+    def _rescale(self, at: float):
+        factor = 2.0 ** -((at - self._landmark) / self.half_life)
+        for row in self._rows:
+            for index, value in enumerate(row):
+                if value:
+                    row[index] = value * factor
+        self._total *= factor
+        self._top = {item: value * factor for item, value in self._top.items()}
+        self._heap = [(value, item) for item, value in self._top.items()]
+        heapq.heapify(self._heap)
+        self._landmark = at
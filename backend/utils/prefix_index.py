@@ -0,0 +1,227 @@
+"""
+Индекс автодополнения: K самых популярных терминов по префиксу
+"""
+
+from array import array
+from bisect import bisect_left, insort
+from typing import Dict, Iterable, List, Optional, Tuple
+import heapq
+import threading
+
+# Строка больше любой строки с тем же префиксом: верхняя граница диапазона
+PREFIX_END = "\U0010ffff"
+
+
+class PrefixIndex:
+    """Термины с весами и выборка top-K по префиксу
+
+    Термины хранятся в отсортированном массиве, поэтому термины с общим
+    префиксом занимают непрерывный диапазон, который находится двоичным
+    поиском. Над весами построено дерево отрезков, хранящее в каждом узле
+    позицию самого популярного термина поддерева: лучший термин диапазона
+    находится за O(log n), а top-K - выбором из кучи поддиапазонов за
+    O(K log n) независимо от того, сколько терминов подходит под префикс.
+
+    Увеличение веса известного термина обновляет дерево за O(log n). Новые
+    термины копятся в небольшом отсортированном буфере, который
+    просматривается при выборке, и вливаются в массив перестроением в
+    фоновом потоке, когда буфер заполняется. При перестроении
+    отбрасываются термины с нулевым весом, а сверх max_terms - наименее
+    популярные.
+    """
+
+    def __init__(self, max_terms: int = 1_000_000, buffer_size: int = 20_000):
+        self.max_terms = max_terms
+        self.buffer_size = buffer_size
+        self._terms: List[str] = []
+        self._positions: Dict[str, int] = {}
+        self._scores = array("d")
+        self._tree = array("i")
+        self._pending: Dict[str, float] = {}
+        self._pending_terms: List[str] = []
+        # Изменения во время перестроения (None - перестроение не идет)
+        self._journal: Optional[List[Tuple[str, float]]] = None
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._terms) + len(self._pending)
+
+    def __contains__(self, term: str) -> bool:
+        return self.score(term) > 0
+
+    def score(self, term: str) -> float:
+        position = self._positions.get(term)
+        if position is not None:
+            return self._scores[position]
+        return self._pending.get(term, 0.0)
+
+    def add(self, term: str, weight: float = 1.0):
+        """Увеличить вес термина (новый термин добавляется)"""
+        with self._lock:
+            if self._add(term, weight):
+                insort(self._pending_terms, term)
+            start = self._rebuild_due()
+        if start:
+            threading.Thread(target=self.rebuild, daemon=True).start()
+
+    def update(self, weights: Iterable[Tuple[str, float]]):
+        """Изменить веса нескольких терминов; новые термины попадают в буфер
+
+        Пакетное обновление (загрузка словаря) само переполняет буфер,
+        поэтому перестроение выполняется сразу в вызывающем потоке.
+        """
+        with self._lock:
+            added = False
+            for term, weight in weights:
+                added = self._add(term, weight) or added
+            if added:
+                self._pending_terms = sorted(self._pending)
+            start = self._rebuild_due()
+        if start:
+            self.rebuild()
+
+    def rebuild(self):
+        """Влить буфер новых терминов в основной массив
+
+        Массив строится без блокировки по снимку; изменения, сделанные за
+        время построения, применяются к новому массиву повторно.
+        """
+        with self._lock:
+            if self._journal is not None:
+                return
+            self._journal = []
+            items = [
+                (term, score)
+                for term, score in zip(self._terms, self._scores)
+                if score > 0
+            ]
+            items.extend(
+                (term, score) for term, score in self._pending.items() if score > 0
+            )
+
+        terms, scores, tree = self._build(items, self.max_terms)
+
+        with self._lock:
+            journal, self._journal = self._journal, None
+            self._terms = terms
+            self._positions = {term: position for position, term in enumerate(terms)}
+            self._scores = scores
+            self._tree = tree
+            self._pending = {}
+            for term, weight in journal:
+                self._add(term, weight)
+            self._pending_terms = sorted(self._pending)
+
+    def suggest(self, prefix: str, limit: int = 10) -> List[Tuple[str, float]]:
+        """До limit терминов с префиксом по убыванию веса (при равенстве - по алфавиту)"""
+        if limit <= 0:
+            return []
+
+        upper = prefix + PREFIX_END
+        with self._lock:
+            results = self._top(
+                bisect_left(self._terms, prefix), bisect_left(self._terms, upper), limit
+            )
+            if self._pending_terms:
+                lo = bisect_left(self._pending_terms, prefix)
+                hi = bisect_left(self._pending_terms, upper, lo)
+                results.extend(
+                    (term, self._pending[term])
+                    for term in self._pending_terms[lo:hi]
+                    if self._pending[term] > 0
+                )
+
+        return heapq.nsmallest(limit, results, key=lambda item: (-item[1], item[0]))
+
+    def _add(self, term: str, weight: float) -> bool:
+        """Изменить вес; True, если термин новый и попал в буфер"""
+        if self._journal is not None:
+            self._journal.append((term, weight))
+        position = self._positions.get(term)
+        if position is not None:
+            self._scores[position] += weight
+            self._update(position)
+            return False
+        if term in self._pending:
+            self._pending[term] += weight
+            return False
+        self._pending[term] = weight
+        return True
+
+    def _rebuild_due(self) -> bool:
+        return len(self._pending) >= self.buffer_size and self._journal is None
+
+    def _better(self, a: int, b: int) -> int:
+        if a < 0:
+            return b
+        if b < 0:
+            return a
+        score_a, score_b = self._scores[a], self._scores[b]
+        if score_a > score_b or (score_a == score_b and a < b):
+            return a
+        return b
+
+    def _update(self, position: int):
+        tree = self._tree
+        node = (position + len(self._terms)) >> 1
+        while node:
+            tree[node] = self._better(tree[2 * node], tree[2 * node + 1])
+            node >>= 1
+
+    def _best(self, lo: int, hi: int) -> int:
+        """Позиция самого популярного термина в [lo, hi) или -1"""
+        tree = self._tree
+        best = -1
+        lo += len(self._terms)
+        hi += len(self._terms)
+        while lo < hi:
+            if lo & 1:
+                best = self._better(best, tree[lo])
+                lo += 1
+            if hi & 1:
+                hi -= 1
+                best = self._better(best, tree[hi])
+            lo >>= 1
+            hi >>= 1
+        return best
+
+    def _top(self, lo: int, hi: int, limit: int) -> List[Tuple[str, float]]:
+        if lo >= hi:
+            return []
+
+        heap = []
+
+        def push(start: int, end: int):
+            if start < end:
+                best = self._best(start, end)
+                heapq.heappush(heap, (-self._scores[best], best, start, end))
+
+        push(lo, hi)
+        results = []
+        while heap and len(results) < limit:
+            negative_score, best, start, end = heapq.heappop(heap)
+            if negative_score >= 0:
+                break
+            results.append((self._terms[best], -negative_score))
+            push(start, best)
+            push(best + 1, end)
+        return results
+
+    @staticmethod
+    def _build(items: List[Tuple[str, float]], max_terms: int):
+        if len(items) > max_terms:
+            items = heapq.nlargest(max_terms, items, key=lambda item: item[1])
+        items.sort()
+
+        size = len(items)
+        terms = [term for term, _ in items]
+        scores = array("d", (score for _, score in items))
+        tree = array("i", [-1]) * size + array("i", range(size))
+        for node in range(size - 1, 0, -1):
+            a, b = tree[2 * node], tree[2 * node + 1]
+            # Правый потомок может лежать левее в массиве (n не степень двойки)
+            if scores[a] > scores[b] or (scores[a] == scores[b] and a < b):
+                tree[node] = a
+            else:
+                tree[node] = b
+        return terms, scores, tree
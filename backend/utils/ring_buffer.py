@@ -0,0 +1,192 @@
+"""
+Кольцевой буфер фиксированной емкости со вторичными индексами
+"""
+
+from collections import deque
+from typing import Any, Callable, Dict, Hashable, Iterator, List, Optional, Sequence
+import heapq
+import time
+
+
+class RingBuffer:
+    """Кольцевой буфер последних capacity записей
+
+    Записи лежат в заранее выделенном списке: запись с порядковым номером
+    seq хранится в ячейке seq % capacity, поэтому добавление, вытеснение
+    самой старой записи и доступ по номеру выполняются за O(1). Для каждой
+    записи хранится время добавления; записи упорядочены по нему.
+
+    Для полей из indexes ведутся индексы "значение -> номера записей" в
+    порядке добавления. Вытесняемая запись всегда самая старая в своих
+    индексах, поэтому индексы очищаются тоже за O(1).
+    """
+
+    def __init__(
+        self,
+        capacity: int,
+        indexes: Sequence[str] = (),
+        key: Callable[[Any, str], Hashable] = getattr,
+        clock: Callable[[], float] = time.time,
+    ):
+        if capacity <= 0:
+            raise ValueError("capacity must be positive")
+        self.capacity = capacity
+        self.key = key
+        self.clock = clock
+        self._items: List[Any] = [None] * capacity
+        self._times: List[float] = [0.0] * capacity
+        self._first = 0  # номер самой старой записи
+        self._next = 0  # номер следующей записи
+        self._indexes: Dict[str, Dict[Hashable, deque]] = {
+            field: {} for field in indexes
+        }
+
+    def __len__(self) -> int:
+        return self._next - self._first
+
+    def __bool__(self) -> bool:
+        return self._next > self._first
+
+    def __getitem__(self, position: int) -> Any:
+        """Запись по позиции от старой к новой (отрицательные - с конца)"""
+        size = len(self)
+        if position < 0:
+            position += size
+        if not 0 <= position < size:
+            raise IndexError("ring buffer index out of range")
+        return self._items[(self._first + position) % self.capacity]
+
+    def __iter__(self) -> Iterator[Any]:
+        """Записи от старой к новой"""
+        for seq in range(self._first, self._next):
+            yield self._items[seq % self.capacity]
+
+    def append(self, item: Any, timestamp: Optional[float] = None):
+        """Добавить запись, вытеснив самую старую при заполнении"""
+        if len(self) == self.capacity:
+            self._pop_oldest()
+
+        seq = self._next
+        slot = seq % self.capacity
+        self._items[slot] = item
+        self._times[slot] = self.clock() if timestamp is None else timestamp
+        self._next += 1
+
+        for field, index in self._indexes.items():
+            value = self.key(item, field)
+            bucket = index.get(value)
+            if bucket is None:
+                bucket = index[value] = deque()
+            bucket.append(seq)
+
+    def _pop_oldest(self):
+        seq = self._first
+        slot = seq % self.capacity
+        item = self._items[slot]
+        self._items[slot] = None
+        self._first += 1
+
+        for field, index in self._indexes.items():
+            value = self.key(item, field)
+            bucket = index[value]
+            bucket.popleft()
+            if not bucket:
+                del index[value]
+
+    def drop_older_than(self, cutoff: float) -> int:
+        """Удалить записи, добавленные раньше cutoff"""
+        dropped = 0
+        while self and self._times[self._first % self.capacity] < cutoff:
+            self._pop_oldest()
+            dropped += 1
+        return dropped
+
+    def clear(self):
+        while self:
+            self._pop_oldest()
+
+    def latest(self, limit: int) -> List[Any]:
+        """Последние limit записей от старой к новой"""
+        start = max(self._first, self._next - max(limit, 0))
+        return [self._items[seq % self.capacity] for seq in range(start, self._next)]
+
+    def values(self, field: str) -> List[Hashable]:
+        """Значения индексированного поля, присутствующие в буфере"""
+        return list(self._indexes[field])
+
+    def count(self, field: str, value: Hashable) -> int:
+        """Число записей с заданным значением индексированного поля"""
+        bucket = self._indexes[field].get(value)
+        return len(bucket) if bucket is not None else 0
+
+    def counts(self, field: str) -> Dict[Hashable, int]:
+        """Число записей по значениям индексированного поля"""
+        return {value: len(bucket) for value, bucket in self._indexes[field].items()}
+
+    def query(
+        self,
+        filters: Optional[Dict[str, Sequence[Hashable]]] = None,
+        predicate: Optional[Callable[[Any], bool]] = None,
+        start_time: Optional[float] = None,
+        end_time: Optional[float] = None,
+        limit: Optional[int] = None,
+    ) -> List[Any]:
+        """Записи от новой к старой
+
+        filters задает для индексированных полей допустимые значения.
+        Перебираются номера записей из самого короткого индекса, остальные
+        условия проверяются для каждой кандидатуры. Перебор заканчивается,
+        когда набрано limit записей или время записи стало меньше start_time.
+        """
+        candidates = self._candidates(filters or {})
+        checks = [
+            (field, set(allowed))
+            for field, allowed in (filters or {}).items()
+            if field != candidates[0]
+        ]
+        result = []
+        if limit is not None and limit <= 0:
+            return result
+
+        for seq in candidates[1]:
+            slot = seq % self.capacity
+            timestamp = self._times[slot]
+            if end_time is not None and timestamp > end_time:
+                continue
+            if start_time is not None and timestamp < start_time:
+                break
+
+            item = self._items[slot]
+            if any(self.key(item, field) not in allowed for field, allowed in checks):
+                continue
+            if predicate is not None and not predicate(item):
+                continue
+
+            result.append(item)
+            if limit is not None and len(result) >= limit:
+                break
+
+        return result
+
+    def _candidates(self, filters: Dict[str, Sequence[Hashable]]):
+        """Самый узкий индекс из фильтров: (поле, номера от новых к старым)"""
+        best_field = None
+        best_buckets: List[deque] = []
+        best_size = len(self) + 1
+        for field, allowed in filters.items():
+            index = self._indexes.get(field)
+            if index is None:
+                continue
+            buckets = [index[value] for value in set(allowed) if value in index]
+            size = sum(len(bucket) for bucket in buckets)
+            if size < best_size:
+                best_field, best_buckets, best_size = field, buckets, size
+
+        if best_field is None:
+            return None, range(self._next - 1, self._first - 1, -1)
+        if len(best_buckets) == 1:
+            return best_field, reversed(best_buckets[0])
+        # Слияние нескольких индексов с сохранением порядка добавления
+        return best_field, heapq.merge(
+            *(reversed(bucket) for bucket in best_buckets), reverse=True
+        )
@@ -4,7 +4,7 @@
 
 from typing import Any, Dict, List, Optional
 from pydantic import BaseModel, ValidationError
-from fastapi import HTTPException, status
+from fastapi import HTTPException, status, Query
 import re
 
 
@@ -146,6 +146,27 @@ class PaginationValidator:
             "limit": min(100, max(1, limit)),
         }
 
+    @staticmethod
+    def cursor_params(
+        pagination: str = Query(
+            "offset",
+            pattern="^(offset|cursor)$",
+            description="Режим пагинации: offset (skip/limit) или cursor",
+        ),
+        cursor: Optional[str] = Query(
+            None, description="Курсор следующей страницы (включает режим cursor)"
+        ),
+        include_total: bool = Query(
+            False, description="Считать общее количество в режиме cursor"
+        ),
+    ):
+        """Зависимость FastAPI: параметры курсорной пагинации или None"""
+        from schemas.base import CursorParams
+
+        if pagination != "cursor" and not cursor:
+            return None
+        return CursorParams(cursor=cursor, include_total=include_total)
+
 
 class DataValidator:
     """Валидатор данных"""
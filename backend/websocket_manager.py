@@ -4,33 +4,95 @@ WebSocket Manager - управление WebSocket соединениями
 
 import json
 import asyncio
-from typing import Dict, List, Any
+from typing import Dict, Iterable, Optional, Set
 from fastapi import WebSocket, WebSocketDisconnect
 import logging
 
+from config import settings
+from monitoring.metrics import MetricsCollector
+
 logger = logging.getLogger(__name__)
+metrics_collector = MetricsCollector()
+
+
+class Connection:
+    """Соединение с очередью исходящих сообщений и собственной задачей записи"""
+
+    def __init__(self, websocket: WebSocket, user_id: Optional[str], queue_size: int):
+        self.websocket = websocket
+        self.user_id = user_id
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.subscriptions: Set[str] = set()
+        self.dropped = 0
+        self.writer: Optional[asyncio.Task] = None
+        # Время начала текущей отправки (loop.time()), None - writer ждет очередь
+        self.sending_since: Optional[float] = None
 
 
 class WebSocketManager:
-    """Менеджер WebSocket соединений"""
+    """Менеджер WebSocket соединений
+
+    Сообщения не отправляются в сокет напрямую: у каждого соединения есть
+    ограниченная очередь уже сериализованных сообщений, которую разбирает
+    его собственная задача записи. Рассылка сериализует сообщение один раз
+    и только кладет текст в очереди получателей, поэтому медленный клиент
+    не задерживает остальных.
+
+    Медленный клиент: если его очередь заполнена, сообщение для него
+    отбрасывается (политика drop) или соединение закрывается (disconnect);
+    соединение, не принявшее сообщение за send_timeout секунд, закрывается
+    при любой политике (проверяется фоновой задачей не реже чем раз в
+    send_timeout / 2).
+    """
+
+    SLOW_CONSUMER_POLICIES = ("drop", "disconnect")
+    # Код закрытия 1013 (Try Again Later) для отключенных медленных клиентов
+    SLOW_CONSUMER_CLOSE_CODE = 1013
+
+    def __init__(
+        self,
+        queue_size: Optional[int] = None,
+        send_timeout: Optional[float] = None,
+        slow_consumer_policy: Optional[str] = None,
+    ):
+        self.queue_size = queue_size or settings.WEBSOCKET_SEND_QUEUE_SIZE
+        self.send_timeout = (
+            settings.WEBSOCKET_SEND_TIMEOUT if send_timeout is None else send_timeout
+        )
+        self.slow_consumer_policy = (
+            slow_consumer_policy or settings.WEBSOCKET_SLOW_CONSUMER_POLICY
+        )
+        if self.send_timeout <= 0:
+            raise ValueError(f"send_timeout must be positive: {self.send_timeout}")
+        if self.slow_consumer_policy not in self.SLOW_CONSUMER_POLICIES:
+            raise ValueError(
+                f"Unknown slow consumer policy: {self.slow_consumer_policy}"
+            )
 
-    def __init__(self):
         # Активные соединения
-        self.active_connections: List[WebSocket] = []
+        self.active_connections: Dict[WebSocket, Connection] = {}
         # Соединения по пользователям
-        self.user_connections: Dict[str, List[WebSocket]] = {}
+        self.user_connections: Dict[str, Set[WebSocket]] = {}
         # Подписки на события
-        self.subscriptions: Dict[str, List[WebSocket]] = {}
+        self.subscriptions: Dict[str, Set[WebSocket]] = {}
+
+        self._watchdog: Optional[asyncio.Task] = None
+
+        self._sent = metrics_collector.websocket_messages.labels(outcome="sent")
+        self._dropped = metrics_collector.websocket_messages.labels(outcome="dropped")
+        self._failed = metrics_collector.websocket_messages.labels(outcome="failed")
 
     async def connect(self, websocket: WebSocket, user_id: str = None):
         """Подключение нового WebSocket клиента"""
         await websocket.accept()
-        self.active_connections.append(websocket)
+        connection = Connection(websocket, user_id, self.queue_size)
+        connection.writer = asyncio.create_task(self._write(connection))
+        self.active_connections[websocket] = connection
+        if self._watchdog is None or self._watchdog.done():
+            self._watchdog = asyncio.create_task(self._watch_slow_consumers())
 
         if user_id:
-            if user_id not in self.user_connections:
-                self.user_connections[user_id] = []
-            self.user_connections[user_id].append(websocket)
+            self.user_connections.setdefault(user_id, set()).add(websocket)
 
         logger.info(
             f"WebSocket connected. Total connections: {len(self.active_connections)}"
@@ -47,20 +109,33 @@ class WebSocketManager:
         )
 
     def disconnect(self, websocket: WebSocket, user_id: str = None):
-        """Отключение WebSocket клиента"""
-        if websocket in self.active_connections:
-            self.active_connections.remove(websocket)
+        """Отключение WebSocket клиента
 
+        Соединение удаляется только из своих множеств (пользователь и
+        подписки хранятся в Connection), неотправленные сообщения
+        отбрасываются с task_done(), чтобы не зависал join(). Повторный
+        вызов ничего не делает.
+        """
+        connection = self.active_connections.pop(websocket, None)
+        if connection is None:
+            return
+
+        user_id = connection.user_id or user_id
         if user_id and user_id in self.user_connections:
-            if websocket in self.user_connections[user_id]:
-                self.user_connections[user_id].remove(websocket)
+            self.user_connections[user_id].discard(websocket)
             if not self.user_connections[user_id]:
                 del self.user_connections[user_id]
 
         # Удаляем из всех подписок
-        for event_type, connections in self.subscriptions.items():
-            if websocket in connections:
-                connections.remove(websocket)
+        for event_type in connection.subscriptions:
+            self._discard_subscription(websocket, event_type)
+
+        if connection.writer is not asyncio.current_task():
+            connection.writer.cancel()
+        queue = connection.queue
+        while not queue.empty():
+            queue.get_nowait()
+            queue.task_done()
 
         logger.info(
             f"WebSocket disconnected. Total connections: {len(self.active_connections)}"
@@ -68,40 +143,127 @@ class WebSocketManager:
 
     async def send_personal_message(self, message: dict, websocket: WebSocket):
         """Отправка сообщения конкретному клиенту"""
-        try:
-            await websocket.send_text(json.dumps(message))
-        except Exception as e:
-            logger.error(f"Error sending personal message: {e}")
+        self._enqueue(websocket, json.dumps(message))
 
-    async def send_to_user(self, message: dict, user_id: str):
+    async def send_to_user(self, message: dict, user_id: str) -> int:
         """Отправка сообщения всем соединениям пользователя"""
-        if user_id in self.user_connections:
-            for websocket in self.user_connections[user_id]:
-                await self.send_personal_message(message, websocket)
+        return self._fanout(self.user_connections.get(user_id, ()), message)
 
-    async def broadcast(self, message: dict):
+    async def broadcast(self, message: dict) -> int:
         """Отправка сообщения всем подключенным клиентам"""
-        for websocket in self.active_connections:
-            await self.send_personal_message(message, websocket)
+        return self._fanout(self.active_connections, message)
 
-    async def send_to_subscribers(self, event_type: str, message: dict):
+    async def send_to_subscribers(self, event_type: str, message: dict) -> int:
         """Отправка сообщения подписчикам на определенный тип событий"""
-        if event_type in self.subscriptions:
-            for websocket in self.subscriptions[event_type]:
-                await self.send_personal_message(message, websocket)
+        return self._fanout(self.subscriptions.get(event_type, ()), message)
+
+    async def join(self):
+        """Дождаться отправки всех сообщений, уже стоящих в очередях"""
+        await asyncio.gather(
+            *(
+                connection.queue.join()
+                for connection in list(self.active_connections.values())
+            )
+        )
 
     def subscribe(self, websocket: WebSocket, event_type: str):
         """Подписка на тип событий"""
-        if event_type not in self.subscriptions:
-            self.subscriptions[event_type] = []
-        if websocket not in self.subscriptions[event_type]:
-            self.subscriptions[event_type].append(websocket)
+        self.subscriptions.setdefault(event_type, set()).add(websocket)
+        connection = self.active_connections.get(websocket)
+        if connection is not None:
+            connection.subscriptions.add(event_type)
 
     def unsubscribe(self, websocket: WebSocket, event_type: str):
         """Отписка от типа событий"""
-        if event_type in self.subscriptions:
-            if websocket in self.subscriptions[event_type]:
-                self.subscriptions[event_type].remove(websocket)
+        self._discard_subscription(websocket, event_type)
+        connection = self.active_connections.get(websocket)
+        if connection is not None:
+            connection.subscriptions.discard(event_type)
+
+    def _discard_subscription(self, websocket: WebSocket, event_type: str):
+        subscribers = self.subscriptions.get(event_type)
+        if subscribers is not None:
+            subscribers.discard(websocket)
+            if not subscribers:
+                del self.subscriptions[event_type]
+
+    def _fanout(self, websockets: Iterable[WebSocket], message: dict) -> int:
+        """Сериализовать сообщение один раз и поставить в очереди получателей"""
+        text = json.dumps(message)
+        # Копия: при переполнении очереди получатель может быть отключен
+        return sum(self._enqueue(websocket, text) for websocket in list(websockets))
+
+    def _enqueue(self, websocket: WebSocket, text: str) -> bool:
+        connection = self.active_connections.get(websocket)
+        if connection is None:
+            logger.warning("Message for unknown WebSocket connection dropped")
+            return False
+
+        try:
+            connection.queue.put_nowait(text)
+            return True
+        except asyncio.QueueFull:
+            self._dropped.inc()
+            connection.dropped += 1
+            if self.slow_consumer_policy == "disconnect":
+                self._drop_slow_consumer(connection)
+            return False
+
+    def _drop_slow_consumer(self, connection: Connection):
+        logger.warning(
+            f"Closing slow WebSocket consumer: {connection.queue.qsize()} queued, "
+            f"{connection.dropped} dropped"
+        )
+        metrics_collector.websocket_slow_consumers.inc()
+        self.disconnect(connection.websocket)
+        asyncio.create_task(self._close(connection.websocket))
+
+    async def _close(self, websocket: WebSocket):
+        try:
+            await websocket.close(code=self.SLOW_CONSUMER_CLOSE_CODE)
+        except Exception as e:
+            logger.debug(f"Error closing WebSocket: {e}")
+
+    async def _write(self, connection: Connection):
+        """Задача записи: отправляет сообщения из очереди соединения по порядку"""
+        queue = connection.queue
+        loop = asyncio.get_running_loop()
+        while True:
+            text = await queue.get()
+            connection.sending_since = loop.time()
+            try:
+                await connection.websocket.send_text(text)
+                self._sent.inc()
+            except Exception as e:
+                # Клиент ушел: цикл чтения в app.py тоже вызовет disconnect
+                self._failed.inc()
+                logger.error(f"Error sending WebSocket message: {e}")
+                self.disconnect(connection.websocket)
+                return
+            finally:
+                connection.sending_since = None
+                queue.task_done()
+
+    async def _watch_slow_consumers(self):
+        """Закрывать соединения, отправка в которые идет дольше send_timeout
+
+        Один проход по соединениям раз в половину send_timeout вместо
+        таймера на каждое сообщение: при рассылке тысячам клиентов
+        таймеры стоили бы дороже самой отправки.
+        """
+        loop = asyncio.get_running_loop()
+        while self.active_connections:
+            await asyncio.sleep(self.send_timeout / 2)
+            deadline = loop.time() - self.send_timeout
+            stuck = [
+                connection
+                for connection in self.active_connections.values()
+                if connection.sending_since is not None
+                and connection.sending_since < deadline
+            ]
+            for connection in stuck:
+                self._failed.inc()
+                self._drop_slow_consumer(connection)
 
     async def handle_message(self, websocket: WebSocket, message: str):
         """Обработка входящих сообщений от клиента"""
@@ -623,10 +623,10 @@ class AdvancedAnalyticsManager {
         const topContentList = document.getElementById('top-content-list');
         topContentList.innerHTML = topContent.map(item => `
             <div class="content-item">
-                <div class="content-title">${item.title}</div>
+                <div class="content-title">${this.escapeHtml(item.title)}</div>
                 <div class="content-stats">
-                    <span>${item.views} просмотров</span>
-                    <span>${(item.engagement * 100).toFixed(1)}% вовлеченность</span>
+                    <span>${item.likes} лайков</span>
+                    <span>${(item.engagement * 100).toFixed(1)}% лайков периода</span>
                 </div>
             </div>
         `).join('');
@@ -941,6 +941,15 @@ class AdvancedAnalyticsManager {
         }
     }
 
+    /**
+     * Экранирование HTML
+     */
+    escapeHtml(text) {
+        const div = document.createElement('div');
+        div.textContent = text;
+        return div.innerHTML;
+    }
+
     /**
      * Показ успеха
      */
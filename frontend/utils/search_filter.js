@@ -589,12 +589,18 @@ class SearchFilterManager {
             return;
         }
 
-        container.innerHTML = suggestions.map(suggestion => `
-            <div class="suggestion-item" onclick="window.searchFilterManager.selectSuggestion('${suggestion}')">
-                ${suggestion}
+        container.innerHTML = suggestions.map((suggestion, index) => `
+            <div class="suggestion-item" data-index="${index}">
+                ${this.escapeHtml(suggestion)}
             </div>
         `).join('');
 
+        container.querySelectorAll('.suggestion-item').forEach(element => {
+            element.addEventListener('click', () => {
+                this.selectSuggestion(suggestions[element.dataset.index]);
+            });
+        });
+
         container.style.display = 'block';
     }
 
@@ -781,7 +787,7 @@ class SearchFilterManager {
                 <div class="result-header">
                     <h4 class="result-title">${post.title}</h4>
                     <div class="result-meta">
-                        ${post.created_at} • ${post.views_count} просмотров
+                        ${post.created_at} • ${post.likes_count} лайков
                     </div>
                 </div>
                 <div class="result-content">${post.content.substring(0, 200)}...</div>
@@ -803,13 +809,11 @@ class SearchFilterManager {
         return `
             <div class="result-item">
                 <div class="result-header">
-                    <h4 class="result-title">${user.full_name}</h4>
+                    <h4 class="result-title">${user.full_name || user.username}</h4>
                     <div class="result-meta">
                         @${user.username} • ${user.followers_count} подписчиков
                     </div>
                 </div>
-                <div class="result-content">${user.bio}</div>
-                <div class="result-meta">${user.location}</div>
                 <div class="result-actions">
                     <button class="btn btn-sm btn-primary">Подписаться</button>
                     <button class="btn btn-sm btn-secondary">Профиль</button>
@@ -991,12 +995,29 @@ class SearchFilterManager {
      */
     renderPopularSearches(popular) {
         const container = document.getElementById('popular-searches-list');
-        container.innerHTML = popular.map(item => `
-            <div class="popular-item" onclick="window.searchFilterManager.selectSuggestion('${item.query}')">
-                <span>${item.query}</span>
-                <span class="trend ${item.trend}">${item.count}</span>
+        container.innerHTML = popular.map((item, index) => `
+            <div class="popular-item" data-index="${index}">
+                <span>${this.escapeHtml(item.query)}</span>
+                <span class="trend ${this.escapeHtml(item.trend)}">${this.escapeHtml(String(item.count))}</span>
             </div>
         `).join('');
+
+        // Запрос берется из данных, а не из разметки: кавычки в нем не
+        // ломают атрибуты и обработчики
+        container.querySelectorAll('.popular-item').forEach(element => {
+            element.addEventListener('click', () => {
+                this.selectSuggestion(popular[element.dataset.index].query);
+            });
+        });
+    }
+
+    /**
+     * Экранирование HTML
+     */
+    escapeHtml(text) {
+        const div = document.createElement('div');
+        div.textContent = text;
+        return div.innerHTML;
     }
 }
 